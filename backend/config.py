@@ -1,5 +1,7 @@
 """AML Transaction Overview Tool - Configuration constants."""
 
+import os
+
 
 # ---------- Structuring Detection ----------
 STRUCTURING_THRESHOLD = 10000
@@ -32,15 +34,81 @@ COUNTERPARTY_AGGREGATE = 15000
 
 # ---------- Profile Deviation ----------
 PROFILE_DEVIATION_MULTIPLIER = 3.0
+# History before a scoped review period used as the customer's baseline
+PROFILE_BASELINE_DAYS = 365
+# Peer groups: customers sharing a dominant transaction type and a band of
+# average monthly EUR volume (band edges below)
+PEER_VOLUME_BANDS = [10000, 50000, 250000, 1000000]
+# Groups with fewer customers are not used as a baseline
+PEER_GROUP_MIN_SIZE = 5
+# A transaction / month is flagged above this multiple of the group quantile
+PEER_BASELINE_QUANTILE = 0.95
+PEER_DEVIATION_MULTIPLIER = 3.0
 
 # ---------- Flow-Through ----------
 FLOW_THROUGH_VARIANCE = 0.10
 FLOW_THROUGH_WINDOW_DAYS = 30
 FLOW_THROUGH_MIN_AMOUNT = 10000
 
+# ---------- Multi-hop Layering ----------
+LAYERING_MIN_AMOUNT = 5000
+LAYERING_AMOUNT_TOLERANCE = 0.10
+LAYERING_WINDOW_HOURS = 168
+LAYERING_MIN_HOPS = 2
+LAYERING_MAX_HOPS = 5
+LAYERING_MAX_CHAINS = 50
+
+# ---------- Cross-customer Transfers ----------
+# An outgoing payment to an IBAN matched by an incoming payment from the
+# same IBAN (to another customer, or back to the payer) shortly after
+MATCHED_TRANSFER_MIN_AMOUNT = 5000
+MATCHED_TRANSFER_TOLERANCE = 0.05
+MATCHED_TRANSFER_WINDOW_HOURS = 48
+# Incoming legs considered per outgoing leg (earliest first)
+MATCHED_TRANSFER_MAX_CANDIDATES = 3
+# Counterparty IBANs used by many customers within a window
+SHARED_IBAN_MIN_BCNS = 3
+SHARED_IBAN_WINDOW_DAYS = 30
+# IBANs shared by more customers than this, or by more than this share of
+# the book, are popular payees (tax office, utilities, large merchants):
+# only customers' matched transfer legs with them are flagged
+SHARED_IBAN_MAX_BCNS = 25
+SHARED_IBAN_MAX_SHARE = 0.5
+
+# ---------- Real-time Scoring ----------
+# Scored transactions are queued in memory and appended to the loaded
+# transactions (extending the per-row indexes) once this many are pending
+REALTIME_FLUSH_ROWS = 1000
+# Appends leave the whole-book structures (counterparty graph, transfer
+# links, pattern cube, portfolio features, peer groups) behind; they are
+# rebuilt in the background once this many appended rows are missing
+DEFERRED_REFRESH_ROWS = 50000
+
+# ---------- Streaming Ingestion ----------
+# Chunked NDJSON/CSV transaction streams are parsed and coerced every
+# STREAM_BATCH_ROWS lines (acknowledged with one progress line each) and
+# appended to the store (extending the per-row indexes) every
+# STREAM_COMMIT_ROWS rows and at the end of the stream; the whole-book
+# structures are rebuilt once, after the stream ends
+STREAM_BATCH_ROWS = 20000
+STREAM_COMMIT_ROWS = 20000
+# A line longer than this aborts the stream
+STREAM_MAX_LINE_BYTES = 1024 * 1024
+
+# ---------- Currency Normalization ----------
+# Rules and aggregates compare amounts in this currency; FX rates are quoted
+# as units of foreign currency per one unit of it
+BASE_CURRENCY = "EUR"
+
+# ---------- Backtesting ----------
+BACKTEST_MAX_COMBINATIONS = 10000
+BACKTEST_MAX_WINDOW_DAYS = 3650
+
 # ---------- Fuzzy Match ----------
 FUZZY_MATCH_HIGH = 85
 FUZZY_MATCH_MEDIUM = 70
+# Distinct names scored against the watchlist per cdist block
+NAME_SCREENING_CHUNK_SIZE = 1000
 
 # ---------- Risk Weights ----------
 RISK_WEIGHTS = {
@@ -56,10 +124,64 @@ RISK_WEIGHTS = {
     "counterparty": 20,
     "profile_deviation": 10,
     "flow_through": 25,
+    "layering": 25,
+    "matched_transfer": 20,
+    "round_trip": 20,
+    "shared_iban": 15,
 }
 
 RISK_SCORE_CAP = 100
 
+# ---------- Screening / Alert Store ----------
+DATA_DIR = os.environ.get("AML_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+ALERT_STORE_PATH = os.path.join(DATA_DIR, "alerts.sqlite3")
+SCREENING_BATCH_SIZE = 500
+ALERT_PAGE_SIZE_MAX = 500
+# Completed screening runs kept in the alert store; older ones, and abandoned
+# (never completed) runs that started before them, are deleted
+ALERT_RUNS_KEPT = 10
+# Portfolio summary: score histogram bin width, top-N customers, runs kept in memory
+PORTFOLIO_SCORE_BIN_WIDTH = 10
+PORTFOLIO_TOP_CUSTOMERS = 20
+PORTFOLIO_SUMMARY_CACHE_SIZE = 8
+# Rows fetched and written per chunk by the /export endpoints
+EXPORT_CHUNK_SIZE = 10000
+
+# ---------- Background Jobs ----------
+JOB_WORKERS = 2
+JOB_HISTORY_LIMIT = 100
+JOB_STREAM_POLL_SECONDS = 0.25
+
+# ---------- Multi-worker Shared Store ----------
+# Set AML_SHARED_STORE=1 when running several workers (uvicorn --workers N)
+# so uploads are published as memory-mapped snapshots all workers attach to.
+SHARED_STORE_ENABLED = os.environ.get("AML_SHARED_STORE", "") == "1"
+SHARED_STORE_DIR = os.path.join(DATA_DIR, "shared")
+SHARED_STORE_KEEP_VERSIONS = 3
+# Appended-row segments after which a worker refreshing its whole-book
+# structures republishes the transactions as one frame
+SHARED_STORE_MAX_APPENDS = 64
+
+# ---------- Upload Cache ----------
+# Parsed transaction uploads are cached by content hash so re-uploading an
+# identical workbook skips Excel parsing; least recently used entries are
+# evicted beyond the size budget (AML_UPLOAD_CACHE_MB=0 disables the cache).
+UPLOAD_CACHE_DIR = os.path.join(DATA_DIR, "upload_cache")
+UPLOAD_CACHE_MAX_BYTES = int(os.environ.get("AML_UPLOAD_CACHE_MB", "2048")) * 1024 * 1024
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
+# Processes parsing workbooks/sheets of a multi-file upload in parallel
+INGEST_WORKERS = int(os.environ.get("AML_INGEST_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# ---------- Memory Budget ----------
+# Resident memory the loaded frames and indexes may use (0 = unlimited).
+# Over budget, uploads are refused ("reject") or frames are first spilled
+# to memory-mapped files under MEMORY_SPILL_DIR ("spill").
+MEMORY_BUDGET_BYTES = int(os.environ.get("AML_MEMORY_BUDGET_MB", "0")) * 1024 * 1024
+MEMORY_POLICY = os.environ.get("AML_MEMORY_POLICY", "reject")
+MEMORY_SPILL_DIR = os.path.join(DATA_DIR, "spill")
+# Derived indexes measured at roughly half the size of the transactions frame
+MEMORY_INDEX_OVERHEAD = 0.5
+
 # ---------- Required Excel Columns ----------
 REQUIRED_COLUMNS_TRANSACTIONS = [
     "date",
@@ -84,6 +206,12 @@ REQUIRED_COLUMNS_HIGH_RISK_COUNTRIES = [
     "risk_level",
 ]
 
+REQUIRED_COLUMNS_FX_RATES = [
+    "date",
+    "currency",
+    "rate",
+]
+
 REQUIRED_COLUMNS_WORK_INSTRUCTIONS = [
     "business_contact_number",
     "instruction",
@@ -0,0 +1,478 @@
+"""HTTP load test - drive the API with concurrent investigator traffic and report latency percentiles.
+
+Starts ``main:app`` under uvicorn with a throw-away data directory, uploads a
+synthetic book of configurable size through the normal upload endpoints and
+then runs a weighted mix of customer search, overview and analysis calls at
+a fixed concurrency.  Throughput, p50/p95/p99 latency and error rates are
+reported per endpoint and saved as JSON (tagged with the git commit) so runs
+can be compared across commits.
+
+Usage (from ``backend/``)::
+
+    python load_test.py --rows 100000 --customers 5000 --concurrency 32 --duration 60
+    python load_test.py --compare loadtest_results/<earlier run>.json
+    python load_test.py --url http://127.0.0.1:8000 --no-load   # existing server
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BACKEND_DIR, "loadtest_results")
+API = "/api/v1"
+
+# Endpoint name -> default share of the request mix
+DEFAULT_MIX = {
+    "search": 30,
+    "overview": 30,
+    "alerts": 15,
+    "risk-breakdown": 15,
+    "network": 10,
+}
+# Share of overview / analysis calls restricted to a review period
+PERIOD_SHARE = 0.2
+
+_FIRST = ["Jan", "Maria", "Ahmed", "Sophie", "Pieter", "Elena", "Omar", "Lucas", "Anna", "Ivan", "Fatima", "Tom"]
+_LAST = ["de Vries", "Petrova", "Hassan", "Mueller", "Jansen", "Rossi", "Ali", "Smit", "Novak", "Bakker", "Visser"]
+_COMPANY = ["Trading", "Holdings", "Services", "Logistics", "Import", "Consulting", "Invest", "Partners"]
+_SUFFIX = ["BV", "NV", "Ltd", "GmbH", "AG", "SA"]
+_IBAN_COUNTRIES = ["NL"] * 12 + ["DE"] * 4 + ["BE", "FR", "CH", "GB", "IR", "SY", "BY", "KP"]
+_TX_TYPES = ["Transfer", "Credit", "Debit", "Purchase", "International Transfer"]
+_CURRENCIES = ["EUR"] * 18 + ["USD", "GBP"]
+_HIGH_RISK = [
+    ("Iran", "IR", "Blacklist"),
+    ("North Korea", "KP", "Blacklist"),
+    ("Syria", "SY", "Blacklist"),
+    ("Belarus", "BY", "Greylist"),
+]
+
+
+# ---------- Synthetic data ----------
+
+def customer_names(n: int, rng: np.random.Generator) -> list[str]:
+    names = []
+    for i in range(n):
+        if i % 3 == 0:
+            names.append(f"{rng.choice(_LAST).split()[-1]} {rng.choice(_COMPANY)} {rng.choice(_SUFFIX)} {i}")
+        else:
+            names.append(f"{rng.choice(_FIRST)} {rng.choice(_LAST)} {i}")
+    return names
+
+
+def synthetic_transactions(rows: int, customers: int, seed: int) -> pd.DataFrame:
+    """``rows`` transactions over ``customers`` BCNs, spread over one year.
+
+    Activity per customer is skewed (a few busy accounts, a long tail), a
+    share of amounts sit just below the reporting threshold or are round,
+    and a fifth of the counterparties are other customers of the book, so
+    network analysis has chains to follow.
+    """
+    rng = np.random.default_rng(seed)
+    bcns = np.array([f"BCN-{i:06d}" for i in range(customers)])
+    names = np.array(customer_names(customers, rng))
+
+    weights = rng.pareto(1.5, customers) + 1
+    owner = rng.choice(customers, size=rows, p=weights / weights.sum())
+    # Every customer has at least one transaction, so overview calls do not 404
+    owner[:min(customers, rows)] = np.arange(min(customers, rows))
+    other = rng.integers(0, customers, size=rows)
+    external = np.array([f"Counterparty {i}" for i in range(max(customers // 2, 1))])
+    counterparty = np.where(
+        rng.random(rows) < 0.2, names[other], external[rng.integers(0, len(external), size=rows)]
+    )
+    outgoing = rng.random(rows) < 0.55
+
+    amount = np.round(rng.lognormal(7.5, 1.3, rows), 2)
+    kind = rng.random(rows)
+    amount = np.where(kind < 0.05, rng.integers(8000, 10000, rows).astype(float), amount)
+    amount = np.where((kind >= 0.05) & (kind < 0.12), rng.integers(1, 30, rows) * 1000.0, amount)
+
+    start = np.datetime64("2024-01-01T00:00")
+    dates = start + rng.integers(0, 365 * 24 * 60, size=rows).astype("timedelta64[m]")
+    country = np.array(_IBAN_COUNTRIES)[rng.integers(0, len(_IBAN_COUNTRIES), size=rows)]
+    iban = np.char.add(country, np.char.zfill(rng.integers(0, 10 ** 9, size=rows).astype(str), 16))
+
+    return pd.DataFrame({
+        "Date": pd.to_datetime(dates),
+        "Amount": amount,
+        "Sender": np.where(outgoing, names[owner], counterparty),
+        "Receiver": np.where(outgoing, counterparty, names[owner]),
+        "IBAN": iban,
+        "BIC": np.char.add(np.char.add("BANK", country), "XX"),
+        "Currency": np.array(_CURRENCIES)[rng.integers(0, len(_CURRENCIES), size=rows)],
+        "Description": np.char.add("Payment ", rng.integers(1, 5000, size=rows).astype(str)),
+        "Transaction Type": np.array(_TX_TYPES)[rng.integers(0, len(_TX_TYPES), size=rows)],
+        "Business Contact Number": bcns[owner],
+    }).sort_values("Date", kind="stable", ignore_index=True)
+
+
+def _workbook(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+# ---------- HTTP ----------
+
+class Client:
+    """Keep-alive HTTP/1.1 connection, reopened after transport errors."""
+
+    def __init__(self, base_url: str, timeout: float) -> None:
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._conn: http.client.HTTPConnection | None = None
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None) -> tuple[int, bytes]:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self._conn.request(method, path, body=body, headers=headers or {})
+            resp = self._conn.getresponse()
+            return resp.status, resp.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def upload(client: Client, endpoint: str, filename: str, contents: bytes) -> dict:
+    boundary = uuid.uuid4().hex
+    body = b"".join([
+        f"--{boundary}\r\n".encode(),
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'.encode(),
+        b"Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet\r\n\r\n",
+        contents,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
+    status, payload = client.request(
+        "POST", f"{API}/upload/{endpoint}", body,
+        {"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    if status != 200:
+        raise RuntimeError(f"Upload to /upload/{endpoint} failed with {status}: {payload[:500]!r}")
+    return json.loads(payload)
+
+
+def start_server(port: int, workers: int, data_dir: str) -> subprocess.Popen:
+    env = dict(os.environ, AML_DATA_DIR=data_dir)
+    if workers > 1:
+        env["AML_SHARED_STORE"] = "1"
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+
+
+def wait_ready(base_url: str, proc: subprocess.Popen | None, timeout: float = 60.0) -> None:
+    client = Client(base_url, timeout=2.0)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            if client.request("GET", "/")[0] == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout:.0f}s")
+
+
+def load_dataset(client: Client, args: argparse.Namespace) -> None:
+    t0 = time.perf_counter()
+    df = synthetic_transactions(args.rows, args.customers, args.seed)
+    contents = _workbook(df)
+    print(f"Generated {len(df):,} transactions for {args.customers:,} customers "
+          f"({len(contents) / 1e6:.1f} MB) in {time.perf_counter() - t0:.1f}s")
+
+    countries = pd.DataFrame(_HIGH_RISK, columns=["Country Name", "Country Code", "Risk Level"])
+    upload(client, "high-risk-countries", "high_risk_countries.xlsx", _workbook(countries))
+    watchlist = pd.DataFrame({"Name": customer_names(args.customers, np.random.default_rng(args.seed))[::97]})
+    upload(client, "watchlist", "watchlist.xlsx", _workbook(watchlist))
+
+    t0 = time.perf_counter()
+    result = upload(client, "transactions", "transactions.xlsx", contents)
+    print(f"Uploaded {result['record_count']:,} transactions in {time.perf_counter() - t0:.1f}s")
+
+
+# ---------- Workload ----------
+
+def parse_mix(spec: str | None) -> dict[str, float]:
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown endpoint '{name}' in --mix. Allowed: {', '.join(DEFAULT_MIX)}.")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _period(rng: random.Random) -> str:
+    if rng.random() >= PERIOD_SHARE:
+        return ""
+    month = rng.randint(1, 10)
+    return "?" + urlencode({"from": f"2024-{month:02d}-01", "to": f"2024-{month + 2:02d}-28"})
+
+
+def request_path(endpoint: str, rng: random.Random, bcns: list[str], names: list[str]) -> str:
+    if endpoint == "search":
+        if rng.random() < 0.5:
+            q = rng.choice(bcns)[: rng.randint(6, 10)]
+        else:
+            q = rng.choice(names).split()[0]
+        return f"{API}/customer/search?" + urlencode({"q": q})
+    bcn = quote(rng.choice(bcns))
+    if endpoint == "overview":
+        return f"{API}/customer/{bcn}/overview{_period(rng)}"
+    return f"{API}/analysis/{bcn}/{endpoint}{_period(rng)}"
+
+
+def run_load(base_url: str, args: argparse.Namespace, mix: dict[str, float]) -> dict[str, list[tuple[float, float, int]]]:
+    """Run ``args.concurrency`` workers for warm-up plus duration; samples per endpoint.
+
+    A sample is ``(finished_at, latency_seconds, status)`` with status 0 for
+    transport errors; samples finishing during the warm-up are dropped.
+    """
+    bcns = [f"BCN-{i:06d}" for i in range(args.customers)]
+    names = customer_names(args.customers, np.random.default_rng(args.seed))
+    endpoints, weights = list(mix), list(mix.values())
+    samples: dict[str, list[tuple[float, float, int]]] = {e: [] for e in endpoints}
+    lock = threading.Lock()
+    t_start = time.perf_counter()
+    measure_from = t_start + args.warmup
+    deadline = measure_from + args.duration
+
+    def worker(i: int) -> None:
+        rng = random.Random(args.seed * 1000 + i)
+        client = Client(base_url, timeout=args.timeout)
+        local: list[tuple[str, float, float, int]] = []
+        while True:
+            endpoint = rng.choices(endpoints, weights)[0]
+            path = request_path(endpoint, rng, bcns, names)
+            t0 = time.perf_counter()
+            if t0 >= deadline:
+                break
+            try:
+                status, _ = client.request("GET", path)
+            except (OSError, http.client.HTTPException):
+                status = 0
+            t1 = time.perf_counter()
+            if t1 >= measure_from:
+                local.append((endpoint, t1, t1 - t0, status))
+        client.close()
+        with lock:
+            for endpoint, t1, latency, status in local:
+                samples[endpoint].append((t1, latency, status))
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples
+
+
+# ---------- Reporting ----------
+
+def summarize(samples: list[tuple[float, float, int]], elapsed: float) -> dict:
+    """Request count, throughput, error rate, latency percentiles and status codes of ``samples``."""
+    if not samples:
+        return {"requests": 0, "errors": 0, "error_rate": 0.0, "throughput_rps": 0.0, "status_codes": {}}
+    latency = np.array([s[1] for s in samples]) * 1000
+    codes, counts = np.unique([s[2] for s in samples], return_counts=True)
+    # 4xx are valid answers (e.g. no transactions in a review period); see status_codes
+    errors = sum(1 for s in samples if s[2] == 0 or s[2] >= 500)
+    p50, p95, p99 = np.percentile(latency, [50, 95, 99])
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples),
+        "throughput_rps": len(samples) / elapsed,
+        "mean_ms": float(latency.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(latency.max()),
+        # 0 counts connection errors and timeouts
+        "status_codes": {str(c): int(n) for c, n in zip(codes, counts)},
+    }
+
+
+def _git(*cmd: str) -> str:
+    try:
+        return subprocess.run(["git", *cmd], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def build_report(samples: dict[str, list], args: argparse.Namespace, mix: dict[str, float]) -> dict:
+    # Measured window: warm-up end to the last completed request
+    finished = [s[0] for rows in samples.values() for s in rows]
+    elapsed = (max(finished) - min(finished)) if len(finished) > 1 else float(args.duration)
+    elapsed = max(elapsed, 1e-9)
+    endpoints = {name: summarize(rows, elapsed) for name, rows in samples.items()}
+    return {
+        "label": args.label,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {
+            "rows": args.rows,
+            "customers": args.customers,
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "workers": args.workers,
+            "mix": mix,
+        },
+        "elapsed_s": elapsed,
+        "total": summarize([s for rows in samples.values() for s in rows], elapsed),
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: dict) -> None:
+    header = f"{'endpoint':<16}{'requests':>10}{'rps':>9}{'errors':>8}{'err%':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    print()
+    print(f"commit {report['commit'] or '?'}{' (dirty)' if report['dirty'] else ''}, "
+          f"{report['config']['concurrency']} concurrent, {report['elapsed_s']:.1f}s measured")
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["total"])]
+    for name, s in rows:
+        if not s["requests"]:
+            print(f"{name:<16}{0:>10}")
+            continue
+        print(f"{name:<16}{s['requests']:>10}{s['throughput_rps']:>9.1f}{s['errors']:>8}{s['error_rate'] * 100:>6.1f}%"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}")
+    other = {c: n for c, n in report["total"]["status_codes"].items() if not 200 <= int(c) < 300}
+    if other:
+        print("non-2xx responses: " + ", ".join(f"{'connection' if c == '0' else c}={n}" for c, n in other.items()))
+
+
+def print_comparison(report: dict, baseline: dict) -> None:
+    """Throughput and tail latency of ``report`` relative to ``baseline``."""
+    def pct(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print()
+    print(f"vs {baseline.get('commit') or '?'} ({baseline.get('label') or baseline.get('created_at', '')})")
+    if baseline.get("config", {}) != report["config"]:
+        print("note: run configurations differ")
+    header = f"{'endpoint':<16}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'err% old→new':>16}"
+    print(header)
+    print("-" * len(header))
+    base_rows = dict(baseline.get("endpoints", {}), TOTAL=baseline.get("total", {}))
+    for name, s in list(report["endpoints"].items()) + [("TOTAL", report["total"])]:
+        old = base_rows.get(name)
+        if not old or not old.get("requests") or not s["requests"]:
+            print(f"{name:<16}{'n/a':>10}")
+            continue
+        print(f"{name:<16}{pct(s['throughput_rps'], old['throughput_rps']):>10}"
+              f"{pct(s['p50_ms'], old['p50_ms']):>10}{pct(s['p95_ms'], old['p95_ms']):>10}"
+              f"{pct(s['p99_ms'], old['p99_ms']):>10}"
+              f"{old['error_rate'] * 100:>8.1f}→{s['error_rate'] * 100:.1f}")
+
+
+def save_report(report: dict, out_dir: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    name = "-".join(p for p in (stamp, report["commit"], report["label"]) if p)
+    path = os.path.join(out_dir, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    return path
+
+
+# ---------- Entry point ----------
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--rows", type=int, default=50_000, help="synthetic transactions (default 50000)")
+    p.add_argument("--customers", type=int, default=2_000, help="synthetic customers (default 2000)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--concurrency", type=int, default=16, help="concurrent clients (default 16)")
+    p.add_argument("--duration", type=float, default=30.0, help="measured seconds (default 30)")
+    p.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before measuring (default 5)")
+    p.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    p.add_argument("--mix", help="endpoint weights, e.g. 'search=3,overview=3,alerts=1,risk-breakdown=1,network=1'")
+    p.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (>1 enables the shared store)")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--url", help="target an already running server instead of starting one")
+    p.add_argument("--no-load", action="store_true", help="skip uploading the synthetic dataset")
+    p.add_argument("--label", default="", help="tag stored with the results")
+    p.add_argument("--out", default=RESULTS_DIR, help="results directory")
+    p.add_argument("--compare", help="earlier results file to compare against")
+    return p.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    mix = parse_mix(args.mix)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+
+    proc, data_dir = None, None
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    try:
+        if not args.url:
+            data_dir = tempfile.mkdtemp(prefix="aml-loadtest-")
+            proc = start_server(args.port, args.workers, data_dir)
+        wait_ready(base_url, proc)
+        if not args.no_load:
+            load_dataset(Client(base_url, timeout=3600), args)
+
+        print(f"Running {args.concurrency} clients for {args.warmup:.0f}s warm-up + {args.duration:.0f}s ...")
+        samples = run_load(base_url, args, mix)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        if data_dir is not None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = build_report(samples, args, mix)
+    print_report(report)
+    if baseline is not None:
+        print_comparison(report, baseline)
+    print(f"\nSaved {save_report(report, args.out)}")
+    return 1 if report["total"]["requests"] == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,21 @@
 """AML Transaction Overview Tool - FastAPI application entry point."""
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from config import API_V1_PREFIX, CORS_ORIGINS
+from config import API_V1_PREFIX, CORS_ORIGINS, SHARED_STORE_ENABLED
+from routers.alerts import router as alerts_router
 from routers.analysis import router as analysis_router
+from routers.backtest import router as backtest_router
 from routers.customer import router as customer_router
+from routers.export import router as export_router
+from routers.jobs import router as jobs_router
+from routers.portfolio import router as portfolio_router
+from routers.score import router as score_router
 from routers.upload import router as upload_router
+from services.data_store import DataStore
+from services.memory import MemoryBudgetExceeded
 
 app = FastAPI(
     title="AML Transaction Overview Tool",
@@ -23,10 +32,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Multi-worker mode: pick up snapshots other workers published.  The reload
+# runs in a background thread; requests are served from the loaded snapshot
+# until it is swapped in.
+if SHARED_STORE_ENABLED:
+    @app.middleware("http")
+    async def attach_shared_snapshot(request: Request, call_next):
+        DataStore.sync_in_background()
+        return await call_next(request)
+
+@app.exception_handler(MemoryBudgetExceeded)
+async def memory_budget_exceeded(request: Request, exc: MemoryBudgetExceeded):
+    return JSONResponse(status_code=413, content={"detail": str(exc)})
+
 # Include routers
 app.include_router(upload_router, prefix=API_V1_PREFIX)
 app.include_router(customer_router, prefix=API_V1_PREFIX)
 app.include_router(analysis_router, prefix=API_V1_PREFIX)
+app.include_router(portfolio_router, prefix=API_V1_PREFIX)
+app.include_router(backtest_router, prefix=API_V1_PREFIX)
+app.include_router(alerts_router, prefix=API_V1_PREFIX)
+app.include_router(jobs_router, prefix=API_V1_PREFIX)
+app.include_router(export_router, prefix=API_V1_PREFIX)
+app.include_router(score_router, prefix=API_V1_PREFIX)
 
 
 @app.get("/")
@@ -38,6 +66,7 @@ async def root():
         "api_prefix": API_V1_PREFIX,
         "endpoints": {
             "upload_transactions": f"{API_V1_PREFIX}/upload/transactions",
+            "stream_transactions": f"{API_V1_PREFIX}/upload/transactions/stream",
             "upload_watchlist": f"{API_V1_PREFIX}/upload/watchlist",
             "upload_high_risk_countries": f"{API_V1_PREFIX}/upload/high-risk-countries",
             "upload_work_instructions": f"{API_V1_PREFIX}/upload/work-instructions",
@@ -47,5 +76,18 @@ async def root():
             "customer_overview": f"{API_V1_PREFIX}/customer/{{bcn}}/overview",
             "customer_alerts": f"{API_V1_PREFIX}/analysis/{{bcn}}/alerts",
             "risk_breakdown": f"{API_V1_PREFIX}/analysis/{{bcn}}/risk-breakdown",
+            "customer_network": f"{API_V1_PREFIX}/analysis/{{bcn}}/network",
+            "portfolio_patterns": f"{API_V1_PREFIX}/portfolio/patterns",
+            "portfolio_aggregates": f"{API_V1_PREFIX}/portfolio/aggregates",
+            "portfolio_flagged": f"{API_V1_PREFIX}/portfolio/flagged",
+            "portfolio_summary": f"{API_V1_PREFIX}/portfolio/summary",
+            "backtest": f"{API_V1_PREFIX}/backtest",
+            "screen_portfolio": f"{API_V1_PREFIX}/alerts/screen",
+            "alert_query": f"{API_V1_PREFIX}/alerts",
+            "customer_risk_query": f"{API_V1_PREFIX}/alerts/customers",
+            "export_alerts": f"{API_V1_PREFIX}/export/alerts",
+            "export_flagged": f"{API_V1_PREFIX}/export/flagged",
+            "jobs": f"{API_V1_PREFIX}/jobs",
+            "score_transaction": f"{API_V1_PREFIX}/score/transaction",
         },
     }
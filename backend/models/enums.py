@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, IntFlag
 
 
 class RiskLevel(str, Enum):
@@ -25,3 +25,27 @@ class AlertType(str, Enum):
     COUNTERPARTY_CONCENTRATION = "COUNTERPARTY_CONCENTRATION"
     PROFILE_DEVIATION = "PROFILE_DEVIATION"
     FLOW_THROUGH = "FLOW_THROUGH"
+    LAYERING_CHAIN = "LAYERING_CHAIN"
+    MATCHED_TRANSFER = "MATCHED_TRANSFER"
+    ROUND_TRIP = "ROUND_TRIP"
+    SHARED_IBAN = "SHARED_IBAN"
+
+
+class JobStatus(str, Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
+
+class TxFlag(IntFlag):
+    """Per-transaction indicator bits stored in the ``tx_flags`` column."""
+
+    LARGE = 1
+    STRUCTURING_BAND = 2
+    ROUND_AMOUNT = 4
+    HIGH_RISK_IBAN = 8
+    HIGH_RISK_BIC = 16
+    WATCHLIST_SENDER = 32
+    WATCHLIST_RECEIVER = 64
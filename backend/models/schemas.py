@@ -4,7 +4,7 @@ from typing import Any, Optional
 
 from pydantic import BaseModel, Field
 
-from models.enums import AlertSeverity, AlertType, RiskLevel
+from models.enums import AlertSeverity, AlertType, JobStatus, RiskLevel
 
 
 # ---- Core transaction record ----
@@ -41,6 +41,17 @@ class RiskAssessment(BaseModel):
     contributing_factors: list[str] = Field(default_factory=list)
 
 
+# ---- Real-time scoring ----
+
+class TransactionScore(BaseModel):
+    business_contact_number: str
+    transaction_index: int
+    amount_eur: float
+    alerts: list[Alert] = Field(default_factory=list)
+    risk: RiskAssessment
+    pending_count: int = 0
+
+
 # ---- Watchlist ----
 
 class WatchlistMatch(BaseModel):
@@ -62,6 +73,139 @@ class PatternData(BaseModel):
     high_risk_country_exposure: float = 0.0
 
 
+# ---- Counterparty network ----
+
+class ChainHop(BaseModel):
+    date: str
+    amount: float
+    sender: str
+    receiver: str
+    iban: Optional[str] = None
+    business_contact_number: str
+    transaction_index: int
+
+
+class LayeringChain(BaseModel):
+    hops: list[ChainHop] = Field(default_factory=list)
+    duration_hours: float = 0.0
+    amount_variance: float = 0.0
+    customers_involved: list[str] = Field(default_factory=list)
+
+
+class NetworkAnalysis(BaseModel):
+    business_contact_number: str
+    node_count: int = 0
+    edge_count: int = 0
+    chains: list[LayeringChain] = Field(default_factory=list)
+
+
+# ---- Backtesting ----
+
+class BacktestRequest(BaseModel):
+    rules: dict[str, dict[str, list[float]]] = Field(default_factory=dict)
+
+
+class BacktestResult(BaseModel):
+    rule: str
+    parameters: dict[str, float] = Field(default_factory=dict)
+    alert_count: int = 0
+    affected_bcn_count: int = 0
+
+
+class BacktestResponse(BaseModel):
+    transaction_count: int = 0
+    bcn_count: int = 0
+    combination_count: int = 0
+    results: list[BacktestResult] = Field(default_factory=list)
+
+
+# ---- Alert store ----
+
+class ScreeningRun(BaseModel):
+    run_id: str
+    started_at: str
+    completed_at: Optional[str] = None
+    bcn_count: int = 0
+    alert_count: int = 0
+
+
+class StoredAlert(Alert):
+    run_id: str
+    bcn: str
+    first_date: Optional[str] = None
+    last_date: Optional[str] = None
+    risk_score: float = 0.0
+
+
+class AlertPage(BaseModel):
+    run_id: str
+    total: int = 0
+    page: int = 1
+    page_size: int = 50
+    items: list[StoredAlert] = Field(default_factory=list)
+
+
+class AlertDiff(BaseModel):
+    base_run_id: str
+    run_id: str
+    new_count: int = 0
+    closed_count: int = 0
+    unchanged_count: int = 0
+    page: int = 1
+    page_size: int = 50
+    new: list[StoredAlert] = Field(default_factory=list)
+    closed: list[StoredAlert] = Field(default_factory=list)
+
+
+class CustomerRisk(BaseModel):
+    bcn: str
+    overall_score: float
+    risk_level: RiskLevel
+    alert_count: int = 0
+
+
+class CustomerRiskPage(BaseModel):
+    run_id: str
+    total: int = 0
+    page: int = 1
+    page_size: int = 100
+    items: list[CustomerRisk] = Field(default_factory=list)
+
+
+class ScoreBin(BaseModel):
+    lower: float
+    upper: float
+    count: int = 0
+
+
+class PortfolioSummary(BaseModel):
+    run_id: str
+    customer_count: int = 0
+    alert_count: int = 0
+    score_histogram: list[ScoreBin] = Field(default_factory=list)
+    risk_level_counts: dict[RiskLevel, int] = Field(default_factory=dict)
+    alert_type_counts: dict[AlertType, int] = Field(default_factory=dict)
+    top_customers: list[CustomerRisk] = Field(default_factory=list)
+
+
+# ---- Background jobs ----
+
+class JobInfo(BaseModel):
+    id: str
+    kind: str
+    status: JobStatus
+    progress: float = Field(0.0, ge=0, le=100)
+    processed: int = 0
+    total: int = 0
+    eta_seconds: Optional[float] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+    result_count: int = 0
+    detail: dict[str, Any] = Field(default_factory=dict)
+
+
 # ---- Customer overview ----
 
 class FlaggedTransaction(BaseModel):
@@ -76,6 +220,18 @@ class FlaggedTransaction(BaseModel):
     description: Optional[str] = None
     transaction_type: Optional[str] = None
     flags: list[str] = Field(default_factory=list)
+    indicators: list[str] = Field(default_factory=list)
+
+
+class PortfolioFlaggedTransaction(FlaggedTransaction):
+    business_contact_number: str
+
+
+class FlaggedTransactionPage(BaseModel):
+    total: int
+    page: int
+    page_size: int
+    items: list[PortfolioFlaggedTransaction] = Field(default_factory=list)
 
 
 class CustomerOverview(BaseModel):
@@ -91,10 +247,58 @@ class CustomerOverview(BaseModel):
 
 # ---- Upload ----
 
+class WatchlistDelta(BaseModel):
+    added_entries: list[str] = Field(default_factory=list)
+    removed_entries: list[str] = Field(default_factory=list)
+    unchanged_entry_count: int = 0
+    new_match_count: int = 0
+    retired_match_count: int = 0
+    bcns_gained: list[str] = Field(default_factory=list)
+    bcns_lost: list[str] = Field(default_factory=list)
+
+
+class HighRiskDelta(BaseModel):
+    added_countries: list[str] = Field(default_factory=list)
+    removed_countries: list[str] = Field(default_factory=list)
+    changed_countries: list[str] = Field(default_factory=list)
+    affected_transaction_count: int = 0
+    affected_bcns: list[str] = Field(default_factory=list)
+    bcns_gained: list[str] = Field(default_factory=list)
+    bcns_lost: list[str] = Field(default_factory=list)
+    rescreen_job_id: Optional[str] = None
+
+
 class UploadResponse(BaseModel):
     status: str
     record_count: int
     warnings: list[str] = Field(default_factory=list)
+    watchlist_delta: Optional[WatchlistDelta] = None
+    high_risk_delta: Optional[HighRiskDelta] = None
+
+
+class StreamProgress(BaseModel):
+    """One NDJSON line of a streaming upload: per micro-batch, then a final status."""
+    status: str  # "running", "success" or "error"
+    batches: int
+    received: int
+    rejected: int
+    committed: int
+    warnings: list[str] = Field(default_factory=list)
+    detail: Optional[str] = None
+
+
+class MemoryItem(BaseModel):
+    resident_bytes: int = 0
+    mapped_bytes: int = 0
+    spilled: bool = False
+
+
+class MemoryUsage(BaseModel):
+    items: dict[str, MemoryItem] = Field(default_factory=dict)
+    resident_bytes: int = 0
+    mapped_bytes: int = 0
+    budget_bytes: Optional[int] = None
+    policy: str = "reject"
 
 
 class UploadStatus(BaseModel):
@@ -102,6 +306,11 @@ class UploadStatus(BaseModel):
     watchlist: bool = False
     high_risk_countries: bool = False
     work_instructions: bool = False
+    fx_rates: bool = False
+    data_version: int = 0
+    pending_transactions: int = 0
+    deferred_index_rows: int = 0
+    memory: Optional[MemoryUsage] = None
 
 
 # ---- Search ----
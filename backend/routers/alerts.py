@@ -0,0 +1,115 @@
+"""Alerts router - portfolio screening and indexed alert queries."""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from config import ALERT_PAGE_SIZE_MAX
+from models.enums import AlertSeverity, AlertType, RiskLevel
+from models.schemas import AlertDiff, AlertPage, CustomerRiskPage, ScreeningRun
+from services.alert_store import alert_store
+from services.aml_engine import AMLEngine
+from services.data_store import DataStore
+from services.screening import run_screening
+
+router = APIRouter(prefix="/alerts", tags=["Alerts"])
+
+_engine = AMLEngine()
+
+
+def _resolve_run(run_id: Optional[str]) -> str:
+    if run_id is not None:
+        return run_id
+    latest = alert_store.latest_run_id()
+    if latest is None:
+        raise HTTPException(status_code=404, detail="No completed screening run found. Run /alerts/screen first.")
+    return latest
+
+
+@router.post("/screen", response_model=ScreeningRun)
+async def screen_portfolio():
+    """Run the AML engine for every customer and persist the alerts as a new screening run."""
+    if DataStore.transactions_df is None:
+        raise HTTPException(status_code=404, detail="No transactions have been uploaded.")
+    run_id = run_screening(_engine, alert_store)
+    return ScreeningRun(**alert_store.get_run(run_id))
+
+
+@router.get("/runs", response_model=list[ScreeningRun])
+async def list_screening_runs(limit: int = Query(20, ge=1, le=500)):
+    """List the most recent screening runs."""
+    return [ScreeningRun(**r) for r in alert_store.list_runs(limit)]
+
+
+@router.get("", response_model=AlertPage)
+async def query_alerts(
+    run_id: Optional[str] = Query(None, description="Screening run (default: latest)"),
+    bcn: Optional[str] = None,
+    alert_type: Optional[AlertType] = None,
+    severity: Optional[AlertSeverity] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    date_from: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    date_to: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=ALERT_PAGE_SIZE_MAX),
+):
+    """Paginated alert lookup across all customers of a screening run."""
+    run = _resolve_run(run_id)
+    total, items = alert_store.query_alerts(
+        run,
+        {
+            "bcn": bcn,
+            "alert_type": alert_type.value if alert_type else None,
+            "severity": severity.value if severity else None,
+            "min_score": min_score,
+            "date_from": date_from,
+            "date_to": date_to,
+        },
+        page=page,
+        page_size=page_size,
+    )
+    return AlertPage(run_id=run, total=total, page=page, page_size=page_size, items=items)
+
+
+@router.get("/diff", response_model=AlertDiff)
+async def diff_runs(
+    run_id: Optional[str] = Query(None, description="Screening run (default: latest)"),
+    base_run_id: Optional[str] = Query(None, description="Run to compare against (default: the run before)"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=ALERT_PAGE_SIZE_MAX),
+):
+    """Alerts opened and closed between two screening runs.
+
+    Alert ids are deterministic, so an alert present in both runs is the
+    same finding; only the new and closed ones are returned.
+    """
+    run = _resolve_run(run_id)
+    if alert_store.get_run(run) is None:
+        raise HTTPException(status_code=404, detail=f"Screening run '{run}' not found.")
+    base = base_run_id or alert_store.previous_run_id(run)
+    if base is None:
+        raise HTTPException(status_code=404, detail="No earlier completed screening run to compare against.")
+    if alert_store.get_run(base) is None:
+        raise HTTPException(status_code=404, detail=f"Screening run '{base}' not found.")
+    diff = alert_store.diff_runs(base, run, page=page, page_size=page_size)
+    return AlertDiff(base_run_id=base, run_id=run, page=page, page_size=page_size, **diff)
+
+
+@router.get("/customers", response_model=CustomerRiskPage)
+async def query_customer_risk(
+    run_id: Optional[str] = Query(None, description="Screening run (default: latest)"),
+    risk_level: Optional[RiskLevel] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(100, ge=1, le=ALERT_PAGE_SIZE_MAX),
+):
+    """Customers of a screening run ordered by risk score, highest first."""
+    run = _resolve_run(run_id)
+    total, items = alert_store.top_customers(
+        run,
+        risk_level=risk_level.value if risk_level else None,
+        page=page,
+        page_size=page_size,
+    )
+    return CustomerRiskPage(run_id=run, total=total, page=page, page_size=page_size, items=items)
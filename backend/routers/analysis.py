@@ -2,44 +2,77 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
+from typing import Optional
 
-from models.schemas import Alert, RiskAssessment
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, HTTPException, Query
+
+from models.schemas import Alert, NetworkAnalysis, RiskAssessment
 from services.aml_engine import AMLEngine
+from services.counterparty_graph import describe_chain
 from services.data_store import DataStore
 from services.risk_scorer import calculate_risk
+from services.screening import analyze_customer, review_period
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
 _engine = AMLEngine()
 
 
-@router.get("/{bcn}/alerts", response_model=list[Alert])
-async def get_customer_alerts(bcn: str):
-    """Return only the AML alerts for a customer."""
-    tx_df = DataStore.get_customer_transactions(bcn)
+_FROM = Query(None, alias="from", description="Review period start, YYYY-MM-DD")
+_TO = Query(None, alias="to", description="Review period end (inclusive), YYYY-MM-DD")
+
+
+def _period(date_from: Optional[str], date_to: Optional[str]) -> tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+    try:
+        return review_period(date_from, date_to)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def _period_alerts(bcn: str, date_from: Optional[str], date_to: Optional[str]) -> list[Alert]:
+    tx_df, alerts = analyze_customer(_engine, bcn, *_period(date_from, date_to))
     if tx_df.empty:
         raise HTTPException(status_code=404, detail=f"No transactions found for BCN '{bcn}'.")
-
-    context = {
-        "watchlist_df": DataStore.watchlist_df,
-        "high_risk_countries_df": DataStore.high_risk_countries_df,
-    }
-    alerts = _engine.analyze(tx_df, context)
     return alerts
 
 
+@router.get("/{bcn}/alerts", response_model=list[Alert])
+async def get_customer_alerts(bcn: str, date_from: Optional[str] = _FROM, date_to: Optional[str] = _TO):
+    """Return only the AML alerts for a customer (optionally for a review period)."""
+    return _period_alerts(bcn, date_from, date_to)
+
+
 @router.get("/{bcn}/risk-breakdown", response_model=RiskAssessment)
-async def get_risk_breakdown(bcn: str):
-    """Return the risk assessment breakdown for a customer."""
-    tx_df = DataStore.get_customer_transactions(bcn)
-    if tx_df.empty:
+async def get_risk_breakdown(bcn: str, date_from: Optional[str] = _FROM, date_to: Optional[str] = _TO):
+    """Return the risk assessment breakdown for a customer (optionally for a review period)."""
+    return calculate_risk(_period_alerts(bcn, date_from, date_to))
+
+
+@router.get("/{bcn}/network", response_model=NetworkAnalysis)
+async def get_network_analysis(bcn: str, date_from: Optional[str] = _FROM, date_to: Optional[str] = _TO):
+    """Return multi-hop layering chains passing through a customer's transactions.
+
+    With a review period, only chains with a hop inside it are returned.
+    """
+    start, end = _period(date_from, date_to)
+    graph = DataStore.counterparty_graph
+    if graph is None or graph.edges_for_bcn(bcn).size == 0:
         raise HTTPException(status_code=404, detail=f"No transactions found for BCN '{bcn}'.")
 
-    context = {
-        "watchlist_df": DataStore.watchlist_df,
-        "high_risk_countries_df": DataStore.high_risk_countries_df,
-    }
-    alerts = _engine.analyze(tx_df, context)
-    risk = calculate_risk(alerts)
-    return risk
+    found = graph.find_chains(bcn)
+    if start is not None or end is not None:
+        lo = start.value if start is not None else np.iinfo(np.int64).min
+        hi = end.value if end is not None else np.iinfo(np.int64).max
+        found = [
+            chain for chain in found
+            if ((graph.ts[list(chain)] >= lo) & (graph.ts[list(chain)] <= hi)).any()
+        ]
+    chains = [describe_chain(graph, chain, DataStore.transactions_df) for chain in found]
+    return NetworkAnalysis(
+        business_contact_number=bcn,
+        node_count=graph.node_count,
+        edge_count=graph.edge_count,
+        chains=chains,
+    )
@@ -0,0 +1,50 @@
+"""Backtest router - what-if evaluation of rule parameter grids."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException
+
+from config import BACKTEST_MAX_COMBINATIONS
+from models.schemas import BacktestRequest, BacktestResponse
+from services.backtester import BACKTEST_RULES, combination_count, resolve_grid, run_backtest
+from services.data_store import DataStore
+
+router = APIRouter(prefix="/backtest", tags=["Backtest"])
+
+
+@router.get("/parameters")
+async def get_backtest_parameters():
+    """List the tunable parameters per rule with their current config values."""
+    return {rule: resolve_grid(rule, {}) for rule in BACKTEST_RULES}
+
+
+@router.post("", response_model=BacktestResponse)
+async def run_threshold_backtest(request: BacktestRequest):
+    """Evaluate every combination of the given parameter grids over the whole portfolio.
+
+    Parameters left out of a rule's grid keep their current ``config`` value.
+    """
+    features = DataStore.portfolio_features
+    if features is None:
+        raise HTTPException(status_code=404, detail="No transactions have been uploaded.")
+    if not request.rules:
+        raise HTTPException(status_code=400, detail="At least one rule grid is required.")
+
+    try:
+        grids = {rule: resolve_grid(rule, grid) for rule, grid in request.rules.items()}
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    total = sum(combination_count(g) for g in grids.values())
+    if total > BACKTEST_MAX_COMBINATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{total} parameter combinations requested; the limit is {BACKTEST_MAX_COMBINATIONS}.",
+        )
+
+    return BacktestResponse(
+        transaction_count=features.row_count + len(features.undated_bcn),
+        bcn_count=len(features.bcns),
+        combination_count=total,
+        results=run_backtest(features, grids),
+    )
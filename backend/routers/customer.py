@@ -2,12 +2,13 @@
 
 from __future__ import annotations
 
+from typing import Optional
+
 from fastapi import APIRouter, HTTPException, Query
 
 import pandas as pd
 
 from models.schemas import (
-    Alert,
     CustomerOverview,
     FlaggedTransaction,
     PatternData,
@@ -18,7 +19,9 @@ from services.aml_engine import AMLEngine
 from services.data_store import DataStore
 from services.pattern_analyzer import analyze_patterns
 from services.risk_scorer import calculate_risk
-from services.watchlist_matcher import match_names
+from services.screening import analyze_customer, review_period
+from services.transaction_flags import flag_names, row_flags
+from services.watchlist_matcher import NAME_FIELDS, match_names, name_positions
 
 router = APIRouter(prefix="/customer", tags=["Customer"])
 
@@ -26,6 +29,37 @@ router = APIRouter(prefix="/customer", tags=["Customer"])
 _engine = AMLEngine()
 
 
+def to_flagged_transaction(
+    model: type[FlaggedTransaction],
+    idx: int,
+    row: dict,
+    flags: list[str],
+    bits: int,
+    **extra,
+) -> FlaggedTransaction:
+    """Build a ``FlaggedTransaction`` (or subclass) from one transaction record."""
+    date_str = ""
+    if "date" in row:
+        dt = pd.to_datetime(row.get("date"), errors="coerce")
+        date_str = dt.strftime("%Y-%m-%d") if pd.notna(dt) else ""
+
+    return model(
+        index=idx,
+        date=date_str,
+        amount=float(row.get("amount", 0)),
+        sender=str(row.get("sender", "")),
+        receiver=str(row.get("receiver", "")),
+        iban=str(row.get("iban", "")) if row.get("iban") else None,
+        bic=str(row.get("bic", "")) if row.get("bic") else None,
+        currency=str(row.get("currency", "EUR")),
+        description=str(row.get("description", "")) if row.get("description") else None,
+        transaction_type=str(row.get("transaction_type", "")) if row.get("transaction_type") else None,
+        flags=flags,
+        indicators=flag_names(bits),
+        **extra,
+    )
+
+
 @router.get("/search", response_model=list[SearchResult])
 async def search_customers(q: str = Query(..., min_length=1, description="Search query")):
     """Search for customers by BCN or name."""
@@ -34,51 +68,49 @@ async def search_customers(q: str = Query(..., min_length=1, description="Search
 
 
 @router.get("/{bcn}/overview", response_model=CustomerOverview)
-async def get_customer_overview(bcn: str):
-    """Full AML overview for a single customer."""
-
-    # 1. Get customer transactions
-    tx_df = DataStore.get_customer_transactions(bcn)
+async def get_customer_overview(
+    bcn: str,
+    date_from: Optional[str] = Query(None, alias="from", description="Review period start, YYYY-MM-DD"),
+    date_to: Optional[str] = Query(None, alias="to", description="Review period end (inclusive), YYYY-MM-DD"),
+):
+    """Full AML overview for a single customer, optionally for a review period only."""
+    try:
+        start, end = review_period(date_from, date_to)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    scoped = start is not None or end is not None
+
+    # 1-3. Get customer transactions (in the period) and run the AML engine
+    tx_df, alerts = analyze_customer(_engine, bcn, start, end)
     if tx_df.empty:
         raise HTTPException(status_code=404, detail=f"No transactions found for BCN '{bcn}'.")
 
-    # 2. Build context
-    context = {
-        "watchlist_df": DataStore.watchlist_df,
-        "high_risk_countries_df": DataStore.high_risk_countries_df,
-    }
-
-    # 3. Run AML engine
-    alerts: list[Alert] = _engine.analyze(tx_df, context)
-
     # 4. Calculate risk
     risk_assessment = calculate_risk(alerts)
 
-    # 5. Analyze patterns
-    patterns: PatternData = analyze_patterns(tx_df, DataStore.high_risk_countries_df)
+    # 5. Analyze patterns (slice of the precomputed cube, or of the period's rows
+    # and of customers with appended rows the cube does not count yet)
+    patterns: PatternData = (
+        DataStore.pattern_cube.patterns(bcn)
+        if not scoped and DataStore.deferred_covers(bcn)
+        else analyze_patterns(tx_df, DataStore.high_risk_countries_df)
+    )
 
-    # 6. Watchlist matches (standalone utility for the overview)
+    # 6. Watchlist matches (lookups in the upload-time screening table)
     watchlist_matches: list[WatchlistMatch] = []
-    if DataStore.watchlist_df is not None and not DataStore.watchlist_df.empty:
-        # Build name -> indices map
-        for field in ["sender", "receiver"]:
+    if DataStore.name_screening is not None:
+        for field in NAME_FIELDS:
             if field not in tx_df.columns:
                 continue
-            names_list = tx_df[field].dropna().astype(str).str.strip().unique().tolist()
-            names_list = [n for n in names_list if n]
-
-            # Build index map
-            idx_map: dict[str, list[int]] = {}
-            for idx, row in tx_df.iterrows():
-                name = str(row[field]).strip().lower()
-                if name:
-                    idx_map.setdefault(name, []).append(int(idx))
+            names, idx_map = name_positions(tx_df, field)
+            names_list = [n for n in names.unique().tolist() if n]
 
             field_matches = match_names(
                 names=names_list,
                 watchlist_df=DataStore.watchlist_df,
                 match_field=field,
                 transaction_indices_map=idx_map,
+                table=DataStore.name_screening,
             )
             watchlist_matches.extend(field_matches)
 
@@ -106,28 +138,11 @@ async def get_customer_overview(bcn: str):
         for idx in alert.affected_transaction_indices:
             index_flags.setdefault(idx, []).append(alert.rule_name)
 
-    flagged_transactions: list[FlaggedTransaction] = []
-    for idx, row in tx_df.iterrows():
-        date_str = ""
-        if "date" in tx_df.columns:
-            dt = pd.to_datetime(row.get("date"), errors="coerce")
-            date_str = dt.strftime("%Y-%m-%d") if pd.notna(dt) else ""
-
-        flagged_transactions.append(
-            FlaggedTransaction(
-                index=int(idx),
-                date=date_str,
-                amount=float(row.get("amount", 0)),
-                sender=str(row.get("sender", "")),
-                receiver=str(row.get("receiver", "")),
-                iban=str(row.get("iban", "")) if row.get("iban") else None,
-                bic=str(row.get("bic", "")) if row.get("bic") else None,
-                currency=str(row.get("currency", "EUR")),
-                description=str(row.get("description", "")) if row.get("description") else None,
-                transaction_type=str(row.get("transaction_type", "")) if row.get("transaction_type") else None,
-                flags=index_flags.get(int(idx), []),
-            )
-        )
+    bits = row_flags(tx_df)
+    flagged_transactions: list[FlaggedTransaction] = [
+        to_flagged_transaction(FlaggedTransaction, int(idx), row, index_flags.get(int(idx), []), int(b))
+        for idx, row, b in zip(tx_df.index, tx_df.to_dict("records"), bits)
+    ]
 
     # Determine customer name from the first sender entry
     customer_name = str(tx_df.iloc[0].get("sender", "")) if not tx_df.empty else None
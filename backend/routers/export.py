@@ -0,0 +1,88 @@
+"""Export router - streamed CSV / XLSX / Parquet downloads of alerts and flagged transactions."""
+
+from __future__ import annotations
+
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from models.enums import AlertSeverity, AlertType
+from services.alert_store import alert_store
+from services.data_store import DataStore
+from services.exporter import (
+    ALERT_COLUMNS,
+    EXPORT_FORMATS,
+    FLAGGED_COLUMNS,
+    alert_chunks,
+    check_format,
+    export_stream,
+    flagged_chunks,
+)
+from services.transaction_flags import parse_flags
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+ExportFormat = Literal["csv", "xlsx", "parquet"]
+
+
+def _response(fmt: str, name: str, stream) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@router.get("/alerts")
+async def export_alerts(
+    format: ExportFormat = "csv",
+    run_id: Optional[str] = Query(None, description="Screening run (default: latest)"),
+    bcn: Optional[str] = None,
+    alert_type: Optional[AlertType] = None,
+    severity: Optional[AlertSeverity] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=100),
+    date_from: Optional[str] = Query(None, description="YYYY-MM-DD"),
+    date_to: Optional[str] = Query(None, description="YYYY-MM-DD"),
+):
+    """Stream the alerts of a screening run (filters as in ``GET /alerts``)."""
+    try:
+        check_format(format)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    run = run_id or alert_store.latest_run_id()
+    if run is None:
+        raise HTTPException(status_code=404, detail="No completed screening run found. Run /alerts/screen first.")
+    if alert_store.get_run(run) is None:
+        raise HTTPException(status_code=404, detail=f"Screening run '{run}' not found.")
+
+    chunks = alert_chunks(alert_store, run, {
+        "bcn": bcn,
+        "alert_type": alert_type.value if alert_type else None,
+        "severity": severity.value if severity else None,
+        "min_score": min_score,
+        "date_from": date_from,
+        "date_to": date_to,
+    })
+    return _response(format, f"alerts_{run}", export_stream(format, ALERT_COLUMNS, chunks, "Alerts"))
+
+
+@router.get("/flagged")
+async def export_flagged_transactions(
+    flags: list[str] = Query(..., description="Indicator flag names (e.g. LARGE, ROUND_AMOUNT)"),
+    match: Literal["any", "all"] = Query("any", description="Require any or all of the flags"),
+    bcn: Optional[str] = Query(None, description="Restrict to one business contact number"),
+    format: ExportFormat = "csv",
+):
+    """Stream the transactions whose indicator bits match ``flags`` (as in ``/portfolio/flagged``)."""
+    try:
+        check_format(format)
+        wanted = parse_flags(flags)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    df = DataStore.transactions_df
+    if df is None:
+        raise HTTPException(status_code=404, detail="No transactions have been uploaded.")
+
+    chunks = flagged_chunks(df, DataStore.customer_index, wanted, match_all=match == "all", bcn=bcn)
+    return _response(format, "flagged_transactions", export_stream(format, FLAGGED_COLUMNS, chunks, "Flagged"))
@@ -0,0 +1,173 @@
+"""Jobs router - background screening, re-indexing and uploads with streamed results."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Literal
+
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+
+from config import JOB_STREAM_POLL_SECONDS
+from models.schemas import JobInfo
+from routers.upload import _fx_warnings, read_transaction_uploads
+from services.alert_store import alert_store
+from services.aml_engine import AMLEngine
+from services.data_store import DataStore
+from services.excel_parser import parse_transaction_uploads_cached
+from services.job_manager import Job, job_manager
+from services.screening import ScreeningBatch, run_screening
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+_engine = AMLEngine()
+
+
+def _get_job(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job
+
+
+# ---- job functions ----
+
+def _screening_job(job: Job) -> None:
+    bcns = DataStore.get_all_bcns()
+    job.total = len(bcns)
+
+    # Results are per-customer summaries; alert detail is read from the
+    # alert store by run_id (GET /alerts?run_id=...&bcn=...)
+    def on_batch(run_id: str, batch: ScreeningBatch) -> None:
+        job.detail["run_id"] = run_id
+        results = []
+        for bcn in batch.bcns:
+            risk = batch.risks[bcn]
+            results.append({
+                "bcn": bcn,
+                "overall_score": risk.overall_score,
+                "risk_level": risk.risk_level.value,
+                "alert_count": batch.buffer.count_for(bcn),
+            })
+        job.report(job.processed + len(batch), results)
+
+    run_screening(_engine, alert_store, bcns, on_batch=on_batch, should_stop=lambda: job.cancelled)
+
+
+def _reindex_job(job: Job) -> None:
+    job.total = 1
+    DataStore.rebuild_indexes()
+    job.report(1)
+
+
+def _upload_transactions_job(uploads: list[tuple[str, bytes, str]], all_sheets: bool):
+    def run(job: Job) -> None:
+        job.total = 2
+        df, warnings = parse_transaction_uploads_cached(uploads, all_sheets)
+        job.report(1)
+        job.check_cancelled()
+        DataStore.set_transactions(df)
+        job.detail.update({"record_count": len(df), "warnings": warnings + _fx_warnings()})
+        job.report(2)
+    return run
+
+
+# ---- endpoints ----
+
+@router.post("/screening", response_model=JobInfo, status_code=202)
+async def start_screening_job():
+    """Screen every customer in the background, persisting results chunk by chunk."""
+    if DataStore.transactions_df is None:
+        raise HTTPException(status_code=404, detail="No transactions have been uploaded.")
+    return job_manager.submit(Job("screening"), _screening_job).info()
+
+
+@router.post("/reindex", response_model=JobInfo, status_code=202)
+async def start_reindex_job():
+    """Rebuild all derived indexes from the loaded data in the background."""
+    return job_manager.submit(Job("reindex"), _reindex_job).info()
+
+
+@router.post("/upload/transactions", response_model=JobInfo, status_code=202)
+async def start_upload_job(
+    file: list[UploadFile] = File(..., description="One or more workbooks or zip archives of workbooks"),
+    all_sheets: bool = Query(False, description="Read every sheet of each workbook, not just the first"),
+):
+    """Parse and load (large) transaction workbooks in the background."""
+    uploads = await read_transaction_uploads(file)
+    job = Job("upload_transactions", detail={"filename": ", ".join(name for name, _, _ in uploads)})
+    return job_manager.submit(job, _upload_transactions_job(uploads, all_sheets)).info()
+
+
+@router.get("", response_model=list[JobInfo])
+async def list_jobs():
+    """List known jobs, newest first."""
+    return [j.info() for j in job_manager.list()]
+
+
+@router.get("/{job_id}", response_model=JobInfo)
+async def get_job(job_id: str):
+    """Return a job's status, progress and ETA."""
+    return _get_job(job_id).info()
+
+
+@router.delete("/{job_id}", response_model=JobInfo)
+async def cancel_job(job_id: str):
+    """Request cancellation; running jobs stop at their next safe point."""
+    job = _get_job(job_id)
+    if not job.finished:
+        job.cancel()
+    return job.info()
+
+
+@router.get("/{job_id}/results")
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Page through the results produced so far (available while the job runs).
+
+    Screening results are per-customer summaries; their alerts are served
+    by ``GET /alerts`` with the job's ``detail.run_id``.
+    """
+    job = _get_job(job_id)
+    return {
+        "status": job.status.value,
+        "offset": offset,
+        "items": job.results_since(offset, limit),
+        "result_count": len(job.results),
+    }
+
+
+def _encode(fmt: str, event: str, data: Any) -> str:
+    payload = json.dumps(data, default=str)
+    if fmt == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return json.dumps({"event": event, "data": data}, default=str) + "\n"
+
+
+@router.get("/{job_id}/stream")
+async def stream_job(job_id: str, format: Literal["ndjson", "sse"] = "ndjson"):
+    """Stream results as NDJSON lines or Server-Sent Events until the job finishes."""
+    job = _get_job(job_id)
+
+    async def events() -> AsyncIterator[str]:
+        offset = 0
+        last_processed = -1
+        while True:
+            finished = job.finished
+            for item in job.results_since(offset):
+                offset += 1
+                yield _encode(format, "result", item)
+            if job.processed != last_processed:
+                last_processed = job.processed
+                yield _encode(format, "progress", job.info().model_dump(mode="json"))
+            if finished:
+                yield _encode(format, "end", job.info().model_dump(mode="json"))
+                return
+            await asyncio.sleep(JOB_STREAM_POLL_SECONDS)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
@@ -0,0 +1,100 @@
+"""Portfolio router - aggregate views across the whole transaction book."""
+
+from __future__ import annotations
+
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from config import ALERT_PAGE_SIZE_MAX
+from models.schemas import FlaggedTransactionPage, PatternData, PortfolioFlaggedTransaction, PortfolioSummary
+from routers.customer import to_flagged_transaction
+from services.alert_store import alert_store
+from services.data_store import DataStore
+from services.exporter import flagged_rows
+from services.portfolio_summary import summary_cache
+from services.transaction_flags import parse_flags
+
+router = APIRouter(prefix="/portfolio", tags=["Portfolio"])
+
+_CUBE_DIMENSIONS = {"bcn", "month", "transaction_type", "currency"}
+
+
+def _require_cube():
+    if DataStore.pattern_cube is None:
+        raise HTTPException(status_code=404, detail="No transactions have been uploaded.")
+    return DataStore.pattern_cube
+
+
+@router.get("/patterns", response_model=PatternData)
+async def get_portfolio_patterns():
+    """Return pattern statistics for the whole transaction book."""
+    return _require_cube().patterns()
+
+
+@router.get("/summary", response_model=PortfolioSummary)
+async def get_portfolio_summary(
+    run_id: Optional[str] = Query(None, description="Screening run (default: latest)"),
+):
+    """Risk distribution of a screening run: score histogram, risk levels, alert types and top customers."""
+    run = run_id or alert_store.latest_run_id()
+    if run is None:
+        raise HTTPException(status_code=404, detail="No completed screening run found. Run /alerts/screen first.")
+    if alert_store.get_run(run) is None:
+        raise HTTPException(status_code=404, detail=f"Screening run '{run}' not found.")
+    return summary_cache.load(alert_store, run)
+
+
+@router.get("/aggregates")
+async def get_portfolio_aggregates(
+    by: list[str] = Query(["month"], description="Cube dimensions to group by"),
+    bcn: Optional[str] = Query(None, description="Restrict to one business contact number"),
+):
+    """Return summed cube measures grouped by the requested dimensions."""
+    invalid = [d for d in by if d not in _CUBE_DIMENSIONS]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid dimension(s): {', '.join(invalid)}. "
+                   f"Allowed: {', '.join(sorted(_CUBE_DIMENSIONS))}.",
+        )
+    grouped = _require_cube().aggregate(list(dict.fromkeys(by)), bcn=bcn)
+    grouped["amount_sum"] = grouped["amount_sum"].round(2)
+    return grouped.to_dict(orient="records")
+
+
+@router.get("/flagged", response_model=FlaggedTransactionPage)
+async def get_flagged_transactions(
+    flags: list[str] = Query(..., description="Indicator flag names (e.g. LARGE, ROUND_AMOUNT)"),
+    match: Literal["any", "all"] = Query("any", description="Require any or all of the flags"),
+    bcn: Optional[str] = Query(None, description="Restrict to one business contact number"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=ALERT_PAGE_SIZE_MAX),
+):
+    """List transactions across the book whose indicator bits match ``flags``.
+
+    ``index`` is the row's position within its customer's transactions, as in
+    the customer overview.
+    """
+    try:
+        wanted = parse_flags(flags)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    df = DataStore.transactions_df
+    if df is None:
+        raise HTTPException(status_code=404, detail="No transactions have been uploaded.")
+
+    index = DataStore.customer_index
+    rows, bits = flagged_rows(df, index, wanted, match_all=match == "all", bcn=bcn)
+    selected = rows[(page - 1) * page_size:page * page_size]
+    records = df.iloc[selected].to_dict("records")
+    local = index.local_indices(selected, [r["business_contact_number"] for r in records]) if records else []
+
+    items = [
+        to_flagged_transaction(
+            PortfolioFlaggedTransaction, int(position), record, [], int(bits[i]),
+            business_contact_number=str(record["business_contact_number"]),
+        )
+        for i, position, record in zip(selected.tolist(), local, records)
+    ]
+    return FlaggedTransactionPage(total=len(rows), page=page, page_size=page_size, items=items)
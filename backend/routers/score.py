@@ -0,0 +1,46 @@
+"""Score router - real-time scoring of single incoming transactions."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from config import DEFERRED_REFRESH_ROWS, REALTIME_FLUSH_ROWS
+from models.schemas import TransactionRecord, TransactionScore
+from services.data_store import DataStore
+from services.realtime_scorer import scorer
+
+router = APIRouter(prefix="/score", tags=["Scoring"])
+
+
+@router.post("/transaction", response_model=TransactionScore)
+async def score_transaction(record: TransactionRecord, background_tasks: BackgroundTasks):
+    """Score one new transaction against its customer's rule state and queue it for the store.
+
+    Queued transactions are appended to the loaded ones after the
+    response once ``REALTIME_FLUSH_ROWS`` are pending, and the whole-book
+    indexes rebuilt once ``DEFERRED_REFRESH_ROWS`` appended rows wait for it.
+    """
+    try:
+        result = await run_in_threadpool(scorer.score, record)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if result.pending_count >= REALTIME_FLUSH_ROWS:
+        background_tasks.add_task(_flush)
+    return result
+
+
+def _flush() -> None:
+    if scorer.flush():
+        DataStore.refresh_deferred(DEFERRED_REFRESH_ROWS)
+
+
+@router.post("/flush")
+async def flush_scored_transactions(background_tasks: BackgroundTasks):
+    """Merge all queued real-time transactions into the loaded transactions now.
+
+    The whole-book indexes catch up after the response.
+    """
+    merged = await run_in_threadpool(scorer.flush, True)
+    background_tasks.add_task(DataStore.refresh_deferred)
+    return {"merged": merged}
@@ -2,60 +2,253 @@
 
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from typing import AsyncIterator, Optional
 
-from models.schemas import UploadResponse, UploadStatus
+from fastapi import APIRouter, HTTPException, Query, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.requests import ClientDisconnect
+
+from config import STREAM_COMMIT_ROWS
+from models.schemas import StreamProgress, UploadResponse, UploadStatus
+from services.alert_store import alert_store
+from services.aml_engine import AMLEngine
 from services.data_store import DataStore
 from services.excel_parser import (
+    parse_fx_rates,
     parse_high_risk_countries,
-    parse_transactions,
+    parse_transaction_uploads_cached,
     parse_watchlist,
     parse_work_instructions,
+    read_upload,
+)
+from services.job_manager import Job, job_manager
+from services.memory import MemoryBudgetExceeded
+from services.screening import ScreeningBatch, rescreen_customers
+from services.stream_ingest import (
+    TransactionStream,
+    commit,
+    stage,
+    stream_format,
+    validate_stream_columns,
 )
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
 ALLOWED_EXTENSIONS = {".xlsx", ".xls"}
+# Transaction uploads may also be zip archives of workbooks
+TRANSACTION_EXTENSIONS = ALLOWED_EXTENSIONS | {".zip"}
+
+_engine = AMLEngine()
 
 
-def _validate_extension(filename: str | None) -> None:
+def _validate_extension(filename: str | None, allowed: set[str] = ALLOWED_EXTENSIONS) -> None:
     if not filename:
         raise HTTPException(status_code=400, detail="No filename provided.")
     ext = "." + filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
-    if ext not in ALLOWED_EXTENSIONS:
+    if ext not in allowed:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid file type '{ext}'. Only .xlsx and .xls are accepted.",
+            detail=f"Invalid file type '{ext}'. Only {', '.join(sorted(allowed))} are accepted.",
         )
 
 
+async def read_transaction_uploads(files: list[UploadFile]) -> list[tuple[str, bytes, str]]:
+    """Validate and read transaction uploads as ``(filename, bytes, sha256)``."""
+    for file in files:
+        _validate_extension(file.filename, TRANSACTION_EXTENSIONS)
+    return [(file.filename, *await read_upload(file)) for file in files]
+
+
+def _fx_warnings() -> list[str]:
+    if DataStore.unconverted_amounts == 0:
+        return []
+    return [
+        f"{DataStore.unconverted_amounts} non-EUR transactions have no FX rate "
+        "and are evaluated at their face amount"
+    ]
+
+
+def _rescreen_job(bcns: list[str]):
+    def run(job: Job) -> None:
+        job.total = len(bcns)
+
+        def on_batch(run_id: str, batch: ScreeningBatch) -> None:
+            job.detail["run_id"] = run_id
+            job.report(job.processed + len(batch))
+
+        job.detail["run_id"] = rescreen_customers(
+            _engine, alert_store, bcns, on_batch=on_batch, should_stop=lambda: job.cancelled,
+        )
+    return run
+
+
 # ---- Upload endpoints ----
 
 @router.post("/transactions", response_model=UploadResponse)
-async def upload_transactions(file: UploadFile = File(...)):
-    """Upload customer transaction data (Excel)."""
-    _validate_extension(file.filename)
-    df, warnings = await parse_transactions(file)
-    DataStore.set_transactions(df)
-    return UploadResponse(status="success", record_count=len(df), warnings=warnings)
+async def upload_transactions(
+    file: list[UploadFile] = File(..., description="One or more workbooks or zip archives of workbooks"),
+    all_sheets: bool = Query(False, description="Read every sheet of each workbook, not just the first"),
+):
+    """Upload customer transaction data (Excel).
+
+    Several files (e.g. one workbook per month) replace the loaded
+    transactions together; they are parsed in parallel and concatenated.
+    """
+    uploads = await read_transaction_uploads(file)
+    try:
+        df, warnings = await run_in_threadpool(parse_transaction_uploads_cached, uploads, all_sheets)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    await run_in_threadpool(DataStore.set_transactions, df)
+    return UploadResponse(status="success", record_count=len(df), warnings=warnings + _fx_warnings())
+
+
+class _BodyStreamingResponse(StreamingResponse):
+    """``StreamingResponse`` whose iterator is still reading the request body.
+
+    The stock response listens for a disconnect with ``receive()``, which
+    would take body chunks from the iterator; a disconnect instead surfaces
+    as ``ClientDisconnect`` from ``request.stream()``.  The background task
+    runs however the response ends.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        finally:
+            if self.background is not None:
+                await self.background()
+
+
+async def _stream_batches(
+    stream: TransactionStream, ready: list[bytes], chunks: AsyncIterator[bytes], ended: bool,
+) -> AsyncIterator[bytes]:
+    """Line batches of the body: those completed while peeking, then the rest as chunks arrive."""
+    for block in ready:
+        yield block
+    if not ended:
+        async for chunk in chunks:
+            for block in stream.feed(chunk):
+                yield block
+    for block in stream.finish():
+        yield block
+
+
+@router.post("/transactions/stream")
+async def stream_transactions(
+    request: Request,
+    format: Optional[str] = Query(None, description="ndjson or csv; defaults to the request's Content-Type"),
+    replace: bool = Query(False, description="Replace the loaded transactions instead of appending to them"),
+    commit_rows: int = Query(STREAM_COMMIT_ROWS, ge=1, description="Rows staged between appends to the store"),
+):
+    """Stream transactions as chunked NDJSON or CSV, appended to the store in micro-batches.
+
+    Rows are coerced like workbook uploads.  The response is NDJSON: one
+    ``StreamProgress`` line per parsed batch, then a final ``success`` or
+    ``error`` line.  Rows are committed (extending the per-row indexes)
+    every ``commit_rows`` rows and at the end; rows committed before an
+    error stay loaded.  The whole-book indexes are rebuilt once, after the
+    response.
+    """
+    try:
+        stream = TransactionStream(stream_format(request.headers.get("content-type"), format))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    # Read up to the header / first record so a wrong body fails with a 400
+    chunks = request.stream()
+    ready: list[bytes] = []
+    ended = True
+    try:
+        async for chunk in chunks:
+            ready += stream.feed(chunk)
+            if stream.columns is not None:
+                ended = False
+                break
+        if ended:
+            ready += stream.finish()
+        validate_stream_columns(stream.columns)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    async def progress() -> AsyncIterator[str]:
+        batches = received = committed = 0
+        staged: list = []
+        staged_rows = 0
+        replacing = replace
+
+        def line(status: str, warnings: list[str], detail: Optional[str] = None) -> str:
+            return StreamProgress(
+                status=status, batches=batches, received=received, rejected=stream.rejected,
+                committed=committed, warnings=warnings, detail=detail,
+            ).model_dump_json() + "\n"
+
+        try:
+            async for block in _stream_batches(stream, ready, chunks, ended):
+                df, warnings = await run_in_threadpool(stream.parse, block)
+                batches += 1
+                received += len(df)
+                if len(df):
+                    staged.append(df)
+                    staged_rows += len(df)
+                if staged_rows >= commit_rows:
+                    committed += await run_in_threadpool(commit, stage(staged), replacing)
+                    staged, staged_rows, replacing = [], 0, False
+                yield line("running", warnings)
+            if staged:
+                committed += await run_in_threadpool(commit, stage(staged), replacing)
+                staged = []
+        except ClientDisconnect:
+            return
+        except (ValueError, MemoryBudgetExceeded) as exc:
+            yield line("error", stream.warnings(), str(exc))
+            return
+        yield line("success", stream.warnings() + _fx_warnings())
+
+    return _BodyStreamingResponse(
+        progress(), media_type="application/x-ndjson", background=BackgroundTask(DataStore.refresh_deferred),
+    )
 
 
 @router.post("/watchlist", response_model=UploadResponse)
 async def upload_watchlist(file: UploadFile = File(...)):
-    """Upload watchlist data (Excel)."""
+    """Upload watchlist data (Excel).
+
+    Only entries that were not on the previous watchlist are screened; the
+    response reports which BCNs gained or lost matches.
+    """
     _validate_extension(file.filename)
     df, warnings = await parse_watchlist(file)
-    DataStore.set_watchlist(df)
-    return UploadResponse(status="success", record_count=len(df), warnings=warnings)
+    delta = DataStore.set_watchlist(df)
+    return UploadResponse(
+        status="success", record_count=len(df), warnings=warnings, watchlist_delta=delta,
+    )
 
 
 @router.post("/high-risk-countries", response_model=UploadResponse)
-async def upload_high_risk_countries(file: UploadFile = File(...)):
-    """Upload high-risk countries data (Excel)."""
+async def upload_high_risk_countries(
+    file: UploadFile = File(...),
+    rescreen: bool = Query(True, description="Re-screen affected customers on top of the latest screening run"),
+):
+    """Upload high-risk countries data (Excel).
+
+    The new list is diffed against the previous one; only transactions of
+    added, removed or re-levelled countries are updated, and the response
+    lists the affected customers.  With ``rescreen``, a background job
+    (``rescreen_job_id``, see ``/jobs``) screens those customers into a new
+    run that carries the others over from the latest run (when it was
+    screened against the loaded transactions); the job's ``detail.run_id``
+    names the new run.
+    """
     _validate_extension(file.filename)
     df, warnings = await parse_high_risk_countries(file)
-    DataStore.set_high_risk_countries(df)
-    return UploadResponse(status="success", record_count=len(df), warnings=warnings)
+    delta = await run_in_threadpool(DataStore.set_high_risk_countries, df)
+    if delta is not None and rescreen and delta.affected_bcns:
+        job = Job("rescreen", detail={"bcn_count": len(delta.affected_bcns)})
+        delta.rescreen_job_id = job_manager.submit(job, _rescreen_job(delta.affected_bcns)).id
+    return UploadResponse(status="success", record_count=len(df), warnings=warnings, high_risk_delta=delta)
 
 
 @router.post("/work-instructions", response_model=UploadResponse)
@@ -67,6 +260,19 @@ async def upload_work_instructions(file: UploadFile = File(...)):
     return UploadResponse(status="success", record_count=len(df), warnings=warnings)
 
 
+@router.post("/fx-rates", response_model=UploadResponse)
+async def upload_fx_rates(file: UploadFile = File(...)):
+    """Upload daily FX rates (Excel): date, currency, rate (units per 1 EUR).
+
+    Transaction amounts are re-normalized to EUR with an as-of join on date
+    and currency; rules and aggregates evaluate the EUR amounts.
+    """
+    _validate_extension(file.filename)
+    df, warnings = await parse_fx_rates(file)
+    await run_in_threadpool(DataStore.set_fx_rates, df)
+    return UploadResponse(status="success", record_count=len(df), warnings=warnings + _fx_warnings())
+
+
 # ---- Status / Clear ----
 
 @router.get("/status", response_model=UploadStatus)
@@ -0,0 +1,231 @@
+"""Columnar alert buffer - compact alert storage for high-volume screening.
+
+Rules that can emit alerts in bulk (the declarative specs) append whole
+arrays at once: one typed entry per alert for rule, type, severity and BCN,
+plus offsets into a shared array of affected transaction indices.  Each
+appended segment carries a renderer, so descriptions and ids are produced
+lazily, only when an alert is turned into an ``Alert`` for a client.
+Rules that build ``Alert`` objects themselves are appended as pre-rendered
+segments and keep their text.  Alert ids are derived, per customer, from
+rule and transaction fingerprints (see ``services.alert_identity``).
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Protocol, Sequence
+
+import numpy as np
+import pandas as pd
+
+from models.enums import AlertSeverity, AlertType
+from models.schemas import Alert
+from services.alert_identity import alert_ids, fingerprints_at
+
+ALERT_TYPES = list(AlertType)
+SEVERITIES = list(AlertSeverity)
+
+# Severity rank (HIGH first), indexed by severity code
+SEVERITY_RANK = np.array(
+    [{AlertSeverity.HIGH: 0, AlertSeverity.MEDIUM: 1, AlertSeverity.LOW: 2}[s] for s in SEVERITIES],
+    dtype=np.int8,
+)
+
+
+class SegmentRenderer(Protocol):
+    """Produces the description of the ``k``-th alert of a segment."""
+
+    def description(self, k: int) -> str:
+        ...
+
+
+class _Prerendered:
+    """Segment of ready-made ``Alert`` objects."""
+
+    def __init__(self, alerts: Sequence[Alert]) -> None:
+        self.alerts = alerts
+
+    def description(self, k: int) -> str:
+        return self.alerts[k].description
+
+
+class AlertBuffer:
+    """Alerts for a set of customers, stored column-wise.
+
+    ``rule_names`` fixes the rule codes (typically the engine's rule order)
+    and ``bcns`` the BCN codes.  Call ``finalize`` after the last append;
+    the column attributes (``rule``, ``alert_type``, ``severity``, ``bcn``,
+    ``score``, ``indptr``, ``indices``) are valid from then on.
+    """
+
+    def __init__(self, rule_names: list[str], bcns: list[str]) -> None:
+        self.rule_names = list(rule_names)
+        self.bcns = pd.Index([str(b) for b in bcns])
+        self._segments: list[SegmentRenderer] = []
+        self._parts: list[tuple[np.ndarray, ...]] = []
+        self._ids: dict[int, str] = {}
+        self._fingerprints: Optional[np.ndarray] = None
+        self._fingerprint_indptr: Optional[np.ndarray] = None
+        self._by_bcn: Optional[tuple[np.ndarray, np.ndarray]] = None
+
+        self.rule = np.zeros(0, dtype=np.int16)
+        self.alert_type = np.zeros(0, dtype=np.int8)
+        self.severity = np.zeros(0, dtype=np.int8)
+        self.bcn = np.zeros(0, dtype=np.int32)
+        self.score = np.zeros(0, dtype=np.float32)
+        self.segment = np.zeros(0, dtype=np.int32)
+        self.segment_pos = np.zeros(0, dtype=np.int32)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.rule)
+
+    def set_fingerprints(self, transactions_df: pd.DataFrame, fingerprints: np.ndarray) -> None:
+        """Attach transaction fingerprints (one per row of the screened table) for alert ids."""
+        if len(transactions_df) == 0 or "business_contact_number" not in transactions_df.columns:
+            return
+        codes = self.bcns.get_indexer(transactions_df["business_contact_number"].astype(str))
+        order = np.argsort(codes, kind="stable")
+        order = order[codes[order] >= 0]
+        self._fingerprints = fingerprints[order]
+        self._fingerprint_indptr = np.searchsorted(codes[order], np.arange(len(self.bcns) + 1), side="left")
+
+    # ---- appends ----
+
+    def extend(
+        self,
+        rule: int,
+        alert_type: AlertType,
+        severity: AlertSeverity,
+        bcn_codes: np.ndarray,
+        lengths: np.ndarray,
+        indices: np.ndarray,
+        renderer: SegmentRenderer,
+    ) -> None:
+        """Append ``len(bcn_codes)`` alerts of one rule/type/severity.
+
+        ``lengths[k]`` affected indices of alert ``k`` are taken, in order,
+        from the flat ``indices`` array.  Alerts with a negative BCN code
+        (customers outside this buffer) are dropped.
+        """
+        n = len(bcn_codes)
+        if n == 0:
+            return
+        keep = np.asarray(bcn_codes) >= 0
+        lengths = np.asarray(lengths, dtype=np.int64)
+        if not keep.all():
+            indices = indices[np.repeat(keep, lengths)]
+        positions = np.flatnonzero(keep).astype(np.int32)
+        if positions.size == 0:
+            return
+
+        segment = len(self._segments)
+        self._segments.append(renderer)
+        m = positions.size
+        self._parts.append((
+            np.full(m, rule, dtype=np.int16),
+            np.full(m, ALERT_TYPES.index(alert_type), dtype=np.int8),
+            np.full(m, SEVERITIES.index(severity), dtype=np.int8),
+            np.asarray(bcn_codes, dtype=np.int32)[keep],
+            np.full(m, segment, dtype=np.int32),
+            positions,
+            lengths[keep],
+            np.asarray(indices, dtype=np.int32),
+        ))
+
+    def add_alerts(self, rule: int, bcn: str, alerts: Sequence[Alert]) -> None:
+        """Append ready-made ``Alert`` objects of one rule for one customer."""
+        if not alerts:
+            return
+        segment = len(self._segments)
+        self._segments.append(_Prerendered(alerts))
+        m = len(alerts)
+        self._parts.append((
+            np.full(m, rule, dtype=np.int16),
+            np.array([ALERT_TYPES.index(a.alert_type) for a in alerts], dtype=np.int8),
+            np.array([SEVERITIES.index(a.severity) for a in alerts], dtype=np.int8),
+            np.full(m, self.bcns.get_loc(str(bcn)), dtype=np.int32),
+            np.full(m, segment, dtype=np.int32),
+            np.arange(m, dtype=np.int32),
+            np.array([len(a.affected_transaction_indices) for a in alerts], dtype=np.int64),
+            np.array([i for a in alerts for i in a.affected_transaction_indices], dtype=np.int32),
+        ))
+
+    def finalize(self) -> "AlertBuffer":
+        """Concatenate the appended parts into the column arrays."""
+        if self._parts:
+            cols = [np.concatenate(c) for c in zip(*self._parts)]
+            (self.rule, self.alert_type, self.severity, self.bcn,
+             self.segment, self.segment_pos, lengths, self.indices) = cols
+            self.indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=self.indptr[1:])
+            self.score = np.zeros(len(self.rule), dtype=np.float32)
+        self._parts = []
+        self._by_bcn = None
+        return self
+
+    # ---- per-customer access ----
+
+    def order_by_bcn(self) -> tuple[np.ndarray, np.ndarray]:
+        """Alert positions grouped by BCN and a CSR pointer into them.
+
+        Within a BCN alerts are ordered like ``AMLEngine.analyze`` output:
+        severity first, then rule order, then emission order.
+        """
+        if self._by_bcn is None:
+            order = np.lexsort((
+                np.arange(len(self)),
+                self.rule,
+                SEVERITY_RANK[self.severity],
+                self.bcn,
+            ))
+            indptr = np.searchsorted(self.bcn[order], np.arange(len(self.bcns) + 1), side="left")
+            self._by_bcn = (order, indptr)
+        return self._by_bcn
+
+    def rows_for(self, bcn: str) -> np.ndarray:
+        code = self.bcns.get_indexer([str(bcn)])[0]
+        if code < 0:
+            return np.zeros(0, dtype=np.int64)
+        order, indptr = self.order_by_bcn()
+        return order[indptr[code]:indptr[code + 1]]
+
+    def count_for(self, bcn: str) -> int:
+        return len(self.rows_for(bcn))
+
+    # ---- lazy rendering ----
+
+    def affected(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def description(self, i: int) -> str:
+        return self._segments[self.segment[i]].description(int(self.segment_pos[i]))
+
+    def alert_id(self, i: int) -> str:
+        """Deterministic id; computed for all of the customer's alerts on first use."""
+        cached = self._ids.get(i)
+        if cached is None:
+            code = int(self.bcn[i])
+            rows = self.rows_for(self.bcns[code]).tolist()
+            if self._fingerprints is None:
+                keys = [(self.rule_names[self.rule[r]], self.affected(r)) for r in rows]
+            else:
+                fingerprints = self._fingerprints[self._fingerprint_indptr[code]:self._fingerprint_indptr[code + 1]]
+                keys = [(self.rule_names[self.rule[r]], fingerprints_at(fingerprints, self.affected(r))) for r in rows]
+            self._ids.update(zip(rows, alert_ids(self.bcns[code], keys)))
+            cached = self._ids[i]
+        return cached
+
+    def to_alert(self, i: int) -> Alert:
+        return Alert(
+            id=self.alert_id(i),
+            rule_name=self.rule_names[self.rule[i]],
+            severity=SEVERITIES[self.severity[i]],
+            description=self.description(i),
+            affected_transaction_indices=self.affected(i).tolist(),
+            alert_type=ALERT_TYPES[self.alert_type[i]],
+        )
+
+    def alerts_for(self, bcn: str) -> list[Alert]:
+        """Render one customer's alerts, in ``AMLEngine.analyze`` order."""
+        return [self.to_alert(int(i)) for i in self.rows_for(bcn)]
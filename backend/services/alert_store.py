@@ -0,0 +1,466 @@
+"""Alert store - persistent SQLite index of screening results for cross-customer queries."""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import ALERT_RUNS_KEPT, ALERT_STORE_PATH
+from models.enums import AlertSeverity
+from services.alert_buffer import ALERT_TYPES, SEVERITIES
+
+if TYPE_CHECKING:
+    from services.screening import ScreeningBatch
+
+_SEVERITY_RANK = {
+    AlertSeverity.HIGH: 0,
+    AlertSeverity.MEDIUM: 1,
+    AlertSeverity.LOW: 2,
+}
+
+_NAT = np.iinfo(np.int64).min
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS screening_runs (
+    run_id        TEXT PRIMARY KEY,
+    started_at    TEXT NOT NULL,
+    completed_at  TEXT,
+    bcn_count     INTEGER NOT NULL DEFAULT 0,
+    alert_count   INTEGER NOT NULL DEFAULT 0,
+    transactions_loaded_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id                 TEXT NOT NULL,
+    run_id             TEXT NOT NULL,
+    bcn                TEXT NOT NULL,
+    rule_name          TEXT NOT NULL,
+    alert_type         TEXT NOT NULL,
+    severity           TEXT NOT NULL,
+    severity_rank      INTEGER NOT NULL,
+    description        TEXT NOT NULL,
+    affected_indices   TEXT NOT NULL,
+    first_date         TEXT,
+    last_date          TEXT,
+    risk_score         REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_alerts_run_id       ON alerts (run_id, id);
+CREATE INDEX IF NOT EXISTS ix_alerts_run_bcn      ON alerts (run_id, bcn);
+CREATE INDEX IF NOT EXISTS ix_alerts_run_type     ON alerts (run_id, alert_type, severity_rank);
+CREATE INDEX IF NOT EXISTS ix_alerts_run_severity ON alerts (run_id, severity_rank, risk_score DESC);
+CREATE INDEX IF NOT EXISTS ix_alerts_run_score    ON alerts (run_id, risk_score DESC);
+CREATE INDEX IF NOT EXISTS ix_alerts_run_date     ON alerts (run_id, first_date);
+
+CREATE TABLE IF NOT EXISTS customer_risk (
+    run_id        TEXT NOT NULL,
+    bcn           TEXT NOT NULL,
+    overall_score REAL NOT NULL,
+    risk_level    TEXT NOT NULL,
+    alert_count   INTEGER NOT NULL,
+    PRIMARY KEY (run_id, bcn)
+);
+CREATE INDEX IF NOT EXISTS ix_customer_risk_score ON customer_risk (run_id, overall_score DESC, bcn);
+"""
+
+# Filterable alert columns -> SQL predicate
+_ALERT_FILTERS = {
+    "bcn": "bcn = ?",
+    "alert_type": "alert_type = ?",
+    "severity": "severity = ?",
+    "min_score": "risk_score >= ?",
+    "date_from": "last_date >= ?",
+    "date_to": "first_date <= ?",
+}
+
+
+def _utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _date_ranges(batch: ScreeningBatch) -> tuple[list[Optional[str]], list[Optional[str]]]:
+    """Earliest and latest transaction date (``YYYY-MM-DD``) among each buffered alert's rows."""
+    buffer = batch.buffer
+    n = len(buffer)
+    if n == 0:
+        return [], []
+
+    # Concatenate the customers' dates in buffer BCN order
+    frames = [batch.frames[bcn] for bcn in buffer.bcns]
+    lengths = np.array([len(f) for f in frames], dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    dates = np.concatenate([
+        pd.to_datetime(f["date"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        if "date" in f.columns else np.full(len(f), np.datetime64("NaT"), dtype="datetime64[ns]")
+        for f in frames
+    ]).view(np.int64)
+
+    counts = np.diff(buffer.indptr)
+    owner = np.repeat(buffer.bcn, counts)
+    local = buffer.indices.astype(np.int64)
+    valid = (local >= 0) & (local < lengths[owner])
+    values = np.full(len(local), _NAT, dtype=np.int64)
+    values[valid] = dates[offsets[owner[valid]] + local[valid]]
+
+    lo = np.where(values == _NAT, np.iinfo(np.int64).max, values)
+    first = np.full(n, _NAT, dtype=np.int64)
+    last = np.full(n, _NAT, dtype=np.int64)
+    nonempty = np.flatnonzero(counts > 0)
+    if nonempty.size:
+        starts = buffer.indptr[nonempty]
+        first[nonempty] = np.minimum.reduceat(lo, starts)
+        last[nonempty] = np.maximum.reduceat(values, starts)
+    first[first == np.iinfo(np.int64).max] = _NAT
+
+    def _days(ns: np.ndarray) -> list[Optional[str]]:
+        return [None if v == _NAT else s for v, s in zip(ns.tolist(), pd.to_datetime(ns).strftime("%Y-%m-%d"))]
+
+    return _days(first), _days(last)
+
+
+def _delete_runs(conn: sqlite3.Connection, run_ids: list[str]) -> None:
+    params = [(r,) for r in run_ids]
+    conn.executemany("DELETE FROM alerts WHERE run_id = ?", params)
+    conn.executemany("DELETE FROM customer_risk WHERE run_id = ?", params)
+    conn.executemany("DELETE FROM screening_runs WHERE run_id = ?", params)
+
+
+def _alert_item(row: sqlite3.Row) -> dict:
+    item = dict(row)
+    item["affected_transaction_indices"] = json.loads(item.pop("affected_indices"))
+    item.pop("severity_rank")
+    return item
+
+
+class AlertStore:
+    """Embedded SQLite store of screening runs, alerts and per-customer risk.
+
+    Every screening run gets its own ``run_id``; queries default to the most
+    recently completed run.  Indexes cover the case-queue lookups (BCN,
+    alert type, severity, risk score and alert date) so they never need the
+    rule engine.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(screening_runs)")}
+                if "transactions_loaded_at" not in columns:
+                    conn.execute("ALTER TABLE screening_runs ADD COLUMN transactions_loaded_at TEXT")
+                self._initialized = True
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---- writes ----
+
+    def start_run(self, transactions_loaded_at: Optional[str] = None) -> str:
+        """Open a run, recording which load of the transactions it screens."""
+        run_id = str(uuid.uuid4())
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO screening_runs (run_id, started_at, transactions_loaded_at) VALUES (?, ?, ?)",
+                (run_id, _utcnow(), transactions_loaded_at),
+            )
+        return run_id
+
+    def add_results(self, run_id: str, batch: ScreeningBatch) -> None:
+        """Persist a screened batch of customers; alert text and ids are rendered here."""
+        buffer = batch.buffer
+        first_dates, last_dates = _date_ranges(batch)
+        alert_rows: list[tuple[Any, ...]] = []
+        risk_rows: list[tuple[Any, ...]] = []
+        for bcn in batch.bcns:
+            risk = batch.risks[bcn]
+            rows = buffer.rows_for(bcn).tolist()
+            for i in rows:
+                severity = SEVERITIES[buffer.severity[i]]
+                alert_rows.append((
+                    buffer.alert_id(i),
+                    run_id,
+                    bcn,
+                    buffer.rule_names[buffer.rule[i]],
+                    ALERT_TYPES[buffer.alert_type[i]].value,
+                    severity.value,
+                    _SEVERITY_RANK.get(severity, 99),
+                    buffer.description(i),
+                    json.dumps(buffer.affected(i).tolist()),
+                    first_dates[i],
+                    last_dates[i],
+                    risk.overall_score,
+                ))
+            risk_rows.append((run_id, bcn, risk.overall_score, risk.risk_level.value, len(rows)))
+
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO alerts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                alert_rows,
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO customer_risk VALUES (?, ?, ?, ?, ?)",
+                risk_rows,
+            )
+            conn.execute(
+                "UPDATE screening_runs SET bcn_count = bcn_count + ?, alert_count = alert_count + ? "
+                "WHERE run_id = ?",
+                (len(risk_rows), len(alert_rows), run_id),
+            )
+
+    def copy_results(self, source_run_id: str, run_id: str, exclude: list[str]) -> None:
+        """Copy the alerts and customer risk of ``source_run_id`` into ``run_id``, except BCNs in ``exclude``."""
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE excluded_bcns (bcn TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO excluded_bcns VALUES (?)", [(b,) for b in exclude])
+            copied = conn.execute(
+                "INSERT INTO alerts SELECT id, ?, bcn, rule_name, alert_type, severity, severity_rank, "
+                "description, affected_indices, first_date, last_date, risk_score FROM alerts "
+                "WHERE run_id = ? AND bcn NOT IN (SELECT bcn FROM excluded_bcns)",
+                (run_id, source_run_id),
+            ).rowcount
+            customers = conn.execute(
+                "INSERT OR REPLACE INTO customer_risk SELECT ?, bcn, overall_score, risk_level, alert_count "
+                "FROM customer_risk WHERE run_id = ? AND bcn NOT IN (SELECT bcn FROM excluded_bcns)",
+                (run_id, source_run_id),
+            ).rowcount
+            conn.execute(
+                "UPDATE screening_runs SET bcn_count = bcn_count + ?, alert_count = alert_count + ? "
+                "WHERE run_id = ?",
+                (customers, copied, run_id),
+            )
+            conn.execute("DROP TABLE excluded_bcns")
+
+    def complete_run(self, run_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE screening_runs SET completed_at = ? WHERE run_id = ?",
+                (_utcnow(), run_id),
+            )
+
+    def delete_run(self, run_id: str) -> None:
+        """Remove a run with its alerts and customer risk (e.g. a cancelled one)."""
+        with self._connect() as conn:
+            _delete_runs(conn, [run_id])
+
+    def prune(self, keep: int = ALERT_RUNS_KEPT) -> int:
+        """Keep the ``keep`` latest completed runs; delete older runs and abandoned ones.
+
+        A run that never completed is abandoned once it started before the
+        oldest kept run.  Returns the number of runs deleted.
+        """
+        with self._connect() as conn:
+            latest = (
+                "SELECT run_id, rowid FROM screening_runs WHERE completed_at IS NOT NULL "
+                "ORDER BY completed_at DESC, rowid DESC LIMIT ?"
+            )
+            kept = conn.execute(latest, (keep,)).fetchall()
+            if len(kept) < keep:
+                return 0
+            oldest = min(row["rowid"] for row in kept)
+            stale = [
+                row["run_id"] for row in conn.execute(
+                    f"SELECT run_id FROM screening_runs WHERE (completed_at IS NULL AND rowid < ?) "
+                    f"OR (completed_at IS NOT NULL AND run_id NOT IN (SELECT run_id FROM ({latest})))",
+                    (oldest, keep),
+                )
+            ]
+            _delete_runs(conn, stale)
+        return len(stale)
+
+    # ---- queries ----
+
+    def list_runs(self, limit: int = 20) -> list[dict]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM screening_runs ORDER BY started_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_run(self, run_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM screening_runs WHERE run_id = ?", (run_id,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_run_id(self) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT run_id FROM screening_runs WHERE completed_at IS NOT NULL "
+                "ORDER BY completed_at DESC, rowid DESC LIMIT 1"
+            ).fetchone()
+        return row["run_id"] if row else None
+
+    def previous_run_id(self, run_id: str) -> Optional[str]:
+        """The completed run that started last before ``run_id``."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT run_id FROM screening_runs WHERE completed_at IS NOT NULL "
+                "AND rowid < (SELECT rowid FROM screening_runs WHERE run_id = ?) "
+                "ORDER BY rowid DESC LIMIT 1",
+                (run_id,),
+            ).fetchone()
+        return row["run_id"] if row else None
+
+    def diff_runs(
+        self,
+        base_run_id: str,
+        run_id: str,
+        page: int = 1,
+        page_size: int = 50,
+    ) -> dict[str, Any]:
+        """Alerts new in ``run_id`` and closed since ``base_run_id``, matched by alert id.
+
+        Returns the ``new``/``closed``/``unchanged`` counts and one page of
+        the new and of the closed alerts (ordered like ``query_alerts``).
+        """
+        delta = (
+            "SELECT * FROM alerts a WHERE a.run_id = ? AND NOT EXISTS "
+            "(SELECT 1 FROM alerts b WHERE b.run_id = ? AND b.id = a.id)"
+        )
+        with self._connect() as conn:
+            def _side(current: str, other: str) -> tuple[int, list[dict]]:
+                total = conn.execute(f"SELECT COUNT(*) FROM ({delta})", (current, other)).fetchone()[0]
+                rows = conn.execute(
+                    f"{delta} ORDER BY a.severity_rank, a.risk_score DESC, a.bcn LIMIT ? OFFSET ?",
+                    (current, other, page_size, (page - 1) * page_size),
+                ).fetchall()
+                return total, [_alert_item(r) for r in rows]
+
+            new_count, new = _side(run_id, base_run_id)
+            closed_count, closed = _side(base_run_id, run_id)
+            current_count = conn.execute(
+                "SELECT COUNT(*) FROM alerts WHERE run_id = ?", (run_id,)
+            ).fetchone()[0]
+
+        return {
+            "new_count": new_count,
+            "closed_count": closed_count,
+            "unchanged_count": current_count - new_count,
+            "new": new,
+            "closed": closed,
+        }
+
+    def query_alerts(
+        self,
+        run_id: str,
+        filters: dict[str, Any],
+        page: int = 1,
+        page_size: int = 50,
+    ) -> tuple[int, list[dict]]:
+        """Return ``(total, rows)`` for alerts matching ``filters``, highest severity and score first."""
+        clauses = ["run_id = ?"]
+        params: list[Any] = [run_id]
+        for name, value in filters.items():
+            if value is None:
+                continue
+            clauses.append(_ALERT_FILTERS[name])
+            params.append(value)
+        where = " AND ".join(clauses)
+
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM alerts WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM alerts WHERE {where} "
+                "ORDER BY severity_rank, risk_score DESC, bcn LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size],
+            ).fetchall()
+
+        return total, [_alert_item(r) for r in rows]
+
+    def iter_alerts(
+        self,
+        run_id: str,
+        filters: dict[str, Any],
+        chunk_size: int,
+    ) -> Iterator[list[dict]]:
+        """Yield alerts matching ``filters`` in chunks, in insertion order.
+
+        Each chunk is a separate keyset query (``rowid > last``), so the
+        export never holds more than one chunk or a connection across yields.
+        """
+        clauses = ["run_id = ?", "rowid > ?"]
+        params: list[Any] = [run_id]
+        for name, value in filters.items():
+            if value is None:
+                continue
+            clauses.append(_ALERT_FILTERS[name])
+            params.append(value)
+        where = " AND ".join(clauses)
+
+        last = 0
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT rowid, * FROM alerts WHERE {where} ORDER BY rowid LIMIT ?",
+                    [params[0], last, *params[1:], chunk_size],
+                ).fetchall()
+            if not rows:
+                return
+            last = rows[-1]["rowid"]
+            items = [_alert_item(r) for r in rows]
+            for item in items:
+                item.pop("rowid")
+            yield items
+            if len(rows) < chunk_size:
+                return
+
+    def top_customers(
+        self,
+        run_id: str,
+        risk_level: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 100,
+    ) -> tuple[int, list[dict]]:
+        """Return ``(total, rows)`` of customers ordered by risk score (highest first)."""
+        clauses = ["run_id = ?"]
+        params: list[Any] = [run_id]
+        if risk_level is not None:
+            clauses.append("risk_level = ?")
+            params.append(risk_level)
+        where = " AND ".join(clauses)
+
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM customer_risk WHERE {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT bcn, overall_score, risk_level, alert_count FROM customer_risk WHERE {where} "
+                "ORDER BY overall_score DESC, bcn LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size],
+            ).fetchall()
+        return total, [dict(r) for r in rows]
+
+    def run_customers(self, run_id: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, int]]:
+        """Per-customer ``(bcns, scores, alert counts)`` of a run and its alert count per type."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT bcn, overall_score, alert_count FROM customer_risk WHERE run_id = ?", (run_id,)
+            ).fetchall()
+            by_type = conn.execute(
+                "SELECT alert_type, COUNT(*) FROM alerts WHERE run_id = ? GROUP BY alert_type", (run_id,)
+            ).fetchall()
+        return (
+            np.array([r["bcn"] for r in rows], dtype=object),
+            np.array([r["overall_score"] for r in rows], dtype=np.float64),
+            np.array([r["alert_count"] for r in rows], dtype=np.int64),
+            {r[0]: int(r[1]) for r in by_type},
+        )
+
+
+# Shared store instance used by the routers
+alert_store = AlertStore(ALERT_STORE_PATH)
@@ -2,25 +2,34 @@
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Optional
 
+import numpy as np
 import pandas as pd
 
 from models.enums import AlertSeverity
 from models.schemas import Alert
+from services.alert_buffer import AlertBuffer
+from services.alert_identity import assign_alert_ids, transaction_fingerprints
+from services.fx_rates import with_eur_amounts
 from services.rules import (
     CounterpartyConcentrationRule,
     DormantAccountRule,
     FlowThroughRule,
     HighRiskCountryRule,
+    LayeringChainRule,
+    MatchedTransferRule,
     ProfileDeviationRule,
     RapidFundMovementRule,
     RoundAmountPatternRule,
+    RoundTripRule,
+    SharedIbanRule,
     StructuringDetectionRule,
     ThresholdAlertRule,
     WatchlistMatchRule,
 )
 from services.rules.base import AMLRule
+from services.rules.dsl import DeclarativeRule
 
 # Severity ordering for sorting (highest first)
 _SEVERITY_ORDER = {
@@ -30,6 +39,23 @@ _SEVERITY_ORDER = {
 }
 
 
+def _history_rows(
+    dates: pd.Series,
+    date_from: Optional[pd.Timestamp],
+    lookback_days: float,
+) -> np.ndarray:
+    """Positions of the rows on or after ``date_from - lookback_days``, plus the last row before."""
+    if date_from is None:
+        return np.arange(len(dates))
+    start = date_from - pd.Timedelta(days=lookback_days)
+    values = dates.to_numpy(dtype="datetime64[ns]")
+    keep = (dates >= start).to_numpy()
+    earlier = np.flatnonzero(dates.notna().to_numpy() & ~keep)
+    if earlier.size:
+        keep[earlier[np.argmax(values[earlier])]] = True
+    return np.flatnonzero(keep)
+
+
 class AMLEngine:
     """Runs all AML rules against customer transactions and returns sorted alerts."""
 
@@ -45,6 +71,10 @@ class AMLEngine:
             CounterpartyConcentrationRule(),
             ProfileDeviationRule(),
             FlowThroughRule(),
+            LayeringChainRule(),
+            MatchedTransferRule(),
+            RoundTripRule(),
+            SharedIbanRule(),
         ]
 
     def analyze(
@@ -52,12 +82,17 @@ class AMLEngine:
         transactions_df: pd.DataFrame,
         context: dict[str, Any],
     ) -> list[Alert]:
-        """Run all rules and return alerts sorted by severity (highest first)."""
+        """Run all rules and return alerts sorted by severity (highest first).
+
+        Rules see amounts normalized to EUR (see ``services.fx_rates``);
+        alert ids are deterministic (see ``services.alert_identity``).
+        """
         all_alerts: list[Alert] = []
+        normalized = with_eur_amounts(transactions_df)
 
         for rule in self.rules:
             try:
-                rule_alerts = rule.evaluate(transactions_df, context)
+                rule_alerts = rule.evaluate(normalized, context)
                 all_alerts.extend(rule_alerts)
             except Exception as exc:
                 # Log but don't crash - one broken rule shouldn't prevent others
@@ -65,4 +100,105 @@ class AMLEngine:
 
         # Sort by severity (HIGH > MEDIUM > LOW)
         all_alerts.sort(key=lambda a: _SEVERITY_ORDER.get(a.severity, 99))
-        return all_alerts
+        return assign_alert_ids(all_alerts, transactions_df)
+
+    @property
+    def max_lookback_days(self) -> float:
+        """Longest history any rule needs before a review period."""
+        return max((rule.lookback_days for rule in self.rules), default=0.0)
+
+    def analyze_period(
+        self,
+        transactions_df: pd.DataFrame,
+        context: dict[str, Any],
+        date_from: Optional[pd.Timestamp],
+        date_to: Optional[pd.Timestamp],
+    ) -> list[Alert]:
+        """Run all rules for one customer's review period ``[date_from, date_to]``.
+
+        ``transactions_df`` holds the customer's dated rows from
+        ``max_lookback_days`` before ``date_from`` (plus the last row before
+        that) up to ``date_to``, indexed by customer-local position - see
+        ``DataStore.get_customer_period``.  Each rule sees the period plus its
+        own ``lookback_days`` of history and the last row before it; only
+        alerts touching a row inside the period are returned, with indices
+        into the customer's full history.
+        """
+        ext = transactions_df.reset_index(drop=True)
+        local = transactions_df.index.to_numpy(dtype=np.int64)
+        dates = (
+            pd.to_datetime(ext["date"], errors="coerce")
+            if "date" in ext.columns else pd.Series(pd.NaT, index=ext.index, dtype="datetime64[ns]")
+        )
+        in_period = dates.notna().to_numpy()
+        if date_from is not None:
+            in_period &= (dates >= date_from).to_numpy()
+        if date_to is not None:
+            in_period &= (dates <= date_to).to_numpy()
+
+        normalized = with_eur_amounts(ext)
+        subsets: dict[float, np.ndarray] = {}
+        all_alerts: list[Alert] = []
+        for rule in self.rules:
+            try:
+                if rule.uses_customer_positions:
+                    position_of = {int(i): p for p, i in enumerate(local)}
+                    rule_alerts = rule.evaluate(normalized, context)
+                    for alert in rule_alerts:
+                        alert.affected_transaction_indices = [
+                            position_of[i] for i in alert.affected_transaction_indices if i in position_of
+                        ]
+                else:
+                    lookback = float(rule.lookback_days)
+                    if lookback not in subsets:
+                        subsets[lookback] = _history_rows(dates, date_from, lookback)
+                    positions = subsets[lookback]
+                    rule_alerts = rule.evaluate(normalized.iloc[positions].reset_index(drop=True), context)
+                    for alert in rule_alerts:
+                        alert.affected_transaction_indices = [
+                            int(positions[i]) for i in alert.affected_transaction_indices
+                        ]
+                all_alerts.extend(rule_alerts)
+            except Exception as exc:
+                print(f"[AMLEngine] Rule '{rule.rule_name}' raised an exception: {exc}")
+
+        all_alerts.sort(key=lambda a: _SEVERITY_ORDER.get(a.severity, 99))
+        assign_alert_ids(all_alerts, ext)
+        scoped: list[Alert] = []
+        for alert in all_alerts:
+            indices = alert.affected_transaction_indices
+            if any(in_period[i] for i in indices):
+                alert.affected_transaction_indices = [int(local[i]) for i in indices]
+                scoped.append(alert)
+        return scoped
+
+    def analyze_portfolio(
+        self,
+        customer_frames: dict[str, pd.DataFrame],
+        transactions_df: pd.DataFrame,
+        context: dict[str, Any],
+    ) -> AlertBuffer:
+        """Run all rules for many customers into a columnar ``AlertBuffer``.
+
+        ``transactions_df`` holds the rows of every customer in
+        ``customer_frames`` (in their original order).  Declarative rules are
+        evaluated over it in one grouped pass; the others run per customer.
+        ``buffer.alerts_for(bcn)`` gives the same alerts as ``analyze``.
+        """
+        buffer = AlertBuffer([rule.rule_name for rule in self.rules], list(customer_frames))
+        buffer.set_fingerprints(transactions_df, transaction_fingerprints(transactions_df))
+        normalized = with_eur_amounts(transactions_df)
+        normalized_frames = {bcn: with_eur_amounts(tx_df) for bcn, tx_df in customer_frames.items()}
+        for code, rule in enumerate(self.rules):
+            if isinstance(rule, DeclarativeRule):
+                try:
+                    rule.emit_portfolio(normalized, buffer, code)
+                except Exception as exc:
+                    print(f"[AMLEngine] Rule '{rule.rule_name}' raised an exception: {exc}")
+                continue
+            for bcn, tx_df in normalized_frames.items():
+                try:
+                    buffer.add_alerts(code, bcn, rule.evaluate(tx_df, context))
+                except Exception as exc:
+                    print(f"[AMLEngine] Rule '{rule.rule_name}' raised an exception: {exc}")
+        return buffer.finalize()
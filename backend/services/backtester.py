@@ -0,0 +1,444 @@
+"""Threshold backtester - evaluate grids of rule parameters over the whole portfolio.
+
+Each rule's alert logic is re-expressed as vectorized numpy operations over
+``PortfolioFeatures``, a date-sorted columnar view of every transaction that
+is built once per upload.  Work shared between parameter combinations (band
+extraction, window boundaries, candidate pairs) is computed once per distinct
+value of the parameters it depends on, so a grid of thousands of combinations
+costs little more than its slowest dimension.
+"""
+
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+from config import BACKTEST_MAX_WINDOW_DAYS
+from models.schemas import BacktestResult
+from services.fx_rates import amount_column
+from utils.windows import distinct_in_windows, prefix_sums, window_ends
+
+_NS_PER_SECOND = 1_000_000_000
+
+_IN_TYPES = ("credit", "incoming", "deposit", "receive", "received")
+_OUT_TYPES = ("debit", "outgoing", "withdrawal", "send", "sent", "transfer_out")
+
+
+@dataclass
+class PortfolioFeatures:
+    """Columnar, (BCN, date)-sorted view of all dated transactions.
+
+    ``key`` places every BCN on its own stretch of a single integer time
+    axis (seconds), so one ``searchsorted`` finds window ends for the whole
+    book without crossing from one customer into the next.
+    """
+
+    bcns: pd.Index
+    bcn: np.ndarray             # int32 BCN code per row
+    ts: np.ndarray              # int64 seconds since epoch
+    key: np.ndarray             # int64 BCN-offset time key
+    amount: np.ndarray          # float64 signed amount
+    incoming: np.ndarray        # bool, same classification as the per-customer rules
+    month: np.ndarray           # int32 year * 12 + month - 1
+    sender: np.ndarray          # int64 (bcn, sender) code, -1 when empty
+    receiver: np.ndarray        # int64 (bcn, receiver) code, -1 when empty
+    bcn_start: np.ndarray       # first row of each BCN
+    bcn_end: np.ndarray         # one past the last row of each BCN
+    # Undated rows still count for amount-only rules
+    undated_bcn: np.ndarray
+    undated_amount: np.ndarray
+
+    @property
+    def row_count(self) -> int:
+        return len(self.bcn)
+
+
+def _classify_incoming(df: pd.DataFrame, amounts: np.ndarray) -> np.ndarray:
+    if "transaction_type" not in df.columns:
+        return amounts >= 0
+    codes, uniques = pd.factorize(df["transaction_type"].to_numpy(), sort=False)
+    labels = pd.Series(uniques, dtype=object).fillna("").astype(str).str.strip().str.lower()
+    is_in = labels.isin(_IN_TYPES).to_numpy()
+    is_out = labels.isin(_OUT_TYPES).to_numpy()
+    known_in = np.where(codes >= 0, is_in[np.maximum(codes, 0)], False)
+    known_out = np.where(codes >= 0, is_out[np.maximum(codes, 0)], False)
+    return known_in | (~known_out & (amounts >= 0))
+
+
+def _party_codes(df: pd.DataFrame, col: str, bcn: np.ndarray) -> np.ndarray:
+    """Code a counterparty column per BCN (case-insensitive), -1 for empty names."""
+    if col not in df.columns:
+        return np.full(len(df), -1, dtype=np.int64)
+    codes, uniques = pd.factorize(df[col].to_numpy(), sort=False)
+    labels = pd.Series(uniques, dtype=object).fillna("").astype(str).str.strip().str.lower()
+    name_codes, _ = pd.factorize(labels.where(labels != "").to_numpy(), sort=False)
+    names = np.where(codes >= 0, name_codes[np.maximum(codes, 0)], -1).astype(np.int64)
+    n_names = int(names.max()) + 1 if len(names) else 0
+    return np.where(names >= 0, bcn.astype(np.int64) * max(n_names, 1) + names, -1)
+
+
+def build_portfolio_features(transactions_df: pd.DataFrame) -> Optional[PortfolioFeatures]:
+    """Build the sorted feature arrays used by every backtest."""
+    required = {"date", "amount", "business_contact_number"}
+    if transactions_df is None or transactions_df.empty or not required.issubset(transactions_df.columns):
+        return None
+
+    df = transactions_df
+    bcn_all, bcns = pd.factorize(df["business_contact_number"].astype(str).to_numpy(), sort=True)
+    bcn_all = bcn_all.astype(np.int32)
+    dates = pd.to_datetime(df["date"], errors="coerce")
+    amounts = df[amount_column(df)].to_numpy(dtype=np.float64)
+    dated = dates.notna().to_numpy()
+
+    ts_all = np.zeros(len(df), dtype=np.int64)
+    ts_all[dated] = dates.to_numpy(dtype="datetime64[ns]")[dated].astype(np.int64) // _NS_PER_SECOND
+
+    rows = np.flatnonzero(dated)
+    order = rows[np.lexsort((ts_all[rows], bcn_all[rows]))]
+
+    bcn = bcn_all[order]
+    ts = ts_all[order]
+    amount = amounts[order]
+    incoming = _classify_incoming(df, amounts)[order]
+    sender = _party_codes(df, "sender", bcn_all)[order]
+    receiver = _party_codes(df, "receiver", bcn_all)[order]
+    month_dates = dates.iloc[order]
+    month = (month_dates.dt.year * 12 + month_dates.dt.month - 1).to_numpy(dtype=np.int32)
+
+    # Leave a gap wider than any window being tested between consecutive BCNs
+    t0 = int(ts.min()) if len(ts) else 0
+    span = (int(ts.max()) - t0 if len(ts) else 0) + BACKTEST_MAX_WINDOW_DAYS * 86400 + 1
+    key = bcn.astype(np.int64) * span + (ts - t0)
+
+    n_bcns = len(bcns)
+    bcn_start = np.searchsorted(bcn, np.arange(n_bcns), side="left")
+    bcn_end = np.searchsorted(bcn, np.arange(n_bcns), side="right")
+
+    undated = np.flatnonzero(~dated)
+    return PortfolioFeatures(
+        bcns=pd.Index(bcns),
+        bcn=bcn,
+        ts=ts,
+        key=key,
+        amount=amount,
+        incoming=incoming,
+        month=month,
+        sender=sender,
+        receiver=receiver,
+        bcn_start=bcn_start,
+        bcn_end=bcn_end,
+        undated_bcn=bcn_all[undated],
+        undated_amount=amounts[undated],
+    )
+
+
+# ---- helpers ----
+
+def _result(rule: str, params: dict[str, Any], alert_bcns: np.ndarray) -> BacktestResult:
+    """``alert_bcns`` holds one BCN code per alert."""
+    return BacktestResult(
+        rule=rule,
+        parameters=params,
+        alert_count=int(len(alert_bcns)),
+        affected_bcn_count=int(np.unique(alert_bcns).size),
+    )
+
+
+# ---- per-rule backtests ----
+
+def _backtest_threshold(f: PortfolioFeatures, grid: dict[str, list]) -> Iterator[BacktestResult]:
+    amounts = np.sort(np.concatenate([f.amount, f.undated_amount]))
+    bcns = np.concatenate([f.bcn, f.undated_bcn])
+    largest = np.full(len(f.bcns), -np.inf)
+    np.maximum.at(largest, bcns, np.concatenate([f.amount, f.undated_amount]))
+    largest.sort()
+    for (threshold,) in itertools.product(grid["LARGE_TX_THRESHOLD"]):
+        yield BacktestResult(
+            rule="threshold",
+            parameters={"LARGE_TX_THRESHOLD": threshold},
+            alert_count=int(len(amounts) - np.searchsorted(amounts, threshold, side="left")),
+            affected_bcn_count=int(len(largest) - np.searchsorted(largest, threshold, side="left")),
+        )
+
+
+def _backtest_structuring(f: PortfolioFeatures, grid: dict[str, list]) -> Iterator[BacktestResult]:
+    for lower, upper in itertools.product(grid["STRUCTURING_LOWER_BOUND"], grid["STRUCTURING_THRESHOLD"]):
+        band = np.flatnonzero((f.amount >= lower) & (f.amount < upper))
+        key, amount, bcn = f.key[band], f.amount[band], f.bcn[band]
+        sums = prefix_sums(amount)
+        positions = np.arange(len(band))
+        for window_days in grid["STRUCTURING_WINDOW_DAYS"]:
+            ends = window_ends(key, window_days * 86400)
+            counts = ends - positions
+            totals = sums[ends] - sums[positions]
+            for min_tx in grid["STRUCTURING_MIN_TX"]:
+                qualifies = np.flatnonzero((counts >= min_tx) & (totals > upper))
+                # A cluster is reported unless it is contained in the previous
+                # reported cluster of the same BCN, i.e. it ends at the same row.
+                q_ends, q_bcn = ends[qualifies], bcn[qualifies]
+                new = np.ones(len(qualifies), dtype=bool)
+                new[1:] = (q_ends[1:] != q_ends[:-1]) | (q_bcn[1:] != q_bcn[:-1])
+                yield _result(
+                    "structuring",
+                    {
+                        "STRUCTURING_LOWER_BOUND": lower,
+                        "STRUCTURING_THRESHOLD": upper,
+                        "STRUCTURING_WINDOW_DAYS": window_days,
+                        "STRUCTURING_MIN_TX": min_tx,
+                    },
+                    q_bcn[new],
+                )
+
+
+def _backtest_rapid_movement(f: PortfolioFeatures, grid: dict[str, list]) -> Iterator[BacktestResult]:
+    min_threshold = min(grid["RAPID_MOVEMENT_THRESHOLD"])
+    max_window = max(grid["RAPID_MOVEMENT_WINDOW_HOURS"]) * 3600
+
+    # Candidate (in, out) pairs within the widest window, each side above the lowest threshold
+    big = np.flatnonzero(np.abs(f.amount) >= min_threshold)
+    is_in = f.incoming[big]
+    ins, outs = big[is_in], big[~is_in]
+    out_keys = f.key[outs]
+    lo = np.searchsorted(out_keys, f.key[ins] - max_window, side="left")
+    hi = np.searchsorted(out_keys, f.key[ins] + max_window, side="right")
+    counts = hi - lo
+    pair_in = np.repeat(ins, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    pair_out = outs[np.repeat(lo, counts) + offsets]
+
+    in_amt = np.abs(f.amount[pair_in])
+    out_amt = np.abs(f.amount[pair_out])
+    nonzero = in_amt > 0
+    pair_in, pair_out, in_amt, out_amt = pair_in[nonzero], pair_out[nonzero], in_amt[nonzero], out_amt[nonzero]
+    hours = np.abs(f.ts[pair_out] - f.ts[pair_in]) / 3600
+    smaller = np.minimum(in_amt, out_amt)
+    diff = np.abs(in_amt - out_amt)
+    ratio_in = diff / in_amt
+    # The reverse pass (sent then received) measures variance against the outgoing amount
+    ratio_out = np.where((f.ts[pair_in] > f.ts[pair_out]) & (out_amt > 0), diff / np.where(out_amt > 0, out_amt, 1), np.inf)
+    best_ratio = np.minimum(ratio_in, ratio_out)
+    pair_bcn = f.bcn[pair_in]
+
+    for threshold, tolerance, window in itertools.product(
+        grid["RAPID_MOVEMENT_THRESHOLD"],
+        grid["RAPID_MOVEMENT_TOLERANCE"],
+        grid["RAPID_MOVEMENT_WINDOW_HOURS"],
+    ):
+        hit = (smaller >= threshold) & (hours <= window) & (best_ratio <= tolerance)
+        yield _result(
+            "rapid_movement",
+            {
+                "RAPID_MOVEMENT_THRESHOLD": threshold,
+                "RAPID_MOVEMENT_TOLERANCE": tolerance,
+                "RAPID_MOVEMENT_WINDOW_HOURS": window,
+            },
+            pair_bcn[hit],
+        )
+
+
+def _backtest_counterparty(f: PortfolioFeatures, grid: dict[str, list]) -> Iterator[BacktestResult]:
+    sums = prefix_sums(f.amount)
+    positions = np.arange(f.row_count)
+    segments = f.bcn_start[f.bcn_end > f.bcn_start]
+    for window_days in grid["COUNTERPARTY_WINDOW_DAYS"]:
+        ends = window_ends(f.key, window_days * 86400)
+        totals = sums[ends] - sums[positions]
+        fan_in = distinct_in_windows(f.sender, ends)
+        fan_out = distinct_in_windows(f.receiver, ends)
+        for aggregate in grid["COUNTERPARTY_AGGREGATE"]:
+            over = totals > aggregate
+            # Widest qualifying window per BCN; at most one alert per direction per BCN
+            best_in = np.maximum.reduceat(np.where(over, fan_in, -1), segments) if len(segments) else np.empty(0)
+            best_out = np.maximum.reduceat(np.where(over, fan_out, -1), segments) if len(segments) else np.empty(0)
+            for unique_min in grid["COUNTERPARTY_UNIQUE_MIN"]:
+                in_hits = best_in >= unique_min
+                out_hits = best_out >= unique_min
+                yield BacktestResult(
+                    rule="counterparty",
+                    parameters={
+                        "COUNTERPARTY_UNIQUE_MIN": unique_min,
+                        "COUNTERPARTY_WINDOW_DAYS": window_days,
+                        "COUNTERPARTY_AGGREGATE": aggregate,
+                    },
+                    alert_count=int(in_hits.sum() + out_hits.sum()),
+                    affected_bcn_count=int((in_hits | out_hits).sum()),
+                )
+
+
+def _backtest_round_amount(f: PortfolioFeatures, grid: dict[str, list]) -> Iterator[BacktestResult]:
+    # Undated rows sort last in the per-customer rule; append them after each BCN's dated rows
+    amounts = np.concatenate([f.amount, f.undated_amount])
+    bcn = np.concatenate([f.bcn, f.undated_bcn])
+    order = np.argsort(bcn, kind="stable")
+    amounts, bcn = amounts[order], bcn[order]
+    abs_amount = np.abs(amounts)
+    is_round = np.zeros(len(amounts), dtype=bool)
+    for divisor in config.ROUND_AMOUNT_DIVISORS:
+        is_round |= (abs_amount > 0) & (abs_amount % divisor == 0)
+
+    n_bcns = len(f.bcns)
+    totals = np.bincount(bcn, minlength=n_bcns)
+    round_counts = np.bincount(bcn, weights=is_round, minlength=n_bcns)
+    ratios = np.divide(round_counts, totals, out=np.zeros(n_bcns), where=totals > 0)
+
+    # Lengths of maximal runs of round amounts inside each BCN
+    starts = is_round & np.r_[True, ~is_round[:-1] | (bcn[1:] != bcn[:-1])]
+    run_id = np.cumsum(starts) - 1
+    run_lengths = np.bincount(run_id[is_round], minlength=int(starts.sum()))
+    run_bcn = bcn[starts]
+
+    for ratio, consecutive_min in itertools.product(grid["ROUND_AMOUNT_RATIO"], grid["ROUND_AMOUNT_CONSECUTIVE_MIN"]):
+        ratio_bcns = np.flatnonzero((ratios > ratio) & (totals >= 3))
+        run_bcns = run_bcn[run_lengths >= consecutive_min]
+        yield _result(
+            "round_amount",
+            {"ROUND_AMOUNT_RATIO": ratio, "ROUND_AMOUNT_CONSECUTIVE_MIN": consecutive_min},
+            np.concatenate([ratio_bcns, run_bcns]),
+        )
+
+
+def _backtest_dormant(f: PortfolioFeatures, grid: dict[str, list]) -> Iterator[BacktestResult]:
+    positions = np.arange(f.row_count)
+    same_bcn = np.r_[False, f.bcn[1:] == f.bcn[:-1]]
+    gap_days = np.where(same_bcn, np.r_[0, np.diff(f.ts)] // 86400, -1)
+    sizes = (f.bcn_end - f.bcn_start)[f.bcn]
+    for window_days in grid["DORMANT_BURST_WINDOW_DAYS"]:
+        bursts = window_ends(f.key, window_days * 86400) - positions
+        for inactivity, burst_count in itertools.product(grid["DORMANT_INACTIVITY_DAYS"], grid["DORMANT_BURST_COUNT"]):
+            hit = (gap_days >= inactivity) & (bursts >= burst_count) & (sizes >= burst_count + 1)
+            yield _result(
+                "dormant",
+                {
+                    "DORMANT_INACTIVITY_DAYS": inactivity,
+                    "DORMANT_BURST_COUNT": burst_count,
+                    "DORMANT_BURST_WINDOW_DAYS": window_days,
+                },
+                f.bcn[hit],
+            )
+
+
+def _backtest_profile_deviation(f: PortfolioFeatures, grid: dict[str, list]) -> Iterator[BacktestResult]:
+    n_bcns = len(f.bcns)
+    amounts = np.concatenate([f.amount, f.undated_amount])
+    bcn = np.concatenate([f.bcn, f.undated_bcn])
+    averages = np.bincount(bcn, weights=amounts, minlength=n_bcns) / np.maximum(np.bincount(bcn, minlength=n_bcns), 1)
+    row_avg = averages[bcn]
+    positive = row_avg > 0
+    amount_ratio = amounts[positive] / row_avg[positive]
+    amount_bcn = bcn[positive]
+
+    months = pd.DataFrame({"bcn": f.bcn, "month": f.month}).groupby(["bcn", "month"], sort=True).size()
+    month_bcn = months.index.get_level_values("bcn").to_numpy()
+    month_counts = months.to_numpy().astype(np.float64)
+    per_bcn_months = np.bincount(month_bcn, minlength=n_bcns)
+    avg_frequency = np.bincount(month_bcn, weights=month_counts, minlength=n_bcns) / np.maximum(per_bcn_months, 1)
+    eligible = per_bcn_months[month_bcn] >= 2
+    freq_ratio = month_counts[eligible] / avg_frequency[month_bcn[eligible]]
+    freq_bcn = month_bcn[eligible]
+
+    for (multiplier,) in itertools.product(grid["PROFILE_DEVIATION_MULTIPLIER"]):
+        yield _result(
+            "profile_deviation",
+            {"PROFILE_DEVIATION_MULTIPLIER": multiplier},
+            np.concatenate([amount_bcn[amount_ratio > multiplier], freq_bcn[freq_ratio > multiplier]]),
+        )
+
+
+def _backtest_flow_through(f: PortfolioFeatures, grid: dict[str, list]) -> Iterator[BacktestResult]:
+    first_ts = f.ts[f.bcn_start[f.bcn]]
+    abs_amount = np.abs(f.amount)
+    for window_days in grid["FLOW_THROUGH_WINDOW_DAYS"]:
+        window_idx = (f.ts - first_ts) // int(window_days * 86400)
+        windows = pd.DataFrame({
+            "bcn": f.bcn,
+            "window": window_idx,
+            "in": np.where(f.incoming, abs_amount, 0.0),
+            "out": np.where(f.incoming, 0.0, abs_amount),
+            "n": 1,
+        }).groupby(["bcn", "window"], sort=False).sum()
+        total_in = windows["in"].to_numpy()
+        total_out = windows["out"].to_numpy()
+        largest = np.maximum(total_in, total_out)
+        variance = np.abs(total_in - total_out) / np.where(largest > 0, largest, 1)
+        base = (windows["n"].to_numpy() >= 2) & (total_in > 0) & (total_out > 0)
+        window_bcn = windows.index.get_level_values("bcn").to_numpy()
+        for max_variance, min_amount in itertools.product(grid["FLOW_THROUGH_VARIANCE"], grid["FLOW_THROUGH_MIN_AMOUNT"]):
+            hit = base & (largest >= min_amount) & (variance <= max_variance)
+            yield _result(
+                "flow_through",
+                {
+                    "FLOW_THROUGH_VARIANCE": max_variance,
+                    "FLOW_THROUGH_WINDOW_DAYS": window_days,
+                    "FLOW_THROUGH_MIN_AMOUNT": min_amount,
+                },
+                window_bcn[hit],
+            )
+
+
+# Rule key -> (backtest function, tunable config parameters)
+BACKTEST_RULES: dict[str, tuple[Callable[[PortfolioFeatures, dict[str, list]], Iterator[BacktestResult]], list[str]]] = {
+    "threshold": (_backtest_threshold, ["LARGE_TX_THRESHOLD"]),
+    "structuring": (
+        _backtest_structuring,
+        ["STRUCTURING_LOWER_BOUND", "STRUCTURING_THRESHOLD", "STRUCTURING_WINDOW_DAYS", "STRUCTURING_MIN_TX"],
+    ),
+    "rapid_movement": (
+        _backtest_rapid_movement,
+        ["RAPID_MOVEMENT_THRESHOLD", "RAPID_MOVEMENT_TOLERANCE", "RAPID_MOVEMENT_WINDOW_HOURS"],
+    ),
+    "counterparty": (
+        _backtest_counterparty,
+        ["COUNTERPARTY_UNIQUE_MIN", "COUNTERPARTY_WINDOW_DAYS", "COUNTERPARTY_AGGREGATE"],
+    ),
+    "round_amount": (_backtest_round_amount, ["ROUND_AMOUNT_RATIO", "ROUND_AMOUNT_CONSECUTIVE_MIN"]),
+    "dormant": (
+        _backtest_dormant,
+        ["DORMANT_INACTIVITY_DAYS", "DORMANT_BURST_COUNT", "DORMANT_BURST_WINDOW_DAYS"],
+    ),
+    "profile_deviation": (_backtest_profile_deviation, ["PROFILE_DEVIATION_MULTIPLIER"]),
+    "flow_through": (
+        _backtest_flow_through,
+        ["FLOW_THROUGH_VARIANCE", "FLOW_THROUGH_WINDOW_DAYS", "FLOW_THROUGH_MIN_AMOUNT"],
+    ),
+}
+
+
+def resolve_grid(rule: str, grid: dict[str, list]) -> dict[str, list]:
+    """Fill missing parameters with their current ``config`` value and validate names.
+
+    Raises ``ValueError`` for unknown rules or parameters.
+    """
+    if rule not in BACKTEST_RULES:
+        raise ValueError(f"Unknown rule '{rule}'. Supported: {', '.join(BACKTEST_RULES)}.")
+    _, params = BACKTEST_RULES[rule]
+    unknown = [p for p in grid if p not in params]
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) for '{rule}': {', '.join(unknown)}. Supported: {', '.join(params)}.")
+    resolved: dict[str, list] = {}
+    for p in params:
+        values = grid.get(p) or [getattr(config, p)]
+        resolved[p] = sorted(set(values))
+    for p in params:
+        if p.endswith("_DAYS") and max(resolved[p]) > BACKTEST_MAX_WINDOW_DAYS:
+            raise ValueError(f"{p} values must not exceed {BACKTEST_MAX_WINDOW_DAYS} days.")
+        if p.endswith("_HOURS") and max(resolved[p]) > BACKTEST_MAX_WINDOW_DAYS * 24:
+            raise ValueError(f"{p} values must not exceed {BACKTEST_MAX_WINDOW_DAYS * 24} hours.")
+    return resolved
+
+
+def combination_count(grid: dict[str, list]) -> int:
+    return int(np.prod([len(v) for v in grid.values()])) if grid else 1
+
+
+def run_backtest(features: PortfolioFeatures, grids: dict[str, dict[str, list]]) -> list[BacktestResult]:
+    """Evaluate every parameter combination of every requested rule."""
+    results: list[BacktestResult] = []
+    for rule, grid in grids.items():
+        func, _ = BACKTEST_RULES[rule]
+        results.extend(func(features, resolve_grid(rule, grid)))
+    return results
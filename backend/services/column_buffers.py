@@ -0,0 +1,121 @@
+"""Column buffers - growable column arrays behind the transaction table.
+
+Appending rows with ``pd.concat`` copies every column, so merging small
+batches into a large book costs O(book) per batch and briefly holds the
+book twice.  Here each column is a NumPy array with spare capacity and
+the table is a frame of zero-copy views of the filled prefixes: appended
+rows are written past the prefix (invisible to frames already handed
+out) and a frame of longer views is returned.  A buffer is reallocated
+(``GROWTH`` times larger) only when full, so appends cost amortised
+O(rows appended).
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+GROWTH = 1.5
+MIN_CAPACITY = 4096
+
+
+def _values(series: pd.Series) -> np.ndarray:
+    values = series.to_numpy()
+    return values if values.ndim == 1 else series.to_numpy(dtype=object)
+
+
+def _missing(dtype: np.dtype):
+    if dtype.kind == "M":
+        return np.datetime64("NaT")
+    if dtype.kind == "m":
+        return np.timedelta64("NaT")
+    return np.nan
+
+
+def _holds_missing(dtype: np.dtype) -> np.dtype:
+    """``dtype`` or the nearest one that can hold a missing value."""
+    if dtype.kind in "iu":
+        return np.dtype(np.float64)
+    if dtype.kind == "b":
+        return np.dtype(object)
+    return dtype
+
+
+def _common_dtype(current: Optional[np.ndarray], incoming: Optional[np.ndarray], n: int, k: int) -> np.dtype:
+    """Dtype holding ``n`` current and ``k`` incoming values (missing when the side is None)."""
+    if current is None:
+        return _holds_missing(incoming.dtype) if n else incoming.dtype
+    if incoming is None:
+        return _holds_missing(current.dtype) if k else current.dtype
+    if current.dtype == incoming.dtype:
+        return current.dtype
+    try:
+        return np.promote_types(current.dtype, incoming.dtype)
+    except TypeError:
+        return np.dtype(object)
+
+
+def _shares_prefix(values: np.ndarray, buffer: np.ndarray) -> bool:
+    """True when ``values`` is the leading part of ``buffer`` (same memory, same layout)."""
+    return (
+        values.dtype == buffer.dtype
+        and values.strides == buffer.strides
+        and values.__array_interface__["data"][0] == buffer.__array_interface__["data"][0]
+    )
+
+
+class ColumnBuffers:
+    """Growable per-column buffers for one append-only table.
+
+    Not thread-safe: callers serialize ``append`` (``DataStore`` holds its
+    merge lock).
+    """
+
+    def __init__(self) -> None:
+        # Column -> (buffer, rows filled so far)
+        self._buffers: dict[str, tuple[np.ndarray, int]] = {}
+
+    def clear(self) -> None:
+        self._buffers = {}
+
+    def append(self, df: Optional[pd.DataFrame], new: pd.DataFrame) -> pd.DataFrame:
+        """``df`` with the rows of ``new`` appended (column union, like ``pd.concat``), re-indexed 0..n-1.
+
+        Columns of ``df`` that are views of this object's buffers are not
+        copied; others (a fresh upload, a replaced column) are adopted by
+        copying them once into a new buffer.
+        """
+        n = 0 if df is None else len(df)
+        total = n + len(new)
+        columns = [] if df is None else list(df.columns)
+        columns += [c for c in new.columns if c not in columns]
+
+        data = {}
+        for col in columns:
+            current = _values(df[col]) if df is not None and col in df.columns else None
+            incoming = _values(new[col]) if col in new.columns else None
+            dtype = _common_dtype(current, incoming, n, len(new))
+            buffer, filled = self._buffers.get(col, (None, 0))
+            # Rows past ``filled`` may be seen by frames handed out earlier
+            if (
+                buffer is None
+                or buffer.dtype != dtype
+                or len(buffer) < total
+                or current is None
+                or filled != n
+                or not _shares_prefix(current, buffer)
+            ):
+                buffer = np.empty(max(int(total * GROWTH), MIN_CAPACITY), dtype=dtype)
+                if current is not None:
+                    buffer[:n] = current
+                elif n:
+                    buffer[:n] = _missing(dtype)
+            if incoming is not None:
+                buffer[n:total] = incoming
+            elif total > n:
+                buffer[n:total] = _missing(dtype)
+            self._buffers[col] = (buffer, total)
+            data[col] = buffer[:total]
+        return pd.DataFrame(data, index=pd.RangeIndex(total), copy=False)
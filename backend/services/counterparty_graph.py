@@ -0,0 +1,402 @@
+"""Counterparty graph - portfolio-wide CSR adjacency for multi-hop layering detection."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    LAYERING_AMOUNT_TOLERANCE,
+    LAYERING_MAX_CHAINS,
+    LAYERING_MAX_HOPS,
+    LAYERING_MIN_AMOUNT,
+    LAYERING_MIN_HOPS,
+    LAYERING_WINDOW_HOURS,
+)
+from models.schemas import ChainHop, LayeringChain
+from services.fx_rates import amount_column
+
+
+def _factorize_names(series: pd.Series) -> tuple[np.ndarray, pd.Index, np.ndarray]:
+    """Integer-code party names case-insensitively.
+
+    Only the distinct raw spellings are normalized, so the cost of the string
+    work scales with the number of parties rather than the number of rows.
+    Returns ``(codes, normalized_names, display_labels)``; empty names get -1.
+    """
+    raw_codes, raw_uniques = pd.factorize(series.to_numpy(), sort=False)
+    raw_labels = pd.Series(raw_uniques, dtype=object).fillna("").astype(str).str.strip()
+    normalized = raw_labels.str.lower()
+    norm_codes, names = pd.factorize(normalized.where(normalized != "").to_numpy(), sort=False)
+    codes = np.where(raw_codes >= 0, norm_codes[raw_codes], -1)
+    # First raw spelling seen for each normalized name
+    labels = raw_labels[norm_codes >= 0].groupby(norm_codes[norm_codes >= 0], sort=True).first().to_numpy()
+    return codes, pd.Index(names), labels
+
+
+@dataclass
+class CounterpartyGraph:
+    """Directed transaction graph over every party in the transaction book.
+
+    Nodes are normalized sender/receiver names.  Each transaction row is one
+    edge ``sender -> receiver``; rows booking the same transfer on both sides
+    share a canonical edge, and only canonical edges are traversed.  Edges are
+    stored twice as integer-coded CSR arrays: ``out_*`` grouped by source node
+    and ``in_*`` grouped by target node, both sorted by timestamp inside each
+    node's slice so time windows can be located with a binary search.  All
+    per-edge attributes are plain numpy arrays - no Python object is created
+    per edge.
+    """
+
+    node_names: pd.Index
+    node_labels: np.ndarray     # display spelling of each node (first occurrence)
+    # Per-edge attributes in original row order
+    src: np.ndarray
+    dst: np.ndarray
+    ts: np.ndarray              # int64 nanoseconds since epoch
+    amount: np.ndarray          # float64, absolute amounts
+    bcn_code: np.ndarray        # int32 codes into ``bcns``
+    iban_code: np.ndarray       # int32 codes into ``ibans`` (-1 when empty)
+    canon: np.ndarray           # id of the first edge booking the same transfer
+    row: np.ndarray             # row position in the full transaction table
+    local_index: np.ndarray     # row position inside the owning BCN's frame
+    bcns: pd.Index
+    ibans: pd.Index
+    # CSR by source node
+    out_indptr: np.ndarray
+    out_edges: np.ndarray
+    # CSR by target node
+    in_indptr: np.ndarray
+    in_edges: np.ndarray
+    # Edge ids per BCN, ascending
+    bcn_indptr: np.ndarray = field(repr=False)
+    bcn_edges: np.ndarray = field(repr=False)
+    # Edge ids per canonical edge
+    booking_indptr: np.ndarray = field(repr=False)
+    booking_edges: np.ndarray = field(repr=False)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_names)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.src)
+
+    def bookings(self, chain: tuple[int, ...]) -> np.ndarray:
+        """Every edge id (across all customers) booking one of the canonical edges in ``chain``."""
+        parts = [
+            self.booking_edges[self.booking_indptr[e]:self.booking_indptr[e + 1]]
+            for e in chain
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def bcn_rows_in_chain(self, bcn: str, chain: tuple[int, ...]) -> list[int]:
+        """Local row positions of a customer's transactions that book a hop of ``chain``."""
+        code = self.bcns.get_indexer([str(bcn)])[0]
+        edges = self.bookings(chain)
+        return sorted(int(i) for i in self.local_index[edges[self.bcn_code[edges] == code]])
+
+    def bcns_in_chain(self, chain: tuple[int, ...]) -> list[str]:
+        """Customers that booked at least one hop of ``chain``."""
+        codes = np.unique(self.bcn_code[self.bookings(chain)])
+        return [str(b) for b in self.bcns[codes]]
+
+    def edges_for_bcn(self, bcn: str) -> np.ndarray:
+        """Return the edge ids recorded in the given customer's transactions."""
+        code = self.bcns.get_indexer([str(bcn)])[0]
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        return self.bcn_edges[self.bcn_indptr[code]:self.bcn_indptr[code + 1]]
+
+    # ---- path search ----
+
+    def _candidates(
+        self,
+        indptr: np.ndarray,
+        edges: np.ndarray,
+        node: int,
+        t_lo: int,
+        t_hi: int,
+        amount_lo: float,
+        amount_hi: float,
+    ) -> np.ndarray:
+        """Edges of ``node`` inside ``[t_lo, t_hi]`` with an amount inside ``[amount_lo, amount_hi]``."""
+        start, end = indptr[node], indptr[node + 1]
+        if start == end:
+            return edges[start:end]
+        slice_edges = edges[start:end]
+        slice_ts = self.ts[slice_edges]
+        lo = np.searchsorted(slice_ts, t_lo, side="left")
+        hi = np.searchsorted(slice_ts, t_hi, side="right")
+        cand = slice_edges[lo:hi]
+        if cand.size == 0:
+            return cand
+        amounts = self.amount[cand]
+        return cand[(amounts >= amount_lo) & (amounts <= amount_hi)]
+
+    def _chain_starts(self, seed: int, window_ns: int) -> set[int]:
+        """Walk backwards from a seed edge to every edge that could open a chain through it.
+
+        Every hop of a chain stays within tolerance of its first hop, so a
+        start must have the seed's amount inside its own tolerance band.
+        """
+        amount_lo, amount_hi = _start_band(float(self.amount[seed]))
+        starts = {seed}
+        frontier = [(seed, 0)]
+        while frontier:
+            edge, depth = frontier.pop()
+            if depth >= LAYERING_MAX_HOPS - 1:
+                continue
+            preds = self._candidates(
+                self.in_indptr,
+                self.in_edges,
+                int(self.src[edge]),
+                int(self.ts[edge]) - window_ns,
+                int(self.ts[edge]),
+                amount_lo,
+                amount_hi,
+            )
+            for p in preds:
+                p = int(p)
+                if p == edge or p in starts or self.src[p] == self.dst[p]:
+                    continue
+                starts.add(p)
+                frontier.append((p, depth + 1))
+        return starts
+
+    def _chains_from(self, start: int, window_ns: int) -> list[tuple[int, ...]]:
+        """Depth-first search for time-respecting, amount-consistent simple paths.
+
+        Hops are compared with the first hop's amount, not the previous
+        one's, so tolerance cannot compound along the chain.
+        """
+        chains: list[tuple[int, ...]] = []
+        t_end = int(self.ts[start]) + window_ns
+        amount_lo, amount_hi = _hop_band(float(self.amount[start]))
+        stack: list[tuple[tuple[int, ...], frozenset[int]]] = [
+            ((start,), frozenset((int(self.src[start]), int(self.dst[start]))))
+        ]
+        while stack and len(chains) < LAYERING_MAX_CHAINS:
+            path, visited = stack.pop()
+            last = path[-1]
+            extended = False
+            if len(path) < LAYERING_MAX_HOPS:
+                nxt = self._candidates(
+                    self.out_indptr,
+                    self.out_edges,
+                    int(self.dst[last]),
+                    int(self.ts[last]),
+                    t_end,
+                    amount_lo,
+                    amount_hi,
+                )
+                for e in nxt:
+                    e = int(e)
+                    target = int(self.dst[e])
+                    if target in visited:
+                        continue
+                    extended = True
+                    stack.append((path + (e,), visited | {target}))
+            if not extended and len(path) >= LAYERING_MIN_HOPS:
+                chains.append(path)
+        return chains
+
+    def find_chains(self, bcn: str) -> list[tuple[int, ...]]:
+        """Return layering chains (tuples of edge ids) that pass through a customer's transactions.
+
+        A chain is a sequence of at least ``LAYERING_MIN_HOPS`` transfers where
+        each hop leaves the previous hop's receiver no earlier than the previous
+        hop, every amount stays within ``LAYERING_AMOUNT_TOLERANCE`` of the first hop's,
+        and the whole chain completes within ``LAYERING_WINDOW_HOURS``.  Only
+        maximal chains are returned.
+        """
+        seeds = self.edges_for_bcn(bcn)
+        if seeds.size == 0:
+            return []
+        seeds = seeds[self.amount[seeds] >= LAYERING_MIN_AMOUNT]
+        seed_set = set(int(s) for s in self.canon[seeds])
+        window_ns = int(pd.Timedelta(hours=LAYERING_WINDOW_HOURS).value)
+
+        starts: set[int] = set()
+        for seed in seed_set:
+            if self.src[seed] == self.dst[seed]:
+                continue
+            starts |= self._chain_starts(seed, window_ns)
+
+        found: dict[tuple[int, ...], None] = {}
+        for start in sorted(starts, key=lambda e: (int(self.ts[e]), e)):
+            for chain in self._chains_from(start, window_ns):
+                if seed_set.isdisjoint(chain):
+                    continue
+                found.setdefault(chain, None)
+            if len(found) >= LAYERING_MAX_CHAINS:
+                break
+
+        # Drop chains that are strict sub-paths of a longer chain
+        chains = sorted(found, key=len, reverse=True)
+        result: list[tuple[int, ...]] = []
+        for chain in chains:
+            if any(_is_subpath(chain, longer) for longer in result):
+                continue
+            result.append(chain)
+        return result[:LAYERING_MAX_CHAINS]
+
+
+def describe_chain(
+    graph: CounterpartyGraph,
+    chain: tuple[int, ...],
+    transactions_df: pd.DataFrame,
+) -> LayeringChain:
+    """Render a chain of edge ids as a ``LayeringChain`` using the original row values."""
+    edges = np.asarray(chain, dtype=np.int64)
+    rows = transactions_df.iloc[graph.row[edges]]
+    hops: list[ChainHop] = []
+    for e, (_, row) in zip(edges, rows.iterrows()):
+        iban_code = int(graph.iban_code[e])
+        hops.append(
+            ChainHop(
+                date=pd.Timestamp(int(graph.ts[e])).strftime("%Y-%m-%d %H:%M"),
+                amount=round(float(graph.amount[e]), 2),
+                sender=str(row.get("sender", "")),
+                receiver=str(row.get("receiver", "")),
+                iban=str(graph.ibans[iban_code]) if iban_code >= 0 else None,
+                business_contact_number=str(graph.bcns[graph.bcn_code[e]]),
+                transaction_index=int(graph.local_index[e]),
+            )
+        )
+    amounts = graph.amount[edges]
+    duration = (int(graph.ts[edges[-1]]) - int(graph.ts[edges[0]])) / 3.6e12
+    variance = float((amounts.max() - amounts.min()) / amounts.max()) if amounts.max() > 0 else 0.0
+    customers = graph.bcns_in_chain(chain)
+    return LayeringChain(
+        hops=hops,
+        duration_hours=round(duration, 1),
+        amount_variance=round(variance, 4),
+        customers_involved=customers,
+    )
+
+
+def _hop_band(start_amount: float) -> tuple[float, float]:
+    """Amounts within ``LAYERING_AMOUNT_TOLERANCE`` of a chain's first hop."""
+    if start_amount <= 0:
+        return -np.inf, np.inf
+    return start_amount * (1 - LAYERING_AMOUNT_TOLERANCE), start_amount * (1 + LAYERING_AMOUNT_TOLERANCE)
+
+
+def _start_band(amount: float) -> tuple[float, float]:
+    """First-hop amounts whose tolerance band contains ``amount``."""
+    if amount <= 0:
+        return -np.inf, np.inf
+    hi = amount / (1 - LAYERING_AMOUNT_TOLERANCE) if LAYERING_AMOUNT_TOLERANCE < 1 else np.inf
+    return amount / (1 + LAYERING_AMOUNT_TOLERANCE), hi
+
+
+def _is_subpath(short: tuple[int, ...], long: tuple[int, ...]) -> bool:
+    n = len(short)
+    if n >= len(long):
+        return False
+    return any(long[i:i + n] == short for i in range(len(long) - n + 1))
+
+
+def _csr(keys: np.ndarray, n_keys: int, presorted: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+    """Group edge ids by ``keys`` and return ``(indptr, edges)``.
+
+    ``presorted`` is an optional ordering of the edges (e.g. by timestamp);
+    the grouping is stable, so that order is kept inside each key's slice.
+    """
+    if presorted is None:
+        order = np.argsort(keys, kind="stable")
+    else:
+        order = presorted[np.argsort(keys[presorted], kind="stable")]
+    counts = np.bincount(keys, minlength=n_keys)
+    indptr = np.zeros(n_keys + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, order.astype(np.int64)
+
+
+def build_counterparty_graph(df: pd.DataFrame) -> Optional[CounterpartyGraph]:
+    """Build the portfolio-wide counterparty graph from the full transaction table."""
+    required = {"date", "amount", "sender", "receiver", "business_contact_number"}
+    if df is None or df.empty or not required.issubset(df.columns):
+        return None
+
+    n_rows = len(df)
+    codes, node_names, node_labels = _factorize_names(
+        pd.concat([df["sender"], df["receiver"]], ignore_index=True)
+    )
+    dates = pd.to_datetime(df["date"], errors="coerce")
+
+    valid = (codes[:n_rows] >= 0) & (codes[n_rows:] >= 0) & dates.notna().to_numpy()
+    rows = np.flatnonzero(valid)
+
+    # Position of every row inside its BCN's frame (matches DataStore.get_customer_transactions)
+    bcn_all = df["business_contact_number"].astype(str)
+    local_all = bcn_all.groupby(bcn_all, sort=False).cumcount().to_numpy()
+
+    n_edges = len(rows)
+    src = codes[:n_rows][rows].astype(np.int32)
+    dst = codes[n_rows:][rows].astype(np.int32)
+    ts = dates.to_numpy(dtype="datetime64[ns]")[rows].astype(np.int64)
+    amount = np.abs(pd.to_numeric(df[amount_column(df)], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)[rows])
+
+    bcn_code, bcns = pd.factorize(bcn_all.to_numpy()[rows], sort=False)
+    bcn_code = bcn_code.astype(np.int32)
+
+    if "iban" in df.columns:
+        raw_codes, raw_ibans = pd.factorize(df["iban"].to_numpy()[rows], sort=False)
+        clean = pd.Series(raw_ibans, dtype=object).fillna("").astype(str).str.strip().str.upper()
+        clean_codes, ibans = pd.factorize(clean.where(clean != "").to_numpy(), sort=False)
+        iban_code = np.where(raw_codes >= 0, clean_codes[raw_codes], -1).astype(np.int32)
+    else:
+        iban_code = np.full(n_edges, -1, dtype=np.int32)
+        ibans = pd.Index([])
+
+    # The same transfer is often booked by both the paying and the receiving
+    # customer; only the first copy of each (src, dst, ts, amount) is traversed.
+    canon = (
+        pd.DataFrame({"s": src, "d": dst, "t": ts, "a": amount})
+        .groupby(["s", "d", "t", "a"], sort=False)
+        .ngroup()
+        .to_numpy()
+    )
+    first = np.full(canon.max() + 1 if n_edges else 0, n_edges, dtype=np.int64)
+    np.minimum.at(first, canon, np.arange(n_edges))
+    canon = first[canon]
+    is_canon = canon == np.arange(n_edges)
+
+    n_nodes = len(node_names)
+    traversable = np.flatnonzero(is_canon)
+    by_time = np.argsort(ts[traversable], kind="stable")
+    out_indptr, out_order = _csr(src[traversable], n_nodes, by_time)
+    in_indptr, in_order = _csr(dst[traversable], n_nodes, by_time)
+    out_edges, in_edges = traversable[out_order], traversable[in_order]
+    bcn_indptr, bcn_edges = _csr(bcn_code, len(bcns))
+    booking_indptr, booking_edges = _csr(canon, n_edges)
+
+    return CounterpartyGraph(
+        node_names=node_names,
+        node_labels=node_labels,
+        src=src,
+        dst=dst,
+        ts=ts,
+        amount=amount,
+        bcn_code=bcn_code,
+        iban_code=iban_code,
+        canon=canon,
+        row=rows.astype(np.int64),
+        local_index=local_all[rows].astype(np.int64),
+        bcns=pd.Index(bcns),
+        ibans=pd.Index(ibans),
+        out_indptr=out_indptr,
+        out_edges=out_edges,
+        in_indptr=in_indptr,
+        in_edges=in_edges,
+        bcn_indptr=bcn_indptr,
+        bcn_edges=bcn_edges,
+        booking_indptr=booking_indptr,
+        booking_edges=booking_edges,
+    )
@@ -0,0 +1,136 @@
+"""Country index - IBAN/BIC country code to transaction rows and BCNs.
+
+Built once per upload so a change to the high-risk country list is
+resolved by lookups: the rows (and customers) involving a set of country
+codes are read from a CSR row list per code instead of re-extracting the
+country of every IBAN and BIC in the book.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.customer_index import append_codes, csr_append
+from utils.country_codes import bic_country, iban_country
+
+
+@dataclass
+class CountryIndex:
+    """Per-row IBAN and BIC country codes plus the rows of each code.
+
+    ``iban[i]`` / ``bic[i]`` are positions in ``codes`` (-1 when the row
+    has no country), ``rows[indptr[c]:indptr[c + 1]]`` are the rows whose
+    IBAN or BIC country is ``codes[c]`` (ascending, each row once), and
+    ``bcn[i]`` is the position of row ``i``'s BCN in ``bcns``.
+    """
+
+    codes: pd.Index
+    iban: np.ndarray
+    bic: np.ndarray
+    indptr: np.ndarray
+    rows: np.ndarray
+    bcns: pd.Index
+    bcn: np.ndarray
+
+    def _positions(self, codes: Iterable[str]) -> np.ndarray:
+        pos = self.codes.get_indexer(sorted({str(c).upper() for c in codes}))
+        return pos[pos >= 0]
+
+    def rows_for(self, codes: Iterable[str]) -> np.ndarray:
+        """Rows whose IBAN or BIC country is in ``codes``, ascending."""
+        parts = [self.rows[self.indptr[c]:self.indptr[c + 1]] for c in self._positions(codes)]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+
+    def bcns_for(self, rows: np.ndarray) -> list[str]:
+        """Sorted BCNs owning ``rows``."""
+        return sorted(self.bcns[np.unique(self.bcn[rows])].tolist())
+
+    def matches(self, codes: Iterable[str], rows: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """Boolean ``(iban_hit, bic_hit)`` masks over ``rows`` (default: every row)."""
+        hit = np.zeros(len(self.codes) + 1, dtype=bool)
+        hit[self._positions(codes)] = True
+        # Code -1 (no country) maps to the trailing False slot
+        iban = self.iban if rows is None else self.iban[rows]
+        bic = self.bic if rows is None else self.bic[rows]
+        return hit[iban], hit[bic]
+
+    def with_rows(self, df: pd.DataFrame, offset: int) -> "CountryIndex":
+        """Index covering this one's rows plus ``df`` appended as table rows ``offset``, ``offset + 1``, ...
+
+        Country codes and BCNs first seen in ``df`` are added after the
+        existing ones, so existing positions stay valid.
+        """
+        iban_cc, bic_cc = _countries(df)
+        codes, iban = append_codes(self.codes, iban_cc.to_numpy(), skip="")
+        codes, bic = append_codes(codes, bic_cc.to_numpy(), skip="")
+        pair_code, pair_row = _pairs(iban, bic, offset)
+        order = np.lexsort((pair_row, pair_code))
+        indptr, rows = csr_append(self.indptr, self.rows, pair_code[order], pair_row[order], len(codes))
+
+        if "business_contact_number" in df.columns:
+            bcns, bcn = append_codes(self.bcns, df["business_contact_number"].astype(str).to_numpy())
+        else:
+            bcns, bcn = append_codes(self.bcns, np.full(len(df), "", dtype=object))
+
+        return CountryIndex(
+            codes=codes,
+            iban=np.concatenate([self.iban, iban.astype(np.int32)]),
+            bic=np.concatenate([self.bic, bic.astype(np.int32)]),
+            indptr=indptr,
+            rows=rows,
+            bcns=bcns,
+            bcn=np.concatenate([self.bcn, bcn.astype(np.int32)]),
+        )
+
+
+def _countries(df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+    empty = pd.Series("", index=df.index, dtype=object)
+    iban_cc = iban_country(df["iban"]) if "iban" in df.columns else empty
+    bic_cc = bic_country(df["bic"]) if "bic" in df.columns else empty
+    return iban_cc, bic_cc
+
+
+def _pairs(iban: np.ndarray, bic: np.ndarray, offset: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """One (code, row) pair per row and distinct country."""
+    row_ids = offset + np.arange(len(iban), dtype=np.int64)
+    keep_bic = (bic >= 0) & (bic != iban)
+    pair_code = np.concatenate([iban[iban >= 0], bic[keep_bic]])
+    pair_row = np.concatenate([row_ids[iban >= 0], row_ids[keep_bic]])
+    return pair_code, pair_row
+
+
+def build_country_index(df: Optional[pd.DataFrame]) -> Optional[CountryIndex]:
+    if df is None or df.empty:
+        return None
+    n = len(df)
+    iban_cc, bic_cc = _countries(df)
+
+    codes = pd.Index(sorted((set(iban_cc.unique()) | set(bic_cc.unique())) - {""}), dtype=object)
+    iban = codes.get_indexer(iban_cc.to_numpy()).astype(np.int32)
+    bic = codes.get_indexer(bic_cc.to_numpy()).astype(np.int32)
+
+    # One (code, row) pair per row and distinct country, grouped by code
+    pair_code, pair_row = _pairs(iban, bic)
+    order = np.lexsort((pair_row, pair_code))
+    indptr = np.searchsorted(pair_code[order], np.arange(len(codes) + 1), side="left")
+
+    if "business_contact_number" in df.columns:
+        bcn, bcns = pd.factorize(df["business_contact_number"].astype(str).to_numpy(), sort=False)
+    else:
+        bcn, bcns = np.zeros(n, dtype=np.int64), np.array([""], dtype=object)
+
+    return CountryIndex(
+        codes=codes,
+        iban=iban,
+        bic=bic,
+        indptr=indptr,
+        rows=pair_row[order],
+        bcns=pd.Index(bcns),
+        bcn=bcn.astype(np.int32),
+    )
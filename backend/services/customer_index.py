@@ -0,0 +1,221 @@
+"""Customer index - per-BCN row lists and date-sorted positions over the transaction table.
+
+Built once per upload so a customer's rows (or just the rows of a review
+period) are found without scanning the whole table: rows are grouped by
+BCN in CSR form, and each BCN's dated rows are kept sorted by date so a
+period is located with two binary searches.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+_NAT = np.iinfo(np.int64).min
+
+
+@dataclass
+class CustomerIndex:
+    """Rows grouped by BCN plus a per-BCN date-sorted view.
+
+    ``rows[indptr[c]:indptr[c + 1]]`` are BCN ``c``'s table rows in their
+    original order; a row's position in that slice is its customer-local
+    index (the one ``DataStore.get_customer_transactions`` and alert
+    indices use).  ``by_date[dated_indptr[c]:dated_indptr[c + 1]]`` are
+    the local indices of the BCN's dated rows sorted by date, with their
+    timestamps (ns) in ``dates``.
+    """
+
+    bcns: pd.Index
+    indptr: np.ndarray
+    rows: np.ndarray
+    dated_indptr: np.ndarray
+    by_date: np.ndarray
+    dates: np.ndarray
+
+    def code(self, bcn: str) -> int:
+        return int(self.bcns.get_indexer([str(bcn)])[0])
+
+    def rows_for(self, bcn: str) -> np.ndarray:
+        """Table rows of ``bcn`` in original order (empty when unknown)."""
+        code = self.code(bcn)
+        if code < 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.rows[self.indptr[code]:self.indptr[code + 1]]
+
+    def rows_for_many(self, bcns: list[str]) -> np.ndarray:
+        """Table rows of several BCNs, ascending (original table order)."""
+        codes = self.bcns.get_indexer([str(b) for b in bcns])
+        codes = np.unique(codes[codes >= 0])
+        if not len(codes):
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate([self.rows[self.indptr[c]:self.indptr[c + 1]] for c in codes]))
+
+    def local_indices(self, rows: np.ndarray, bcns: np.ndarray) -> np.ndarray:
+        """Customer-local indices of table ``rows``, whose BCNs are ``bcns``."""
+        codes = self.bcns.get_indexer(np.asarray(bcns).astype(str))
+        local = np.empty(len(rows), dtype=np.int64)
+        order = np.argsort(codes, kind="stable")
+        for part in np.split(order, np.flatnonzero(np.diff(codes[order])) + 1):
+            if not len(part):
+                continue
+            code = codes[part[0]]
+            start, end = self.indptr[code], self.indptr[code + 1]
+            local[part] = np.searchsorted(self.rows[start:end], rows[part])
+        return local
+
+    def period(
+        self,
+        bcn: str,
+        start: Optional[pd.Timestamp],
+        end: Optional[pd.Timestamp],
+    ) -> np.ndarray:
+        """Local indices of ``bcn``'s rows dated in ``[start, end]``, ascending.
+
+        Either bound may be None (open).  Undated rows never fall in a period.
+        """
+        code = self.code(bcn)
+        if code < 0:
+            return np.zeros(0, dtype=np.int64)
+        lo, hi = self.dated_indptr[code], self.dated_indptr[code + 1]
+        keys = self.dates[lo:hi]
+        first = 0 if start is None else int(np.searchsorted(keys, pd.Timestamp(start).value, side="left"))
+        last = len(keys) if end is None else int(np.searchsorted(keys, pd.Timestamp(end).value, side="right"))
+        return np.sort(self.by_date[lo + first:lo + last])
+
+    def previous(self, bcn: str, before: pd.Timestamp) -> Optional[int]:
+        """Local index of ``bcn``'s latest row dated strictly before ``before``."""
+        code = self.code(bcn)
+        if code < 0:
+            return None
+        lo, hi = self.dated_indptr[code], self.dated_indptr[code + 1]
+        pos = int(np.searchsorted(self.dates[lo:hi], pd.Timestamp(before).value, side="left"))
+        return int(self.by_date[lo + pos - 1]) if pos > 0 else None
+
+    def with_rows(self, df: pd.DataFrame, offset: int) -> "CustomerIndex":
+        """Index covering this one's rows plus ``df`` appended as table rows ``offset``, ``offset + 1``, ...
+
+        Appended rows go to the end of their BCN's row list (so earlier
+        local indices do not change) and into its date-sorted view.
+        """
+        bcns, codes = append_codes(self.bcns, df["business_contact_number"].astype(str).to_numpy())
+        n_bcns = len(bcns)
+        rows = offset + np.arange(len(df), dtype=np.int64)
+        counts = _pad(np.diff(self.indptr), n_bcns)
+        indptr, all_rows = csr_append(self.indptr, self.rows, codes, rows, n_bcns)
+
+        # Local index: the BCN's existing count plus the row's rank in the batch
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        starts = np.searchsorted(sorted_codes, sorted_codes, side="left")
+        local = np.empty(len(df), dtype=np.int64)
+        local[order] = counts[sorted_codes] + np.arange(len(df)) - starts
+
+        ts = _timestamps(df)
+        dated = np.flatnonzero(ts != _NAT)
+        dated = dated[np.lexsort((ts[dated], codes[dated]))]
+        dated_indptr = _pad_indptr(self.dated_indptr, n_bcns)
+        positions = dated_indptr[codes[dated] + 1].copy()
+        # Rows dated before a BCN's latest one are placed by binary search
+        last = np.full(len(dated), _NAT, dtype=np.int64)
+        known = positions > dated_indptr[codes[dated]]
+        last[known] = self.dates[positions[known] - 1]
+        late = np.flatnonzero(last > ts[dated])
+        for i in late.tolist():
+            c = codes[dated[i]]
+            start, end = dated_indptr[c], dated_indptr[c + 1]
+            positions[i] = start + int(np.searchsorted(self.dates[start:end], ts[dated[i]], side="right"))
+        added = np.bincount(codes[dated], minlength=n_bcns)
+        dated_indptr[1:] += np.cumsum(added)
+
+        return CustomerIndex(
+            bcns=bcns,
+            indptr=indptr,
+            rows=all_rows,
+            dated_indptr=dated_indptr,
+            by_date=np.insert(self.by_date, positions, local[dated]),
+            dates=np.insert(self.dates, positions, ts[dated]),
+        )
+
+
+def _pad(values: np.ndarray, n: int) -> np.ndarray:
+    return np.concatenate([values, np.zeros(n - len(values), dtype=values.dtype)])
+
+
+def _pad_indptr(indptr: np.ndarray, n_keys: int) -> np.ndarray:
+    return np.concatenate([indptr, np.full(n_keys + 1 - len(indptr), indptr[-1], dtype=indptr.dtype)])
+
+
+def append_codes(
+    index: pd.Index,
+    values: np.ndarray,
+    skip: Optional[str] = None,
+) -> tuple[pd.Index, np.ndarray]:
+    """Codes of ``values`` in ``index``, with unseen values appended to it.
+
+    Values equal to ``skip`` are never added and get code -1.
+    """
+    codes = index.get_indexer(values)
+    unseen = codes < 0
+    if skip is not None:
+        unseen &= values != skip
+    if unseen.any():
+        extra = pd.unique(values[unseen])
+        index = index.append(pd.Index(extra, dtype=object))
+        codes[unseen] = len(index) - len(extra) + pd.Index(extra).get_indexer(values[unseen])
+    return index, codes.astype(np.int64)
+
+
+def csr_append(
+    indptr: np.ndarray,
+    values: np.ndarray,
+    keys: np.ndarray,
+    new_values: np.ndarray,
+    n_keys: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """CSR ``(indptr, values)`` with ``new_values`` added at the end of their ``keys``' segments.
+
+    ``keys`` may include keys up to ``n_keys - 1`` beyond the current ones.
+    Values of one key keep their order, existing ones first.
+    """
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    indptr = _pad_indptr(indptr, n_keys)
+    values = np.insert(values, indptr[keys + 1], new_values[order])
+    indptr = indptr.copy()
+    indptr[1:] += np.cumsum(np.bincount(keys, minlength=n_keys))
+    return indptr, values
+
+
+def _timestamps(df: pd.DataFrame) -> np.ndarray:
+    if "date" not in df.columns:
+        return np.full(len(df), _NAT, dtype=np.int64)
+    return pd.to_datetime(df["date"], errors="coerce").to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def build_customer_index(df: Optional[pd.DataFrame]) -> Optional[CustomerIndex]:
+    if df is None or df.empty or "business_contact_number" not in df.columns:
+        return None
+
+    codes, bcns = pd.factorize(df["business_contact_number"].astype(str).to_numpy(), sort=False)
+    rows = np.argsort(codes, kind="stable").astype(np.int64)
+    indptr = np.searchsorted(codes[rows], np.arange(len(bcns) + 1), side="left")
+    local = np.empty(len(df), dtype=np.int64)
+    local[rows] = np.arange(len(df)) - np.repeat(indptr[:-1], np.diff(indptr))
+
+    ts = _timestamps(df)
+    dated = np.flatnonzero(ts != _NAT)
+    order = dated[np.lexsort((ts[dated], codes[dated]))]
+    dated_indptr = np.searchsorted(codes[order], np.arange(len(bcns) + 1), side="left")
+
+    return CustomerIndex(
+        bcns=pd.Index(bcns),
+        indptr=indptr,
+        rows=rows,
+        dated_indptr=dated_indptr,
+        by_date=local[order],
+        dates=ts[order],
+    )
@@ -2,10 +2,76 @@
 
 from __future__ import annotations
 
-from typing import Optional
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, Optional
 
+import numpy as np
 import pandas as pd
 
+from config import (
+    MEMORY_BUDGET_BYTES,
+    MEMORY_INDEX_OVERHEAD,
+    MEMORY_POLICY,
+    MEMORY_SPILL_DIR,
+    SHARED_STORE_DIR,
+    SHARED_STORE_ENABLED,
+    SHARED_STORE_KEEP_VERSIONS,
+    SHARED_STORE_MAX_APPENDS,
+)
+from models.schemas import HighRiskDelta, WatchlistDelta
+from services.backtester import PortfolioFeatures, build_portfolio_features
+from services.column_buffers import ColumnBuffers
+from services.counterparty_graph import CounterpartyGraph, build_counterparty_graph
+from services.country_index import CountryIndex, build_country_index
+from services.customer_index import CustomerIndex, build_customer_index
+from services.fx_rates import AMOUNT_EUR_COLUMN, eur_amounts
+from services.memory import MemoryBudgetExceeded, format_bytes, memory_usage, spill_frame, spillable_bytes
+from services.pattern_analyzer import PatternCube, build_pattern_cube
+from services.peer_groups import PeerGroups, build_peer_groups
+from services.portfolio_summary import summary_cache
+from services.shared_store import APPENDS, FRAMES, SharedStore
+from services.transaction_flags import (
+    FLAGS_COLUMN,
+    HIGH_RISK_FLAGS,
+    STATIC_FLAGS,
+    WATCHLIST_FLAGS,
+    high_risk_flags,
+    replace_bits,
+    row_flags,
+    static_flags,
+    watchlist_flags,
+)
+from services.transfer_links import TransferLinks, build_transfer_links
+from utils.country_codes import high_risk_codes, high_risk_levels
+from services.watchlist_matcher import NameScreeningTable, build_name_screening_table, watchlist_entries
+
+shared_store = SharedStore(SHARED_STORE_DIR, keep_versions=SHARED_STORE_KEEP_VERSIONS)
+
+# Shared-store frame name -> DataStore attribute / setter
+_FRAME_ATTRS = {
+    "transactions": "transactions_df",
+    "watchlist": "watchlist_df",
+    "high_risk_countries": "high_risk_countries_df",
+    "work_instructions": "work_instructions_df",
+    "fx_rates": "fx_rates_df",
+}
+_FRAME_SETTERS = {
+    "watchlist": "set_watchlist",
+    "high_risk_countries": "set_high_risk_countries",
+    "work_instructions": "set_work_instructions",
+    "fx_rates": "set_fx_rates",
+}
+# Derived indexes rebuilt with the transactions
+_INDEX_ATTRS = [
+    "counterparty_graph", "pattern_cube", "portfolio_features", "name_screening", "customer_index", "country_index",
+    "transfer_links", "peer_groups",
+]
+# Whole-book structures: appends leave them behind until ``refresh_deferred``
+_DEFERRED_ATTRS = ["counterparty_graph", "transfer_links", "pattern_cube", "portfolio_features", "peer_groups"]
+
 
 class DataStore:
     """Class-level singleton: all attributes are shared across the application."""
@@ -14,35 +80,754 @@ class DataStore:
     watchlist_df: Optional[pd.DataFrame] = None
     high_risk_countries_df: Optional[pd.DataFrame] = None
     work_instructions_df: Optional[pd.DataFrame] = None
+    fx_rates_df: Optional[pd.DataFrame] = None
+
+    # Non-EUR transactions left unconverted for lack of an FX rate
+    unconverted_amounts: int = 0
+    # UTC time the loaded transactions were indexed in this process (appends keep it)
+    transactions_loaded_at: Optional[str] = None
+    # Real-time scored transactions (coerced row dicts) not yet merged into transactions_df
+    pending_transactions: list[dict] = []
+    # Appended rows not yet reflected in the whole-book structures (_DEFERRED_ATTRS)
+    stale_rows: int = 0
+
+    # Derived indexes, rebuilt on upload
+    counterparty_graph: Optional[CounterpartyGraph] = None
+    pattern_cube: Optional[PatternCube] = None
+    portfolio_features: Optional[PortfolioFeatures] = None
+    name_screening: Optional[NameScreeningTable] = None
+    customer_index: Optional[CustomerIndex] = None
+    country_index: Optional[CountryIndex] = None
+    transfer_links: Optional[TransferLinks] = None
+    peer_groups: Optional[PeerGroups] = None
+
+    # Memory accounting: spilled frame -> directory of its memory-mapped copy
+    _spilled: dict[str, str] = {}
+    _memory: Optional[tuple[tuple, dict]] = None
+    # Estimated bytes appended since ``_memory`` was computed
+    _appended_bytes: float = 0.0
+
+    # Multi-worker mode: shared snapshot version this process reflects
+    version: int = 0
+    _frame_versions: dict[str, Optional[int]] = {}
+    _attaching: bool = False
+    _sync_lock = threading.Lock()
+    # Serializes changes to the loaded transactions and their per-row indexes
+    # (taken before append_lock when both are needed)
+    _merge_lock = threading.RLock()
+    # Guards the real-time queue and the swap of appended rows into the book
+    append_lock = threading.RLock()
+    # BCNs of the rows ``append_transactions`` is merging; the real-time
+    # scorer waits on ``merge_done`` before queueing rows for them
+    merging_bcns: frozenset[str] = frozenset()
+    merge_done = threading.Condition(append_lock)
+    _refresh_lock = threading.Lock()
+    # Bumped whenever the whole-book structures or the flags they read change
+    _deferred_epoch: int = 0
+    # Column buffers the appended book is a view of
+    _buffers = ColumnBuffers()
+    # Called with the BCNs of rows appended from outside the real-time queue
+    _append_listeners: list[Callable[[list[str]], None]] = []
 
     # ---- setters ----
 
     @classmethod
     def set_transactions(cls, df: pd.DataFrame) -> None:
-        cls.transactions_df = df
+        with cls._merge_lock:
+            df = cls._admit("transactions", df)
+            with cls.append_lock:
+                cls.transactions_df = df
+                cls.pending_transactions = []
+                cls._buffers.clear()
+                cls._index_rows()
+            cls._build_deferred(df)
+            cls._publish({"transactions": df})
+
+    @classmethod
+    def append_transaction(cls, row: dict) -> int:
+        """Queue one coerced transaction for the next ``flush_pending``; returns the number queued."""
+        cls.pending_transactions.append(row)
+        return len(cls.pending_transactions)
+
+    @classmethod
+    def append_transactions(cls, df: Optional[pd.DataFrame] = None) -> int:
+        """Append the queued transactions, then coerced ``df``, to the loaded ones; returns the number appended.
+
+        Rows go after the existing ones, so customer-local indices of
+        earlier rows do not change.  The per-row indexes are extended with
+        the new rows only; the whole-book structures wait for
+        ``refresh_deferred``.  The merge is built outside ``append_lock``:
+        meanwhile scoring goes on, except that real-time rows of ``df``'s
+        customers wait (``merging_bcns``) so they land after it.  After the
+        swap those BCNs are passed to the append listeners.  In multi-worker
+        mode the rows are published for the other workers.
+        """
+        if df is None or not len(df):
+            return cls.flush_pending()
+        bcns = df["business_contact_number"].astype(str).unique().tolist()
+        with cls._merge_lock, cls._shared_append():
+            with cls.append_lock:
+                queued = len(cls.pending_transactions)
+                parts = [pd.DataFrame(cls.pending_transactions[:queued])] if queued else []
+                incoming = pd.concat(parts + [df], ignore_index=True) if parts else df
+                if cls.transactions_df is None:
+                    cls.set_transactions(incoming)
+                    return len(incoming)
+                cls.merging_bcns = frozenset(bcns)
+            cls._merge_rows(incoming, bcns, queued)
+            cls._publish_rows(incoming)
+            return len(incoming)
 
     @classmethod
-    def set_watchlist(cls, df: pd.DataFrame) -> None:
-        cls.watchlist_df = df
+    def _merge_rows(cls, incoming: pd.DataFrame, bcns: list[str], queued: int) -> None:
+        """Append ``incoming`` (the first ``queued`` pending rows, then rows of ``bcns``); see ``append_transactions``.
+
+        The caller set ``merging_bcns`` under ``append_lock`` when it took
+        the queued rows.
+        """
+        try:
+            merged = cls._extended(incoming)
+            with cls.append_lock:
+                cls._swap(merged)
+                del cls.pending_transactions[:queued]
+                for listener in cls._append_listeners:
+                    listener(bcns)
+        finally:
+            with cls.append_lock:
+                cls.merging_bcns = frozenset()
+                cls.merge_done.notify_all()
+
+    @classmethod
+    def flush_pending(cls) -> int:
+        """Merge the queued transactions into the loaded ones; returns the number merged.
+
+        The merge is built outside ``append_lock`` (scoring continues and
+        may queue more rows) and swapped in under it.
+        """
+        with cls._merge_lock, cls._shared_append():
+            with cls.append_lock:
+                queued = len(cls.pending_transactions)
+                if not queued:
+                    return 0
+                if cls.transactions_df is None:
+                    cls.set_transactions(pd.DataFrame(cls.pending_transactions))
+                    return queued
+                incoming = pd.DataFrame(cls.pending_transactions[:queued])
+            merged = cls._extended(incoming)
+            with cls.append_lock:
+                cls._swap(merged)
+                del cls.pending_transactions[:queued]
+            cls._publish_rows(incoming)
+            return queued
+
+    @classmethod
+    def add_append_listener(cls, listener: Callable[[list[str]], None]) -> None:
+        """Call ``listener`` with the BCNs of rows appended from outside the real-time queue.
+
+        It runs under ``append_lock``, right after the rows are swapped in.
+        """
+        cls._append_listeners.append(listener)
+
+    @classmethod
+    def _extended(cls, new: pd.DataFrame) -> dict:
+        """The book with coerced ``new`` appended and its per-row indexes extended to match.
+
+        Returns the attributes to swap in (see ``_swap``).  Only ``new`` is
+        converted, flagged, indexed and screened; the book's columns are
+        extended in place through the column buffers.
+        """
+        cls._admit_rows(new)
+        base = cls.transactions_df
+        offset = len(base)
+        new = new.copy(deep=False)
+        new[AMOUNT_EUR_COLUMN], unconverted = eur_amounts(new, cls.fx_rates_df)
+
+        country_index = cls.country_index.with_rows(new, offset) if cls.country_index is not None else None
+        name_screening = cls.name_screening.with_transactions(new) if cls.name_screening is not None else None
+        flags = static_flags(new)
+        rows = offset + np.arange(len(new))
+        bits = high_risk_flags(new, high_risk_codes(cls.high_risk_countries_df), country_index, rows)
+        flags = replace_bits(flags, HIGH_RISK_FLAGS, bits)
+        matches = name_screening.matches if name_screening is not None else None
+        new[FLAGS_COLUMN] = replace_bits(flags, WATCHLIST_FLAGS, watchlist_flags(new, matches))
+
+        return {
+            "transactions_df": cls._buffers.append(base, new),
+            "unconverted_amounts": cls.unconverted_amounts + unconverted,
+            "customer_index": cls.customer_index.with_rows(new, offset) if cls.customer_index is not None else None,
+            "country_index": country_index,
+            "name_screening": name_screening,
+            "stale_rows": cls.stale_rows + len(new),
+        }
+
+    @classmethod
+    def _swap(cls, attrs: dict) -> None:
+        """Install an appended book and its indexes (hold ``append_lock``)."""
+        for attr, value in attrs.items():
+            setattr(cls, attr, value)
+        cls._release_spill("transactions")
+
+    @classmethod
+    def set_watchlist(cls, df: pd.DataFrame) -> Optional[WatchlistDelta]:
+        """Swap the watchlist, re-screening only added entries.
+
+        Returns the delta against the previous watchlist, or None when no
+        transactions are loaded yet.
+        """
+        with cls._merge_lock:
+            df = cls._admit("watchlist", df)
+            cls.watchlist_df = df
+            cls._publish({"watchlist": df})
+            table = cls.name_screening or build_name_screening_table(cls.transactions_df, None)
+            if table is None:
+                return None
+            cls.name_screening, delta = table.with_watchlist(watchlist_entries(df))
+            cls.refresh_flags(WATCHLIST_FLAGS)
+            return delta
 
     @classmethod
-    def set_high_risk_countries(cls, df: pd.DataFrame) -> None:
-        cls.high_risk_countries_df = df
+    def set_high_risk_countries(cls, df: pd.DataFrame) -> Optional[HighRiskDelta]:
+        """Swap the high-risk country list, updating only rows of changed countries.
+
+        Countries added, removed or moved to another risk level are looked
+        up in the country index; only their rows get new flag bits and
+        pattern-cube counts.  Returns the delta against the previous list,
+        or None when no transactions are loaded yet.
+        """
+        with cls._merge_lock:
+            df = cls._admit("high_risk_countries", df)
+            old_levels = high_risk_levels(cls.high_risk_countries_df)
+            cls.high_risk_countries_df = df
+            cls._publish({"high_risk_countries": df})
+            tx = cls.transactions_df
+            index = cls.country_index
+            if tx is None or tx.empty or index is None:
+                cls.refresh_flags(HIGH_RISK_FLAGS)
+                cls.pattern_cube = build_pattern_cube(tx, df)
+                return None
+
+            new_levels = high_risk_levels(df)
+            changed = sorted(c for c in old_levels.keys() | new_levels.keys() if old_levels.get(c) != new_levels.get(c))
+            rows = index.rows_for(changed)
+
+            flags = row_flags(tx).copy()
+            was_high_risk = (flags & HIGH_RISK_FLAGS) != 0
+            bits = high_risk_flags(tx, set(new_levels), index, rows)
+            flags[rows] = replace_bits(flags[rows], HIGH_RISK_FLAGS, bits)
+            tx[FLAGS_COLUMN] = flags
+            is_high_risk = (flags & HIGH_RISK_FLAGS) != 0
+            cls._deferred_epoch += 1
+            if cls.pattern_cube is not None:
+                # Appended rows are not in the cube yet; refresh_deferred counts them
+                cube_rows = rows[rows < len(tx) - cls.stale_rows]
+                delta = is_high_risk[cube_rows].astype(np.int64) - was_high_risk[cube_rows]
+                cls.pattern_cube = cls.pattern_cube.with_high_risk_delta(tx.iloc[cube_rows], delta)
+
+            # Customers whose exposure to any high-risk country started or ended
+            n_bcns = len(index.bcns)
+            before = np.bincount(index.bcn[was_high_risk], minlength=n_bcns) > 0
+            after = np.bincount(index.bcn[is_high_risk], minlength=n_bcns) > 0
+            return HighRiskDelta(
+                added_countries=sorted(new_levels.keys() - old_levels.keys()),
+                removed_countries=sorted(old_levels.keys() - new_levels.keys()),
+                changed_countries=sorted(c for c in changed if c in old_levels and c in new_levels),
+                affected_transaction_count=len(rows),
+                affected_bcns=index.bcns_for(rows),
+                bcns_gained=sorted(index.bcns[after & ~before].tolist()),
+                bcns_lost=sorted(index.bcns[before & ~after].tolist()),
+            )
 
     @classmethod
     def set_work_instructions(cls, df: pd.DataFrame) -> None:
+        df = cls._admit("work_instructions", df)
         cls.work_instructions_df = df
+        cls._publish({"work_instructions": df})
+
+    @classmethod
+    def set_fx_rates(cls, df: pd.DataFrame) -> None:
+        """Swap the FX rate table and re-derive everything that depends on EUR amounts."""
+        with cls._merge_lock:
+            df = cls._admit("fx_rates", df)
+            cls.fx_rates_df = df
+            cls._publish({"fx_rates": df})
+            if cls.transactions_df is None:
+                return
+            cls.refresh_amounts()
+            cls.refresh_flags(STATIC_FLAGS)
+            cls._build_deferred(cls.transactions_df)
+
+    @classmethod
+    def rebuild_indexes(cls) -> None:
+        """Rebuild every derived index from the currently loaded frames.
+
+        Scoring waits for the per-row indexes only; the whole-book
+        structures are built after ``append_lock`` is released.
+        """
+        with cls._merge_lock:
+            with cls.append_lock:
+                cls._index_rows()
+            cls._build_deferred(cls.transactions_df)
+
+    @classmethod
+    def _index_rows(cls) -> None:
+        """Rebuild the per-row columns and indexes of the loaded book (hold ``append_lock``)."""
+        attrs = cls._indexed(cls.transactions_df, cls.fx_rates_df, cls.watchlist_df, cls.high_risk_countries_df)
+        for attr, value in attrs.items():
+            setattr(cls, attr, value)
+        cls._deferred_epoch += 1
+
+    @classmethod
+    def _indexed(
+        cls,
+        df: Optional[pd.DataFrame],
+        fx_rates: Optional[pd.DataFrame],
+        watchlist: Optional[pd.DataFrame],
+        high_risk: Optional[pd.DataFrame],
+    ) -> dict:
+        """The per-row indexes of the book ``df``, whose amount and flag columns are recomputed in place.
+
+        Returns the attributes to install; the loaded ones are not read.
+        """
+        attrs = {
+            "transactions_loaded_at": datetime.now(timezone.utc).isoformat(timespec="microseconds"),
+            "unconverted_amounts": 0,
+        }
+        if df is not None and not df.empty:
+            df[AMOUNT_EUR_COLUMN], attrs["unconverted_amounts"] = eur_amounts(df, fx_rates)
+        attrs["customer_index"] = build_customer_index(df)
+        attrs["country_index"] = build_country_index(df)
+        attrs["name_screening"] = build_name_screening_table(df, watchlist)
+        if df is not None and not df.empty:
+            df[FLAGS_COLUMN] = cls._flags(
+                df, STATIC_FLAGS | HIGH_RISK_FLAGS | WATCHLIST_FLAGS, high_risk, attrs["country_index"], attrs["name_screening"],
+            )
+        return attrs
+
+    @classmethod
+    def _build_deferred(cls, df: Optional[pd.DataFrame]) -> None:
+        """Build the whole-book structures from ``df``, the whole loaded book (hold ``_merge_lock``)."""
+        for attr, value in cls._deferred(df, cls.high_risk_countries_df).items():
+            setattr(cls, attr, value)
+        cls.stale_rows = 0
+        cls._deferred_epoch += 1
+
+    @classmethod
+    def _deferred(cls, df: Optional[pd.DataFrame], high_risk: Optional[pd.DataFrame]) -> dict:
+        """The whole-book structures (``_DEFERRED_ATTRS``) of the book ``df``."""
+        return {
+            "counterparty_graph": build_counterparty_graph(df),
+            "transfer_links": build_transfer_links(df),
+            "pattern_cube": build_pattern_cube(df, high_risk),
+            "portfolio_features": build_portfolio_features(df),
+            "peer_groups": build_peer_groups(df),
+        }
+
+    @classmethod
+    def refresh_deferred(cls, min_rows: int = 0) -> int:
+        """Rebuild the whole-book structures once appends left them ``min_rows`` or more rows behind.
+
+        They are built from a snapshot of the book without holding the
+        merge or append lock, and discarded if a full rebuild or a
+        reference-list change got there first.  Returns the rows caught up.
+        """
+        with cls._refresh_lock:
+            with cls._merge_lock:
+                df, stale, epoch = cls.transactions_df, cls.stale_rows, cls._deferred_epoch
+                high_risk = cls.high_risk_countries_df
+            if df is None or not stale or stale < min_rows:
+                return 0
+            built = cls._deferred(df, high_risk)
+            with cls._merge_lock:
+                if cls._deferred_epoch != epoch:
+                    return 0
+                for attr, value in built.items():
+                    setattr(cls, attr, value)
+                cls.stale_rows -= stale
+                cls._deferred_epoch += 1
+                cls._compact()
+            return stale
+
+    @classmethod
+    def refresh_amounts(cls) -> None:
+        """Recompute the ``amount_eur`` column from the loaded FX rates."""
+        df = cls.transactions_df
+        if df is None or df.empty:
+            cls.unconverted_amounts = 0
+            return
+        df[AMOUNT_EUR_COLUMN], cls.unconverted_amounts = eur_amounts(df, cls.fx_rates_df)
+        cls._deferred_epoch += 1
+
+    @classmethod
+    def refresh_flags(cls, mask: int) -> None:
+        """Recompute the bits selected by ``mask`` in ``tx_flags``."""
+        df = cls.transactions_df
+        if df is None or df.empty:
+            return
+        df[FLAGS_COLUMN] = cls._flags(df, mask, cls.high_risk_countries_df, cls.country_index, cls.name_screening)
+        cls._deferred_epoch += 1
+
+    @classmethod
+    def _flags(
+        cls,
+        df: pd.DataFrame,
+        mask: int,
+        high_risk: Optional[pd.DataFrame],
+        country_index: Optional[CountryIndex],
+        name_screening: Optional[NameScreeningTable],
+    ) -> np.ndarray:
+        """``df``'s ``tx_flags`` with the bits selected by ``mask`` recomputed."""
+        flags = row_flags(df)
+        if mask & STATIC_FLAGS:
+            flags = replace_bits(flags, STATIC_FLAGS, static_flags(df))
+        if mask & HIGH_RISK_FLAGS:
+            bits = high_risk_flags(df, high_risk_codes(high_risk), country_index)
+            flags = replace_bits(flags, HIGH_RISK_FLAGS, bits)
+        if mask & WATCHLIST_FLAGS:
+            matches = name_screening.matches if name_screening is not None else None
+            flags = replace_bits(flags, WATCHLIST_FLAGS, watchlist_flags(df, matches))
+        return flags
+
+    # ---- memory accounting ----
+
+    @classmethod
+    def memory_usage(cls) -> dict:
+        """Resident and memory-mapped bytes per loaded frame, derived index and cache.
+
+        Recomputed only when a frame, index or cached summary changes.
+        """
+        frames = {name: getattr(cls, attr) for name, attr in _FRAME_ATTRS.items()}
+        indexes = {attr: getattr(cls, attr) for attr in _INDEX_ATTRS}
+        key = (
+            tuple(id(obj) for obj in (*frames.values(), *indexes.values())),
+            tuple(len(df.columns) for df in frames.values() if df is not None),
+            summary_cache.keys(),
+        )
+        if cls._memory is not None and cls._memory[0] == key:
+            return cls._memory[1]
+
+        items: dict[str, dict] = {}
+        for name, obj in (*frames.items(), *indexes.items(), ("portfolio_summaries", summary_cache.values())):
+            resident, mapped = memory_usage(obj)
+            items[name] = {"resident_bytes": resident, "mapped_bytes": mapped, "spilled": name in cls._spilled}
+        usage = {
+            "items": items,
+            "resident_bytes": sum(i["resident_bytes"] for i in items.values()),
+            "mapped_bytes": sum(i["mapped_bytes"] for i in items.values()),
+            "budget_bytes": MEMORY_BUDGET_BYTES or None,
+            "policy": MEMORY_POLICY,
+        }
+        cls._memory = (key, usage)
+        cls._appended_bytes = 0.0
+        return usage
+
+    @classmethod
+    def _admit(cls, name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Check an incoming frame against the memory budget before it replaces frame ``name``.
+
+        Transactions are charged ``MEMORY_INDEX_OVERHEAD`` extra for the
+        indexes built from them (which replace the current ones).  With the
+        "spill" policy, frames - the incoming one included - are spilled
+        (most spillable bytes first) until the upload fits; otherwise, or if it still does
+        not fit, ``MemoryBudgetExceeded`` is raised.
+        """
+        if MEMORY_BUDGET_BYTES <= 0 or cls._attaching or df is None:
+            return df
+        factor = 1.0 + MEMORY_INDEX_OVERHEAD if name == "transactions" else 1.0
+        items = cls.memory_usage()["items"]
+        replaced = {name} | (set(_INDEX_ATTRS) if name == "transactions" else set())
+
+        def fits(incoming: pd.DataFrame) -> tuple[bool, float, float]:
+            used = sum(i["resident_bytes"] for n, i in items.items() if n not in replaced)
+            need = memory_usage(incoming)[0] * factor
+            return used + need <= MEMORY_BUDGET_BYTES, need, MEMORY_BUDGET_BYTES - used
+
+        ok, need, free = fits(df)
+        pending: Optional[str] = None
+        if not ok and MEMORY_POLICY == "spill":
+            candidates = [(spillable_bytes(df), name)] + [
+                (spillable_bytes(getattr(cls, attr)), other)
+                for other, attr in _FRAME_ATTRS.items()
+                if other != name and getattr(cls, attr) is not None and other not in cls._spilled
+            ]
+            for gain, candidate in sorted(candidates, reverse=True):
+                if gain == 0:
+                    break
+                if candidate == name:
+                    df, pending = spill_frame(df, MEMORY_SPILL_DIR, name)
+                else:
+                    frame, path = spill_frame(getattr(cls, _FRAME_ATTRS[candidate]), MEMORY_SPILL_DIR, candidate)
+                    setattr(cls, _FRAME_ATTRS[candidate], frame)
+                    cls._spilled[candidate] = path
+                    resident, mapped = memory_usage(frame)
+                    items[candidate] = {"resident_bytes": resident, "mapped_bytes": mapped, "spilled": True}
+                ok, need, free = fits(df)
+                if ok:
+                    break
+        if not ok:
+            if pending is not None:
+                shutil.rmtree(pending, ignore_errors=True)
+            raise MemoryBudgetExceeded(
+                f"Loading {name.replace('_', ' ')} needs about {format_bytes(need)} but only "
+                f"{format_bytes(max(free, 0))} of the {format_bytes(MEMORY_BUDGET_BYTES)} memory budget is free."
+            )
+        cls._release_spill(name)
+        if pending is not None:
+            cls._spilled[name] = pending
+        return df
+
+    @classmethod
+    def _admit_rows(cls, df: pd.DataFrame) -> None:
+        """Check rows about to be appended to the transactions against the memory budget.
+
+        They are charged like an upload (with ``MEMORY_INDEX_OVERHEAD``) on
+        top of the last measured usage; a spilled book is charged in full,
+        since appending makes it resident.  Raises ``MemoryBudgetExceeded``.
+        """
+        if MEMORY_BUDGET_BYTES <= 0 or cls._attaching:
+            return
+        usage = cls._memory[1] if cls._memory is not None else cls.memory_usage()
+        need = memory_usage(df)[0] * (1.0 + MEMORY_INDEX_OVERHEAD)
+        if "transactions" in cls._spilled:
+            need += usage["items"]["transactions"]["mapped_bytes"]
+        free = MEMORY_BUDGET_BYTES - usage["resident_bytes"] - cls._appended_bytes
+        if need > free:
+            raise MemoryBudgetExceeded(
+                f"Appending {len(df)} transactions needs about {format_bytes(need)} but only "
+                f"{format_bytes(max(free, 0))} of the {format_bytes(MEMORY_BUDGET_BYTES)} memory budget is free."
+            )
+        cls._appended_bytes += need
+
+    @classmethod
+    def _release_spill(cls, name: str) -> None:
+        """Delete the spill files of frame ``name`` (live mappings stay valid until dropped)."""
+        path = cls._spilled.pop(name, None)
+        if path is not None:
+            shutil.rmtree(path, ignore_errors=True)
+
+    # ---- multi-worker sharing ----
+
+    @classmethod
+    def _publish(cls, frames: dict[str, Optional[pd.DataFrame]]) -> None:
+        """Publish changed frames to the shared store (multi-worker mode only)."""
+        if not SHARED_STORE_ENABLED or cls._attaching:
+            return
+        cls.version = shared_store.publish(frames)
+        cls._frame_versions = shared_store.manifest(cls.version)
+
+    @classmethod
+    @contextmanager
+    def _shared_append(cls) -> Iterator[None]:
+        """Multi-worker mode: hold the shared-store lock, caught up with the other workers' appends.
+
+        Appends made meanwhile are published before it is released, so
+        every worker's book holds the rows in the same order.  Hold
+        ``_merge_lock``.  Real-time rows queued here before other workers'
+        rows for the same customer arrived keep the local indices they
+        were scored with.
+        """
+        if not SHARED_STORE_ENABLED or cls._attaching:
+            yield
+            return
+        with shared_store.locked():
+            cls._catch_up()
+            yield
+
+    @classmethod
+    def _publish_rows(cls, rows: pd.DataFrame) -> None:
+        """Publish appended rows to the shared store (multi-worker mode only; inside ``_shared_append``)."""
+        if not SHARED_STORE_ENABLED or cls._attaching:
+            return
+        cls.version = shared_store.append(rows)
+        cls._frame_versions = shared_store.manifest(cls.version)
+
+    @classmethod
+    def _compact(cls) -> None:
+        """Multi-worker mode: republish the book as one frame once many appended segments piled up.
+
+        Skipped unless this worker reflects the latest version (hold ``_merge_lock``).
+        """
+        if not SHARED_STORE_ENABLED or len(cls._frame_versions.get(APPENDS) or []) < SHARED_STORE_MAX_APPENDS:
+            return
+        with shared_store.locked():
+            if shared_store.current_version() == cls.version:
+                cls._publish({"transactions": cls.transactions_df})
+
+    @classmethod
+    def sync(cls) -> bool:
+        """Attach the latest shared snapshot if another worker published one.
+
+        Only frames whose stored version changed are re-attached, and derived
+        indexes are refreshed the same way the matching setter would; rows
+        other workers appended are appended here too.  Returns True when
+        anything was reloaded.
+        """
+        if not SHARED_STORE_ENABLED or shared_store.current_version() == cls.version:
+            return False
+        with cls._sync_lock, cls._merge_lock:
+            return cls._catch_up()
+
+    @classmethod
+    def sync_in_background(cls) -> bool:
+        """Start ``sync`` in a background thread if another worker published a snapshot.
+
+        Returns at once; requests keep reading the loaded snapshot until
+        the new one is swapped in.  At most one reload runs at a time.
+        Returns True when a reload was started.
+        """
+        if not SHARED_STORE_ENABLED or shared_store.current_version() == cls.version:
+            return False
+        if not cls._sync_lock.acquire(blocking=False):
+            return False
+        threading.Thread(target=cls._sync_locked, name="aml-shared-sync", daemon=True).start()
+        return True
+
+    @classmethod
+    def _sync_locked(cls) -> None:
+        """Background body of ``sync_in_background`` (the caller acquired ``_sync_lock``)."""
+        try:
+            with cls._merge_lock:
+                cls._catch_up()
+        finally:
+            cls._sync_lock.release()
+
+    @classmethod
+    def _catch_up(cls) -> bool:
+        """Attach what was published after ``version`` (hold ``_merge_lock``); True when anything changed."""
+        version = shared_store.current_version()
+        if version <= cls.version:
+            return False
+        try:
+            manifest: dict[str, Any] = shared_store.manifest(version)
+            frames = {
+                name: shared_store.load_frame(name, manifest.get(name))
+                for name in FRAMES
+                if manifest.get(name) != cls._frame_versions.get(name)
+            }
+            segments = manifest.get(APPENDS) or []
+            known = cls._frame_versions.get(APPENDS) or []
+            if "transactions" not in frames and segments[:len(known)] != known:
+                frames["transactions"] = shared_store.load_frame("transactions", manifest.get("transactions"))
+            appended = shared_store.load_appended(segments if "transactions" in frames else segments[len(known):])
+        except FileNotFoundError:
+            # Snapshot evicted by a newer publish; pick it up next time
+            return False
+
+        cls._attaching = True
+        try:
+            if "transactions" in frames:
+                # Built aside: requests keep reading the loaded book until the swap
+                loaded = {**{name: getattr(cls, attr) for name, attr in _FRAME_ATTRS.items()}, **frames}
+                tx = loaded["transactions"]
+                if appended is not None:
+                    tx = pd.concat([tx, appended], ignore_index=True)
+                attrs = {_FRAME_ATTRS[name]: df for name, df in frames.items()}
+                attrs["transactions_df"] = tx
+                attrs.update(cls._indexed(tx, loaded["fx_rates"], loaded["watchlist"], loaded["high_risk_countries"]))
+                attrs.update(cls._deferred(tx, loaded["high_risk_countries"]))
+                with cls.append_lock:
+                    for attr, value in attrs.items():
+                        setattr(cls, attr, value)
+                    cls._buffers.clear()
+                    cls.stale_rows = 0
+                    cls._deferred_epoch += 1
+            else:
+                for name, df in frames.items():
+                    getattr(cls, _FRAME_SETTERS[name])(df)
+                if appended is not None:
+                    cls._append_published(appended)
+        finally:
+            cls._attaching = False
+
+        cls.version = version
+        cls._frame_versions = manifest
+        return True
+
+    @classmethod
+    def _append_published(cls, rows: pd.DataFrame) -> None:
+        """Append rows another worker published (hold ``_merge_lock``)."""
+        bcns = rows["business_contact_number"].astype(str).unique().tolist()
+        with cls.append_lock:
+            cls.merging_bcns = frozenset(bcns)
+        cls._merge_rows(rows, bcns, 0)
 
     # ---- queries ----
 
+    @classmethod
+    def get_context(cls) -> dict:
+        """Return the shared rule-evaluation context passed to ``AMLEngine.analyze``."""
+        return {
+            "watchlist_df": cls.watchlist_df,
+            "high_risk_countries_df": cls.high_risk_countries_df,
+            "counterparty_graph": cls.counterparty_graph,
+            "transfer_links": cls.transfer_links,
+            "peer_groups": cls.peer_groups,
+            "name_screening": cls.name_screening,
+        }
+
+    @classmethod
+    def deferred_covers(cls, bcn: str) -> bool:
+        """True when the whole-book structures include every row of ``bcn`` (none appended since)."""
+        df, index, stale = cls.transactions_df, cls.customer_index, cls.stale_rows
+        if not stale or df is None or index is None:
+            return True
+        rows = index.rows_for(bcn)
+        return not rows.size or int(rows[-1]) < len(df) - stale
+
     @classmethod
     def get_customer_transactions(cls, bcn: str) -> pd.DataFrame:
         """Return all transactions for a given business_contact_number."""
         if cls.transactions_df is None:
             return pd.DataFrame()
+        if cls.customer_index is not None:
+            return cls.transactions_df.iloc[cls.customer_index.rows_for(bcn)].reset_index(drop=True)
         mask = cls.transactions_df["business_contact_number"].astype(str) == str(bcn)
         return cls.transactions_df.loc[mask].reset_index(drop=True)
 
+    @classmethod
+    def get_customer_period(
+        cls,
+        bcn: str,
+        date_from: Optional[pd.Timestamp],
+        date_to: Optional[pd.Timestamp],
+        lookback_days: float = 0.0,
+    ) -> pd.DataFrame:
+        """Return a customer's transactions dated in ``[date_from - lookback_days, date_to]``.
+
+        With a look-back, the customer's last transaction before that window
+        is included too (rules measuring gaps need it).  Rows keep their
+        original order and are indexed by their position in
+        ``get_customer_transactions(bcn)``.  Undated rows are left out.
+        """
+        if cls.transactions_df is None:
+            return pd.DataFrame()
+        index = cls.customer_index
+        if index is None:
+            index = cls.customer_index = build_customer_index(cls.transactions_df)
+        if index is None:
+            return pd.DataFrame()
+
+        start = date_from
+        if start is not None and lookback_days > 0:
+            start = start - pd.Timedelta(days=lookback_days)
+        local = index.period(bcn, start, date_to)
+        if start is not None and lookback_days > 0:
+            anchor = index.previous(bcn, start)
+            if anchor is not None:
+                local = np.union1d(local, [anchor])
+        period = cls.transactions_df.iloc[index.rows_for(bcn)[local]]
+        period.index = pd.Index(local)
+        return period
+
+    @classmethod
+    def get_customers_transactions(cls, bcns: list[str]) -> pd.DataFrame:
+        """Return the transactions of several BCNs, in their original order."""
+        if cls.transactions_df is None:
+            return pd.DataFrame()
+        if cls.customer_index is not None:
+            return cls.transactions_df.iloc[cls.customer_index.rows_for_many(bcns)]
+        mask = cls.transactions_df["business_contact_number"].astype(str).isin([str(b) for b in bcns])
+        return cls.transactions_df.loc[mask]
+
     @classmethod
     def search_bcn(cls, query: str) -> list[dict]:
         """Search BCNs by prefix and contains match.  Returns list of dicts
@@ -103,6 +888,13 @@ class DataStore:
             .tolist()
         )
 
+    @classmethod
+    def transactions_revision(cls) -> Optional[str]:
+        """Identity of the loaded rows: their load time and, since rows are only appended, their count."""
+        if cls.transactions_loaded_at is None or cls.transactions_df is None:
+            return None
+        return f"{cls.transactions_loaded_at}+{len(cls.transactions_df)}"
+
     @classmethod
     def get_upload_status(cls) -> dict:
         return {
@@ -110,11 +902,35 @@ class DataStore:
             "watchlist": cls.watchlist_df is not None,
             "high_risk_countries": cls.high_risk_countries_df is not None,
             "work_instructions": cls.work_instructions_df is not None,
+            "fx_rates": cls.fx_rates_df is not None,
+            "data_version": cls.version,
+            "pending_transactions": len(cls.pending_transactions),
+            "deferred_index_rows": cls.stale_rows,
+            "memory": cls.memory_usage(),
         }
 
     @classmethod
     def clear_all(cls) -> None:
-        cls.transactions_df = None
-        cls.watchlist_df = None
-        cls.high_risk_countries_df = None
-        cls.work_instructions_df = None
+        with cls._merge_lock, cls.append_lock:
+            cls.transactions_df = None
+            cls.watchlist_df = None
+            cls.high_risk_countries_df = None
+            cls.work_instructions_df = None
+            cls.fx_rates_df = None
+            cls.unconverted_amounts = 0
+            cls.transactions_loaded_at = None
+            cls.pending_transactions = []
+            cls.stale_rows = 0
+            cls._deferred_epoch += 1
+            cls._buffers.clear()
+            cls.counterparty_graph = None
+            cls.pattern_cube = None
+            cls.portfolio_features = None
+            cls.name_screening = None
+            cls.customer_index = None
+            cls.country_index = None
+            cls.transfer_links = None
+            cls.peer_groups = None
+            for name in list(cls._spilled):
+                cls._release_spill(name)
+            cls._publish({name: None for name in _FRAME_ATTRS})
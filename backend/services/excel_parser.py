@@ -2,18 +2,29 @@
 
 from __future__ import annotations
 
+import hashlib
 import io
-from typing import Tuple
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple, Union
 
+import openpyxl
 import pandas as pd
 from fastapi import UploadFile
 
 from config import (
+    INGEST_WORKERS,
+    REQUIRED_COLUMNS_FX_RATES,
     REQUIRED_COLUMNS_HIGH_RISK_COUNTRIES,
     REQUIRED_COLUMNS_TRANSACTIONS,
     REQUIRED_COLUMNS_WATCHLIST,
     REQUIRED_COLUMNS_WORK_INSTRUCTIONS,
+    UPLOAD_READ_CHUNK_BYTES,
 )
+from services.transaction_flags import FLAGS_COLUMN, static_flags
+from services.upload_cache import upload_cache
+
+WORKBOOK_EXTENSIONS = (".xlsx", ".xls")
 
 
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -26,10 +37,25 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def _read_excel_bytes(contents: bytes) -> pd.DataFrame:
+    """Read raw workbook bytes into a DataFrame."""
+    return pd.read_excel(io.BytesIO(contents), engine="openpyxl")
+
+
+async def read_upload(file: UploadFile) -> Tuple[bytes, str]:
+    """Read an UploadFile, hashing it (SHA-256) as the chunks come in."""
+    digest = hashlib.sha256()
+    parts: list[bytes] = []
+    while chunk := await file.read(UPLOAD_READ_CHUNK_BYTES):
+        digest.update(chunk)
+        parts.append(chunk)
+    return b"".join(parts), digest.hexdigest()
+
+
 async def _read_excel(file: UploadFile) -> pd.DataFrame:
     """Read an UploadFile into a DataFrame."""
     contents = await file.read()
-    return pd.read_excel(io.BytesIO(contents), engine="openpyxl")
+    return _read_excel_bytes(contents)
 
 
 def _validate_columns(
@@ -47,9 +73,25 @@ def _validate_columns(
 # ---- Transactions ----
 
 async def parse_transactions(file: UploadFile) -> Tuple[pd.DataFrame, list[str]]:
+    return parse_transactions_cached(*await read_upload(file))
+
+
+def parse_transactions_cached(contents: bytes, digest: Optional[str] = None) -> Tuple[pd.DataFrame, list[str]]:
+    """``parse_transactions_bytes``, served from the upload cache when the same bytes were parsed before."""
+    if digest is None:
+        digest = hashlib.sha256(contents).hexdigest()
+    return upload_cache.parse("transactions", digest, lambda: parse_transactions_bytes(contents))
+
+
+def parse_transactions_bytes(contents: bytes) -> Tuple[pd.DataFrame, list[str]]:
+    """Synchronous variant of ``parse_transactions`` for already-read workbook bytes."""
+    df = _normalize_columns(_read_excel_bytes(contents))
+    return _coerce_transactions(df)
+
+
+def _coerce_transactions(df: pd.DataFrame) -> Tuple[pd.DataFrame, list[str]]:
+    """Validate and coerce a (possibly concatenated) transactions frame."""
     warnings: list[str] = []
-    df = await _read_excel(file)
-    df = _normalize_columns(df)
     warnings.extend(_validate_columns(df, REQUIRED_COLUMNS_TRANSACTIONS))
 
     # Coerce types
@@ -69,9 +111,112 @@ async def parse_transactions(file: UploadFile) -> Tuple[pd.DataFrame, list[str]]
         if col in df.columns:
             df[col] = df[col].fillna("").astype(str).str.strip()
 
+    # Amount-based indicator bits; reference-list bits are added by DataStore
+    df[FLAGS_COLUMN] = static_flags(df)
+
     return df, warnings
 
 
+# ---- Multi-file / multi-sheet transactions ----
+
+def _workbooks(filename: str, contents: bytes) -> list[Tuple[str, bytes]]:
+    """``(label, bytes)`` of the workbooks in one upload; zip archives are expanded."""
+    if not filename.lower().endswith(".zip"):
+        return [(filename, contents)]
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(contents))
+    except zipfile.BadZipFile:
+        raise ValueError(f"'{filename}' is not a valid zip archive.")
+    with archive:
+        members = sorted(
+            info.filename for info in archive.infolist()
+            if not info.is_dir()
+            and not info.filename.startswith("__MACOSX/")
+            and info.filename.lower().endswith(WORKBOOK_EXTENSIONS)
+        )
+        if not members:
+            raise ValueError(f"'{filename}' contains no Excel workbooks.")
+        return [(f"{filename}/{name}", archive.read(name)) for name in members]
+
+
+def _sheet_names(contents: bytes) -> list[str]:
+    workbook = openpyxl.load_workbook(io.BytesIO(contents), read_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _read_sheet(task: Tuple[bytes, Union[str, int]]) -> pd.DataFrame:
+    """Read one sheet with normalized column names (runs in an ingest worker process)."""
+    contents, sheet = task
+    df = pd.read_excel(io.BytesIO(contents), sheet_name=sheet, engine="openpyxl")
+    return _normalize_columns(df)
+
+
+def parse_transaction_uploads(
+    uploads: list[Tuple[str, bytes]],
+    all_sheets: bool = False,
+) -> Tuple[pd.DataFrame, list[str]]:
+    """Parse several transaction workbooks (or zip archives of them) into one frame.
+
+    Each workbook contributes its first sheet, or every sheet with
+    ``all_sheets``.  Sheets are read concurrently in a process pool of
+    ``INGEST_WORKERS`` and concatenated in upload/sheet order, then
+    validated and coerced once.  Sheets sharing no column with the
+    transaction schema (cover or notes sheets) are skipped with a warning.
+    """
+    tasks: list[Tuple[bytes, Union[str, int]]] = []
+    labels: list[str] = []
+    for filename, contents in uploads:
+        for label, workbook in _workbooks(filename, contents):
+            sheets: list[Union[str, int]] = list(_sheet_names(workbook)) if all_sheets else [0]
+            for sheet in sheets:
+                tasks.append((workbook, sheet))
+                labels.append(f"{label}[{sheet}]" if all_sheets else label)
+
+    if len(tasks) == 1:
+        frames = [_read_sheet(tasks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=max(1, min(INGEST_WORKERS, len(tasks)))) as pool:
+            frames = list(pool.map(_read_sheet, tasks))
+
+    warnings: list[str] = []
+    kept: list[pd.DataFrame] = []
+    for label, frame in zip(labels, frames):
+        if len(tasks) > 1 and not set(frame.columns) & set(REQUIRED_COLUMNS_TRANSACTIONS):
+            warnings.append(f"Skipped {label}: no transaction columns")
+            continue
+        kept.append(frame)
+    if not kept:
+        raise ValueError("No transaction sheets found in the upload.")
+
+    df = kept[0] if len(kept) == 1 else pd.concat(kept, ignore_index=True)
+    df, coerce_warnings = _coerce_transactions(df)
+    return df, warnings + coerce_warnings
+
+
+def parse_transaction_uploads_cached(
+    uploads: list[Tuple[str, bytes, str]],
+    all_sheets: bool = False,
+) -> Tuple[pd.DataFrame, list[str]]:
+    """``parse_transaction_uploads`` for ``(filename, bytes, sha256)`` uploads, via the upload cache.
+
+    A single plain workbook is keyed by its own hash, so it shares cache
+    entries with ``parse_transactions_cached``.
+    """
+    digests = [digest for _, _, digest in uploads]
+    if len(uploads) == 1 and not all_sheets and not uploads[0][0].lower().endswith(".zip"):
+        key = digests[0]
+    else:
+        key = hashlib.sha256("|".join(digests + [f"all_sheets={all_sheets}"]).encode()).hexdigest()
+    return upload_cache.parse(
+        "transactions",
+        key,
+        lambda: parse_transaction_uploads([(name, contents) for name, contents, _ in uploads], all_sheets),
+    )
+
+
 # ---- Watchlist ----
 
 async def parse_watchlist(file: UploadFile) -> Tuple[pd.DataFrame, list[str]]:
@@ -116,3 +261,24 @@ async def parse_work_instructions(file: UploadFile) -> Tuple[pd.DataFrame, list[
         df["instruction"] = df["instruction"].fillna("").astype(str).str.strip()
 
     return df, warnings
+
+
+# ---- FX Rates ----
+
+async def parse_fx_rates(file: UploadFile) -> Tuple[pd.DataFrame, list[str]]:
+    warnings: list[str] = []
+    df = await _read_excel(file)
+    df = _normalize_columns(df)
+    warnings.extend(_validate_columns(df, REQUIRED_COLUMNS_FX_RATES))
+
+    if "date" in df.columns:
+        df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    if "currency" in df.columns:
+        df["currency"] = df["currency"].fillna("").astype(str).str.strip().str.upper()
+    if "rate" in df.columns:
+        df["rate"] = pd.to_numeric(df["rate"], errors="coerce")
+        invalid = int((~(df["rate"] > 0)).sum())
+        if invalid > 0:
+            warnings.append(f"{invalid} rows have a missing or non-positive rate and are ignored")
+
+    return df, warnings
@@ -0,0 +1,203 @@
+"""Exporter - stream screening alerts and flagged transactions as CSV, XLSX or Parquet.
+
+Sources yield fixed-column ``DataFrame`` chunks of ``EXPORT_CHUNK_SIZE``
+rows (alerts via keyset queries on the alert store, flagged transactions
+as slices of the in-memory table); writers turn the chunks into bytes.
+CSV is encoded chunk by chunk as it is sent.  XLSX (openpyxl write-only
+mode) and Parquet (pyarrow) are written chunk by chunk to a
+temporary file, which is then streamed, so memory stays bounded by one
+chunk whatever the export size.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import tempfile
+from typing import Any, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from config import EXPORT_CHUNK_SIZE
+from services.alert_store import AlertStore
+from services.customer_index import CustomerIndex
+from services.fx_rates import AMOUNT_EUR_COLUMN
+from services.transaction_flags import flag_names, matching_rows, row_flags
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+ALERT_COLUMNS = [
+    "run_id", "bcn", "id", "rule_name", "alert_type", "severity", "risk_score",
+    "first_date", "last_date", "affected_transaction_indices", "description",
+]
+FLAGGED_COLUMNS = [
+    "business_contact_number", "index", "date", "amount", "currency", "amount_eur",
+    "sender", "receiver", "iban", "bic", "transaction_type", "description", "indicators",
+]
+
+# Data rows per worksheet (Excel's limit minus the header row)
+_XLSX_MAX_ROWS = 1_048_575
+_READ_SIZE = 1 << 20
+
+
+def check_format(fmt: str) -> None:
+    """Raise ``ValueError`` for unknown formats or a missing optional writer."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Allowed: {', '.join(EXPORT_FORMATS)}.")
+    if fmt == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ValueError("Parquet export requires the 'pyarrow' package (see requirements.txt).")
+
+
+# ---- sources ----
+
+def alert_chunks(store: AlertStore, run_id: str, filters: dict[str, Any]) -> Iterator[pd.DataFrame]:
+    """Alerts of a screening run matching ``filters``, one chunk at a time."""
+    for items in store.iter_alerts(run_id, filters, EXPORT_CHUNK_SIZE):
+        chunk = pd.DataFrame(items, columns=ALERT_COLUMNS)
+        chunk["run_id"] = run_id
+        chunk["affected_transaction_indices"] = [
+            ";".join(map(str, v)) for v in chunk["affected_transaction_indices"]
+        ]
+        for col in ("first_date", "last_date"):
+            chunk[col] = chunk[col].fillna("")
+        chunk["risk_score"] = chunk["risk_score"].astype(np.float64)
+        yield chunk
+
+
+def flagged_rows(
+    df: pd.DataFrame,
+    index: Optional[CustomerIndex],
+    wanted: int,
+    match_all: bool = False,
+    bcn: Optional[str] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Table rows whose indicator bits match ``wanted`` (ascending), and every row's bits.
+
+    With ``bcn`` only that customer's rows (from the customer index) are tested.
+    """
+    bits = row_flags(df)
+    if index is None:
+        return np.zeros(0, dtype=np.int64), bits
+    if bcn is None:
+        return np.flatnonzero(matching_rows(bits, wanted, match_all)), bits
+    candidates = index.rows_for(bcn)
+    return candidates[matching_rows(bits[candidates], wanted, match_all)], bits
+
+
+def flagged_chunks(
+    df: pd.DataFrame,
+    index: Optional[CustomerIndex],
+    wanted: int,
+    match_all: bool = False,
+    bcn: Optional[str] = None,
+) -> Iterator[pd.DataFrame]:
+    """Transactions whose indicator bits match ``wanted``, one chunk at a time.
+
+    ``index`` is the row's position within its customer's transactions, as
+    in the customer overview and ``/portfolio/flagged``.
+    """
+    rows, bits = flagged_rows(df, index, wanted, match_all, bcn)
+    bcn_values = df["business_contact_number"].to_numpy()
+    names = {int(b): "|".join(flag_names(int(b))) for b in np.unique(bits[rows])}
+
+    def text(part: pd.DataFrame, col: str) -> pd.Series:
+        if col not in part.columns:
+            return pd.Series("", index=part.index)
+        return part[col].fillna("").astype(str)
+
+    for start in range(0, len(rows), EXPORT_CHUNK_SIZE):
+        sel = rows[start:start + EXPORT_CHUNK_SIZE]
+        part = df.iloc[sel]
+        amount = pd.to_numeric(part["amount"], errors="coerce").astype(np.float64)
+        dates = pd.to_datetime(part["date"], errors="coerce") if "date" in part.columns else None
+        bcns = bcn_values[sel].astype(str)
+        yield pd.DataFrame({
+            "business_contact_number": bcns,
+            "index": index.local_indices(sel, bcns),
+            "date": dates.dt.strftime("%Y-%m-%d").fillna("").to_numpy() if dates is not None else "",
+            "amount": amount.to_numpy(),
+            "currency": text(part, "currency").to_numpy(),
+            "amount_eur": (
+                part[AMOUNT_EUR_COLUMN].astype(np.float64).to_numpy()
+                if AMOUNT_EUR_COLUMN in part.columns else amount.to_numpy()
+            ),
+            "sender": text(part, "sender").to_numpy(),
+            "receiver": text(part, "receiver").to_numpy(),
+            "iban": text(part, "iban").to_numpy(),
+            "bic": text(part, "bic").to_numpy(),
+            "transaction_type": text(part, "transaction_type").to_numpy(),
+            "description": text(part, "description").to_numpy(),
+            "indicators": [names[int(b)] for b in bits[sel]],
+        }, columns=FLAGGED_COLUMNS)
+
+
+# ---- writers ----
+
+def _stream_file(handle: Any) -> Iterator[bytes]:
+    handle.seek(0)
+    while True:
+        data = handle.read(_READ_SIZE)
+        if not data:
+            return
+        yield data
+
+
+def _csv(columns: list[str], chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    yield (",".join(columns) + "\n").encode("utf-8")
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=False).encode("utf-8")
+
+
+def _xlsx(columns: list[str], chunks: Iterable[pd.DataFrame], title: str) -> Iterator[bytes]:
+    wb = Workbook(write_only=True)
+    ws, written, sheet = None, _XLSX_MAX_ROWS, 0
+    for chunk in chunks:
+        for row in zip(*(chunk[c].tolist() for c in columns)):
+            if written == _XLSX_MAX_ROWS:
+                sheet += 1
+                ws = wb.create_sheet(title if sheet == 1 else f"{title} {sheet}")
+                ws.append(columns)
+                written = 0
+            ws.append(row)
+            written += 1
+    if ws is None:
+        wb.create_sheet(title).append(columns)
+    with tempfile.TemporaryFile() as handle:
+        wb.save(handle)
+        yield from _stream_file(handle)
+
+
+def _parquet(columns: list[str], chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with tempfile.TemporaryFile() as handle:
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(
+                    chunk[columns], schema=writer.schema if writer else None, preserve_index=False
+                )
+                if writer is None:
+                    writer = pq.ParquetWriter(handle, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pq.write_table(pa.table({c: pa.array([], pa.string()) for c in columns}), handle)
+        yield from _stream_file(handle)
+
+
+def export_stream(fmt: str, columns: list[str], chunks: Iterable[pd.DataFrame], title: str) -> Iterator[bytes]:
+    """Encode ``chunks`` (DataFrames with ``columns``) in ``fmt``; call ``check_format`` first."""
+    if fmt == "csv":
+        return _csv(columns, chunks)
+    if fmt == "xlsx":
+        return _xlsx(columns, chunks, title)
+    return _parquet(columns, chunks)
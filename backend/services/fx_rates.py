@@ -0,0 +1,142 @@
+"""FX normalization - convert transaction amounts to the base currency (EUR).
+
+``amount_eur`` is computed once per transactions or FX-rate upload with an
+as-of join: each row takes the latest rate of its currency on or before
+its date (or the earliest rate when it predates the table).  Rows already
+in the base currency, or in a currency without any rate, keep their
+amount.  Rule evaluation and portfolio aggregates read amounts through
+``amount_column`` / ``with_eur_amounts`` so they compare like with like.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import BASE_CURRENCY
+
+AMOUNT_EUR_COLUMN = "amount_eur"
+# Rule-evaluation view: the amount as transacted, next to the EUR ``amount``
+ORIGINAL_AMOUNT_COLUMN = "amount_original"
+
+
+def _currency_codes(values: pd.Series) -> pd.Series:
+    """Upper-cased, stripped currency codes; normalised once per distinct value."""
+    codes, uniques = pd.factorize(values.to_numpy(), sort=False)
+    labels = pd.Series(uniques, dtype=object).fillna("").astype(str).str.strip().str.upper().to_numpy()
+    labels = np.append(labels, "")
+    return pd.Series(labels[codes], index=values.index)
+
+
+def _valid_rates(fx_rates_df: pd.DataFrame) -> pd.DataFrame:
+    """Dated, positive rates with normalised currency codes, sorted by date."""
+    rates = pd.DataFrame({
+        "date": pd.to_datetime(fx_rates_df["date"], errors="coerce").astype("datetime64[ns]"),
+        "currency": _currency_codes(fx_rates_df["currency"]),
+        "rate": pd.to_numeric(fx_rates_df["rate"], errors="coerce"),
+    })
+    return rates[rates["date"].notna() & (rates["rate"] > 0)].sort_values("date", kind="stable")
+
+
+def eur_amounts(
+    transactions_df: pd.DataFrame,
+    fx_rates_df: Optional[pd.DataFrame],
+) -> tuple[np.ndarray, int]:
+    """Amounts of ``transactions_df`` in the base currency.
+
+    Returns the amounts and the number of non-base-currency rows that had
+    no rate and were left unconverted.
+    """
+    n = len(transactions_df)
+    amounts = (
+        pd.to_numeric(transactions_df["amount"], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+        if "amount" in transactions_df.columns else np.zeros(n, dtype=np.float64)
+    )
+    if "currency" not in transactions_df.columns or n == 0:
+        return amounts.copy(), 0
+
+    currency = _currency_codes(transactions_df["currency"]).to_numpy()
+    foreign = np.flatnonzero((currency != BASE_CURRENCY) & (currency != ""))
+    if foreign.size == 0:
+        return amounts.copy(), 0
+    if fx_rates_df is None or fx_rates_df.empty:
+        return amounts.copy(), int(foreign.size)
+
+    rates = _valid_rates(fx_rates_df)
+
+    if "date" in transactions_df.columns:
+        dates = pd.to_datetime(transactions_df["date"], errors="coerce").to_numpy(dtype="datetime64[ns]")[foreign]
+    else:
+        dates = np.full(foreign.size, np.datetime64("NaT"), dtype="datetime64[ns]")
+    left = pd.DataFrame({"date": dates, "currency": currency[foreign], "pos": np.arange(foreign.size)})
+    rate = np.full(foreign.size, np.nan)
+
+    # Undated rows take the currency's latest rate
+    undated = left["date"].isna().to_numpy()
+    if undated.any():
+        latest = rates.groupby("currency")["rate"].last()
+        rate[undated] = latest.reindex(left.loc[undated, "currency"]).to_numpy()
+
+    # Dated rows: latest rate on or before the date, else the first one after
+    pending = left[~undated].sort_values("date", kind="stable")
+    for direction in ("backward", "forward"):
+        if pending.empty:
+            break
+        joined = pd.merge_asof(pending, rates, on="date", by="currency", direction=direction)
+        found = joined["rate"].notna().to_numpy()
+        rate[joined["pos"].to_numpy()[found]] = joined["rate"].to_numpy()[found]
+        pending = pending[~found]
+
+    out = amounts.copy()
+    converted = ~np.isnan(rate)
+    out[foreign[converted]] = amounts[foreign[converted]] / rate[converted]
+    return out, int((~converted).sum())
+
+
+def rate_table(fx_rates_df: Optional[pd.DataFrame]) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Currency -> (dates as int64 ns, rates), date-sorted, for ``eur_amount``."""
+    if fx_rates_df is None or fx_rates_df.empty:
+        return {}
+    rates = _valid_rates(fx_rates_df)
+    return {
+        str(currency): (group["date"].to_numpy(dtype="datetime64[ns]").view(np.int64), group["rate"].to_numpy())
+        for currency, group in rates.groupby("currency", sort=False)
+    }
+
+
+def eur_amount(
+    amount: float,
+    currency: str,
+    date: Optional[pd.Timestamp],
+    table: dict[str, tuple[np.ndarray, np.ndarray]],
+) -> Optional[float]:
+    """One amount in the base currency, looked up like ``eur_amounts`` (None when there is no rate)."""
+    code = str(currency or "").strip().upper()
+    if code in ("", BASE_CURRENCY):
+        return amount
+    if code not in table:
+        return None
+    dates, rates = table[code]
+    if date is None or pd.isna(date):
+        return amount / rates[-1]
+    pos = int(np.searchsorted(dates, pd.Timestamp(date).value, side="right")) - 1
+    if pos < 0:
+        pos = int(np.searchsorted(dates, pd.Timestamp(date).value, side="left"))
+    return amount / rates[pos]
+
+
+def amount_column(df: pd.DataFrame) -> str:
+    """Name of the column holding base-currency amounts (``amount`` when not normalized)."""
+    return AMOUNT_EUR_COLUMN if AMOUNT_EUR_COLUMN in df.columns else "amount"
+
+
+def with_eur_amounts(df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` with ``amount`` replaced by the base-currency amount, for rule evaluation.
+
+    The transacted amount stays available as ``amount_original``.
+    """
+    if AMOUNT_EUR_COLUMN not in df.columns:
+        return df
+    return df.assign(**{ORIGINAL_AMOUNT_COLUMN: df["amount"], "amount": df[AMOUNT_EUR_COLUMN]})
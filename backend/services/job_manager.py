@@ -0,0 +1,158 @@
+"""Job manager - in-process background jobs with progress, cancellation and partial results."""
+
+from __future__ import annotations
+
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from config import JOB_HISTORY_LIMIT, JOB_WORKERS
+from models.enums import JobStatus
+from models.schemas import JobInfo
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function to stop at a safe point after cancellation."""
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(timespec="seconds")
+
+
+class Job:
+    """A unit of background work.
+
+    Job functions receive the ``Job`` and call ``report`` as they go; each
+    call may append result records, which readers can page through or
+    stream while the job is still running.
+    """
+
+    def __init__(self, kind: str, total: int = 0, detail: Optional[dict[str, Any]] = None) -> None:
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = JobStatus.PENDING
+        self.total = total
+        self.processed = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.detail: dict[str, Any] = detail or {}
+        self.results: list[dict[str, Any]] = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._future: Optional[Future] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+    def check_cancelled(self) -> None:
+        if self.cancelled:
+            raise JobCancelled()
+
+    def report(self, processed: Optional[int] = None, results: Optional[list[dict[str, Any]]] = None) -> None:
+        with self._lock:
+            if processed is not None:
+                self.processed = processed
+            if results:
+                self.results.extend(results)
+
+    def results_since(self, offset: int, limit: Optional[int] = None) -> list[dict[str, Any]]:
+        with self._lock:
+            end = len(self.results) if limit is None else min(len(self.results), offset + limit)
+            return self.results[offset:end]
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self.status = JobStatus.CANCELLED
+            self.finished_at = time.time()
+
+    def info(self) -> JobInfo:
+        progress = 0.0
+        eta: Optional[float] = None
+        if self.status == JobStatus.COMPLETED:
+            progress = 100.0
+        elif self.total > 0:
+            progress = min(100.0, 100.0 * self.processed / self.total)
+            if self.status == JobStatus.RUNNING and self.processed > 0 and self.started_at is not None:
+                elapsed = time.time() - self.started_at
+                eta = round(elapsed / self.processed * (self.total - self.processed), 1)
+        return JobInfo(
+            id=self.id,
+            kind=self.kind,
+            status=self.status,
+            progress=round(progress, 1),
+            processed=self.processed,
+            total=self.total,
+            eta_seconds=eta,
+            created_at=_iso(self.created_at),
+            started_at=_iso(self.started_at),
+            finished_at=_iso(self.finished_at),
+            error=self.error,
+            result_count=len(self.results),
+            detail=self.detail,
+        )
+
+
+class JobManager:
+    """Runs jobs on a small thread pool and keeps a bounded history of finished jobs."""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, history_limit: int = JOB_HISTORY_LIMIT) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="aml-job")
+        self._jobs: dict[str, Job] = {}
+        self._history_limit = history_limit
+        self._lock = threading.Lock()
+
+    def submit(self, job: Job, func: Callable[[Job], None]) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        job._future = self._executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def _run(self, job: Job, func: Callable[[Job], None]) -> None:
+        if job.cancelled:
+            job.status = JobStatus.CANCELLED
+            job.finished_at = time.time()
+            return
+        job.status = JobStatus.RUNNING
+        job.started_at = time.time()
+        try:
+            func(job)
+            job.status = JobStatus.CANCELLED if job.cancelled else JobStatus.COMPLETED
+        except JobCancelled:
+            job.status = JobStatus.CANCELLED
+        except Exception as exc:
+            job.status = JobStatus.FAILED
+            job.error = str(exc)
+            print(f"[JobManager] Job '{job.id}' ({job.kind}) failed:\n{traceback.format_exc()}")
+        finally:
+            job.finished_at = time.time()
+
+    def _evict(self) -> None:
+        finished = [j for j in self._jobs.values() if j.finished]
+        excess = len(self._jobs) - self._history_limit
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(excess, 0)]:
+            del self._jobs[job.id]
+
+
+# Shared manager used by the routers
+job_manager = JobManager()
@@ -0,0 +1,121 @@
+"""Memory accounting - deep sizes of loaded frames and indexes, budget checks and spilling.
+
+Sizes distinguish resident bytes (heap memory: numpy buffers, Python
+string objects) from mapped bytes (columns backed by memory-mapped files,
+which the OS can page out and reload on demand).  Spilling a frame writes
+it in the shared store's column format and re-attaches it memory-mapped,
+so its numeric and datetime columns stop counting against the budget
+(string columns are rebuilt as objects and stay resident).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import mmap
+import os
+import shutil
+import sys
+import uuid
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from services.shared_store import read_frame, write_frame
+
+
+class MemoryBudgetExceeded(Exception):
+    """An upload does not fit the configured memory budget."""
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _is_mapped(values: Any) -> bool:
+    base = values
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        base = getattr(base, "base", None)
+    return False
+
+
+def _frame_usage(df: pd.DataFrame) -> tuple[int, int]:
+    resident = int(df.index.memory_usage(deep=True))
+    mapped = 0
+    for col in df.columns:
+        series = df[col]
+        size = int(series.memory_usage(index=False, deep=True))
+        if _is_mapped(series.to_numpy()):
+            mapped += size
+        else:
+            resident += size
+    return resident, mapped
+
+
+def memory_usage(obj: Any, _seen: set[int] | None = None) -> tuple[int, int]:
+    """``(resident, mapped)`` bytes held by ``obj``, following frames, arrays and dataclass fields."""
+    if obj is None:
+        return 0, 0
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0, 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return _frame_usage(obj)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        size = int(obj.memory_usage(deep=True))
+        return (0, size) if _is_mapped(obj.to_numpy()) else (size, 0)
+    if isinstance(obj, np.ndarray):
+        size = int(pd.Series(obj, copy=False).memory_usage(index=False, deep=True)) if obj.dtype == object else obj.nbytes
+        return (0, size) if _is_mapped(obj) else (size, 0)
+    if isinstance(obj, BaseModel):
+        return memory_usage(obj.__dict__, seen)
+
+    children: Any
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        children = [getattr(obj, f.name) for f in dataclasses.fields(obj)]
+    elif isinstance(obj, dict):
+        children = list(obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        children = list(obj)
+    else:
+        return sys.getsizeof(obj), 0
+
+    resident, mapped = sys.getsizeof(obj), 0
+    for child in children:
+        r, m = memory_usage(child, seen)
+        resident += r
+        mapped += m
+    return resident, mapped
+
+
+def spillable_bytes(df: pd.DataFrame) -> int:
+    """Resident bytes spilling ``df`` would free: its numeric, boolean and datetime columns.
+
+    String columns are re-materialised as Python objects when a spilled
+    frame is attached, so they stay resident.
+    """
+    return sum(
+        int(df[col].memory_usage(index=False))
+        for col in df.columns
+        if df[col].dtype != object and not _is_mapped(df[col].to_numpy())
+    )
+
+
+def spill_frame(df: pd.DataFrame, root: str, name: str) -> tuple[pd.DataFrame, str]:
+    """Write ``df`` under ``root`` and return it re-attached memory-mapped, with its directory."""
+    path = os.path.join(root, f"{name}-{uuid.uuid4().hex}")
+    os.makedirs(root, exist_ok=True)
+    try:
+        write_frame(path, df)
+    except OSError:
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    return read_frame(path, mmap=True), path
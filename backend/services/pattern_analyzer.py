@@ -2,92 +2,218 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
+from models.enums import TxFlag
 from models.schemas import PatternData
+from services.fx_rates import amount_column
+from services.transaction_flags import FLAGS_COLUMN, HIGH_RISK_FLAGS, row_flags
+from utils.country_codes import high_risk_codes, high_risk_mask
+
+# Cube dimensions, in the order the cells are grouped and sorted
+_DIMENSIONS = ["bcn", "month", "transaction_type", "currency"]
+
+
+def _month_keys(df: pd.DataFrame) -> np.ndarray:
+    """``year * 12 + month - 1`` per row, ``-1`` for missing or unparseable dates."""
+    if "date" not in df.columns:
+        return np.full(len(df), -1, dtype=np.int32)
+    dates = pd.to_datetime(df["date"], errors="coerce")
+    return (dates.dt.year * 12 + dates.dt.month - 1).fillna(-1).to_numpy(dtype=np.int32)
+
+
+def _labels(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), "", dtype=object)
+    return df[col].fillna("").astype(str).to_numpy()
+
+
+def _month_labels(month_keys: np.ndarray) -> list[str]:
+    """Render ``year * 12 + month - 1`` keys as ``YYYY-MM``."""
+    return [f"{k // 12:04d}-{k % 12 + 1:02d}" for k in month_keys]
+
+
+@dataclass
+class PatternCube:
+    """Pre-aggregated BCN x month x transaction_type x currency cube.
+
+    ``cells`` holds one row per non-empty combination with integer-coded
+    dimensions and the measures ``amount_sum``, ``tx_count``, ``round_count``
+    and ``high_risk_count``.  Rows with an unparseable date use month ``-1``
+    so they still count towards the totals but not towards ``by_month``.
+    Cells are sorted by BCN, and ``bcn_indptr`` gives each BCN's slice.
+    """
+
+    cells: pd.DataFrame
+    bcns: pd.Index
+    transaction_types: pd.Index
+    currencies: pd.Index
+    bcn_indptr: np.ndarray
+
+    def slice(self, bcn: Optional[str] = None) -> pd.DataFrame:
+        """Return the cells for one BCN, or the whole cube when ``bcn`` is None."""
+        if bcn is None:
+            return self.cells
+        code = self.bcns.get_indexer([str(bcn)])[0]
+        if code < 0:
+            return self.cells.iloc[0:0]
+        return self.cells.iloc[self.bcn_indptr[code]:self.bcn_indptr[code + 1]]
+
+    def with_high_risk_delta(self, rows: pd.DataFrame, delta: np.ndarray) -> "PatternCube":
+        """Return a cube whose ``high_risk_count`` is shifted by ``delta`` (-1/0/+1) for ``rows``.
+
+        ``rows`` are transactions of the table the cube was built from, so
+        every one of them falls into an existing cell.
+        """
+        keys = pd.DataFrame({
+            "bcn": self.bcns.get_indexer(_labels(rows, "business_contact_number")),
+            "month": _month_keys(rows),
+            "transaction_type": self.transaction_types.get_indexer(_labels(rows, "transaction_type")),
+            "currency": self.currencies.get_indexer(_labels(rows, "currency")),
+            "delta": np.asarray(delta, dtype=np.int64),
+        })
+        keys = keys[keys["delta"] != 0].groupby(_DIMENSIONS, sort=False)["delta"].sum()
+        if keys.empty:
+            return self
+        cell = pd.MultiIndex.from_frame(self.cells[_DIMENSIONS]).get_indexer(keys.index)
+        counts = self.cells["high_risk_count"].to_numpy().copy()
+        counts[cell] += keys.to_numpy()
+        cells = self.cells.copy(deep=False)
+        cells["high_risk_count"] = counts
+        return PatternCube(
+            cells=cells,
+            bcns=self.bcns,
+            transaction_types=self.transaction_types,
+            currencies=self.currencies,
+            bcn_indptr=self.bcn_indptr,
+        )
+
+    def aggregate(self, by: list[str], bcn: Optional[str] = None) -> pd.DataFrame:
+        """Sum the cube measures over the given dimensions (decoded to labels)."""
+        cells = self.slice(bcn)
+        grouped = cells.groupby(by, sort=True)[
+            ["amount_sum", "tx_count", "round_count", "high_risk_count"]
+        ].sum().reset_index()
+        if "bcn" in by:
+            grouped["bcn"] = self.bcns[grouped["bcn"].to_numpy()]
+        if "transaction_type" in by:
+            grouped["transaction_type"] = self.transaction_types[grouped["transaction_type"].to_numpy()]
+        if "currency" in by:
+            grouped["currency"] = self.currencies[grouped["currency"].to_numpy()]
+        if "month" in by:
+            grouped = grouped[grouped["month"] >= 0]
+            grouped["month"] = _month_labels(grouped["month"].to_numpy())
+        return grouped
+
+    def patterns(self, bcn: Optional[str] = None) -> PatternData:
+        """Build ``PatternData`` for one BCN, or for the whole portfolio when ``bcn`` is None."""
+        cells = self.slice(bcn)
+        total = int(cells["tx_count"].sum())
+        if total == 0:
+            return PatternData()
+
+        def _totals(dim: str, labels: pd.Index) -> dict[str, float]:
+            sums = cells.groupby(dim, sort=True)["amount_sum"].sum()
+            return {
+                str(labels[k]): round(float(v), 2)
+                for k, v in sums.items()
+                if str(labels[k]).strip()
+            }
+
+        monthly = cells.loc[cells["month"] >= 0].groupby("month", sort=True)["amount_sum"].sum()
+        by_month = {
+            label: round(float(v), 2)
+            for label, v in zip(_month_labels(monthly.index.to_numpy()), monthly.to_numpy())
+        }
+
+        return PatternData(
+            by_month=by_month,
+            by_type=_totals("transaction_type", self.transaction_types),
+            by_currency=_totals("currency", self.currencies),
+            round_amount_ratio=round(float(cells["round_count"].sum() / total), 4),
+            avg_transaction_size=round(float(cells["amount_sum"].sum() / total), 2),
+            high_risk_country_exposure=round(float(cells["high_risk_count"].sum() / total), 4),
+        )
+
+
+def build_pattern_cube(
+    transactions_df: pd.DataFrame,
+    high_risk_countries_df: Optional[pd.DataFrame] = None,
+) -> Optional[PatternCube]:
+    """Aggregate a transaction table into a ``PatternCube`` in one grouped pass.
+
+    Round-amount and high-risk indicators are read from the ``tx_flags``
+    column when present (``DataStore`` keeps it in step with the loaded
+    high-risk list); otherwise they are computed from ``high_risk_countries_df``.
+    """
+    if transactions_df is None or transactions_df.empty:
+        return None
+
+    df = transactions_df
+    n = len(df)
+
+    def _codes(col: str) -> tuple[np.ndarray, pd.Index]:
+        codes, uniques = pd.factorize(_labels(df, col), sort=True)
+        return codes.astype(np.int32), pd.Index(uniques)
+
+    bcn_codes, bcns = _codes("business_contact_number")
+    type_codes, transaction_types = _codes("transaction_type")
+    currency_codes, currencies = _codes("currency")
+    month = _month_keys(df)
+
+    if "amount" in df.columns:
+        amounts = df[amount_column(df)].to_numpy(dtype=np.float64)
+    else:
+        amounts = np.zeros(n, dtype=np.float64)
+
+    flags = row_flags(df)
+    is_round = (flags & TxFlag.ROUND_AMOUNT) != 0
+    if FLAGS_COLUMN in df.columns:
+        is_high_risk = (flags & HIGH_RISK_FLAGS) != 0
+    else:
+        is_high_risk = high_risk_mask(df, high_risk_codes(high_risk_countries_df))
+
+    cells = (
+        pd.DataFrame({
+            "bcn": bcn_codes,
+            "month": month,
+            "transaction_type": type_codes,
+            "currency": currency_codes,
+            "amount_sum": amounts,
+            "tx_count": np.ones(n, dtype=np.int64),
+            "round_count": is_round.astype(np.int64),
+            "high_risk_count": is_high_risk.astype(np.int64),
+        })
+        .groupby(_DIMENSIONS, sort=True)
+        .sum()
+        .reset_index()
+    )
+
+    bcn_indptr = np.searchsorted(cells["bcn"].to_numpy(), np.arange(len(bcns) + 1), side="left")
+
+    return PatternCube(
+        cells=cells,
+        bcns=bcns,
+        transaction_types=transaction_types,
+        currencies=currencies,
+        bcn_indptr=bcn_indptr,
+    )
 
 
 def analyze_patterns(
     transactions_df: pd.DataFrame,
     high_risk_countries_df: Optional[pd.DataFrame] = None,
 ) -> PatternData:
-    """Analyze transaction patterns and return a PatternData object."""
+    """Analyze transaction patterns and return a PatternData object.
 
-    if transactions_df.empty:
+    For data already in ``DataStore`` prefer slicing the precomputed
+    ``DataStore.pattern_cube``; this builds a throwaway cube for ad-hoc frames.
+    """
+    cube = build_pattern_cube(transactions_df, high_risk_countries_df)
+    if cube is None:
         return PatternData()
-
-    df = transactions_df.copy()
-
-    # ---- By month ----
-    by_month: dict[str, float] = {}
-    if "date" in df.columns:
-        df["_date"] = pd.to_datetime(df["date"], errors="coerce")
-        valid_dates = df.dropna(subset=["_date"])
-        if not valid_dates.empty:
-            valid_dates = valid_dates.copy()
-            valid_dates["_month"] = valid_dates["_date"].dt.strftime("%Y-%m")
-            monthly = valid_dates.groupby("_month")["amount"].sum()
-            by_month = {str(k): round(float(v), 2) for k, v in monthly.items()}
-
-    # ---- By transaction type ----
-    by_type: dict[str, float] = {}
-    if "transaction_type" in df.columns:
-        type_groups = df.groupby("transaction_type")["amount"].sum()
-        by_type = {str(k): round(float(v), 2) for k, v in type_groups.items() if str(k).strip()}
-
-    # ---- By currency ----
-    by_currency: dict[str, float] = {}
-    if "currency" in df.columns:
-        currency_groups = df.groupby("currency")["amount"].sum()
-        by_currency = {str(k): round(float(v), 2) for k, v in currency_groups.items() if str(k).strip()}
-
-    # ---- Round amount ratio ----
-    round_amount_ratio = 0.0
-    if "amount" in df.columns and len(df) > 0:
-        round_mask = df["amount"].apply(
-            lambda x: abs(x) > 0 and (abs(x) % 1000 == 0 or abs(x) % 500 == 0)
-        )
-        round_amount_ratio = round(float(round_mask.sum() / len(df)), 4)
-
-    # ---- Average transaction size ----
-    avg_transaction_size = 0.0
-    if "amount" in df.columns and len(df) > 0:
-        avg_transaction_size = round(float(df["amount"].mean()), 2)
-
-    # ---- High risk country exposure ----
-    high_risk_country_exposure = 0.0
-    if high_risk_countries_df is not None and not high_risk_countries_df.empty:
-        if "country_code" in high_risk_countries_df.columns:
-            hr_codes = set(
-                high_risk_countries_df["country_code"]
-                .dropna()
-                .astype(str)
-                .str.strip()
-                .str.upper()
-                .tolist()
-            )
-
-            if hr_codes and len(df) > 0:
-                hr_count = 0
-                for _, row in df.iterrows():
-                    iban = str(row.get("iban", "")).strip().upper()
-                    bic = str(row.get("bic", "")).strip().upper()
-
-                    iban_country = iban[:2] if len(iban) >= 2 and iban[:2].isalpha() else ""
-                    bic_country = bic[4:6] if len(bic) >= 6 and bic[4:6].isalpha() else ""
-
-                    if iban_country in hr_codes or bic_country in hr_codes:
-                        hr_count += 1
-
-                high_risk_country_exposure = round(hr_count / len(df), 4)
-
-    return PatternData(
-        by_month=by_month,
-        by_type=by_type,
-        by_currency=by_currency,
-        round_amount_ratio=round_amount_ratio,
-        avg_transaction_size=avg_transaction_size,
-        high_risk_country_exposure=high_risk_country_exposure,
-    )
+    return cube.patterns()
@@ -0,0 +1,148 @@
+"""Peer groups - portfolio-wide amount and frequency baselines per customer segment.
+
+Customers are grouped by their dominant transaction type and the band of
+their average monthly EUR volume (``PEER_VOLUME_BANDS``).  The amount and
+monthly-frequency distributions of each group are reduced to a median and
+a ``PEER_BASELINE_QUANTILE`` quantile once per upload, so a rule reads its
+customer's peer baseline with one lookup.  A customer whose segment has
+fewer than ``PEER_GROUP_MIN_SIZE`` members (typically one pushed into an
+empty volume band by the very activity under review) is compared with its
+whole dominant type instead, and failing that with the whole book.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import PEER_BASELINE_QUANTILE, PEER_GROUP_MIN_SIZE, PEER_VOLUME_BANDS
+from services.fx_rates import amount_column
+
+
+@dataclass
+class PeerGroups:
+    """Peer group of every BCN and the baselines of every group.
+
+    ``group[c]`` is the group BCN ``bcns[c]`` is compared with (-1 when
+    none is large enough).  Group ``g`` holds ``size[g]`` customers whose
+    dominant transaction type is ``dominant_type[g]`` (None for the whole
+    book) and whose monthly volume falls in band ``band[g]`` (an index into
+    the ``PEER_VOLUME_BANDS`` edges, -1 for any volume).  Amount baselines
+    are over absolute EUR amounts, frequency baselines over transactions
+    per active month.
+    """
+
+    bcns: pd.Index
+    group: np.ndarray
+    dominant_type: np.ndarray
+    band: np.ndarray
+    size: np.ndarray
+    amount_median: np.ndarray
+    amount_quantile: np.ndarray
+    frequency_median: np.ndarray
+    frequency_quantile: np.ndarray
+
+    def group_for(self, bcn: str) -> int:
+        """Peer group ``bcn`` is compared with, -1 when unknown or without one."""
+        code = int(self.bcns.get_indexer([str(bcn)])[0])
+        return int(self.group[code]) if code >= 0 else -1
+
+    def label(self, g: int) -> str:
+        """Readable description of group ``g``."""
+        if self.dominant_type[g] is None:
+            return f"all customers ({int(self.size[g])} customers)"
+        edges = [0, *PEER_VOLUME_BANDS]
+        b = int(self.band[g])
+        if b < 0:
+            volume = ""
+        elif b + 1 < len(edges):
+            volume = f" with {edges[b]:,}-{edges[b + 1]:,} EUR/month"
+        else:
+            volume = f" with over {edges[b]:,} EUR/month"
+        return f"'{self.dominant_type[g] or 'untyped'}' customers{volume} ({int(self.size[g])} customers)"
+
+
+def _group_quantiles(values: np.ndarray, groups: np.ndarray, n_groups: int) -> tuple[np.ndarray, np.ndarray]:
+    median = np.full(n_groups, np.nan)
+    quantile = np.full(n_groups, np.nan)
+    if len(values):
+        stats = pd.Series(values).groupby(groups).quantile([0.5, PEER_BASELINE_QUANTILE]).unstack()
+        median[stats.index.to_numpy()] = stats[0.5].to_numpy()
+        quantile[stats.index.to_numpy()] = stats[PEER_BASELINE_QUANTILE].to_numpy()
+    return median, quantile
+
+
+def build_peer_groups(df: Optional[pd.DataFrame]) -> Optional[PeerGroups]:
+    """Assign every BCN to a peer group and compute the group baselines."""
+    required = {"amount", "business_contact_number"}
+    if df is None or df.empty or not required.issubset(df.columns):
+        return None
+
+    bcn, bcns = pd.factorize(df["business_contact_number"].astype(str).to_numpy(), sort=False)
+    n_bcns = len(bcns)
+    amount = np.abs(pd.to_numeric(df[amount_column(df)], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64))
+
+    if "transaction_type" in df.columns:
+        codes, uniques = pd.factorize(df["transaction_type"].to_numpy(), sort=False)
+        labels = pd.Series(uniques, dtype=object).fillna("").astype(str).str.strip().str.lower()
+        type_codes, types = pd.factorize(np.append(labels.to_numpy(), ""), sort=False)
+        row_type = type_codes[np.where(codes >= 0, codes, len(labels))]
+    else:
+        row_type, types = np.zeros(len(df), dtype=np.int64), np.array([""], dtype=object)
+
+    # Dominant type: most frequent per BCN, ties to the first-seen type
+    pair_counts = pd.DataFrame({"bcn": bcn, "type": row_type}).value_counts().reset_index(name="n")
+    pair_counts = pair_counts.sort_values(["bcn", "n", "type"], ascending=[True, False, True])
+    first = pair_counts.drop_duplicates("bcn")
+    dominant = np.zeros(n_bcns, dtype=np.int64)
+    dominant[first["bcn"].to_numpy()] = first["type"].to_numpy()
+
+    # Monthly counts over dated rows; volume per active month
+    if "date" in df.columns:
+        dates = pd.to_datetime(df["date"], errors="coerce")
+        dated = dates.notna().to_numpy()
+        month = (dates.dt.year * 12 + dates.dt.month).to_numpy()[dated].astype(np.int64)
+        monthly = pd.DataFrame({"bcn": bcn[dated], "month": month}).value_counts()
+        month_bcn = monthly.index.get_level_values("bcn").to_numpy()
+        month_count = monthly.to_numpy(dtype=np.float64)
+    else:
+        month_bcn, month_count = np.zeros(0, dtype=np.int64), np.zeros(0)
+    active_months = np.maximum(np.bincount(month_bcn, minlength=n_bcns), 1)
+    volume = np.bincount(bcn, weights=amount, minlength=n_bcns) / active_months
+    volume_band = np.searchsorted(np.asarray(PEER_VOLUME_BANDS, dtype=np.float64), volume, side="right")
+
+    # Groups: (type, band) segments, then whole dominant types, then the book
+    n_bands = len(PEER_VOLUME_BANDS) + 1
+    segment, keys = pd.factorize(dominant * n_bands + volume_band, sort=True)
+    n_segments, n_types = len(keys), len(types)
+    n_groups = n_segments + n_types + 1
+    levels = [segment, n_segments + dominant, np.full(n_bcns, n_groups - 1, dtype=np.int64)]
+    size = np.bincount(np.concatenate(levels), minlength=n_groups)
+
+    group = np.full(n_bcns, -1, dtype=np.int64)
+    for level in reversed(levels):
+        group = np.where(size[level] >= PEER_GROUP_MIN_SIZE, level, group)
+
+    # Each row (and customer-month) counts in its segment, its type and the book
+    amount_median, amount_quantile = _group_quantiles(
+        np.tile(amount, len(levels)), np.concatenate([level[bcn] for level in levels]), n_groups
+    )
+    frequency_median, frequency_quantile = _group_quantiles(
+        np.tile(month_count, len(levels)), np.concatenate([level[month_bcn] for level in levels]), n_groups
+    )
+
+    types = np.asarray(types, dtype=object)
+    return PeerGroups(
+        bcns=pd.Index(bcns),
+        group=group.astype(np.int32),
+        dominant_type=np.concatenate([types[keys // n_bands], types, np.array([None], dtype=object)]),
+        band=np.concatenate([keys % n_bands, np.full(n_types + 1, -1)]).astype(np.int32),
+        size=size,
+        amount_median=amount_median,
+        amount_quantile=amount_quantile,
+        frequency_median=frequency_median,
+        frequency_quantile=frequency_quantile,
+    )
@@ -0,0 +1,143 @@
+"""Portfolio summary - book-wide risk distribution of a screening run.
+
+The summary (score histogram, customers per risk level, alerts per type and
+the top-N customers) is accumulated from the alert columns while a run is
+screened and kept in memory once the run completes, so dashboards read it
+without touching the alert store.  Runs screened by another process (or
+before a restart) are summarised once from the store and cached too.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from config import (
+    PORTFOLIO_SCORE_BIN_WIDTH,
+    PORTFOLIO_SUMMARY_CACHE_SIZE,
+    PORTFOLIO_TOP_CUSTOMERS,
+    RISK_SCORE_CAP,
+)
+from models.schemas import CustomerRisk, PortfolioSummary, ScoreBin
+from services.alert_buffer import ALERT_TYPES
+from services.risk_scorer import RISK_LEVELS, risk_levels
+
+if TYPE_CHECKING:
+    from services.alert_store import AlertStore
+    from services.screening import ScreeningBatch
+
+
+def summarize(
+    run_id: str,
+    bcns: np.ndarray,
+    scores: np.ndarray,
+    alert_counts: np.ndarray,
+    type_counts: np.ndarray,
+) -> PortfolioSummary:
+    """Build the summary from per-customer scores and alert counts.
+
+    ``type_counts`` holds the number of alerts per ``ALERT_TYPES`` code.
+    """
+    edges = np.arange(0, RISK_SCORE_CAP + PORTFOLIO_SCORE_BIN_WIDTH, PORTFOLIO_SCORE_BIN_WIDTH, dtype=np.float64)
+    edges[-1] = max(edges[-1], RISK_SCORE_CAP)
+    histogram, _ = np.histogram(scores, bins=edges)
+    levels = risk_levels(scores)
+    level_counts = np.bincount(levels, minlength=len(RISK_LEVELS))
+
+    top = np.lexsort((bcns, -scores))[:PORTFOLIO_TOP_CUSTOMERS]
+    return PortfolioSummary(
+        run_id=run_id,
+        customer_count=len(bcns),
+        alert_count=int(type_counts.sum()),
+        score_histogram=[
+            ScoreBin(lower=float(lo), upper=float(hi), count=int(n))
+            for lo, hi, n in zip(edges[:-1], edges[1:], histogram)
+        ],
+        risk_level_counts={level: int(n) for level, n in zip(RISK_LEVELS, level_counts)},
+        alert_type_counts={at: int(n) for at, n in zip(ALERT_TYPES, type_counts)},
+        top_customers=[
+            CustomerRisk(
+                bcn=str(bcns[i]),
+                overall_score=float(scores[i]),
+                risk_level=RISK_LEVELS[levels[i]],
+                alert_count=int(alert_counts[i]),
+            )
+            for i in top.tolist()
+        ],
+    )
+
+
+class SummaryAccumulator:
+    """Collects the per-customer columns of a run batch by batch."""
+
+    def __init__(self) -> None:
+        self._bcns: list[np.ndarray] = []
+        self._scores: list[np.ndarray] = []
+        self._alert_counts: list[np.ndarray] = []
+        self.type_counts = np.zeros(len(ALERT_TYPES), dtype=np.int64)
+
+    def add(self, batch: ScreeningBatch) -> None:
+        buffer = batch.buffer
+        codes = buffer.bcns.get_indexer(batch.bcns)
+        self._bcns.append(np.asarray(batch.bcns, dtype=object))
+        self._scores.append(np.array([batch.risks[b].overall_score for b in batch.bcns], dtype=np.float64))
+        self._alert_counts.append(np.bincount(buffer.bcn, minlength=len(buffer.bcns))[codes])
+        self.type_counts += np.bincount(buffer.alert_type, minlength=len(ALERT_TYPES))
+
+    def summary(self, run_id: str) -> PortfolioSummary:
+        def cat(parts: list[np.ndarray], dtype) -> np.ndarray:
+            return np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+
+        return summarize(
+            run_id,
+            cat(self._bcns, object),
+            cat(self._scores, np.float64),
+            cat(self._alert_counts, np.int64),
+            self.type_counts,
+        )
+
+
+class SummaryCache:
+    """The most recent run summaries, in memory."""
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._items: OrderedDict[str, PortfolioSummary] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, summary: PortfolioSummary) -> None:
+        with self._lock:
+            self._items[summary.run_id] = summary
+            self._items.move_to_end(summary.run_id)
+            while len(self._items) > self._size:
+                self._items.popitem(last=False)
+
+    def keys(self) -> tuple[str, ...]:
+        with self._lock:
+            return tuple(self._items)
+
+    def values(self) -> list[PortfolioSummary]:
+        with self._lock:
+            return list(self._items.values())
+
+    def get(self, run_id: str) -> Optional[PortfolioSummary]:
+        with self._lock:
+            return self._items.get(run_id)
+
+    def load(self, store: AlertStore, run_id: str) -> PortfolioSummary:
+        """Cached summary of ``run_id``, summarising it from ``store`` on a miss."""
+        cached = self.get(run_id)
+        if cached is not None:
+            return cached
+        bcns, scores, alert_counts, by_type = store.run_customers(run_id)
+        type_counts = np.array([by_type.get(at.value, 0) for at in ALERT_TYPES], dtype=np.int64)
+        summary = summarize(run_id, bcns, scores, alert_counts, type_counts)
+        self.put(summary)
+        return summary
+
+
+# Shared cache filled by ``run_screening`` and read by the portfolio router
+summary_cache = SummaryCache(PORTFOLIO_SUMMARY_CACHE_SIZE)
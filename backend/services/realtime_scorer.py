@@ -0,0 +1,617 @@
+"""Real-time scoring - evaluate one incoming transaction against per-customer rule state.
+
+Batch screening re-reads a customer's whole history.  To score a payment
+as it arrives only what the rules depend on is kept per BCN: its dated
+rows of the last ``STATE_DAYS`` (the longest rule window) in date order,
+running amount and monthly counts for the profile, and the last activity
+date for dormancy.  A customer's state is bootstrapped from the loaded
+transactions the first time it is scored (and again after the book is
+reloaded, or after rows streamed in for the customer); afterwards each
+transaction only touches the rows in its windows.
+
+The checks are the trailing-window forms of the batch rules: every alert
+involves the new transaction and the rows of the window ending at it.
+Scored transactions are queued on ``DataStore`` and appended to the
+book every ``REALTIME_FLUSH_ROWS`` transactions.  The rows keep the
+customer-local indices they were scored with, so states survive a flush;
+rules needing the whole book (watchlist, rapid movement, round amounts,
+layering, cross-customer transfers) see them once it is merged.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    COUNTERPARTY_WINDOW_DAYS,
+    DORMANT_BURST_COUNT,
+    DORMANT_BURST_WINDOW_DAYS,
+    DORMANT_INACTIVITY_DAYS,
+    FLOW_THROUGH_MIN_AMOUNT,
+    FLOW_THROUGH_VARIANCE,
+    FLOW_THROUGH_WINDOW_DAYS,
+    PEER_BASELINE_QUANTILE,
+    PEER_DEVIATION_MULTIPLIER,
+    PROFILE_DEVIATION_MULTIPLIER,
+    REALTIME_FLUSH_ROWS,
+    STRUCTURING_WINDOW_DAYS,
+)
+from models.enums import AlertSeverity, AlertType, TxFlag
+from models.schemas import Alert, TransactionRecord, TransactionScore
+from services.data_store import DataStore
+from services.customer_index import CustomerIndex
+from services.fx_rates import amount_column, eur_amount, rate_table
+from services.risk_scorer import calculate_risk
+from services.rules import (
+    CounterpartyConcentrationRule,
+    DormantAccountRule,
+    FlowThroughRule,
+    HighRiskCountryRule,
+    ProfileDeviationRule,
+    StructuringDetectionRule,
+    ThresholdAlertRule,
+)
+from services.transaction_flags import amount_flags, static_flags
+from services.transfer_links import incoming_mask, is_incoming
+from utils.country_codes import high_risk_levels
+
+_DAY_NS = 86_400 * 10**9
+STATE_DAYS = max(STRUCTURING_WINDOW_DAYS, FLOW_THROUGH_WINDOW_DAYS, COUNTERPARTY_WINDOW_DAYS, DORMANT_BURST_WINDOW_DAYS)
+
+_STRUCTURING = StructuringDetectionRule()
+_THRESHOLD = ThresholdAlertRule()
+_COUNTERPARTY = CounterpartyConcentrationRule()
+_FLOW_THROUGH = FlowThroughRule()
+_DORMANT = DormantAccountRule()
+_PROFILE = ProfileDeviationRule()
+_HIGH_RISK = HighRiskCountryRule()
+
+# Striped per-customer scoring locks
+_LOCK_STRIPES = 64
+
+_STRING_FIELDS = ("sender", "receiver", "iban", "bic", "currency", "description", "transaction_type")
+
+
+@dataclass
+class CustomerState:
+    """Incremental rule state of one BCN.
+
+    ``ts`` / ``amount`` / ``local`` / ``incoming`` / ``band`` / ``sender`` /
+    ``receiver`` describe the dated rows of the last ``STATE_DAYS`` before
+    ``last_ts``, sorted by date (``amount`` in EUR, counterparties
+    lower-cased, "" when empty).
+    """
+
+    count: int = 0
+    amount_sum: float = 0.0
+    months: dict[int, int] = field(default_factory=dict)
+    last_ts: Optional[int] = None
+    # Start of the activity after the latest dormancy gap, and its gap
+    burst_start: Optional[int] = None
+    burst_gap_days: int = 0
+    burst_last_activity: Optional[int] = None
+    burst_alerted: bool = False
+    # Months already reported against the own / peer frequency baseline
+    alerted_months: set[int] = field(default_factory=set)
+    peer_alerted_months: set[int] = field(default_factory=set)
+    ts: list[int] = field(default_factory=list)
+    amount: list[float] = field(default_factory=list)
+    local: list[int] = field(default_factory=list)
+    incoming: list[bool] = field(default_factory=list)
+    band: list[bool] = field(default_factory=list)
+    sender: list[str] = field(default_factory=list)
+    receiver: list[str] = field(default_factory=list)
+
+    def window(self, start_ts: int, end_ts: int) -> range:
+        """Positions of the rows dated in ``[start_ts, end_ts]``."""
+        return range(bisect.bisect_left(self.ts, start_ts), bisect.bisect_right(self.ts, end_ts))
+
+    def add(self, ts: Optional[int], amount: float, incoming: bool, band: bool, sender: str, receiver: str) -> int:
+        """Record one row; returns its customer-local index."""
+        local = self.count
+        self.count += 1
+        self.amount_sum += amount
+        if ts is None:
+            return local
+        month = _month(ts)
+        self.months[month] = self.months.get(month, 0) + 1
+
+        if self.last_ts is not None and ts - self.last_ts >= DORMANT_INACTIVITY_DAYS * _DAY_NS:
+            self.burst_start = ts
+            self.burst_gap_days = int((ts - self.last_ts) // _DAY_NS)
+            self.burst_last_activity = self.last_ts
+            self.burst_alerted = False
+
+        pos = bisect.bisect_right(self.ts, ts)
+        for column, value in (
+            (self.ts, ts), (self.amount, amount), (self.local, local), (self.incoming, incoming),
+            (self.band, band), (self.sender, sender), (self.receiver, receiver),
+        ):
+            column.insert(pos, value)
+        self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+        drop = bisect.bisect_left(self.ts, self.last_ts - STATE_DAYS * _DAY_NS)
+        if drop:
+            for column in (self.ts, self.amount, self.local, self.incoming, self.band, self.sender, self.receiver):
+                del column[:drop]
+        return local
+
+
+def _month(ts: int) -> int:
+    stamp = pd.Timestamp(ts)
+    return stamp.year * 12 + stamp.month - 1
+
+
+def _day(ts: int) -> str:
+    return pd.Timestamp(ts).strftime("%Y-%m-%d")
+
+
+def _counterparty(value: Any) -> str:
+    return str(value).strip().lower() if value is not None and pd.notna(value) else ""
+
+
+def _alert(rule: Any, severity: AlertSeverity, alert_type: AlertType, description: str, rows: list[int]) -> Alert:
+    return Alert(
+        id=str(uuid.uuid4()),
+        rule_name=rule.rule_name,
+        severity=severity,
+        description=description,
+        affected_transaction_indices=sorted(rows),
+        alert_type=alert_type,
+    )
+
+
+# ---- bootstrap ----
+
+def _bootstrap(
+    bcn: str,
+    df: Optional[pd.DataFrame],
+    index: Optional[CustomerIndex],
+    queued: list[dict],
+) -> CustomerState:
+    """State of ``bcn`` from a snapshot of the loaded transactions plus its ``queued`` ones."""
+    state = CustomerState()
+    rows = index.rows_for(bcn) if df is not None and index is not None else np.zeros(0, dtype=np.int64)
+
+    if rows.size:
+        frame = df.iloc[rows]
+        amount = pd.to_numeric(frame[amount_column(frame)], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+        state.count = len(rows)
+        state.amount_sum = float(amount.sum())
+
+        dates = pd.to_datetime(frame["date"], errors="coerce") if "date" in frame.columns else None
+        if dates is not None and dates.notna().any():
+            ts = dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+            dated = np.flatnonzero(dates.notna().to_numpy())
+            months = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()[dated].astype(np.int64)
+            state.months = {int(m): int(c) for m, c in zip(*np.unique(months, return_counts=True))}
+
+            order = dated[np.argsort(ts[dated], kind="stable")]
+            sorted_ts = ts[order]
+            state.last_ts = int(sorted_ts[-1])
+            gaps = np.flatnonzero(np.diff(sorted_ts) >= DORMANT_INACTIVITY_DAYS * _DAY_NS)
+            if gaps.size:
+                g = int(gaps[-1]) + 1
+                state.burst_start = int(sorted_ts[g])
+                state.burst_gap_days = int((sorted_ts[g] - sorted_ts[g - 1]) // _DAY_NS)
+                state.burst_last_activity = int(sorted_ts[g - 1])
+                burst_end = state.burst_start + DORMANT_BURST_WINDOW_DAYS * _DAY_NS
+                state.burst_alerted = int(np.searchsorted(sorted_ts, burst_end, side="right")) - g >= DORMANT_BURST_COUNT
+
+            recent = order[sorted_ts >= state.last_ts - STATE_DAYS * _DAY_NS]
+            incoming = incoming_mask(frame, amount)
+            band = static_flags(frame.iloc[recent]) & TxFlag.STRUCTURING_BAND
+            state.ts = ts[recent].tolist()
+            state.amount = amount[recent].tolist()
+            state.local = recent.tolist()
+            state.incoming = incoming[recent].tolist()
+            state.band = (band != 0).tolist()
+            for col in ("sender", "receiver"):
+                values = frame[col].iloc[recent] if col in frame.columns else [""] * len(recent)
+                setattr(state, col, [_counterparty(v) for v in values])
+
+    for row in queued:
+        state.add(*_row_state(row)[0])
+
+    # Months over a baseline before now were reported by batch screening
+    if len(state.months) >= 2:
+        avg = sum(state.months.values()) / len(state.months)
+        state.alerted_months = {m for m, c in state.months.items() if c > avg * PROFILE_DEVIATION_MULTIPLIER}
+    peers = DataStore.peer_groups
+    group = peers.group_for(bcn) if peers is not None else -1
+    if group >= 0 and peers.frequency_quantile[group] > 0:
+        limit = peers.frequency_quantile[group] * PEER_DEVIATION_MULTIPLIER
+        state.peer_alerted_months = {m for m, c in state.months.items() if c > limit}
+    return state
+
+
+def _row_state(row: dict) -> tuple[tuple[Optional[int], float, bool, bool, str, str], int]:
+    """Arguments of ``CustomerState.add`` for a coerced row, and its static flag bits."""
+    date = row.get("date")
+    amount = eur_amount(float(row["amount"]), row.get("currency", ""), date, _rate_table())
+    if amount is None:
+        amount = float(row["amount"])
+    flags = int(amount_flags(np.array([amount]), np.array([float(row["amount"])]))[0])
+    args = (
+        int(date.value) if date is not None and pd.notna(date) else None,
+        amount,
+        is_incoming(amount, row.get("transaction_type")),
+        bool(flags & TxFlag.STRUCTURING_BAND),
+        _counterparty(row.get("sender")),
+        _counterparty(row.get("receiver")),
+    )
+    return args, flags
+
+
+_rates_cache: tuple[Optional[int], dict[str, tuple[np.ndarray, np.ndarray]]] = (None, {})
+
+
+def _rate_table() -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    global _rates_cache
+    df = DataStore.fx_rates_df
+    if _rates_cache[0] != id(df):
+        _rates_cache = (id(df), rate_table(df))
+    return _rates_cache[1]
+
+
+# ---- checks ----
+#
+# Each check sees the state after the new row at position ``pos`` (local
+# index ``local``) was added and returns the alerts it raises.
+
+def _check_threshold(state: CustomerState, row: dict, flags: int, amount: float, local: int) -> list[Alert]:
+    if not flags & TxFlag.LARGE:
+        return []
+    spec = _THRESHOLD.specs[0]
+    fields = {**spec.params, **row, "amount": amount, "date": _day(row["date"].value)}
+    return [_alert(_THRESHOLD, spec.severity, spec.alert_type, spec.template.format_map(fields), [local])]
+
+
+def _check_high_risk(row: dict, amount: float, local: int) -> list[Alert]:
+    levels = _high_risk_levels()
+    found = [
+        (code, source)
+        for code, source in (
+            (_HIGH_RISK._extract_country_iban(row.get("iban", "")), "IBAN"),
+            (_HIGH_RISK._extract_country_bic(row.get("bic", "")), "BIC"),
+        )
+        if code and code in levels
+    ]
+    alerts = []
+    for code, source in found:
+        blacklist = "blacklist" in levels[code].lower()
+        alerts.append(_alert(
+            _HIGH_RISK,
+            AlertSeverity.HIGH if blacklist else AlertSeverity.MEDIUM,
+            AlertType.HIGH_RISK_COUNTRY,
+            (
+                f"{'Blacklisted' if blacklist else 'Greylisted'} country {code} detected via {source} on "
+                f"transaction dated {_day(row['date'].value)}, amount {amount:,.2f} EUR. "
+                f"Sender: {row.get('sender') or 'N/A'}, Receiver: {row.get('receiver') or 'N/A'}."
+            ),
+            [local],
+        ))
+    return alerts
+
+
+_levels_cache: tuple[Optional[int], dict[str, str]] = (None, {})
+
+
+def _high_risk_levels() -> dict[str, str]:
+    global _levels_cache
+    df = DataStore.high_risk_countries_df
+    if _levels_cache[0] != id(df):
+        _levels_cache = (id(df), high_risk_levels(df) if df is not None else {})
+    return _levels_cache[1]
+
+
+def _check_structuring(state: CustomerState, ts: int) -> list[Alert]:
+    spec = _STRUCTURING.specs[0]
+    window = [p for p in state.window(ts - int(spec.window_days * _DAY_NS), ts) if state.band[p]]
+    amounts = [state.amount[p] for p in window]
+    if len(window) < spec.min_count or sum(amounts) <= spec.min_total:
+        return []
+    description = spec.template.format_map({
+        **spec.params,
+        "count": len(window),
+        "total": sum(amounts),
+        "first_date": _day(state.ts[window[0]]),
+        "last_date": _day(state.ts[window[-1]]),
+        "amounts": ", ".join(f"{a:,.2f}" for a in amounts),
+    })
+    return [_alert(_STRUCTURING, spec.severity, spec.alert_type, description, [state.local[p] for p in window])]
+
+
+def _check_counterparty(state: CustomerState, ts: int, row: dict) -> list[Alert]:
+    alerts = []
+    for spec in _COUNTERPARTY.specs:
+        if not _counterparty(row.get(spec.column)):
+            continue
+        start = ts - int(spec.window_days * _DAY_NS)
+        window = list(state.window(start, ts))
+        values = getattr(state, spec.column)
+        distinct = sorted({values[p] for p in window if values[p]})
+        total = sum(state.amount[p] for p in window)
+        if len(distinct) < spec.min_distinct or total <= spec.min_total:
+            continue
+        description = spec.template.format_map({
+            **spec.params,
+            "distinct": len(distinct),
+            "total": total,
+            "window_start": _day(start),
+            "window_end": _day(ts),
+            "values": ", ".join(distinct[:10]),
+        })
+        alerts.append(_alert(_COUNTERPARTY, spec.severity, spec.alert_type, description,
+                             [state.local[p] for p in window]))
+    return alerts
+
+
+def _check_flow_through(state: CustomerState, ts: int) -> list[Alert]:
+    start = ts - FLOW_THROUGH_WINDOW_DAYS * _DAY_NS
+    window = list(state.window(start, ts))
+    if len(window) < 2:
+        return []
+    total_in = sum(abs(state.amount[p]) for p in window if state.incoming[p])
+    total_out = sum(abs(state.amount[p]) for p in window if not state.incoming[p])
+    total = max(total_in, total_out)
+    if total < FLOW_THROUGH_MIN_AMOUNT or total_in <= 0 or total_out <= 0:
+        return []
+    variance = abs(total_in - total_out) / total
+    if variance > FLOW_THROUGH_VARIANCE:
+        return []
+    return [_alert(
+        _FLOW_THROUGH, AlertSeverity.HIGH, AlertType.FLOW_THROUGH,
+        (
+            f"Potential flow-through activity: incoming {total_in:,.2f} EUR vs outgoing {total_out:,.2f} EUR "
+            f"({variance:.1%} variance) between {_day(start)} and {_day(ts)} ({len(window)} transactions)."
+        ),
+        [state.local[p] for p in window],
+    )]
+
+
+def _check_dormant(state: CustomerState, ts: int) -> list[Alert]:
+    if state.burst_start is None or state.burst_alerted:
+        return []
+    burst_end = state.burst_start + DORMANT_BURST_WINDOW_DAYS * _DAY_NS
+    if ts > burst_end:
+        return []
+    window = list(state.window(state.burst_start, burst_end))
+    if len(window) < DORMANT_BURST_COUNT:
+        return []
+    state.burst_alerted = True
+    total = sum(state.amount[p] for p in window)
+    return [_alert(
+        _DORMANT, AlertSeverity.MEDIUM, AlertType.DORMANT_ACCOUNT,
+        (
+            f"Dormant account reactivation: {state.burst_gap_days} days of inactivity "
+            f"(last activity {_day(state.burst_last_activity)}), followed by {len(window)} transactions within "
+            f"{DORMANT_BURST_WINDOW_DAYS} days starting {_day(state.burst_start)}, totalling {total:,.2f} EUR."
+        ),
+        [state.local[p] for p in window],
+    )]
+
+
+def _check_profile(state: CustomerState, bcn: str, ts: int, amount: float, local: int) -> list[Alert]:
+    alerts = []
+    date_str = _day(ts)
+    month = _month(ts)
+    count = state.months[month]
+
+    def month_rows() -> list[int]:
+        start = pd.Timestamp(ts).to_period("M").start_time.value
+        return [state.local[p] for p in state.window(start, start + 32 * _DAY_NS) if _month(state.ts[p]) == month]
+
+    avg_amount = state.amount_sum / state.count
+    if avg_amount > 0 and amount > avg_amount * PROFILE_DEVIATION_MULTIPLIER:
+        alerts.append(_alert(
+            _PROFILE, AlertSeverity.MEDIUM, AlertType.PROFILE_DEVIATION,
+            (
+                f"Amount deviation: transaction of {amount:,.2f} EUR on {date_str} is "
+                f"{amount / avg_amount:.1f}x the historical average of {avg_amount:,.2f} EUR "
+                f"(threshold: {PROFILE_DEVIATION_MULTIPLIER}x)."
+            ),
+            [local],
+        ))
+    if len(state.months) >= 2 and month not in state.alerted_months:
+        avg_frequency = sum(state.months.values()) / len(state.months)
+        if count > avg_frequency * PROFILE_DEVIATION_MULTIPLIER:
+            state.alerted_months.add(month)
+            alerts.append(_alert(
+                _PROFILE, AlertSeverity.MEDIUM, AlertType.PROFILE_DEVIATION,
+                (
+                    f"Frequency deviation: {count} transactions in {pd.Timestamp(ts).to_period('M')} is "
+                    f"{count / avg_frequency:.1f}x the average monthly frequency of {avg_frequency:.1f} "
+                    f"(threshold: {PROFILE_DEVIATION_MULTIPLIER}x)."
+                ),
+                month_rows(),
+            ))
+
+    peers = DataStore.peer_groups
+    group = peers.group_for(bcn) if peers is not None else -1
+    if group < 0:
+        return alerts
+    peer_label = peers.label(group)
+    amount_baseline = peers.amount_quantile[group]
+    if amount_baseline > 0 and abs(amount) > amount_baseline * PEER_DEVIATION_MULTIPLIER:
+        alerts.append(_alert(
+            _PROFILE, AlertSeverity.MEDIUM, AlertType.PROFILE_DEVIATION,
+            (
+                f"Peer amount deviation: transaction of {abs(amount):,.2f} EUR on {date_str} is "
+                f"{abs(amount) / amount_baseline:.1f}x the {PEER_BASELINE_QUANTILE:.0%} quantile of "
+                f"{amount_baseline:,.2f} EUR among {peer_label} "
+                f"(peer median {peers.amount_median[group]:,.2f} EUR, threshold: {PEER_DEVIATION_MULTIPLIER}x)."
+            ),
+            [local],
+        ))
+    frequency_baseline = peers.frequency_quantile[group]
+    if (
+        frequency_baseline > 0
+        and month not in state.peer_alerted_months
+        and count > frequency_baseline * PEER_DEVIATION_MULTIPLIER
+    ):
+        state.peer_alerted_months.add(month)
+        alerts.append(_alert(
+            _PROFILE, AlertSeverity.MEDIUM, AlertType.PROFILE_DEVIATION,
+            (
+                f"Peer frequency deviation: {count} transactions in {pd.Timestamp(ts).to_period('M')} is "
+                f"{count / frequency_baseline:.1f}x the {PEER_BASELINE_QUANTILE:.0%} quantile of "
+                f"{frequency_baseline:.1f} per month among {peer_label} "
+                f"(peer median {peers.frequency_median[group]:.1f}, threshold: {PEER_DEVIATION_MULTIPLIER}x)."
+            ),
+            month_rows(),
+        ))
+    return alerts
+
+
+# ---- scorer ----
+
+class RealtimeScorer:
+    """Per-BCN states, dropped whenever the book is reloaded or FX rates change.
+
+    Appending the queued transactions keeps every state (the book then
+    holds the rows the state already counted); appending rows from
+    elsewhere drops the states of their BCNs (``forget``).
+
+    A customer's transactions are scored one at a time (striped locks).
+    ``DataStore.append_lock`` is only held to look a state up, and to
+    install it and queue the row once the checks ran; a state dropped in
+    between is bootstrapped again and the transaction re-scored.
+    """
+
+    def __init__(self) -> None:
+        self._states: dict[str, CustomerState] = {}
+        self._source: Optional[tuple] = None
+        # Bumped whenever states are dropped; bootstraps started before are discarded
+        self._epoch = 0
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+    def _check_source(self) -> None:
+        # EUR amounts change with the FX table, everything else with a reload
+        # (appends keep transactions_loaded_at)
+        source = (DataStore.transactions_loaded_at, id(DataStore.fx_rates_df))
+        if self._source != source:
+            self._states.clear()
+            self._source = source
+            self._epoch += 1
+
+    def _claim(self, bcn: str) -> tuple[Optional[CustomerState], int, tuple]:
+        """The state of ``bcn``, or None and the snapshot to bootstrap it from (hold ``append_lock``)."""
+        self._check_source()
+        state = self._states.get(bcn)
+        if state is not None:
+            return state, self._epoch, ()
+        queued = [r for r in DataStore.pending_transactions if r["business_contact_number"] == bcn]
+        return None, self._epoch, (DataStore.transactions_df, DataStore.customer_index, queued)
+
+    def _commit(self, bcn: str, state: CustomerState, epoch: int, fresh: bool, row: dict) -> Optional[int]:
+        """Queue ``row`` if ``state`` is still current; returns the number queued, else None (hold ``append_lock``)."""
+        while bcn in DataStore.merging_bcns:
+            DataStore.merge_done.wait()
+        self._check_source()
+        if fresh:
+            if self._epoch != epoch:
+                return None
+            self._states[bcn] = state
+        elif self._states.get(bcn) is not state:
+            return None
+        return DataStore.append_transaction(row)
+
+    def score(self, record: TransactionRecord) -> TransactionScore:
+        """Score ``record``, queue it on ``DataStore`` and return its alerts.
+
+        Raises ``ValueError`` for an unparseable date or one older than the
+        customer's real-time window.
+        """
+        row = coerce_record(record)
+        bcn = row["business_contact_number"]
+        ts = int(row["date"].value)
+        args, flags = _row_state(row)
+        amount = args[1]
+        with self._locks[hash(bcn) % _LOCK_STRIPES]:
+            pending = None
+            while pending is None:
+                with DataStore.append_lock:
+                    state, epoch, snapshot = self._claim(bcn)
+                fresh = state is None
+                if fresh:
+                    state = _bootstrap(bcn, *snapshot)
+                if state.last_ts is not None and ts < state.last_ts - STATE_DAYS * _DAY_NS:
+                    raise ValueError(
+                        f"Transaction dated {_day(ts)} is more than {STATE_DAYS} days before the customer's "
+                        f"latest activity ({_day(state.last_ts)}); upload it for batch screening instead."
+                    )
+                local = state.add(*args)
+
+                alerts = (
+                    _check_threshold(state, row, flags, amount, local)
+                    + _check_high_risk(row, amount, local)
+                    + _check_structuring(state, ts)
+                    + _check_counterparty(state, ts, row)
+                    + _check_flow_through(state, ts)
+                    + _check_dormant(state, ts)
+                    + _check_profile(state, bcn, ts, amount, local)
+                )
+                # Window checks only report windows the new row is part of
+                alerts = [a for a in alerts if local in a.affected_transaction_indices]
+                with DataStore.append_lock:
+                    pending = self._commit(bcn, state, epoch, fresh, row)
+
+        return TransactionScore(
+            business_contact_number=bcn,
+            transaction_index=local,
+            amount_eur=amount,
+            alerts=alerts,
+            risk=calculate_risk(alerts),
+            pending_count=pending,
+        )
+
+    def forget(self, bcns: list[str]) -> None:
+        """Drop the states of ``bcns`` (rows for them were appended to the book)."""
+        with DataStore.append_lock:
+            self._epoch += 1
+            for bcn in bcns:
+                self._states.pop(bcn, None)
+
+    def flush(self, force: bool = False) -> int:
+        """Merge queued transactions into the book once ``REALTIME_FLUSH_ROWS`` are pending (or when forced).
+
+        Scoring is not blocked while the merge is built (see
+        ``DataStore.flush_pending``).
+        """
+        if not force and len(DataStore.pending_transactions) < REALTIME_FLUSH_ROWS:
+            return 0
+        return DataStore.flush_pending()
+
+
+def coerce_record(record: TransactionRecord) -> dict:
+    """Row dict of ``record`` coerced the way uploaded transactions are."""
+    try:
+        date = pd.Timestamp(record.date)
+    except (TypeError, ValueError):
+        date = pd.NaT
+    if pd.isna(date):
+        raise ValueError(f"Unparseable transaction date '{record.date}'.")
+    if date.tzinfo is not None:
+        date = date.tz_convert(None)
+    row: dict[str, Any] = {
+        "date": pd.Timestamp(date),
+        "amount": float(record.amount),
+        "business_contact_number": str(record.business_contact_number).strip(),
+    }
+    for col in _STRING_FIELDS:
+        value = getattr(record, col)
+        row[col] = "" if value is None else str(value).strip()
+    return row
+
+
+# Shared scorer used by the score router
+scorer = RealtimeScorer()
+DataStore.add_append_listener(scorer.forget)
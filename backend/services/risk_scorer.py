@@ -2,16 +2,20 @@
 
 from __future__ import annotations
 
+import numpy as np
+
 from models.enums import AlertSeverity, AlertType, RiskLevel
 from models.schemas import Alert, RiskAssessment
 from config import RISK_SCORE_CAP, RISK_WEIGHTS
+from services.alert_buffer import ALERT_TYPES, SEVERITIES, AlertBuffer
 
 
 def _map_alert_to_weight_key(alert: Alert) -> str | None:
     """Map an Alert to the corresponding key in RISK_WEIGHTS."""
-    at = alert.alert_type
-    sev = alert.severity
+    return _weight_key(alert.alert_type, alert.severity)
+
 
+def _weight_key(at: AlertType, sev: AlertSeverity) -> str | None:
     if at == AlertType.STRUCTURING:
         return "structuring"
     if at == AlertType.THRESHOLD:
@@ -36,10 +40,23 @@ def _map_alert_to_weight_key(alert: Alert) -> str | None:
         return "profile_deviation"
     if at == AlertType.FLOW_THROUGH:
         return "flow_through"
+    if at == AlertType.LAYERING_CHAIN:
+        return "layering"
+    if at == AlertType.MATCHED_TRANSFER:
+        return "matched_transfer"
+    if at == AlertType.ROUND_TRIP:
+        return "round_trip"
+    if at == AlertType.SHARED_IBAN:
+        return "shared_iban"
 
     return None
 
 
+RISK_LEVELS = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL]
+# Upper score bound (inclusive) of each level but the last
+_LEVEL_BOUNDS = np.array([25, 50, 75], dtype=np.float64)
+
+
 def _score_to_level(score: float) -> RiskLevel:
     if score <= 25:
         return RiskLevel.LOW
@@ -76,3 +93,75 @@ def calculate_risk(alerts: list[Alert]) -> RiskAssessment:
         risk_level=_score_to_level(capped_score),
         contributing_factors=contributing_factors,
     )
+
+
+def _weight_tables() -> tuple[list[str], np.ndarray, np.ndarray]:
+    """RISK_WEIGHTS keys, the key code per (alert type, severity) code (-1: unweighted) and the weights."""
+    keys = sorted(RISK_WEIGHTS)
+    key_table = np.array(
+        [[keys.index(k) if (k := _weight_key(at, sev)) in RISK_WEIGHTS else -1 for sev in SEVERITIES]
+         for at in ALERT_TYPES],
+        dtype=np.int64,
+    )
+    weights = np.array([RISK_WEIGHTS[k] for k in keys], dtype=np.float64)
+    return keys, key_table, weights
+
+
+def risk_scores(
+    alert_type: np.ndarray,
+    severity: np.ndarray,
+    bcn: np.ndarray,
+    n_customers: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``calculate_risk`` scores over a whole alert table given as code arrays.
+
+    ``alert_type`` and ``severity`` are codes into ``ALERT_TYPES`` /
+    ``SEVERITIES`` and ``bcn`` customer codes in ``[0, n_customers)``.
+    Returns the capped score per customer, the positions of the alerts
+    that contributed (first alert of each customer and weight key, in
+    table order) and the weight-key code of every alert.
+    """
+    keys, key_table, weights = _weight_tables()
+    key_codes = key_table[alert_type, severity]
+    weighted = np.flatnonzero(key_codes >= 0)
+    _, first = np.unique(bcn[weighted].astype(np.int64) * len(keys) + key_codes[weighted], return_index=True)
+    first = weighted[np.sort(first)]
+    raw = np.bincount(bcn[first], weights=weights[key_codes[first]], minlength=n_customers)
+    return np.minimum(raw, RISK_SCORE_CAP), first, key_codes
+
+
+def risk_levels(scores: np.ndarray) -> np.ndarray:
+    """``RiskLevel`` code (index into ``RISK_LEVELS``) per score."""
+    return np.searchsorted(_LEVEL_BOUNDS, scores, side="left")
+
+
+def calculate_risk_batch(buffer: AlertBuffer) -> dict[str, RiskAssessment]:
+    """``calculate_risk`` for every customer of a columnar ``AlertBuffer`` at once.
+
+    Also fills ``buffer.score`` with each alert's customer risk score.
+    """
+    keys = sorted(RISK_WEIGHTS)
+    order, _ = buffer.order_by_bcn()
+    bcn_codes = buffer.bcn[order]
+    scores, first, key_codes = risk_scores(
+        buffer.alert_type[order], buffer.severity[order], bcn_codes, len(buffer.bcns)
+    )
+    levels = risk_levels(scores)
+
+    factors: list[list[str]] = [[] for _ in range(len(buffer.bcns))]
+    for pos in first.tolist():
+        i = order[pos]
+        factors[bcn_codes[pos]].append(
+            f"{buffer.rule_names[buffer.rule[i]]} ({SEVERITIES[buffer.severity[i]].value}): "
+            f"+{RISK_WEIGHTS[keys[key_codes[pos]]]} points"
+        )
+    buffer.score = scores[buffer.bcn].astype(np.float32)
+
+    return {
+        bcn: RiskAssessment(
+            overall_score=float(scores[code]),
+            risk_level=RISK_LEVELS[levels[code]],
+            contributing_factors=factors[code],
+        )
+        for code, bcn in enumerate(buffer.bcns)
+    }
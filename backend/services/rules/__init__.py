@@ -4,9 +4,13 @@ from services.rules.counterparty_concentration import CounterpartyConcentrationR
 from services.rules.dormant_account import DormantAccountRule
 from services.rules.flow_through import FlowThroughRule
 from services.rules.high_risk_country import HighRiskCountryRule
+from services.rules.layering_chain import LayeringChainRule
+from services.rules.matched_transfer import MatchedTransferRule
 from services.rules.profile_deviation import ProfileDeviationRule
 from services.rules.rapid_movement import RapidFundMovementRule
 from services.rules.round_amounts import RoundAmountPatternRule
+from services.rules.round_trip import RoundTripRule
+from services.rules.shared_iban import SharedIbanRule
 from services.rules.structuring import StructuringDetectionRule
 from services.rules.threshold import ThresholdAlertRule
 from services.rules.watchlist import WatchlistMatchRule
@@ -16,9 +20,13 @@ __all__ = [
     "DormantAccountRule",
     "FlowThroughRule",
     "HighRiskCountryRule",
+    "LayeringChainRule",
+    "MatchedTransferRule",
     "ProfileDeviationRule",
     "RapidFundMovementRule",
     "RoundAmountPatternRule",
+    "RoundTripRule",
+    "SharedIbanRule",
     "StructuringDetectionRule",
     "ThresholdAlertRule",
     "WatchlistMatchRule",
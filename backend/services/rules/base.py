@@ -13,6 +13,13 @@ from models.schemas import Alert
 class AMLRule(ABC):
     """Every AML rule must implement rule_name, description, and evaluate."""
 
+    # Days of history before a review period the rule needs to judge rows
+    # inside it (see ``AMLEngine.analyze_period``)
+    lookback_days: float = 0.0
+    # Alert indices refer to the customer's full history (e.g. via the
+    # portfolio graph) rather than to the frame passed to ``evaluate``
+    uses_customer_positions: bool = False
+
     @property
     @abstractmethod
     def rule_name(self) -> str:
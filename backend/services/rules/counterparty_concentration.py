@@ -2,22 +2,46 @@
 
 from __future__ import annotations
 
-import uuid
-from typing import Any
-
-import pandas as pd
-
 from config import (
     COUNTERPARTY_AGGREGATE,
     COUNTERPARTY_UNIQUE_MIN,
     COUNTERPARTY_WINDOW_DAYS,
 )
 from models.enums import AlertSeverity, AlertType
-from models.schemas import Alert
-from services.rules.base import AMLRule
+from services.rules.dsl import CountDistinctSpec, DeclarativeRule
+
+_TEMPLATE = (
+    "{label}: {distinct} unique counterparties "
+    "within {window_days} days "
+    "({window_start} to {window_end}), "
+    "aggregate {total:,.2f} EUR. "
+    "Counterparties: {values}."
+)
+
 
+def _concentration(column: str, label: str) -> CountDistinctSpec:
+    # Only the first detected window per direction is reported to avoid spam
+    return CountDistinctSpec(
+        column=column,
+        window_days=COUNTERPARTY_WINDOW_DAYS,
+        min_distinct=COUNTERPARTY_UNIQUE_MIN,
+        min_total=COUNTERPARTY_AGGREGATE,
+        severity=AlertSeverity.HIGH,
+        alert_type=AlertType.COUNTERPARTY_CONCENTRATION,
+        template=_TEMPLATE,
+        first_only=True,
+        params={"label": label, "window_days": COUNTERPARTY_WINDOW_DAYS},
+    )
 
-class CounterpartyConcentrationRule(AMLRule):
+
+class CounterpartyConcentrationRule(DeclarativeRule):
+
+    specs = (
+        # Fan-in: many senders to the customer
+        _concentration("sender", "Fan-in concentration"),
+        # Fan-out: customer sends to many receivers
+        _concentration("receiver", "Fan-out concentration"),
+    )
 
     @property
     def rule_name(self) -> str:
@@ -30,77 +54,3 @@ class CounterpartyConcentrationRule(AMLRule):
             f"counterparties within {COUNTERPARTY_WINDOW_DAYS} days with aggregate > "
             f"{COUNTERPARTY_AGGREGATE} EUR."
         )
-
-    def _check_direction(
-        self,
-        df: pd.DataFrame,
-        counterparty_col: str,
-        label: str,
-    ) -> list[Alert]:
-        """Check fan-in or fan-out using a sliding window."""
-        alerts: list[Alert] = []
-
-        if counterparty_col not in df.columns:
-            return alerts
-
-        dates = df["date"].tolist()
-
-        for i in range(len(df)):
-            window_start = dates[i]
-            window_end = window_start + pd.Timedelta(days=COUNTERPARTY_WINDOW_DAYS)
-
-            window_mask = (df["date"] >= window_start) & (df["date"] <= window_end)
-            window_df = df[window_mask]
-
-            unique_counterparties = window_df[counterparty_col].str.strip().str.lower().unique()
-            unique_counterparties = [c for c in unique_counterparties if c]
-
-            if len(unique_counterparties) < COUNTERPARTY_UNIQUE_MIN:
-                continue
-
-            aggregate = window_df["amount"].sum()
-            if aggregate <= COUNTERPARTY_AGGREGATE:
-                continue
-
-            window_indices = window_df.index.tolist()
-            alerts.append(
-                Alert(
-                    id=str(uuid.uuid4()),
-                    rule_name=self.rule_name,
-                    severity=AlertSeverity.HIGH,
-                    description=(
-                        f"{label}: {len(unique_counterparties)} unique counterparties "
-                        f"within {COUNTERPARTY_WINDOW_DAYS} days "
-                        f"({window_start.strftime('%Y-%m-%d')} to {window_end.strftime('%Y-%m-%d')}), "
-                        f"aggregate {aggregate:,.2f} EUR. "
-                        f"Counterparties: {', '.join(sorted(set(unique_counterparties))[:10])}."
-                    ),
-                    affected_transaction_indices=[int(j) for j in window_indices],
-                    alert_type=AlertType.COUNTERPARTY_CONCENTRATION,
-                )
-            )
-            # Only report the first detected window per direction to avoid spam
-            break
-
-        return alerts
-
-    def evaluate(self, transactions: pd.DataFrame, context: dict[str, Any]) -> list[Alert]:
-        alerts: list[Alert] = []
-
-        if transactions.empty or "date" not in transactions.columns:
-            return alerts
-
-        df = transactions.copy()
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-
-        if df.empty:
-            return alerts
-
-        # Fan-in: many senders to the customer
-        alerts.extend(self._check_direction(df, "sender", "Fan-in concentration"))
-
-        # Fan-out: customer sends to many receivers
-        alerts.extend(self._check_direction(df, "receiver", "Fan-out concentration"))
-
-        return alerts
@@ -18,6 +18,7 @@ from services.rules.base import AMLRule
 
 
 class DormantAccountRule(AMLRule):
+    lookback_days = DORMANT_INACTIVITY_DAYS
 
     @property
     def rule_name(self) -> str:
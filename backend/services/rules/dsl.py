@@ -0,0 +1,496 @@
+"""Declarative rule specs compiled to vectorized evaluation over many customers at once.
+
+Three typologies cover most transaction-monitoring rules:
+
+* ``ThresholdSpec`` - one alert per row matching a set of predicates.
+* ``WindowAggregateSpec`` - rolling time windows (starting at each matching
+  row) over the matching rows, alerting when count and total are reached.
+* ``CountDistinctSpec`` - rolling windows over all dated rows, alerting when
+  the number of distinct values in a column and the window total are reached.
+
+A spec is evaluated over a whole transaction table in one pass: rows are
+sorted once by (BCN, date) and every window is located with a single
+``searchsorted`` on a BCN-offset time key (see ``utils.windows``).  Alert
+descriptions are ``str.format`` templates filled from the matched rows,
+rendered only when an alert is materialised (see ``emit_specs``).
+"""
+
+from __future__ import annotations
+
+import operator
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Union
+
+import numpy as np
+import pandas as pd
+
+from models.enums import AlertSeverity, AlertType
+from models.schemas import Alert
+from services.alert_buffer import AlertBuffer
+from services.rules.base import AMLRule
+from services.transaction_flags import has_flag
+from utils.windows import concat_ranges, distinct_in_windows, prefix_sums, window_ends
+
+_NS_PER_SECOND = 1_000_000_000
+_SECONDS_PER_DAY = 86400
+# Relative distance from a limit within which prefix-sum totals are re-added exactly
+_TIE_TOLERANCE = 1e-6
+
+_OPERATORS = {
+    ">=": operator.ge,
+    ">": operator.gt,
+    "<=": operator.le,
+    "<": operator.lt,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+# ---- specs ----
+
+@dataclass(frozen=True)
+class Predicate:
+    """Row filter ``column <op> value``; rows lacking the column never match."""
+
+    column: str
+    op: str
+    value: Any
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        if self.column not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        return np.asarray(_OPERATORS[self.op](df[self.column], self.value), dtype=bool)
+
+
+@dataclass(frozen=True)
+class HasFlag:
+    """Row filter on the precomputed ``tx_flags`` bitmask (any of ``flag``'s bits)."""
+
+    flag: int
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        return has_flag(df, self.flag)
+
+
+RowFilter = Union[Predicate, HasFlag]
+
+
+@dataclass(frozen=True)
+class ThresholdSpec:
+    """One alert per row matching every predicate in ``where``.
+
+    Template fields: the row's columns, ``date`` (``YYYY-MM-DD``) and ``params``.
+    """
+
+    where: tuple[RowFilter, ...]
+    severity: AlertSeverity
+    alert_type: AlertType
+    template: str
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class WindowAggregateSpec:
+    """Windows of ``window_days`` over the rows matching ``where``.
+
+    A window starts at each matching row and alerts when it holds at least
+    ``min_count`` rows totalling more than ``min_total``.  Windows contained
+    in an already reported window are skipped.
+
+    Template fields: ``count``, ``total``, ``first_date``, ``last_date``,
+    ``amounts`` and ``params``.
+    """
+
+    where: tuple[RowFilter, ...]
+    window_days: float
+    min_count: int
+    min_total: float
+    severity: AlertSeverity
+    alert_type: AlertType
+    template: str
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class CountDistinctSpec:
+    """Windows of ``window_days`` from each dated row over all rows on or after its date.
+
+    Alerts when the window holds at least ``min_distinct`` distinct non-empty
+    (case-insensitive) values of ``column`` and totals more than ``min_total``.
+    With ``first_only`` only the earliest such window per customer is reported.
+
+    Template fields: ``distinct``, ``total``, ``window_start``, ``window_end``,
+    ``values`` (first ten distinct values, sorted) and ``params``.
+    """
+
+    column: str
+    window_days: float
+    min_distinct: int
+    min_total: float
+    severity: AlertSeverity
+    alert_type: AlertType
+    template: str
+    first_only: bool = True
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+RuleSpec = Union[ThresholdSpec, WindowAggregateSpec, CountDistinctSpec]
+
+
+# ---- compiled frame ----
+
+class _Fields(dict):
+    """Template fields; unknown names render as ``N/A``."""
+
+    def __missing__(self, key: str) -> str:
+        return "N/A"
+
+
+@dataclass
+class _Frame:
+    """Columnar view of a transaction table grouped by customer.
+
+    ``local`` is each row's index within its customer (the index the
+    per-customer frame from ``DataStore.get_customer_transactions`` uses),
+    ``order`` the dated rows sorted by (group, date) and ``key`` their
+    group-offset time key.
+    """
+
+    df: pd.DataFrame
+    groups: pd.Index
+    group: np.ndarray
+    local: np.ndarray
+    dates: pd.Series
+    amount: np.ndarray
+    order: np.ndarray
+    key: np.ndarray
+
+
+def _compile_frame(df: pd.DataFrame, by_bcn: bool, max_window_days: float) -> _Frame:
+    n = len(df)
+    if by_bcn and "business_contact_number" in df.columns:
+        group, groups = pd.factorize(df["business_contact_number"].astype(str).to_numpy(), sort=True)
+        local = pd.Series(group).groupby(group).cumcount().to_numpy()
+    else:
+        group, groups = np.zeros(n, dtype=np.int64), pd.Index([""])
+        local = np.asarray(df.index, dtype=np.int64)
+
+    if "date" in df.columns:
+        dates = pd.to_datetime(df["date"], errors="coerce").reset_index(drop=True)
+    else:
+        dates = pd.Series(pd.NaT, index=range(n), dtype="datetime64[ns]")
+    dated = dates.notna().to_numpy()
+    ts = np.zeros(n, dtype=np.int64)
+    ts[dated] = dates.to_numpy(dtype="datetime64[ns]")[dated].astype(np.int64) // _NS_PER_SECOND
+
+    rows = np.flatnonzero(dated)
+    order = rows[np.lexsort((ts[rows], group[rows]))]
+    sorted_ts = ts[order]
+    t0 = int(sorted_ts.min()) if len(order) else 0
+    span = (int(sorted_ts.max()) - t0 if len(order) else 0) + int(max_window_days * _SECONDS_PER_DAY) + 1
+    key = group[order].astype(np.int64) * span + (sorted_ts - t0)
+
+    amount = (
+        pd.to_numeric(df["amount"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+        if "amount" in df.columns else np.zeros(n, dtype=np.float64)
+    )
+    return _Frame(
+        df=df,
+        groups=pd.Index(groups),
+        group=np.asarray(group),
+        local=local,
+        dates=dates,
+        amount=amount,
+        order=order,
+        key=key,
+    )
+
+
+def _where(frame: _Frame, where: tuple[RowFilter, ...]) -> np.ndarray:
+    mask = np.ones(len(frame.df), dtype=bool)
+    for predicate in where:
+        mask &= predicate.mask(frame.df)
+    return mask
+
+
+def _day(frame: _Frame, row: int) -> str:
+    return frame.dates.iloc[row].strftime("%Y-%m-%d")
+
+
+def _tie_tolerance(limit: float) -> float:
+    return _TIE_TOLERANCE * max(1.0, abs(limit))
+
+
+def _exceeds(totals: np.ndarray, limit: float) -> np.ndarray:
+    """``totals > limit``, with near-ties left for an exact re-check."""
+    return totals > limit - _tie_tolerance(limit)
+
+
+# ---- evaluators ----
+#
+# Each evaluator returns an ``_Emission``: the alerts of one spec as arrays
+# (group code per alert, affected rows as a flat array plus per-alert
+# lengths) and a renderer that formats an alert's description on demand.
+
+@dataclass
+class _Emission:
+    groups: np.ndarray
+    lengths: np.ndarray
+    rows: np.ndarray
+    renderer: Any
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+
+def _empty_emission() -> _Emission:
+    empty = np.zeros(0, dtype=np.int64)
+    return _Emission(empty, empty, empty, None)
+
+
+class _ThresholdRenderer:
+    def __init__(self, spec: ThresholdSpec, frame: _Frame, rows: np.ndarray) -> None:
+        self.spec, self.frame, self.rows = spec, frame, rows
+
+    def description(self, k: int) -> str:
+        row = int(self.rows[k])
+        fields = _Fields(self.spec.params)
+        fields.update(self.frame.df.iloc[[row]].to_dict("records")[0])
+        if "date" in self.frame.df.columns:
+            fields["date"] = _day(self.frame, row) if pd.notna(self.frame.dates.iloc[row]) else "unknown date"
+        else:
+            fields["date"] = ""
+        return self.spec.template.format_map(fields)
+
+
+def _evaluate_threshold(spec: ThresholdSpec, frame: _Frame) -> _Emission:
+    rows = np.flatnonzero(_where(frame, spec.where))
+    return _Emission(
+        groups=frame.group[rows],
+        lengths=np.ones(len(rows), dtype=np.int64),
+        rows=rows,
+        renderer=_ThresholdRenderer(spec, frame, rows),
+    )
+
+
+class _WindowRenderer:
+    def __init__(self, spec: WindowAggregateSpec, frame: _Frame, rows: np.ndarray,
+                 starts: np.ndarray, ends: np.ndarray) -> None:
+        self.spec, self.frame, self.rows = spec, frame, rows
+        self.starts, self.ends = starts, ends
+
+    def description(self, k: int) -> str:
+        start, end = int(self.starts[k]), int(self.ends[k])
+        window_rows = self.rows[start:end]
+        window = self.frame.amount[window_rows].tolist()
+        fields = _Fields(self.spec.params)
+        fields.update(
+            count=len(window),
+            total=sum(window),
+            first_date=_day(self.frame, int(window_rows[0])),
+            last_date=_day(self.frame, int(window_rows[-1])),
+            amounts=", ".join(f"{a:,.2f}" for a in window),
+        )
+        return self.spec.template.format_map(fields)
+
+
+def _evaluate_window_aggregate(spec: WindowAggregateSpec, frame: _Frame) -> _Emission:
+    selected = _where(frame, spec.where)[frame.order]
+    rows = frame.order[selected]
+    if rows.size < spec.min_count:
+        return _empty_emission()
+    key = frame.key[selected]
+    amounts = frame.amount[rows]
+    positions = np.arange(len(rows))
+    all_ends = window_ends(key, spec.window_days * _SECONDS_PER_DAY)
+    sums = prefix_sums(amounts)
+    totals = sums[all_ends] - sums[positions]
+    starts = np.flatnonzero((all_ends - positions >= spec.min_count) & _exceeds(totals, spec.min_total))
+    starts = _confirm_totals(
+        starts, all_ends[starts],
+        lambda s, e: sum(amounts[s:e].tolist()), spec.min_total, totals[starts],
+    )
+    ends = all_ends[starts]
+    # Window ends never decrease, so a window is contained in an already
+    # reported one exactly when it ends where the previous reported one did
+    keep = np.ones(len(starts), dtype=bool)
+    keep[1:] = ends[1:] != ends[:-1]
+    starts, ends = starts[keep], ends[keep]
+
+    return _Emission(
+        groups=frame.group[rows[starts]],
+        lengths=(ends - starts).astype(np.int64),
+        rows=rows[concat_ranges(starts, ends)],
+        renderer=_WindowRenderer(spec, frame, rows, starts, ends),
+    )
+
+
+class _CountDistinctRenderer:
+    def __init__(self, spec: CountDistinctSpec, frame: _Frame, positions: np.ndarray,
+                 starts: np.ndarray, ends: np.ndarray, row_codes: np.ndarray, values: np.ndarray) -> None:
+        self.spec, self.frame, self.positions = spec, frame, positions
+        self.starts, self.ends = starts, ends
+        self.row_codes, self.values = row_codes, values
+
+    def description(self, k: int) -> str:
+        start, end = int(self.starts[k]), int(self.ends[k])
+        window_rows = self.frame.order[start:end]
+        window_values = {self.values[c] for c in self.row_codes[start:end].tolist() if c >= 0}
+        window_start = self.frame.dates.iloc[int(self.frame.order[self.positions[k]])]
+        fields = _Fields(self.spec.params)
+        fields.update(
+            distinct=len(window_values),
+            total=float(self.frame.amount[window_rows].sum()),
+            window_start=window_start.strftime("%Y-%m-%d"),
+            window_end=(window_start + pd.Timedelta(days=self.spec.window_days)).strftime("%Y-%m-%d"),
+            values=", ".join(sorted(window_values)[:10]),
+        )
+        return self.spec.template.format_map(fields)
+
+
+def _evaluate_count_distinct(spec: CountDistinctSpec, frame: _Frame) -> _Emission:
+    if spec.column not in frame.df.columns or frame.order.size == 0:
+        return _empty_emission()
+    codes, uniques = pd.factorize(frame.df[spec.column].to_numpy(), sort=False)
+    labels = pd.Series(uniques, dtype=object).fillna("").astype(str).str.strip().str.lower()
+    value_codes, values = pd.factorize(labels.where(labels != "").to_numpy(), sort=False)
+    row_codes = np.where(codes >= 0, value_codes[np.maximum(codes, 0)], -1)[frame.order]
+
+    key = frame.key
+    starts = np.searchsorted(key, key, side="left")
+    ends = window_ends(key, spec.window_days * _SECONDS_PER_DAY)
+    distinct = distinct_in_windows(row_codes, ends)[starts]
+    sorted_amounts = frame.amount[frame.order]
+    sums = prefix_sums(sorted_amounts)
+    positions = np.flatnonzero(
+        (distinct >= spec.min_distinct) & _exceeds(sums[ends] - sums[starts], spec.min_total)
+    )
+    positions = _confirm_totals(
+        positions, ends[positions],
+        lambda i, e: float(sorted_amounts[starts[i]:e].sum()), spec.min_total,
+        sums[ends[positions]] - sums[starts[positions]],
+    )
+    groups = frame.group[frame.order[positions]]
+    if spec.first_only:
+        _, first = np.unique(groups, return_index=True)
+        positions, groups = positions[first], groups[first]
+
+    window_starts, window_ends_ = starts[positions], ends[positions]
+    return _Emission(
+        groups=groups,
+        lengths=(window_ends_ - window_starts).astype(np.int64),
+        rows=frame.order[concat_ranges(window_starts, window_ends_)],
+        renderer=_CountDistinctRenderer(spec, frame, positions, window_starts, window_ends_, row_codes, values),
+    )
+
+
+def _confirm_totals(candidates: np.ndarray, ends: np.ndarray, exact_total, limit: float,
+                    approx: np.ndarray) -> np.ndarray:
+    """Drop candidates whose exact window total does not exceed ``limit``.
+
+    Prefix-sum totals are only re-added exactly for near-ties, where their
+    rounding could decide the comparison.
+    """
+    near = np.flatnonzero(np.abs(approx - limit) <= _tie_tolerance(limit))
+    if near.size == 0:
+        return candidates
+    keep = np.ones(len(candidates), dtype=bool)
+    for j in near.tolist():
+        keep[j] = exact_total(int(candidates[j]), int(ends[j])) > limit
+    return candidates[keep]
+
+
+_EVALUATORS = {
+    ThresholdSpec: _evaluate_threshold,
+    WindowAggregateSpec: _evaluate_window_aggregate,
+    CountDistinctSpec: _evaluate_count_distinct,
+}
+
+
+def _emissions(specs: tuple[RuleSpec, ...], transactions_df: pd.DataFrame, by_bcn: bool):
+    if transactions_df is None or transactions_df.empty or not specs:
+        return None, []
+    max_window = max((getattr(s, "window_days", 0) for s in specs), default=0)
+    frame = _compile_frame(transactions_df, by_bcn, max_window)
+    return frame, [(spec, _EVALUATORS[type(spec)](spec, frame)) for spec in specs]
+
+
+def evaluate_specs(
+    specs: tuple[RuleSpec, ...],
+    transactions_df: pd.DataFrame,
+    rule_name: str,
+    by_bcn: bool = True,
+) -> dict[str, list[Alert]]:
+    """Evaluate ``specs`` over a transaction table and group the alerts by BCN.
+
+    With ``by_bcn`` the table may hold many customers and alert indices are
+    positions within each customer's rows; otherwise the table is treated as
+    one customer, keyed ``""``, and indices are its index labels.
+    """
+    frame, emissions = _emissions(specs, transactions_df, by_bcn)
+    alerts: dict[str, list[Alert]] = {}
+    for spec, emission in emissions:
+        indptr = np.concatenate(([0], np.cumsum(emission.lengths)))
+        local = frame.local[emission.rows]
+        for k, group in enumerate(emission.groups.tolist()):
+            alerts.setdefault(str(frame.groups[group]), []).append(Alert(
+                id=str(uuid.uuid4()),
+                rule_name=rule_name,
+                severity=spec.severity,
+                description=emission.renderer.description(k),
+                affected_transaction_indices=[int(i) for i in local[indptr[k]:indptr[k + 1]]],
+                alert_type=spec.alert_type,
+            ))
+    return alerts
+
+
+def emit_specs(
+    specs: tuple[RuleSpec, ...],
+    transactions_df: pd.DataFrame,
+    buffer: AlertBuffer,
+    rule: int,
+) -> None:
+    """Evaluate ``specs`` over many customers straight into a columnar ``AlertBuffer``.
+
+    Descriptions are not rendered here; the buffer asks the spec's renderer
+    for them when an alert is serialized.
+    """
+    frame, emissions = _emissions(specs, transactions_df, by_bcn=True)
+    if frame is None:
+        return
+    bcn_codes = buffer.bcns.get_indexer(frame.groups)
+    for spec, emission in emissions:
+        if len(emission) == 0:
+            continue
+        buffer.extend(
+            rule,
+            spec.alert_type,
+            spec.severity,
+            bcn_codes[emission.groups],
+            emission.lengths,
+            frame.local[emission.rows],
+            emission.renderer,
+        )
+
+
+class DeclarativeRule(AMLRule):
+    """Rule defined by declarative ``specs``; subclasses only name and describe it."""
+
+    specs: tuple[RuleSpec, ...] = ()
+
+    @property
+    def lookback_days(self) -> float:
+        return max((getattr(s, "window_days", 0.0) for s in self.specs), default=0.0)
+
+    def evaluate(self, transactions: pd.DataFrame, context: dict[str, Any]) -> list[Alert]:
+        by_group = evaluate_specs(self.specs, transactions, self.rule_name, by_bcn=False)
+        return by_group.get("", [])
+
+    def evaluate_portfolio(self, transactions_df: pd.DataFrame) -> dict[str, list[Alert]]:
+        """Evaluate the rule for every customer in ``transactions_df`` in one pass."""
+        return evaluate_specs(self.specs, transactions_df, self.rule_name)
+
+    def emit_portfolio(self, transactions_df: pd.DataFrame, buffer: AlertBuffer, rule: int) -> None:
+        """Evaluate the rule for every customer in one pass into ``buffer`` as rule code ``rule``."""
+        emit_specs(self.specs, transactions_df, buffer, rule)
@@ -18,6 +18,7 @@ from services.rules.base import AMLRule
 
 
 class FlowThroughRule(AMLRule):
+    lookback_days = FLOW_THROUGH_WINDOW_DAYS
 
     @property
     def rule_name(self) -> str:
@@ -10,6 +10,7 @@ import pandas as pd
 from models.enums import AlertSeverity, AlertType
 from models.schemas import Alert
 from services.rules.base import AMLRule
+from services.transaction_flags import FLAGS_COLUMN, HIGH_RISK_FLAGS, has_flag
 
 
 class HighRiskCountryRule(AMLRule):
@@ -58,7 +59,12 @@ class HighRiskCountryRule(AMLRule):
         if not risk_lookup:
             return alerts
 
-        for idx, row in transactions.iterrows():
+        # Only rows whose precomputed bits mark a high-risk IBAN/BIC country
+        candidates = transactions
+        if FLAGS_COLUMN in transactions.columns:
+            candidates = transactions[has_flag(transactions, HIGH_RISK_FLAGS)]
+
+        for idx, row in candidates.iterrows():
             countries_found: list[tuple[str, str]] = []  # (country_code, source)
 
             if "iban" in transactions.columns:
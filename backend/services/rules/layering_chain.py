@@ -0,0 +1,75 @@
+"""Layering Chain Rule - detects multi-hop pass-through chains across customers."""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any
+
+import pandas as pd
+
+from config import (
+    LAYERING_AMOUNT_TOLERANCE,
+    LAYERING_MIN_AMOUNT,
+    LAYERING_WINDOW_HOURS,
+)
+from models.enums import AlertSeverity, AlertType
+from models.schemas import Alert
+from services.rules.base import AMLRule
+
+
+class LayeringChainRule(AMLRule):
+    uses_customer_positions = True
+
+    @property
+    def rule_name(self) -> str:
+        return "Multi-hop Layering Chain"
+
+    @property
+    def description(self) -> str:
+        return (
+            f"Detects chains of transfers >= {LAYERING_MIN_AMOUNT} EUR passing through "
+            f"several parties within {LAYERING_WINDOW_HOURS} hours with amounts within "
+            f"{LAYERING_AMOUNT_TOLERANCE:.0%} of the first transfer, using the portfolio-wide counterparty graph."
+        )
+
+    def evaluate(self, transactions: pd.DataFrame, context: dict[str, Any]) -> list[Alert]:
+        alerts: list[Alert] = []
+
+        graph = context.get("counterparty_graph")
+        if graph is None or transactions.empty or "business_contact_number" not in transactions.columns:
+            return alerts
+
+        bcn = str(transactions["business_contact_number"].iloc[0])
+
+        for chain in graph.find_chains(bcn):
+            own = graph.bcn_rows_in_chain(bcn, chain)
+            if not own:
+                continue
+            other_bcns = sorted(set(graph.bcns_in_chain(chain)) - {bcn})
+            # A single in-out pair inside one customer is already covered by RapidFundMovementRule
+            if len(chain) < 3 and not other_bcns:
+                continue
+
+            parties = [graph.node_labels[graph.src[chain[0]]]]
+            parties.extend(graph.node_labels[graph.dst[e]] for e in chain)
+            amounts = [float(graph.amount[e]) for e in chain]
+            start = pd.Timestamp(int(graph.ts[chain[0]]))
+            end = pd.Timestamp(int(graph.ts[chain[-1]]))
+
+            alerts.append(
+                Alert(
+                    id=str(uuid.uuid4()),
+                    rule_name=self.rule_name,
+                    severity=AlertSeverity.HIGH,
+                    description=(
+                        f"{len(chain)}-hop layering chain: {' -> '.join(parties)} "
+                        f"between {start.strftime('%Y-%m-%d %H:%M')} and {end.strftime('%Y-%m-%d %H:%M')}. "
+                        f"Amounts: {', '.join(f'{a:,.2f}' for a in amounts)} EUR."
+                        + (f" Other customers involved: {', '.join(other_bcns)}." if other_bcns else "")
+                    ),
+                    affected_transaction_indices=own,
+                    alert_type=AlertType.LAYERING_CHAIN,
+                )
+            )
+
+        return alerts
@@ -0,0 +1,73 @@
+"""Matched Transfer Rule - detects money passed between customers through one IBAN."""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any
+
+import pandas as pd
+
+from config import (
+    MATCHED_TRANSFER_MIN_AMOUNT,
+    MATCHED_TRANSFER_TOLERANCE,
+    MATCHED_TRANSFER_WINDOW_HOURS,
+)
+from models.enums import AlertSeverity, AlertType
+from models.schemas import Alert
+from services.rules.base import AMLRule
+
+
+def _when(ts: int) -> str:
+    return pd.Timestamp(int(ts)).strftime("%Y-%m-%d %H:%M")
+
+
+class MatchedTransferRule(AMLRule):
+    uses_customer_positions = True
+
+    @property
+    def rule_name(self) -> str:
+        return "Cross-customer Matched Transfer"
+
+    @property
+    def description(self) -> str:
+        return (
+            f"Detects payments >= {MATCHED_TRANSFER_MIN_AMOUNT} EUR to an IBAN that another customer "
+            f"receives from the same IBAN within {MATCHED_TRANSFER_WINDOW_HOURS} hours "
+            f"(amounts within {MATCHED_TRANSFER_TOLERANCE:.0%}), using the portfolio-wide transfer links."
+        )
+
+    def evaluate(self, transactions: pd.DataFrame, context: dict[str, Any]) -> list[Alert]:
+        alerts: list[Alert] = []
+
+        links = context.get("transfer_links")
+        if links is None or transactions.empty or "business_contact_number" not in transactions.columns:
+            return alerts
+
+        bcn = str(transactions["business_contact_number"].iloc[0])
+        pairs = links.pairs_for(bcn)
+        pairs = pairs[~links.round_trip[pairs]]
+
+        for p in pairs.tolist():
+            out_row, in_row = int(links.out_row[p]), int(links.in_row[p])
+            payer = str(links.bcns[links.bcn[out_row]])
+            payee = str(links.bcns[links.bcn[in_row]])
+            own = out_row if payer == bcn else in_row
+            lag = (int(links.ts[in_row]) - int(links.ts[out_row])) / 3.6e12
+
+            alerts.append(
+                Alert(
+                    id=str(uuid.uuid4()),
+                    rule_name=self.rule_name,
+                    severity=AlertSeverity.HIGH,
+                    description=(
+                        f"Matched transfer via IBAN {links.ibans[links.iban[out_row]]}: "
+                        f"{payer} paid {links.amount[out_row]:,.2f} EUR on {_when(links.ts[out_row])} and "
+                        f"{payee} received {links.amount[in_row]:,.2f} EUR from it on {_when(links.ts[in_row])} "
+                        f"({lag:.1f} hours later)."
+                    ),
+                    affected_transaction_indices=[int(links.local_index[own])],
+                    alert_type=AlertType.MATCHED_TRANSFER,
+                )
+            )
+
+        return alerts
@@ -1,4 +1,4 @@
-"""Profile Deviation Rule - detects transactions deviating from historical patterns."""
+"""Profile Deviation Rule - detects transactions deviating from historical and peer-group patterns."""
 
 from __future__ import annotations
 
@@ -7,13 +7,19 @@ from typing import Any
 
 import pandas as pd
 
-from config import PROFILE_DEVIATION_MULTIPLIER
+from config import (
+    PEER_BASELINE_QUANTILE,
+    PEER_DEVIATION_MULTIPLIER,
+    PROFILE_BASELINE_DAYS,
+    PROFILE_DEVIATION_MULTIPLIER,
+)
 from models.enums import AlertSeverity, AlertType
 from models.schemas import Alert
 from services.rules.base import AMLRule
 
 
 class ProfileDeviationRule(AMLRule):
+    lookback_days = PROFILE_BASELINE_DAYS
 
     @property
     def rule_name(self) -> str:
@@ -23,7 +29,8 @@ class ProfileDeviationRule(AMLRule):
     def description(self) -> str:
         return (
             f"Flags transactions exceeding {PROFILE_DEVIATION_MULTIPLIER}x the "
-            "historical average amount or monthly frequency."
+            "historical average amount or monthly frequency, or "
+            f"{PEER_DEVIATION_MULTIPLIER}x the {PEER_BASELINE_QUANTILE:.0%} quantile of the customer's peer group."
         )
 
     def evaluate(self, transactions: pd.DataFrame, context: dict[str, Any]) -> list[Alert]:
@@ -95,4 +102,65 @@ class ProfileDeviationRule(AMLRule):
                                 )
                             )
 
+        # ---- Peer-group deviation ----
+        peers = context.get("peer_groups")
+        if peers is not None and "business_contact_number" in df.columns:
+            group = peers.group_for(str(df["business_contact_number"].iloc[0]))
+            if group >= 0:
+                alerts.extend(self._peer_alerts(df, peers, group))
+
+        return alerts
+
+    def _peer_alerts(self, df: pd.DataFrame, peers: Any, group: int) -> list[Alert]:
+        alerts: list[Alert] = []
+        peer_label = peers.label(group)
+
+        amount_baseline = peers.amount_quantile[group]
+        if amount_baseline > 0:
+            threshold = amount_baseline * PEER_DEVIATION_MULTIPLIER
+            amounts = df["amount"].abs()
+            for idx in df.index[amounts > threshold]:
+                dt = pd.to_datetime(df.at[idx, "date"], errors="coerce") if "date" in df.columns else pd.NaT
+                date_str = dt.strftime("%Y-%m-%d") if pd.notna(dt) else "unknown date"
+                alerts.append(
+                    Alert(
+                        id=str(uuid.uuid4()),
+                        rule_name=self.rule_name,
+                        severity=AlertSeverity.MEDIUM,
+                        description=(
+                            f"Peer amount deviation: transaction of {amounts[idx]:,.2f} EUR on {date_str} is "
+                            f"{amounts[idx]/amount_baseline:.1f}x the {PEER_BASELINE_QUANTILE:.0%} quantile of "
+                            f"{amount_baseline:,.2f} EUR among {peer_label} "
+                            f"(peer median {peers.amount_median[group]:,.2f} EUR, "
+                            f"threshold: {PEER_DEVIATION_MULTIPLIER}x)."
+                        ),
+                        affected_transaction_indices=[int(idx)],
+                        alert_type=AlertType.PROFILE_DEVIATION,
+                    )
+                )
+
+        frequency_baseline = peers.frequency_quantile[group]
+        if frequency_baseline > 0 and "date" in df.columns:
+            months = pd.to_datetime(df["date"], errors="coerce").dt.to_period("M")
+            monthly_counts = months.dropna().groupby(months.dropna()).size()
+            freq_threshold = frequency_baseline * PEER_DEVIATION_MULTIPLIER
+            for period, count in monthly_counts.items():
+                if count > freq_threshold:
+                    alerts.append(
+                        Alert(
+                            id=str(uuid.uuid4()),
+                            rule_name=self.rule_name,
+                            severity=AlertSeverity.MEDIUM,
+                            description=(
+                                f"Peer frequency deviation: {count} transactions in {period} is "
+                                f"{count/frequency_baseline:.1f}x the {PEER_BASELINE_QUANTILE:.0%} quantile of "
+                                f"{frequency_baseline:.1f} per month among {peer_label} "
+                                f"(peer median {peers.frequency_median[group]:.1f}, "
+                                f"threshold: {PEER_DEVIATION_MULTIPLIER}x)."
+                            ),
+                            affected_transaction_indices=[int(j) for j in df.index[months == period]],
+                            alert_type=AlertType.PROFILE_DEVIATION,
+                        )
+                    )
+
         return alerts
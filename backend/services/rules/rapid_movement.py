@@ -18,6 +18,7 @@ from services.rules.base import AMLRule
 
 
 class RapidFundMovementRule(AMLRule):
+    lookback_days = RAPID_MOVEMENT_WINDOW_HOURS / 24
 
     @property
     def rule_name(self) -> str:
@@ -12,9 +12,11 @@ from config import (
     ROUND_AMOUNT_DIVISORS,
     ROUND_AMOUNT_RATIO,
 )
-from models.enums import AlertSeverity, AlertType
+from models.enums import AlertSeverity, AlertType, TxFlag
 from models.schemas import Alert
+from services.fx_rates import ORIGINAL_AMOUNT_COLUMN
 from services.rules.base import AMLRule
+from services.transaction_flags import has_flag
 
 
 class RoundAmountPatternRule(AMLRule):
@@ -31,13 +33,6 @@ class RoundAmountPatternRule(AMLRule):
             f"or {ROUND_AMOUNT_CONSECUTIVE_MIN}+ consecutive round amounts."
         )
 
-    def _is_round(self, amount: float) -> bool:
-        abs_amount = abs(amount)
-        for divisor in ROUND_AMOUNT_DIVISORS:
-            if abs_amount > 0 and abs_amount % divisor == 0:
-                return True
-        return False
-
     def evaluate(self, transactions: pd.DataFrame, context: dict[str, Any]) -> list[Alert]:
         alerts: list[Alert] = []
 
@@ -45,7 +40,9 @@ class RoundAmountPatternRule(AMLRule):
             return alerts
 
         df = transactions.copy()
-        df["_is_round"] = df["amount"].apply(self._is_round)
+        df["_is_round"] = has_flag(df, TxFlag.ROUND_AMOUNT)
+        # Round figures are listed as transacted, not as converted to EUR
+        transacted = ORIGINAL_AMOUNT_COLUMN if ORIGINAL_AMOUNT_COLUMN in df.columns else "amount"
 
         total = len(df)
         round_count = df["_is_round"].sum()
@@ -76,7 +73,7 @@ class RoundAmountPatternRule(AMLRule):
         # Flag consecutive round amounts
         if "date" in df.columns:
             df = df.sort_values("date").reset_index(drop=True)
-            df["_is_round"] = df["amount"].apply(self._is_round)
+            df["_is_round"] = has_flag(df, TxFlag.ROUND_AMOUNT)
 
         consecutive_start = None
         consecutive_count = 0
@@ -89,7 +86,7 @@ class RoundAmountPatternRule(AMLRule):
             else:
                 if consecutive_count >= ROUND_AMOUNT_CONSECUTIVE_MIN:
                     consec_indices = list(range(consecutive_start, consecutive_start + consecutive_count))
-                    amounts = [df.loc[i, "amount"] for i in consec_indices]
+                    amounts = [df.loc[i, transacted] for i in consec_indices]
                     alerts.append(
                         Alert(
                             id=str(uuid.uuid4()),
@@ -109,7 +106,7 @@ class RoundAmountPatternRule(AMLRule):
         # Check last sequence
         if consecutive_count >= ROUND_AMOUNT_CONSECUTIVE_MIN and consecutive_start is not None:
             consec_indices = list(range(consecutive_start, consecutive_start + consecutive_count))
-            amounts = [df.loc[i, "amount"] for i in consec_indices]
+            amounts = [df.loc[i, transacted] for i in consec_indices]
             alerts.append(
                 Alert(
                     id=str(uuid.uuid4()),
@@ -0,0 +1,70 @@
+"""Round Trip Rule - detects funds paid to an IBAN and received back from it."""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any
+
+import pandas as pd
+
+from config import (
+    MATCHED_TRANSFER_MIN_AMOUNT,
+    MATCHED_TRANSFER_TOLERANCE,
+    MATCHED_TRANSFER_WINDOW_HOURS,
+)
+from models.enums import AlertSeverity, AlertType
+from models.schemas import Alert
+from services.rules.base import AMLRule
+from services.rules.matched_transfer import _when
+
+
+class RoundTripRule(AMLRule):
+    uses_customer_positions = True
+
+    @property
+    def rule_name(self) -> str:
+        return "Round-trip Transfer"
+
+    @property
+    def description(self) -> str:
+        return (
+            f"Detects payments >= {MATCHED_TRANSFER_MIN_AMOUNT} EUR to an IBAN that come back from the "
+            f"same IBAN within {MATCHED_TRANSFER_WINDOW_HOURS} hours "
+            f"(amounts within {MATCHED_TRANSFER_TOLERANCE:.0%})."
+        )
+
+    def evaluate(self, transactions: pd.DataFrame, context: dict[str, Any]) -> list[Alert]:
+        alerts: list[Alert] = []
+
+        links = context.get("transfer_links")
+        if links is None or transactions.empty or "business_contact_number" not in transactions.columns:
+            return alerts
+
+        bcn = str(transactions["business_contact_number"].iloc[0])
+        pairs = links.pairs_for(bcn)
+        pairs = pairs[links.round_trip[pairs]]
+
+        for p in pairs.tolist():
+            out_row, in_row = int(links.out_row[p]), int(links.in_row[p])
+            out_amt, in_amt = float(links.amount[out_row]), float(links.amount[in_row])
+            lag = (int(links.ts[in_row]) - int(links.ts[out_row])) / 3.6e12
+
+            alerts.append(
+                Alert(
+                    id=str(uuid.uuid4()),
+                    rule_name=self.rule_name,
+                    severity=AlertSeverity.MEDIUM,
+                    description=(
+                        f"Round trip via IBAN {links.ibans[links.iban[out_row]]}: "
+                        f"paid {out_amt:,.2f} EUR on {_when(links.ts[out_row])}, "
+                        f"received {in_amt:,.2f} EUR back on {_when(links.ts[in_row])} "
+                        f"({lag:.1f} hours later, {abs(in_amt - out_amt) / out_amt:.1%} variance)."
+                    ),
+                    affected_transaction_indices=sorted(
+                        {int(links.local_index[out_row]), int(links.local_index[in_row])}
+                    ),
+                    alert_type=AlertType.ROUND_TRIP,
+                )
+            )
+
+        return alerts
@@ -0,0 +1,88 @@
+"""Shared IBAN Rule - detects counterparty accounts used by many customers."""
+
+from __future__ import annotations
+
+import uuid
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    SHARED_IBAN_MAX_BCNS,
+    SHARED_IBAN_MAX_SHARE,
+    SHARED_IBAN_MIN_BCNS,
+    SHARED_IBAN_WINDOW_DAYS,
+)
+from models.enums import AlertSeverity, AlertType
+from models.schemas import Alert
+from services.rules.base import AMLRule
+
+
+class SharedIbanRule(AMLRule):
+    uses_customer_positions = True
+
+    @property
+    def rule_name(self) -> str:
+        return "Shared Counterparty IBAN"
+
+    @property
+    def description(self) -> str:
+        return (
+            f"Flags counterparty IBANs used by {SHARED_IBAN_MIN_BCNS} or more customers within "
+            f"{SHARED_IBAN_WINDOW_DAYS} days (HIGH when the IBAN also passes matched transfers). "
+            f"IBANs used by more than {SHARED_IBAN_MAX_BCNS} customers or {SHARED_IBAN_MAX_SHARE:.0%} "
+            "of the book are treated as popular payees and only flag matched transfer legs."
+        )
+
+    def evaluate(self, transactions: pd.DataFrame, context: dict[str, Any]) -> list[Alert]:
+        alerts: list[Alert] = []
+
+        links = context.get("transfer_links")
+        if links is None or transactions.empty or "business_contact_number" not in transactions.columns:
+            return alerts
+
+        bcn = str(transactions["business_contact_number"].iloc[0])
+        # Never below the flagging threshold, or small books would treat every shared IBAN as popular
+        popular_above = max(
+            SHARED_IBAN_MIN_BCNS,
+            min(SHARED_IBAN_MAX_BCNS, SHARED_IBAN_MAX_SHARE * len(links.bcns)),
+        )
+        legs = None
+
+        for group in links.shared_for(bcn).tolist():
+            rows = links.shared_rows_for(group, bcn)
+            matched = bool(links.shared_has_matches[group])
+            popular = links.shared_bcn_count[group] > popular_above
+            if popular:
+                # Sharing a popular payee is normal; keep only this customer's matched legs
+                if legs is None:
+                    pairs = links.pairs_for(bcn)
+                    legs = np.concatenate([links.out_row[pairs], links.in_row[pairs]])
+                rows = rows[np.isin(rows, legs)]
+            if rows.size == 0:
+                continue
+            start = pd.Timestamp(int(links.shared_start[group])).strftime("%Y-%m-%d")
+            end = pd.Timestamp(int(links.shared_end[group])).strftime("%Y-%m-%d")
+
+            alerts.append(
+                Alert(
+                    id=str(uuid.uuid4()),
+                    rule_name=self.rule_name,
+                    severity=AlertSeverity.HIGH if matched else AlertSeverity.MEDIUM,
+                    description=(
+                        f"IBAN {links.ibans[links.shared_ibans[group]]} was used by "
+                        f"{int(links.shared_bcn_count[group])} customers between {start} and {end}; "
+                        + (
+                            f"this popular payee carried {rows.size} matched transfer leg(s) of this customer."
+                            if popular else
+                            f"this customer booked {rows.size} transaction(s) with it."
+                            + (" The IBAN also passed matched transfers between customers." if matched else "")
+                        )
+                    ),
+                    affected_transaction_indices=sorted(int(i) for i in links.local_index[rows]),
+                    alert_type=AlertType.SHARED_IBAN,
+                )
+            )
+
+        return alerts
@@ -6,12 +6,13 @@ import uuid
 from typing import Any
 
 import pandas as pd
-from rapidfuzz import fuzz
 
-from config import FUZZY_MATCH_HIGH, FUZZY_MATCH_MEDIUM
+from config import FUZZY_MATCH_HIGH
 from models.enums import AlertSeverity, AlertType
 from models.schemas import Alert
 from services.rules.base import AMLRule
+from services.transaction_flags import FLAGS_COLUMN, WATCHLIST_FLAGS, has_flag
+from services.watchlist_matcher import NAME_FIELDS, build_name_screening_table, name_positions
 
 
 class WatchlistMatchRule(AMLRule):
@@ -27,66 +28,56 @@ class WatchlistMatchRule(AMLRule):
     def evaluate(self, transactions: pd.DataFrame, context: dict[str, Any]) -> list[Alert]:
         alerts: list[Alert] = []
 
-        wl_df = context.get("watchlist_df")
-        if wl_df is None or wl_df.empty or "name" not in wl_df.columns:
-            return alerts
-
         if transactions.empty:
             return alerts
 
-        watchlist_names = wl_df["name"].dropna().astype(str).str.strip().tolist()
-        watchlist_names = [n for n in watchlist_names if n]
-
-        if not watchlist_names:
+        # Names are pre-screened at upload; fall back to screening this frame only
+        table = context.get("name_screening")
+        if table is not None and FLAGS_COLUMN in transactions.columns:
+            # Rows were flagged against this table: no watchlist-hit bit, nothing to look up
+            if not has_flag(transactions, WATCHLIST_FLAGS).any():
+                return alerts
+        if table is None:
+            table = build_name_screening_table(transactions, context.get("watchlist_df"))
+        if table is None or not table.matches:
             return alerts
 
-        # Track already-reported (entity, watchlist_entry) pairs to deduplicate
-        seen: set[tuple[str, str]] = set()
+        # One alert per (entity, watchlist_entry) pair, across both fields
+        by_pair: dict[tuple[str, str], Alert] = {}
 
-        for field in ["sender", "receiver"]:
+        for field in NAME_FIELDS:
             if field not in transactions.columns:
                 continue
 
-            for idx, row in transactions.iterrows():
-                entity_name = str(row[field]).strip()
-                if not entity_name:
+            names, positions = name_positions(transactions, field)
+            for lowered, indices in positions.items():
+                hits = table.matches.get(lowered)
+                if not hits:
                     continue
-
-                for wl_name in watchlist_names:
-                    score = fuzz.token_sort_ratio(entity_name.lower(), wl_name.lower())
-
-                    if score < FUZZY_MATCH_MEDIUM:
-                        continue
-
-                    dedup_key = (entity_name.lower(), wl_name.lower())
-                    if dedup_key in seen:
-                        # Still add the transaction index to the existing alert
-                        for alert in alerts:
-                            if (
-                                alert.alert_type == AlertType.WATCHLIST_MATCH
-                                and wl_name.lower() in alert.description.lower()
-                                and entity_name.lower() in alert.description.lower()
-                            ):
-                                if int(idx) not in alert.affected_transaction_indices:
-                                    alert.affected_transaction_indices.append(int(idx))
-                                break
+                entity_name = names.loc[indices[0]]
+
+                for wl_name, score in hits:
+                    dedup_key = (lowered, wl_name.lower())
+                    existing = by_pair.get(dedup_key)
+                    if existing is not None:
+                        for idx in indices:
+                            if idx not in existing.affected_transaction_indices:
+                                existing.affected_transaction_indices.append(idx)
                         continue
 
-                    seen.add(dedup_key)
                     severity = AlertSeverity.HIGH if score >= FUZZY_MATCH_HIGH else AlertSeverity.MEDIUM
-
-                    alerts.append(
-                        Alert(
-                            id=str(uuid.uuid4()),
-                            rule_name=self.rule_name,
-                            severity=severity,
-                            description=(
-                                f"Watchlist match: '{entity_name}' ({field}) matches "
-                                f"watchlist entry '{wl_name}' with score {score:.0f}%."
-                            ),
-                            affected_transaction_indices=[int(idx)],
-                            alert_type=AlertType.WATCHLIST_MATCH,
-                        )
+                    alert = Alert(
+                        id=str(uuid.uuid4()),
+                        rule_name=self.rule_name,
+                        severity=severity,
+                        description=(
+                            f"Watchlist match: '{entity_name}' ({field}) matches "
+                            f"watchlist entry '{wl_name}' with score {score:.0f}%."
+                        ),
+                        affected_transaction_indices=list(indices),
+                        alert_type=AlertType.WATCHLIST_MATCH,
                     )
+                    by_pair[dedup_key] = alert
+                    alerts.append(alert)
 
         return alerts
@@ -0,0 +1,184 @@
+"""Portfolio screening - run the AML engine for many customers and persist the results."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import pandas as pd
+
+from config import SCREENING_BATCH_SIZE
+from models.schemas import Alert, RiskAssessment
+from services.aml_engine import AMLEngine
+from services.alert_buffer import AlertBuffer
+from services.alert_store import AlertStore
+from services.data_store import DataStore
+from services.portfolio_summary import SummaryAccumulator, summary_cache
+from services.risk_scorer import calculate_risk_batch
+
+
+@dataclass
+class ScreeningBatch:
+    """Screening results for a chunk of customers.
+
+    Alerts stay in the columnar ``buffer`` until asked for; ``alerts_for``
+    renders one customer's alerts.
+    """
+
+    bcns: list[str]
+    frames: dict[str, pd.DataFrame]
+    buffer: AlertBuffer
+    risks: dict[str, RiskAssessment]
+
+    def __len__(self) -> int:
+        return len(self.bcns)
+
+    def alerts_for(self, bcn: str) -> list[Alert]:
+        return self.buffer.alerts_for(bcn)
+
+
+def review_period(
+    date_from: Optional[str],
+    date_to: Optional[str],
+) -> tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+    """Parse a ``from``/``to`` review period; a date-only ``to`` covers that whole day."""
+    start = end = None
+    try:
+        if date_from:
+            start = pd.Timestamp(date_from)
+        if date_to:
+            end = pd.Timestamp(date_to)
+            if end == end.normalize():
+                end = end + pd.Timedelta(days=1) - pd.Timedelta(1, unit="ns")
+    except ValueError:
+        raise ValueError("Review period dates must be YYYY-MM-DD.")
+    if start is not None and end is not None and start > end:
+        raise ValueError("'from' must not be after 'to'.")
+    return start, end
+
+
+def analyze_customer(
+    engine: AMLEngine,
+    bcn: str,
+    date_from: Optional[pd.Timestamp] = None,
+    date_to: Optional[pd.Timestamp] = None,
+) -> tuple[pd.DataFrame, list[Alert]]:
+    """Run the engine for one customer, optionally for a review period only.
+
+    Returns the customer's transactions (those dated in the period, when
+    one is given) indexed by their position in the full history, and the
+    alerts touching them.  A period is evaluated from the customer's
+    date-sorted rows with just the history the rules look back over (see
+    ``AMLEngine.analyze_period``).
+    """
+    context = DataStore.get_context()
+    if date_from is None and date_to is None:
+        tx_df = DataStore.get_customer_transactions(bcn)
+        return tx_df, engine.analyze(tx_df, context) if not tx_df.empty else []
+
+    history = DataStore.get_customer_period(bcn, date_from, date_to, engine.max_lookback_days)
+    if history.empty:
+        return history, []
+    dates = pd.to_datetime(history["date"], errors="coerce")
+    in_period = dates.notna()
+    if date_from is not None:
+        in_period &= dates >= date_from
+    if date_to is not None:
+        in_period &= dates <= date_to
+    return history.loc[in_period], engine.analyze_period(history, context, date_from, date_to)
+
+
+def screen_customers(engine: AMLEngine, bcns: list[str]) -> ScreeningBatch:
+    """Screen a chunk of customers together.
+
+    The customers' rows are fetched together so declarative rules run over
+    all of them in one pass (see ``AMLEngine.analyze_portfolio``), and risk
+    is scored from the alert columns without rendering any alert.
+    """
+    context = DataStore.get_context()
+    rows = DataStore.get_customers_transactions(bcns)
+    frames = {
+        str(bcn): group.reset_index(drop=True)
+        for bcn, group in rows.groupby(rows["business_contact_number"].astype(str), sort=False)
+    } if not rows.empty else {}
+    frames = {bcn: frames[bcn] for bcn in map(str, bcns) if bcn in frames}
+    buffer = engine.analyze_portfolio(frames, rows, context)
+    return ScreeningBatch(
+        bcns=list(frames),
+        frames=frames,
+        buffer=buffer,
+        risks=calculate_risk_batch(buffer),
+    )
+
+
+def run_screening(
+    engine: AMLEngine,
+    store: AlertStore,
+    bcns: Optional[list[str]] = None,
+    on_batch: Optional[Callable[[str, ScreeningBatch], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    base_run_id: Optional[str] = None,
+) -> str:
+    """Screen ``bcns`` (default: every customer) into a new run and return its ``run_id``.
+
+    Customers are processed in chunks of ``SCREENING_BATCH_SIZE``; each chunk
+    is persisted and handed to ``on_batch`` before the next one starts, so
+    partial results are visible early.  When ``should_stop`` returns True the
+    run is abandoned after the current chunk and deleted, as it is when
+    screening fails; completing a run prunes the store to the latest
+    ``ALERT_RUNS_KEPT`` runs.
+    With ``base_run_id`` the results of every other customer are carried
+    over from that run, so the new run still covers the whole book.
+    A completed run's portfolio summary is kept in ``summary_cache``.
+    """
+    # Network and peer rules read the whole-book structures appends defer
+    DataStore.refresh_deferred()
+    if bcns is None:
+        bcns = DataStore.get_all_bcns()
+
+    run_id = store.start_run(DataStore.transactions_revision())
+    try:
+        if base_run_id is not None:
+            store.copy_results(base_run_id, run_id, exclude=bcns)
+        summary = SummaryAccumulator()
+        for start in range(0, len(bcns), SCREENING_BATCH_SIZE):
+            if should_stop is not None and should_stop():
+                store.delete_run(run_id)
+                return run_id
+            batch = screen_customers(engine, bcns[start:start + SCREENING_BATCH_SIZE])
+            store.add_results(run_id, batch)
+            summary.add(batch)
+            if on_batch is not None:
+                on_batch(run_id, batch)
+    except Exception:
+        store.delete_run(run_id)
+        raise
+    store.complete_run(run_id)
+    store.prune()
+    if base_run_id is None:
+        summary_cache.put(summary.summary(run_id))
+    else:
+        summary_cache.load(store, run_id)
+    return run_id
+
+
+def rescreen_customers(
+    engine: AMLEngine,
+    store: AlertStore,
+    bcns: list[str],
+    on_batch: Optional[Callable[[str, ScreeningBatch], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Optional[str]:
+    """Re-screen ``bcns`` on top of the latest run and return the new ``run_id``.
+
+    Returns None when there is nothing to re-screen or no completed run
+    was screened against the currently loaded transactions.
+    """
+    revision = DataStore.transactions_revision()
+    if not bcns or revision is None:
+        return None
+    base = store.latest_run_id()
+    run = store.get_run(base) if base is not None else None
+    if run is None or run["transactions_loaded_at"] != revision:
+        return None
+    return run_screening(engine, store, bcns, on_batch=on_batch, should_stop=should_stop, base_run_id=base)
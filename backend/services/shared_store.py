@@ -0,0 +1,233 @@
+"""Shared snapshot store - memory-mapped copies of the uploaded frames for multi-worker mode.
+
+Each publish writes the changed frames into a new ``v<version>`` directory
+and a ``manifest.json`` naming, per frame, the version directory holding
+it.  ``VERSION`` holds the latest version number and is replaced
+atomically, so workers detect reloads with one small file read.
+Publishes hold an exclusive lock on ``LOCK`` from reading the current
+manifest to replacing ``VERSION``, so concurrent publishes from several
+workers each carry over the other's frames.
+
+Rows appended to the transactions are published as segments: the
+manifest's ``APPENDS`` entry lists, in order, the versions holding rows
+to add to the stored transactions, so workers pick up each other's
+appends without re-reading (or overwriting) the whole book.  Publishing
+the transactions themselves starts a new, empty list.
+
+Columns are stored as ``.npy`` files and attached with ``mmap_mode="r"``:
+numeric, boolean and datetime columns are shared read-only page-cache
+memory across workers.  String columns are stored as int32 codes plus
+their distinct values, so a worker only materialises one object per
+distinct string.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+# Frames mirrored from DataStore, in publish order
+FRAMES = ["transactions", "watchlist", "high_risk_countries", "work_instructions", "fx_rates"]
+
+# Manifest entry listing the versions that hold appended transaction rows
+APPENDS = "transactions_appends"
+
+_VERSION_FILE = "VERSION"
+_MANIFEST_FILE = "manifest.json"
+_META_FILE = "meta.json"
+_LOCK_FILE = "LOCK"
+
+
+def _version_dir(version: int) -> str:
+    return f"v{version:08d}"
+
+
+def write_frame(path: str, df: pd.DataFrame) -> None:
+    os.makedirs(path)
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        entry = {"name": str(col), "file": f"c{i}.npy"}
+        if pd.api.types.is_datetime64_dtype(series.dtype):
+            entry["kind"] = "datetime"
+            entry["dtype"] = str(series.dtype)
+            np.save(os.path.join(path, entry["file"]), series.to_numpy().view(np.int64))
+        elif pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+            entry["kind"] = "numeric"
+            np.save(os.path.join(path, entry["file"]), series.to_numpy())
+        else:
+            entry["kind"] = "codes"
+            entry["uniques"] = f"c{i}.uniques.npy"
+            codes, uniques = pd.factorize(series.astype(object).to_numpy(), use_na_sentinel=True)
+            np.save(os.path.join(path, entry["file"]), codes.astype(np.int32))
+            np.save(os.path.join(path, entry["uniques"]), np.asarray(uniques, dtype=object), allow_pickle=True)
+        columns.append(entry)
+
+    with open(os.path.join(path, _META_FILE), "w", encoding="utf-8") as fh:
+        json.dump({"length": len(df), "columns": columns}, fh)
+
+
+def read_frame(path: str, mmap: bool = True) -> pd.DataFrame:
+    with open(os.path.join(path, _META_FILE), encoding="utf-8") as fh:
+        meta = json.load(fh)
+
+    data: dict[str, np.ndarray] = {}
+    for entry in meta["columns"]:
+        values = np.load(os.path.join(path, entry["file"]), mmap_mode="r" if mmap else None)
+        if entry["kind"] == "datetime":
+            values = values.view(entry["dtype"])
+        elif entry["kind"] == "codes":
+            uniques = np.load(os.path.join(path, entry["uniques"]), allow_pickle=True)
+            # NaN is appended last so the -1 NA sentinel indexes it
+            values = np.append(uniques, np.nan).astype(object)[values]
+        data[entry["name"]] = values
+    return pd.DataFrame(data, index=pd.RangeIndex(meta["length"]), copy=False)
+
+
+class SharedStore:
+    """Versioned, memory-mapped frame snapshots under one directory."""
+
+    def __init__(self, root: str, keep_versions: int = 3):
+        self.root = root
+        self.keep_versions = keep_versions
+        # Lock depth of the current thread (``locked`` is re-entrant)
+        self._held = threading.local()
+
+    def current_version(self) -> int:
+        try:
+            with open(os.path.join(self.root, _VERSION_FILE), encoding="utf-8") as fh:
+                return int(fh.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def manifest(self, version: int) -> dict[str, Any]:
+        if version <= 0:
+            return {**{name: None for name in FRAMES}, APPENDS: []}
+        with open(os.path.join(self.root, _version_dir(version), _MANIFEST_FILE), encoding="utf-8") as fh:
+            return json.load(fh)
+
+    def load_frame(self, name: str, version: Optional[int]) -> Optional[pd.DataFrame]:
+        """Attach frame ``name`` as stored in version directory ``version``."""
+        if version is None:
+            return None
+        return read_frame(os.path.join(self.root, _version_dir(version), name))
+
+    def load_appended(self, versions: list[int]) -> Optional[pd.DataFrame]:
+        """The transaction rows appended in ``versions``, in order (None when there are none)."""
+        frames = [read_frame(os.path.join(self.root, _version_dir(v), APPENDS)) for v in versions]
+        if not frames:
+            return None
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the store's cross-process publish lock (re-entrant within a thread)."""
+        depth = getattr(self._held, "depth", 0)
+        if depth:
+            self._held.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._held.depth = depth
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, _LOCK_FILE), "a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            self._held.depth = 1
+            try:
+                yield
+            finally:
+                self._held.depth = 0
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+                else:
+                    fh.seek(0)
+                    msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def publish(self, changed: dict[str, Optional[pd.DataFrame]]) -> int:
+        """Write the ``changed`` frames as a new version and make it current.
+
+        Frames not in ``changed`` are carried over from the current manifest.
+        Returns the new version number.
+        """
+        with self.locked():
+            return self._publish(changed)
+
+    def append(self, rows: pd.DataFrame) -> int:
+        """Publish ``rows`` as appended to the stored transactions; returns the new version.
+
+        Callers hold ``locked()`` from catching up with the current version
+        until this returns, so every worker appends in the same order.
+        """
+        with self.locked():
+            return self._publish({}, rows)
+
+    def _publish(self, changed: dict[str, Optional[pd.DataFrame]], appended: Optional[pd.DataFrame] = None) -> int:
+        previous = self.current_version()
+        manifest = self.manifest(previous)
+        manifest.setdefault(APPENDS, [])
+
+        # Skip directories left behind by an interrupted publish
+        version = previous + 1
+        while True:
+            try:
+                os.mkdir(os.path.join(self.root, _version_dir(version)))
+                break
+            except FileExistsError:
+                version += 1
+        path = os.path.join(self.root, _version_dir(version))
+
+        for name, df in changed.items():
+            if df is None:
+                manifest[name] = None
+            else:
+                write_frame(os.path.join(path, name), df)
+                manifest[name] = version
+            if name == "transactions":
+                manifest[APPENDS] = []
+        if appended is not None:
+            write_frame(os.path.join(path, APPENDS), appended)
+            manifest[APPENDS] = manifest[APPENDS] + [version]
+
+        with open(os.path.join(path, _MANIFEST_FILE), "w", encoding="utf-8") as fh:
+            json.dump(manifest, fh)
+
+        tmp = os.path.join(self.root, f"{_VERSION_FILE}.{version}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(str(version))
+        if version > self.current_version():
+            os.replace(tmp, os.path.join(self.root, _VERSION_FILE))
+        else:
+            os.remove(tmp)
+
+        self._evict(version, manifest)
+        return version
+
+    def _evict(self, version: int, manifest: dict[str, Any]) -> None:
+        """Drop old versions that the latest manifest no longer references."""
+        referenced = {v for name, v in manifest.items() if name != APPENDS and v is not None}
+        referenced.update(manifest.get(APPENDS, []))
+        cutoff = version - self.keep_versions
+        for entry in os.listdir(self.root):
+            if not entry.startswith("v") or not entry[1:].isdigit():
+                continue
+            v = int(entry[1:])
+            if v <= cutoff and v not in referenced:
+                shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
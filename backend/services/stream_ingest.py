@@ -0,0 +1,221 @@
+"""Streaming transaction ingestion - chunked NDJSON or CSV bodies parsed in micro-batches.
+
+Body chunks are split into lines as they arrive and every
+``STREAM_BATCH_ROWS`` lines are parsed and coerced with the same rules as
+an uploaded workbook (``_normalize_columns`` + ``_coerce_transactions``),
+so at most one batch of raw text is held at a time.  The upload router
+stages coerced batches and appends them to ``DataStore`` every
+``STREAM_COMMIT_ROWS`` rows and at the end of the stream.  An append
+extends the per-row indexes with the new rows only, so its cost does not
+grow with the book; the whole-book structures are rebuilt once the
+stream has ended.
+
+Records are one per line: a JSON object per NDJSON line, or a CSV row
+after a header line (quoted fields must not contain line breaks).
+Malformed lines are counted as rejected rather than failing the stream.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+from typing import Optional
+
+import pandas as pd
+
+from config import (
+    REQUIRED_COLUMNS_TRANSACTIONS,
+    STREAM_BATCH_ROWS,
+    STREAM_MAX_LINE_BYTES,
+)
+from services.data_store import DataStore
+from services.excel_parser import _coerce_transactions, _normalize_columns
+
+STREAM_FORMATS = ("ndjson", "csv")
+
+_CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-lines": "ndjson",
+    "text/csv": "csv",
+    "application/csv": "csv",
+}
+
+_STRING_COLUMNS = ["sender", "receiver", "iban", "bic", "currency", "description", "transaction_type"]
+
+
+def stream_format(content_type: Optional[str], fmt: Optional[str] = None) -> str:
+    """Body format from an explicit ``fmt`` or the request's Content-Type."""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported stream format '{fmt}'; use one of {', '.join(STREAM_FORMATS)}.")
+        return fmt
+    media = (content_type or "").split(";", 1)[0].strip().lower()
+    if media not in _CONTENT_TYPES:
+        raise ValueError(
+            f"Cannot tell the stream format from Content-Type '{media}'; "
+            "send application/x-ndjson or text/csv, or pass format."
+        )
+    return _CONTENT_TYPES[media]
+
+
+class TransactionStream:
+    """Line splitter and micro-batch parser for one streamed body.
+
+    ``feed`` takes raw body chunks and ``finish`` the end of the body; both
+    return the complete line batches, which ``parse`` turns into coerced
+    frames (``parse`` is CPU-bound and meant for a worker thread).  Counts
+    and warnings are accumulated over the whole stream.
+    """
+
+    def __init__(self, fmt: str, batch_rows: int = STREAM_BATCH_ROWS) -> None:
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        # Normalized column names from the CSV header or first NDJSON record
+        self.columns: Optional[list[str]] = None
+        self.rejected = 0
+        self.unparseable_dates = 0
+        self._header: list[str] = []
+        self._warnings: dict[str, None] = {}
+        self._tail = b""
+        self._lines: list[bytes] = []
+        self._line_count = 0
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """Take one body chunk; returns the line batches it completes."""
+        data = self._tail + chunk
+        cut = data.rfind(b"\n") + 1
+        self._tail = data[cut:]
+        if len(self._tail) > STREAM_MAX_LINE_BYTES:
+            raise ValueError(f"A line exceeds {STREAM_MAX_LINE_BYTES} bytes.")
+        block = data[:cut]
+        if self.columns is None and block:
+            block = self._read_columns(block)
+        if block:
+            self._lines.append(block)
+            self._line_count += block.count(b"\n")
+        batches = []
+        while self._line_count >= self.batch_rows:
+            batches.append(self._take(self.batch_rows))
+        return batches
+
+    def finish(self) -> list[bytes]:
+        """End of body: the remaining (possibly unterminated) lines as a final batch."""
+        if self._tail:
+            return self.feed(b"\n") + self.finish()
+        return [self._take(self._line_count)] if self._lines else []
+
+    def _read_columns(self, block: bytes) -> bytes:
+        if self.fmt == "csv":
+            end = block.index(b"\n") + 1
+            self._header = next(csv.reader([block[:end].decode("utf-8-sig")]), [])
+            names = self._header
+            block = block[end:]
+        else:
+            first = next((line for line in block.splitlines() if line.strip()), None)
+            if first is None:
+                return block
+            try:
+                record = json.loads(first)
+            except ValueError:
+                record = None
+            names = list(record) if isinstance(record, dict) else []
+        self.columns = _normalize_columns(pd.DataFrame(columns=[str(n) for n in names])).columns.tolist()
+        return block
+
+    def _take(self, lines: int) -> bytes:
+        """The first ``lines`` buffered lines; the rest stay buffered."""
+        block = b"".join(self._lines)
+        cut = len(block)
+        if lines < self._line_count:
+            cut = -1
+            for _ in range(lines):
+                cut = block.index(b"\n", cut + 1)
+            cut += 1
+        self._lines = [block[cut:]] if cut < len(block) else []
+        self._line_count -= lines
+        return block[:cut]
+
+    def parse(self, block: bytes) -> tuple[pd.DataFrame, list[str]]:
+        """Coerced frame and warnings of one line batch."""
+        text = block.decode("utf-8", errors="replace")
+        if self.fmt == "csv":
+            width = len(self._header)
+            rows = [row for row in csv.reader(io.StringIO(text)) if row]
+            kept = [row for row in rows if len(row) == width]
+            df = pd.DataFrame(kept, columns=self._header)
+            rejected = len(rows) - len(kept)
+        else:
+            records = []
+            rejected = 0
+            for line in text.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                if isinstance(record, dict):
+                    records.append(record)
+                else:
+                    rejected += 1
+            df = pd.DataFrame.from_records(records)
+
+        warnings: list[str] = []
+        if len(df):
+            df, warnings = _coerce_transactions(_normalize_columns(df))
+            nat_count = int(df["date"].isna().sum()) if "date" in df.columns else 0
+            self.unparseable_dates += nat_count
+            for warning in warnings:
+                if warning != f"{nat_count} rows have unparseable dates":
+                    self._warnings[warning] = None
+        if rejected:
+            self.rejected += rejected
+            warnings.append(f"{rejected} malformed lines rejected")
+        return df, warnings
+
+    def warnings(self) -> list[str]:
+        """Distinct warnings of the whole stream, with totals for dates and rejected lines."""
+        warnings = list(self._warnings)
+        if self.unparseable_dates:
+            warnings.append(f"{self.unparseable_dates} rows have unparseable dates")
+        if self.rejected:
+            warnings.append(f"{self.rejected} malformed lines rejected")
+        return warnings
+
+
+def validate_stream_columns(columns: Optional[list[str]]) -> None:
+    """Reject an empty stream or one sharing no column with the transaction schema."""
+    if columns is None:
+        raise ValueError("The stream contains no transactions.")
+    if not set(columns) & set(REQUIRED_COLUMNS_TRANSACTIONS):
+        raise ValueError(
+            "The stream has no transaction columns; expected some of "
+            f"{', '.join(REQUIRED_COLUMNS_TRANSACTIONS)}."
+        )
+
+
+def stage(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """One frame of staged batches, with string columns missing from some (or all) of them filled with ""."""
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    for col in _STRING_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+        elif df[col].hasnans:
+            df[col] = df[col].fillna("")
+    return df
+
+
+def commit(df: pd.DataFrame, replace: bool) -> int:
+    """Append staged rows to the store (replacing the loaded transactions with ``replace``); returns their count.
+
+    Appends also merge queued real-time transactions, ahead of the staged rows.
+    """
+    if replace:
+        DataStore.set_transactions(df)
+    else:
+        DataStore.append_transactions(df)
+    return len(df)
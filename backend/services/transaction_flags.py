@@ -0,0 +1,147 @@
+"""Per-transaction flag bitmask - row-level predicates computed once per upload.
+
+Amount-based bits (large, structuring band, round) only depend on the row
+and are set by ``parse_transactions`` (and refreshed by ``DataStore`` when
+FX rates change the EUR amounts).  Reference-list bits (high-risk IBAN
+or BIC country, watchlist-hit sender or receiver) are refreshed by
+``DataStore`` whenever the high-risk country list or watchlist changes.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    LARGE_TX_THRESHOLD,
+    ROUND_AMOUNT_DIVISORS,
+    STRUCTURING_LOWER_BOUND,
+    STRUCTURING_THRESHOLD,
+)
+from models.enums import TxFlag
+from services.country_index import CountryIndex
+from services.fx_rates import amount_column
+from utils.country_codes import bic_country, iban_country
+
+FLAGS_COLUMN = "tx_flags"
+
+STATIC_FLAGS = TxFlag.LARGE | TxFlag.STRUCTURING_BAND | TxFlag.ROUND_AMOUNT
+HIGH_RISK_FLAGS = TxFlag.HIGH_RISK_IBAN | TxFlag.HIGH_RISK_BIC
+WATCHLIST_FLAGS = TxFlag.WATCHLIST_SENDER | TxFlag.WATCHLIST_RECEIVER
+
+_FLAG_DTYPE = np.uint8
+
+
+def static_flags(df: pd.DataFrame) -> np.ndarray:
+    """Amount-based bits for every row of ``df``.
+
+    Size bands use the EUR amount when normalized; round amounts are a
+    property of the figure as transacted, so they use the original amount.
+    """
+    if "amount" not in df.columns:
+        return np.zeros(len(df), dtype=_FLAG_DTYPE)
+    return amount_flags(
+        pd.to_numeric(df[amount_column(df)], errors="coerce").to_numpy(dtype=np.float64),
+        pd.to_numeric(df["amount"], errors="coerce").to_numpy(dtype=np.float64),
+    )
+
+
+def amount_flags(amount: np.ndarray, original: np.ndarray) -> np.ndarray:
+    """``static_flags`` from the EUR and the transacted amounts."""
+    flags = np.zeros(len(amount), dtype=_FLAG_DTYPE)
+    abs_amount = np.abs(original)
+    is_round = np.zeros(len(amount), dtype=bool)
+    for divisor in ROUND_AMOUNT_DIVISORS:
+        is_round |= abs_amount % divisor == 0
+    is_round &= abs_amount > 0
+
+    flags[amount >= LARGE_TX_THRESHOLD] |= _FLAG_DTYPE(TxFlag.LARGE)
+    flags[(amount >= STRUCTURING_LOWER_BOUND) & (amount < STRUCTURING_THRESHOLD)] |= _FLAG_DTYPE(TxFlag.STRUCTURING_BAND)
+    flags[is_round] |= _FLAG_DTYPE(TxFlag.ROUND_AMOUNT)
+    return flags
+
+
+def high_risk_flags(
+    df: pd.DataFrame,
+    codes: set[str],
+    index: Optional[CountryIndex] = None,
+    rows: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """High-risk IBAN/BIC country bits for the given set of country codes.
+
+    With a ``CountryIndex`` of ``df`` the countries are looked up instead
+    of extracted, and ``rows`` may restrict the result to those rows.
+    """
+    if index is not None:
+        iban_hit, bic_hit = index.matches(codes, rows)
+        flags = np.zeros(len(iban_hit), dtype=_FLAG_DTYPE)
+        flags[iban_hit] |= _FLAG_DTYPE(TxFlag.HIGH_RISK_IBAN)
+        flags[bic_hit] |= _FLAG_DTYPE(TxFlag.HIGH_RISK_BIC)
+        return flags
+    if rows is not None:
+        df = df.iloc[rows]
+    flags = np.zeros(len(df), dtype=_FLAG_DTYPE)
+    if not codes:
+        return flags
+    if "iban" in df.columns:
+        flags[iban_country(df["iban"]).isin(codes).to_numpy()] |= _FLAG_DTYPE(TxFlag.HIGH_RISK_IBAN)
+    if "bic" in df.columns:
+        flags[bic_country(df["bic"]).isin(codes).to_numpy()] |= _FLAG_DTYPE(TxFlag.HIGH_RISK_BIC)
+    return flags
+
+
+def watchlist_flags(df: pd.DataFrame, matched_names: Optional[set[str] | dict]) -> np.ndarray:
+    """Bits for rows whose sender/receiver (lower-cased, stripped) has a watchlist match."""
+    flags = np.zeros(len(df), dtype=_FLAG_DTYPE)
+    if not matched_names:
+        return flags
+    for col, bit in (("sender", TxFlag.WATCHLIST_SENDER), ("receiver", TxFlag.WATCHLIST_RECEIVER)):
+        if col not in df.columns:
+            continue
+        codes, uniques = pd.factorize(df[col].to_numpy(), sort=False)
+        names = pd.Series(uniques, dtype=object).fillna("").astype(str).str.strip().str.lower()
+        hit = names.isin(matched_names).to_numpy()
+        flags[(codes >= 0) & hit[np.maximum(codes, 0)]] |= _FLAG_DTYPE(bit)
+    return flags
+
+
+def replace_bits(current: np.ndarray, mask: int, bits: np.ndarray) -> np.ndarray:
+    """Replace the bits selected by ``mask`` in ``current`` with ``bits``."""
+    return (current & _FLAG_DTYPE(~mask & 0xFF)) | bits
+
+
+def row_flags(df: pd.DataFrame) -> np.ndarray:
+    """The ``tx_flags`` column, or freshly computed static bits when it is absent."""
+    if FLAGS_COLUMN in df.columns:
+        return df[FLAGS_COLUMN].to_numpy(dtype=_FLAG_DTYPE)
+    return static_flags(df)
+
+
+def has_flag(df: pd.DataFrame, flag: int) -> np.ndarray:
+    """Boolean mask of rows with any of the bits in ``flag`` set."""
+    return (row_flags(df) & flag) != 0
+
+
+def parse_flags(names: list[str]) -> int:
+    """Combine indicator flag names (case-insensitive) into a bitmask."""
+    invalid = [n for n in names if n.upper() not in TxFlag.__members__]
+    if invalid:
+        raise ValueError(
+            f"Invalid flag(s): {', '.join(invalid)}. Allowed: {', '.join(TxFlag.__members__)}."
+        )
+    wanted = 0
+    for name in names:
+        wanted |= TxFlag[name.upper()]
+    return wanted
+
+
+def matching_rows(bits: np.ndarray, wanted: int, match_all: bool = False) -> np.ndarray:
+    """Boolean mask of rows with all (or any) of the bits in ``wanted`` set."""
+    return (bits & wanted) == wanted if match_all else (bits & wanted) != 0
+
+
+def flag_names(value: int) -> list[str]:
+    """Decode a bitmask into its flag names, in bit order."""
+    return [f.name for f in TxFlag if value & f]
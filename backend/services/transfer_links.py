@@ -0,0 +1,324 @@
+"""Transfer links - portfolio-wide matched transfers and shared counterparty IBANs.
+
+Two cross-customer patterns are derived from the full transaction table
+once per upload:
+
+* matched transfers - an outgoing payment to an IBAN followed, within
+  ``MATCHED_TRANSFER_WINDOW_HOURS``, by an incoming payment of about the
+  same amount from that IBAN.  When the incoming leg belongs to another
+  customer the IBAN passed money between them (a mule account); when it
+  belongs to the payer the money went round trip.  Legs are hash-joined on
+  ``(IBAN, amount bucket)`` - buckets are ``MATCHED_TRANSFER_TOLERANCE``
+  wide on a log scale, so a match is in the same or an adjacent bucket -
+  and each outgoing leg's time window is located with a binary search in
+  the incoming legs sorted by key and time.
+* shared IBANs - counterparty IBANs used by at least
+  ``SHARED_IBAN_MIN_BCNS`` customers within ``SHARED_IBAN_WINDOW_DAYS``,
+  found with a sweep over per-customer coverage intervals.
+
+No step compares transactions pairwise; the cost is a few sorts over the
+table plus the number of candidate matches.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    MATCHED_TRANSFER_MAX_CANDIDATES,
+    MATCHED_TRANSFER_MIN_AMOUNT,
+    MATCHED_TRANSFER_TOLERANCE,
+    MATCHED_TRANSFER_WINDOW_HOURS,
+    SHARED_IBAN_MIN_BCNS,
+    SHARED_IBAN_WINDOW_DAYS,
+)
+from services.fx_rates import amount_column
+
+_NAT = np.iinfo(np.int64).min
+_DAY_NS = 86_400 * 10**9
+
+# Transaction types read as incoming / outgoing (as in ``RapidFundMovementRule``);
+# other rows are incoming when their amount is non-negative
+_IN_TYPES = {"credit", "incoming", "deposit", "receive", "received"}
+_OUT_TYPES = {"debit", "outgoing", "withdrawal", "send", "sent", "transfer_out"}
+
+
+def incoming_mask(df: pd.DataFrame, amount: np.ndarray) -> np.ndarray:
+    """True for rows classified as incoming funds."""
+    is_in = amount >= 0
+    if "transaction_type" in df.columns:
+        codes, uniques = pd.factorize(df["transaction_type"].to_numpy(), sort=False)
+        types = pd.Series(uniques, dtype=object).fillna("").astype(str).str.strip().str.lower()
+        known_in = np.append(types.isin(_IN_TYPES).to_numpy(), False)
+        known_out = np.append(types.isin(_OUT_TYPES).to_numpy(), False)
+        is_in = (is_in | known_in[codes]) & ~known_out[codes]
+    return is_in
+
+
+def is_incoming(amount: float, transaction_type: object) -> bool:
+    """``incoming_mask`` for a single row."""
+    kind = str(transaction_type).strip().lower() if transaction_type is not None and pd.notna(transaction_type) else ""
+    return (amount >= 0 or kind in _IN_TYPES) and kind not in _OUT_TYPES
+
+
+def _csr(keys: np.ndarray, n_keys: int) -> tuple[np.ndarray, np.ndarray]:
+    order = np.argsort(keys, kind="stable").astype(np.int64)
+    indptr = np.zeros(n_keys + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n_keys), out=indptr[1:])
+    return indptr, order
+
+
+@dataclass
+class TransferLinks:
+    """Matched transfers and shared IBANs over the transaction table.
+
+    Matched transfers are stored column-wise: ``out_row[p]`` / ``in_row[p]``
+    are the table rows of pair ``p`` (sorted by outgoing row).  Shared IBAN
+    ``g`` is ``shared_ibans[g]``, used by ``shared_bcn_count[g]`` customers
+    between ``shared_start[g]`` and ``shared_end[g]`` (ns); its rows in that
+    window are ``shared_rows[shared_indptr[g]:shared_indptr[g + 1]]``.
+    Per-row arrays (``ts``, ``amount``, ``iban``, ``bcn``, ``local_index``)
+    cover the whole table.
+    """
+
+    bcns: pd.Index
+    ibans: pd.Index
+    ts: np.ndarray
+    amount: np.ndarray
+    iban: np.ndarray
+    bcn: np.ndarray
+    local_index: np.ndarray
+    out_row: np.ndarray
+    in_row: np.ndarray
+    shared_ibans: np.ndarray        # IBAN codes
+    shared_bcn_count: np.ndarray
+    shared_start: np.ndarray
+    shared_end: np.ndarray
+    shared_indptr: np.ndarray
+    shared_rows: np.ndarray
+    shared_has_matches: np.ndarray  # the IBAN also carries a matched transfer
+    # Pair ids / shared IBAN ids per BCN code
+    pair_indptr: np.ndarray = field(repr=False)
+    pair_ids: np.ndarray = field(repr=False)
+    shared_bcn_indptr: np.ndarray = field(repr=False)
+    shared_ids: np.ndarray = field(repr=False)
+
+    def code(self, bcn: str) -> int:
+        return int(self.bcns.get_indexer([str(bcn)])[0])
+
+    @property
+    def round_trip(self) -> np.ndarray:
+        """True for pairs whose legs belong to the same customer."""
+        return self.bcn[self.out_row] == self.bcn[self.in_row]
+
+    def pairs_for(self, bcn: str) -> np.ndarray:
+        """Ids of the matched pairs with a leg booked by ``bcn``."""
+        code = self.code(bcn)
+        if code < 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.pair_ids[self.pair_indptr[code]:self.pair_indptr[code + 1]]
+
+    def shared_for(self, bcn: str) -> np.ndarray:
+        """Ids of the shared IBANs ``bcn`` used within their window."""
+        code = self.code(bcn)
+        if code < 0:
+            return np.zeros(0, dtype=np.int64)
+        return self.shared_ids[self.shared_bcn_indptr[code]:self.shared_bcn_indptr[code + 1]]
+
+    def shared_rows_for(self, group: int, bcn: Optional[str] = None) -> np.ndarray:
+        """Table rows of shared IBAN ``group`` in its window, optionally of one customer."""
+        rows = self.shared_rows[self.shared_indptr[group]:self.shared_indptr[group + 1]]
+        if bcn is not None:
+            rows = rows[self.bcn[rows] == self.code(bcn)]
+        return rows
+
+
+def _match_transfers(
+    ts: np.ndarray,
+    amount: np.ndarray,
+    iban: np.ndarray,
+    is_in: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """``(out_row, in_row)`` of every matched transfer, sorted by outgoing row."""
+    empty = np.zeros(0, dtype=np.int64)
+    candidate = (ts != _NAT) & (iban >= 0) & (amount >= MATCHED_TRANSFER_MIN_AMOUNT)
+    ins = np.flatnonzero(candidate & is_in)
+    outs = np.flatnonzero(candidate & ~is_in)
+    if ins.size == 0 or outs.size == 0:
+        return empty, empty
+
+    bucket = np.floor(np.log(amount, where=candidate, out=np.zeros_like(amount))
+                      / np.log1p(MATCHED_TRANSFER_TOLERANCE)).astype(np.int64)
+    lo_bucket = int(bucket[candidate].min()) - 1
+    width = int(bucket[candidate].max()) - lo_bucket + 2
+
+    # Incoming legs sorted by (IBAN, bucket) key, then time rank
+    in_keys, keys = pd.factorize(iban[ins].astype(np.int64) * width + (bucket[ins] - lo_bucket), sort=False)
+    keys = pd.Index(keys)
+    times = np.unique(ts[ins])
+    stride = len(times) + 1
+    composite = in_keys.astype(np.int64) * stride + np.searchsorted(times, ts[ins])
+    order = np.argsort(composite, kind="stable")
+    composite = composite[order]
+
+    window_ns = int(MATCHED_TRANSFER_WINDOW_HOURS * 3600 * 10**9)
+    first_rank = np.searchsorted(times, ts[outs], side="left")
+    end_rank = np.searchsorted(times, ts[outs] + window_ns, side="right")
+
+    out_parts, in_parts = [], []
+    for shift in (-1, 0, 1):
+        key = keys.get_indexer(iban[outs].astype(np.int64) * width + (bucket[outs] + shift - lo_bucket))
+        hit = key >= 0
+        lo = np.searchsorted(composite, key * stride + first_rank, side="left")
+        hi = np.searchsorted(composite, key * stride + end_rank, side="left")
+        counts = np.where(hit, np.minimum(hi - lo, MATCHED_TRANSFER_MAX_CANDIDATES), 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        starts = np.repeat(lo, counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        out_parts.append(np.repeat(outs, counts))
+        in_parts.append(ins[order[starts + offsets]])
+    if not out_parts:
+        return empty, empty
+
+    out_row = np.concatenate(out_parts)
+    in_row = np.concatenate(in_parts)
+    close = np.abs(amount[in_row] - amount[out_row]) <= MATCHED_TRANSFER_TOLERANCE * amount[out_row]
+    out_row, in_row = out_row[close], in_row[close]
+    order = np.lexsort((in_row, out_row))
+    return out_row[order], in_row[order]
+
+
+def _shared_ibans(
+    ts: np.ndarray,
+    iban: np.ndarray,
+    bcn: np.ndarray,
+) -> tuple[np.ndarray, ...]:
+    """IBAN codes used by at least ``SHARED_IBAN_MIN_BCNS`` customers within the window.
+
+    Each customer's days on an IBAN cover the anchor days up to
+    ``SHARED_IBAN_WINDOW_DAYS`` later (until its next day), so the number of
+    customers in the window ending on a day is the number of intervals
+    covering it; a running sum over interval start/end events gives the
+    peak per IBAN.  Returns ``(ibans, bcn_counts, start_ns, end_ns, indptr,
+    rows)`` with each IBAN's table rows inside its peak window in CSR form.
+    """
+    rows = np.flatnonzero((ts != _NAT) & (iban >= 0))
+    empty = np.zeros(0, dtype=np.int64)
+    none = (empty, empty, empty, empty, np.zeros(1, dtype=np.int64), empty)
+    if rows.size == 0:
+        return none
+
+    window = SHARED_IBAN_WINDOW_DAYS
+    triples = pd.DataFrame({"iban": iban[rows], "bcn": bcn[rows], "day": ts[rows] // _DAY_NS}).drop_duplicates()
+    customers = triples.groupby("iban")["bcn"].nunique()
+    triples = triples[triples["iban"].isin(customers.index[customers >= SHARED_IBAN_MIN_BCNS])]
+    if triples.empty:
+        return none
+    triples = triples.sort_values(["iban", "bcn", "day"], ignore_index=True)
+
+    day = triples["day"].to_numpy()
+    same_pair = (triples[["iban", "bcn"]].shift(-1) == triples[["iban", "bcn"]]).all(axis=1).to_numpy()
+    next_day = np.where(same_pair, np.roll(day, -1), np.iinfo(np.int64).max)
+    end = np.minimum(day + window - 1, next_day - 1)
+
+    ib = triples["iban"].to_numpy()
+    events = pd.DataFrame({
+        "iban": np.concatenate([ib, ib]),
+        "day": np.concatenate([day, end + 1]),
+        "delta": np.concatenate([np.ones(len(day), np.int64), -np.ones(len(day), np.int64)]),
+    }).sort_values(["iban", "day", "delta"], ignore_index=True)
+    # Every IBAN's events sum to zero, so one running sum serves all IBANs
+    events["active"] = events["delta"].cumsum()
+    peaks = events.loc[events.groupby("iban")["active"].idxmax()]
+    peaks = peaks[peaks["active"] >= SHARED_IBAN_MIN_BCNS]
+    if peaks.empty:
+        return none
+
+    ibans = peaks["iban"].to_numpy(dtype=np.int64)
+    last_day = peaks["day"].to_numpy(dtype=np.int64)
+    first_day = last_day - window + 1
+
+    group = np.full(int(iban.max()) + 1, -1, dtype=np.int64)
+    group[ibans] = np.arange(len(ibans))
+    g = group[iban[rows]]
+    in_window = g >= 0
+    row_day = ts[rows] // _DAY_NS
+    in_window[in_window] &= (row_day[in_window] >= first_day[g[in_window]]) & (row_day[in_window] <= last_day[g[in_window]])
+    window_rows = rows[in_window]
+    window_groups = g[in_window]
+    indptr, order = _csr(window_groups, len(ibans))
+    return (
+        ibans,
+        peaks["active"].to_numpy(dtype=np.int64),
+        first_day * _DAY_NS,
+        (last_day + 1) * _DAY_NS - 1,
+        indptr,
+        window_rows[order],
+    )
+
+
+def build_transfer_links(df: Optional[pd.DataFrame]) -> Optional[TransferLinks]:
+    """Build matched transfers and shared IBANs from the full transaction table."""
+    required = {"date", "amount", "iban", "business_contact_number"}
+    if df is None or df.empty or not required.issubset(df.columns):
+        return None
+
+    ts = pd.to_datetime(df["date"], errors="coerce").to_numpy(dtype="datetime64[ns]").view(np.int64)
+    signed = pd.to_numeric(df[amount_column(df)], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    amount = np.abs(signed)
+
+    raw_codes, raw_ibans = pd.factorize(df["iban"].to_numpy(), sort=False)
+    clean = pd.Series(raw_ibans, dtype=object).fillna("").astype(str).str.strip().str.upper()
+    clean_codes, ibans = pd.factorize(clean.where(clean != "").to_numpy(), sort=False)
+    iban = np.where(raw_codes >= 0, clean_codes[np.maximum(raw_codes, 0)], -1).astype(np.int32)
+
+    bcn_all = df["business_contact_number"].astype(str)
+    bcn, bcns = pd.factorize(bcn_all.to_numpy(), sort=False)
+    bcn = bcn.astype(np.int32)
+    local_index = bcn_all.groupby(bcn_all, sort=False).cumcount().to_numpy(dtype=np.int64)
+
+    out_row, in_row = _match_transfers(ts, amount, iban, incoming_mask(df, signed))
+    shared_ibans, shared_bcn_count, shared_start, shared_end, shared_indptr, shared_rows = _shared_ibans(ts, iban, bcn)
+
+    # Pair ids per BCN (once per customer, even when both legs are its own)
+    pairs = np.arange(len(out_row), dtype=np.int64)
+    cross = bcn[out_row] != bcn[in_row]
+    pair_bcn = np.concatenate([bcn[out_row], bcn[in_row][cross]])
+    pair_of = np.concatenate([pairs, pairs[cross]])
+    pair_indptr, order = _csr(pair_bcn, len(bcns))
+    pair_ids = pair_of[order]
+
+    # Shared IBAN ids per BCN
+    groups = np.repeat(np.arange(len(shared_ibans), dtype=np.int64), np.diff(shared_indptr))
+    member = pd.DataFrame({"bcn": bcn[shared_rows], "group": groups}).drop_duplicates()
+    shared_bcn_indptr, order = _csr(member["bcn"].to_numpy(), len(bcns))
+    shared_ids = member["group"].to_numpy(dtype=np.int64)[order]
+
+    return TransferLinks(
+        bcns=pd.Index(bcns),
+        ibans=pd.Index(ibans),
+        ts=ts,
+        amount=amount,
+        iban=iban,
+        bcn=bcn,
+        local_index=local_index,
+        out_row=out_row,
+        in_row=in_row,
+        shared_ibans=shared_ibans,
+        shared_bcn_count=shared_bcn_count,
+        shared_start=shared_start,
+        shared_end=shared_end,
+        shared_indptr=shared_indptr,
+        shared_rows=shared_rows,
+        shared_has_matches=np.isin(shared_ibans, iban[out_row]),
+        pair_indptr=pair_indptr,
+        pair_ids=pair_ids,
+        shared_bcn_indptr=shared_bcn_indptr,
+        shared_ids=shared_ids,
+    )
@@ -0,0 +1,122 @@
+"""Upload cache - parsed uploads keyed by the SHA-256 of the uploaded bytes.
+
+Re-uploading a workbook that was parsed before (after a restart or
+``/upload/clear``) loads the cached columns instead of running openpyxl
+and the type coercions again.  Entries are stored in the shared store's
+column format (one ``.npy`` file per column, strings dictionary-encoded)
+together with the parse warnings, and the least recently
+used entries are evicted once the cache exceeds its size budget.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import threading
+import uuid
+from typing import Callable, Optional, Tuple
+
+import pandas as pd
+
+from config import UPLOAD_CACHE_DIR, UPLOAD_CACHE_MAX_BYTES
+from services.shared_store import read_frame, write_frame
+
+# Bump when a parser's output changes so stale entries are not served
+CACHE_FORMAT = 1
+
+_FRAME_DIR = "frame"
+_WARNINGS_FILE = "warnings.json"
+
+ParseResult = Tuple[pd.DataFrame, list[str]]
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class UploadCache:
+    """Directory of parsed uploads, one sub-directory per ``(kind, digest)``."""
+
+    def __init__(self, root: str, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, kind: str, digest: str) -> str:
+        return os.path.join(self.root, f"{kind}-v{CACHE_FORMAT}-{digest}")
+
+    def get(self, kind: str, digest: str) -> Optional[ParseResult]:
+        path = self._path(kind, digest)
+        try:
+            with open(os.path.join(path, _WARNINGS_FILE), encoding="utf-8") as fh:
+                warnings = json.load(fh)
+            df = read_frame(os.path.join(path, _FRAME_DIR), mmap=False)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        # Entry recency for eviction
+        os.utime(path)
+        return df, warnings
+
+    def put(self, kind: str, digest: str, df: pd.DataFrame, warnings: list[str]) -> None:
+        """Store a parse result; written to a temporary directory and renamed into place."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = os.path.join(self.root, f".tmp-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(tmp)
+            write_frame(os.path.join(tmp, _FRAME_DIR), df)
+            with open(os.path.join(tmp, _WARNINGS_FILE), "w", encoding="utf-8") as fh:
+                json.dump(warnings, fh)
+            os.replace(tmp, self._path(kind, digest))
+        except OSError:
+            # Another worker stored the same entry first, or the disk is full
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits ``max_bytes``."""
+        with self._lock:
+            try:
+                names = [n for n in os.listdir(self.root) if not n.startswith(".")]
+            except FileNotFoundError:
+                return
+            entries = []
+            for name in names:
+                path = os.path.join(self.root, name)
+                try:
+                    entries.append((os.path.getmtime(path), _dir_size(path), path))
+                except OSError:
+                    continue
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+    def parse(self, kind: str, digest: str, parse: Callable[[], ParseResult]) -> ParseResult:
+        """Cached result for ``digest``, or ``parse()`` stored under it."""
+        if not self.enabled:
+            return parse()
+        cached = self.get(kind, digest)
+        if cached is not None:
+            return cached
+        df, warnings = parse()
+        self.put(kind, digest, df, warnings)
+        return df, warnings
+
+
+# Shared cache used by the upload parsers
+upload_cache = UploadCache(UPLOAD_CACHE_DIR, UPLOAD_CACHE_MAX_BYTES)
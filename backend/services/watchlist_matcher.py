@@ -1,14 +1,284 @@
-"""Watchlist matcher - standalone fuzzy name matching utility."""
+"""Watchlist matcher - fuzzy name screening table and lookup utilities."""
 
 from __future__ import annotations
 
-from typing import Optional
+import bisect
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
 
+import numpy as np
 import pandas as pd
 from rapidfuzz import fuzz, process
 
-from config import FUZZY_MATCH_MEDIUM
-from models.schemas import WatchlistMatch
+from config import FUZZY_MATCH_MEDIUM, NAME_SCREENING_CHUNK_SIZE
+from models.schemas import WatchlistDelta, WatchlistMatch
+
+# Counterparty name columns screened against the watchlist
+NAME_FIELDS = ["sender", "receiver"]
+
+
+def _clean_names(values: Iterable) -> pd.Series:
+    return pd.Series(list(values), dtype=object).fillna("").astype(str).str.strip()
+
+
+def watchlist_entries(watchlist_df: Optional[pd.DataFrame]) -> list[str]:
+    """Distinct non-empty watchlist names (case-insensitive, first spelling wins)."""
+    if watchlist_df is None or watchlist_df.empty or "name" not in watchlist_df.columns:
+        return []
+    names = _clean_names(watchlist_df["name"].dropna())
+    names = names[names != ""]
+    return names[~names.str.lower().duplicated()].tolist()
+
+
+def counterparty_names(transactions_df: Optional[pd.DataFrame]) -> list[str]:
+    """Distinct lower-cased sender/receiver names in a transaction table."""
+    if transactions_df is None or transactions_df.empty:
+        return []
+    names: set[str] = set()
+    for col in NAME_FIELDS:
+        if col in transactions_df.columns:
+            uniques = _clean_names(transactions_df[col].unique()).str.lower().unique()
+            names.update(uniques)
+    names.discard("")
+    return sorted(names)
+
+
+def score_names(names: list[str], entries: list[str]) -> dict[str, list[tuple[str, float]]]:
+    """Fuzzy-score lower-cased ``names`` against watchlist ``entries``.
+
+    Returns ``{name: [(entry, score), ...]}`` for every pair scoring at least
+    ``FUZZY_MATCH_MEDIUM``, with each name's entries in watchlist order.
+    Scoring runs in ``NAME_SCREENING_CHUNK_SIZE`` blocks through ``cdist``.
+    """
+    matches: dict[str, list[tuple[str, float]]] = {}
+    if not names or not entries:
+        return matches
+
+    lowered = [e.lower() for e in entries]
+    for start in range(0, len(names), NAME_SCREENING_CHUNK_SIZE):
+        block = names[start:start + NAME_SCREENING_CHUNK_SIZE]
+        scores = process.cdist(
+            block,
+            lowered,
+            scorer=fuzz.token_sort_ratio,
+            score_cutoff=FUZZY_MATCH_MEDIUM,
+            dtype=np.float32,
+            workers=-1,
+        )
+        rows, cols = np.nonzero(scores >= FUZZY_MATCH_MEDIUM)
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            matches.setdefault(block[r], []).append((entries[c], float(scores[r, c])))
+    return matches
+
+
+@dataclass
+class NameScreeningTable:
+    """Every distinct counterparty name screened once against the watchlist.
+
+    ``matches`` maps a lower-cased, stripped name to its ``(watchlist_entry,
+    score)`` hits in watchlist order; names without hits are absent, so a
+    per-customer lookup is a dictionary join on the customer's names.
+    ``bcn_indptr``/``bcn_codes`` are a CSR index from each position in
+    ``names`` to the BCNs (codes into ``bcns``) whose transactions use it.
+    """
+
+    entries: list[str] = field(default_factory=list)
+    names: list[str] = field(default_factory=list)
+    matches: dict[str, list[tuple[str, float]]] = field(default_factory=dict)
+    bcns: pd.Index = field(default_factory=pd.Index)
+    bcn_indptr: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int64))
+    bcn_codes: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+
+    def lookup(self, name: str) -> list[tuple[str, float]]:
+        return self.matches.get(name.strip().lower(), [])
+
+    def bcns_for(self, names: Iterable[str]) -> list[str]:
+        """Sorted BCNs whose transactions mention any of ``names`` (lower-cased)."""
+        positions = np.searchsorted(self.names, list(names))
+        parts = [
+            self.bcn_codes[self.bcn_indptr[p]:self.bcn_indptr[p + 1]]
+            for p in positions.tolist()
+        ]
+        if not parts:
+            return []
+        return sorted(self.bcns[np.unique(np.concatenate(parts))].tolist())
+
+    def with_watchlist(self, entries: list[str]) -> tuple["NameScreeningTable", WatchlistDelta]:
+        """Return a table screened against ``entries`` and the delta from this one.
+
+        Only entries not already present (case-insensitively) are scored;
+        matches for entries no longer present are retired.
+        """
+        current = {e.lower() for e in self.entries}
+        incoming = {e.lower() for e in entries}
+        added = [e for e in entries if e.lower() not in current]
+        removed = [e for e in self.entries if e.lower() not in incoming]
+        removed_keys = {e.lower() for e in removed}
+
+        matches = dict(self.matches)
+        lost: set[str] = set()
+        retired = 0
+        if removed_keys:
+            for name, hits in self.matches.items():
+                kept = [hit for hit in hits if hit[0].lower() not in removed_keys]
+                if len(kept) == len(hits):
+                    continue
+                retired += len(hits) - len(kept)
+                lost.add(name)
+                if kept:
+                    matches[name] = kept
+                else:
+                    del matches[name]
+
+        gained = score_names(self.names, added)
+        for name, hits in gained.items():
+            matches[name] = matches.get(name, []) + hits
+
+        table = NameScreeningTable(
+            entries=list(entries),
+            names=self.names,
+            matches=matches,
+            bcns=self.bcns,
+            bcn_indptr=self.bcn_indptr,
+            bcn_codes=self.bcn_codes,
+        )
+        delta = WatchlistDelta(
+            added_entries=added,
+            removed_entries=removed,
+            unchanged_entry_count=len(entries) - len(added),
+            new_match_count=sum(len(hits) for hits in gained.values()),
+            retired_match_count=retired,
+            bcns_gained=self.bcns_for(gained),
+            bcns_lost=self.bcns_for(lost),
+        )
+        return table, delta
+
+    def with_transactions(self, transactions_df: pd.DataFrame) -> "NameScreeningTable":
+        """Return a table also covering the counterparty names of appended ``transactions_df``.
+
+        Only names not already in the table are scored; the name/BCN index
+        gains the new rows' (name, BCN) pairs.
+        """
+        incoming = counterparty_names(transactions_df)
+        # Old-list insertion points (bisect keeps this O(new names), not O(table))
+        at = [bisect.bisect_left(self.names, n) for n in incoming]
+        fresh = [i for i, (n, p) in enumerate(zip(incoming, at)) if p == len(self.names) or self.names[p] != n]
+        added = [incoming[i] for i in fresh]
+        inserted = np.array([at[i] for i in fresh], dtype=np.int64)
+        names: list[str] = []
+        previous = 0
+        for p, name in zip(inserted.tolist(), added):
+            names.extend(self.names[previous:p])
+            names.append(name)
+            previous = p
+        names.extend(self.names[previous:])
+
+        new_bcns, new_indptr, new_codes = _name_bcn_index(transactions_df, incoming)
+        unseen = self.bcns.get_indexer(new_bcns) < 0
+        bcns = self.bcns.union(new_bcns) if unseen.any() else self.bcns
+        n_bcns = max(len(bcns), 1)
+
+        # Old positions move up by the names inserted at or before them; the
+        # BCN remap is monotone too, so the old keys stay sorted
+        old_names = np.repeat(np.arange(len(self.names)), np.diff(self.bcn_indptr))
+        old_names = old_names + np.searchsorted(inserted, old_names, side="right")
+        old_bcns = self.bcn_codes if bcns is self.bcns else bcns.get_indexer(self.bcns)[self.bcn_codes]
+        keys = old_names.astype(np.int64) * n_bcns + old_bcns
+
+        # An added name lands after the names added before it
+        incoming_pos = np.array(at, dtype=np.int64)
+        incoming_pos += np.searchsorted(inserted, incoming_pos, side="right")
+        incoming_pos[fresh] = inserted + np.arange(len(fresh))
+        pair_names = incoming_pos[np.repeat(np.arange(len(incoming)), np.diff(new_indptr))]
+        pair_bcns = bcns.get_indexer(new_bcns)[new_codes]
+        new_keys = np.unique(pair_names * n_bcns + pair_bcns)
+        at = np.searchsorted(keys, new_keys)
+        present = np.zeros(len(new_keys), dtype=bool)
+        inside = at < len(keys)
+        present[inside] = keys[at[inside]] == new_keys[inside]
+        keys = np.insert(keys, at[~present], new_keys[~present])
+
+        matches = self.matches
+        if added and self.entries:
+            matches = {**self.matches, **score_names(added, self.entries)}
+        return NameScreeningTable(
+            entries=self.entries,
+            names=names,
+            matches=matches,
+            bcns=bcns,
+            bcn_indptr=np.searchsorted(keys // n_bcns, np.arange(len(names) + 1), side="left"),
+            bcn_codes=keys % n_bcns,
+        )
+
+
+def _name_bcn_index(
+    transactions_df: pd.DataFrame,
+    names: list[str],
+) -> tuple[pd.Index, np.ndarray, np.ndarray]:
+    """CSR index from each of ``names`` to the BCNs using it as sender/receiver."""
+    if "business_contact_number" in transactions_df.columns:
+        bcn_col = transactions_df["business_contact_number"].astype(str).to_numpy()
+    else:
+        bcn_col = np.full(len(transactions_df), "", dtype=object)
+    bcn_codes, bcns = pd.factorize(bcn_col, sort=True)
+    name_index = pd.Index(names)
+
+    name_parts, bcn_parts = [], []
+    for col in NAME_FIELDS:
+        if col not in transactions_df.columns:
+            continue
+        codes, uniques = pd.factorize(transactions_df[col].fillna("").astype(str).to_numpy())
+        lookup = name_index.get_indexer(_clean_names(uniques).str.lower())
+        row_names = lookup[codes] if len(uniques) else np.full(len(codes), -1)
+        keep = row_names >= 0
+        name_parts.append(row_names[keep])
+        bcn_parts.append(bcn_codes[keep])
+
+    n_bcns = max(len(bcns), 1)
+    if name_parts:
+        pairs = np.unique(np.concatenate(name_parts).astype(np.int64) * n_bcns + np.concatenate(bcn_parts))
+    else:
+        pairs = np.zeros(0, dtype=np.int64)
+    pair_names, pair_bcns = pairs // n_bcns, pairs % n_bcns
+    indptr = np.searchsorted(pair_names, np.arange(len(names) + 1), side="left")
+    return pd.Index(bcns), indptr, pair_bcns
+
+
+def build_name_screening_table(
+    transactions_df: Optional[pd.DataFrame],
+    watchlist_df: Optional[pd.DataFrame],
+) -> Optional[NameScreeningTable]:
+    """Screen all distinct counterparty names in ``transactions_df`` against the watchlist.
+
+    A table is built even for an empty watchlist so that later watchlist
+    uploads can be applied incrementally with ``with_watchlist``.
+    """
+    if transactions_df is None or transactions_df.empty:
+        return None
+    entries = watchlist_entries(watchlist_df)
+    names = counterparty_names(transactions_df)
+    bcns, indptr, codes = _name_bcn_index(transactions_df, names)
+    return NameScreeningTable(
+        entries=entries,
+        names=names,
+        matches=score_names(names, entries),
+        bcns=bcns,
+        bcn_indptr=indptr,
+        bcn_codes=codes,
+    )
+
+
+def name_positions(transactions: pd.DataFrame, field: str) -> tuple[pd.Series, dict[str, list[int]]]:
+    """Return the stripped ``field`` values and a lower-cased name -> row index map.
+
+    Names appear in the map in order of first occurrence.
+    """
+    names = transactions[field].fillna("").astype(str).str.strip()
+    positions: dict[str, list[int]] = {}
+    for name, idx in zip(names.str.lower().tolist(), transactions.index.tolist()):
+        if name:
+            positions.setdefault(name, []).append(int(idx))
+    return names, positions
 
 
 def match_names(
@@ -16,6 +286,7 @@ def match_names(
     watchlist_df: pd.DataFrame,
     match_field: str,
     transaction_indices_map: Optional[dict[str, list[int]]] = None,
+    table: Optional[NameScreeningTable] = None,
 ) -> list[WatchlistMatch]:
     """Match a list of entity names against watchlist entries.
 
@@ -24,23 +295,27 @@ def match_names(
     names : list[str]
         Names to match (e.g. sender/receiver names).
     watchlist_df : pd.DataFrame
-        Watchlist with at least a 'name' column.
+        Watchlist with at least a 'name' column.  Only used when ``table``
+        is not given.
     match_field : str
         Label describing the source field (e.g. "sender", "receiver").
     transaction_indices_map : dict, optional
         Mapping from name (lowered) to list of transaction indices where the name appears.
+    table : NameScreeningTable, optional
+        Precomputed screening table (``DataStore.name_screening``); names are
+        then looked up instead of re-scored.
 
     Returns
     -------
     list[WatchlistMatch]
+        At most five best-scoring entries per name.
     """
-    if watchlist_df is None or watchlist_df.empty or "name" not in watchlist_df.columns:
-        return []
+    if table is None:
+        entries = watchlist_entries(watchlist_df)
+        cleaned = sorted({n.strip().lower() for n in names} - {""})
+        table = NameScreeningTable(entries=entries, names=cleaned, matches=score_names(cleaned, entries))
 
-    watchlist_names = watchlist_df["name"].dropna().astype(str).str.strip().tolist()
-    watchlist_names = [n for n in watchlist_names if n]
-
-    if not watchlist_names or not names:
+    if not table.matches or not names:
         return []
 
     if transaction_indices_map is None:
@@ -54,31 +329,20 @@ def match_names(
         if not entity_clean:
             continue
 
-        results = process.extract(
-            entity_clean,
-            watchlist_names,
-            scorer=fuzz.token_sort_ratio,
-            limit=5,
-        )
-
-        for wl_name, score, _ in results:
-            if score < FUZZY_MATCH_MEDIUM:
-                continue
-
+        hits = sorted(table.lookup(entity_clean), key=lambda hit: -hit[1])[:5]
+        for wl_name, score in hits:
             dedup_key = (entity_clean.lower(), wl_name.lower())
             if dedup_key in seen:
                 continue
             seen.add(dedup_key)
 
-            tx_indices = transaction_indices_map.get(entity_clean.lower(), [])
-
             matches.append(
                 WatchlistMatch(
                     matched_entity=entity_clean,
                     watchlist_entry=wl_name,
                     match_score=round(score, 1),
                     match_field=match_field,
-                    transaction_indices=tx_indices,
+                    transaction_indices=transaction_indices_map.get(entity_clean.lower(), []),
                 )
             )
 
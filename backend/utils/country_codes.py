@@ -0,0 +1,70 @@
+"""Vectorized extraction of ISO country codes from IBAN and BIC columns."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def _extract(series: pd.Series, start: int, end: int) -> pd.Series:
+    """Slice ``[start:end]`` out of each upper-cased value, keeping only alphabetic codes.
+
+    The string work is done once per distinct value and broadcast back, so
+    the cost scales with the number of distinct IBANs/BICs, not rows.
+    """
+    codes, uniques = pd.factorize(series.to_numpy(), sort=False)
+    clean = pd.Series(uniques, dtype=object).fillna("").astype(str).str.strip().str.upper()
+    cc = clean.str[start:end]
+    cc = cc.where((clean.str.len() >= end) & cc.str.isalpha(), "")
+    out = np.where(codes >= 0, cc.to_numpy(dtype=object)[np.maximum(codes, 0)], "")
+    return pd.Series(out, index=series.index, dtype=object)
+
+
+def iban_country(series: pd.Series) -> pd.Series:
+    """First 2 characters of each IBAN, or ``""`` when not a country code."""
+    return _extract(series, 0, 2)
+
+
+def bic_country(series: pd.Series) -> pd.Series:
+    """Characters 5-6 (0-indexed 4:6) of each BIC, or ``""`` when not a country code."""
+    return _extract(series, 4, 6)
+
+
+def high_risk_codes(high_risk_countries_df: pd.DataFrame | None) -> set[str]:
+    """Return the set of upper-cased country codes on the high-risk list."""
+    if high_risk_countries_df is None or high_risk_countries_df.empty:
+        return set()
+    if "country_code" not in high_risk_countries_df.columns:
+        return set()
+    codes = (
+        high_risk_countries_df["country_code"]
+        .dropna()
+        .astype(str)
+        .str.strip()
+        .str.upper()
+    )
+    return {c for c in codes if c}
+
+
+def high_risk_levels(high_risk_countries_df: pd.DataFrame | None) -> dict[str, str]:
+    """Map each upper-cased country code on the high-risk list to its risk level."""
+    codes = high_risk_codes(high_risk_countries_df)
+    if not codes or "risk_level" not in high_risk_countries_df.columns:
+        return dict.fromkeys(codes, "")
+    df = high_risk_countries_df
+    keys = df["country_code"].fillna("").astype(str).str.strip().str.upper()
+    levels = df["risk_level"].fillna("").astype(str).str.strip()
+    # Later rows win, as in ``HighRiskCountryRule``
+    return {k: v for k, v in zip(keys, levels) if k}
+
+
+def high_risk_mask(transactions_df: pd.DataFrame, hr_codes: set[str]) -> np.ndarray:
+    """Boolean array: True where the IBAN or BIC country is in ``hr_codes``."""
+    mask = np.zeros(len(transactions_df), dtype=bool)
+    if not hr_codes:
+        return mask
+    if "iban" in transactions_df.columns:
+        mask |= iban_country(transactions_df["iban"]).isin(hr_codes).to_numpy()
+    if "bic" in transactions_df.columns:
+        mask |= bic_country(transactions_df["bic"]).isin(hr_codes).to_numpy()
+    return mask
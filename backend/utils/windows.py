@@ -0,0 +1,62 @@
+"""Sorted time-window primitives shared by the vectorized rule evaluators.
+
+Rows are expected sorted by an integer ``key`` that places each group (BCN)
+on its own stretch of the time axis, so one ``searchsorted`` finds every
+window without crossing from one customer into the next.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def window_ends(key: np.ndarray, seconds: float) -> np.ndarray:
+    """Index one past the last row with ``key <= key_i + seconds`` (same BCN)."""
+    return np.searchsorted(key, key + int(seconds), side="right")
+
+
+def prefix_sums(values: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(values) + 1, dtype=np.float64)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def previous_occurrence(codes: np.ndarray) -> np.ndarray:
+    """Position of the previous row with the same code, -1 if none (or code is -1)."""
+    prev = np.full(len(codes), -1, dtype=np.int64)
+    valid = np.flatnonzero(codes >= 0)
+    if valid.size == 0:
+        return prev
+    order = valid[np.argsort(codes[valid], kind="stable")]
+    same = codes[order[1:]] == codes[order[:-1]]
+    prev[order[1:][same]] = order[:-1][same]
+    return prev
+
+
+def distinct_in_windows(codes: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Number of distinct non-negative codes in each window ``[i, ends[i])``.
+
+    Row ``p`` is the first occurrence of its code inside window ``i`` exactly
+    when ``prev[p] < i <= p`` and the window reaches ``p``; because window
+    ends are non-decreasing those ``i`` form one contiguous range, so the
+    counts come from a single difference array.
+    """
+    n = len(codes)
+    prev = previous_occurrence(codes)
+    positions = np.arange(n)
+    first_covering = np.searchsorted(ends, positions, side="right")
+    lo = np.maximum(prev + 1, first_covering)
+    valid = (codes >= 0) & (lo <= positions)
+    diff = (
+        np.bincount(lo[valid], minlength=n + 1)
+        - np.bincount(positions[valid] + 1, minlength=n + 1)
+    )
+    return np.cumsum(diff[:-1])
+
+
+def concat_ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of ``arange(starts[k], ends[k])`` over all ``k``."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(total) - np.repeat(offsets - starts, lengths)
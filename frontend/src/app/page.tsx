@@ -13,6 +13,7 @@ export default function Home() {
     watchlist: false,
     high_risk_countries: false,
     work_instructions: false,
+    fx_rates: false,
   });
   const [statusLoaded, setStatusLoaded] = useState(false);
 
@@ -14,6 +14,7 @@ export default function UploadPage() {
     FILE_TYPES.watchlist,
     FILE_TYPES.high_risk_countries,
     FILE_TYPES.work_instructions,
+    FILE_TYPES.fx_rates,
   ];
 
   return (
@@ -11,6 +11,7 @@ const fileLabels: { key: keyof UploadStatusType; label: string }[] = [
   { key: "watchlist", label: "Watchlist" },
   { key: "high_risk_countries", label: "High-Risk Countries" },
   { key: "work_instructions", label: "Work Instructions" },
+  { key: "fx_rates", label: "FX Rates" },
 ];
 
 export default function UploadStatus({ status }: UploadStatusProps) {
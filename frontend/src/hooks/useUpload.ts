@@ -14,6 +14,7 @@ const STATUS_KEY_MAP: Record<string, keyof UploadStatus> = {
   watchlist: "watchlist",
   "high-risk-countries": "high_risk_countries",
   "work-instructions": "work_instructions",
+  "fx-rates": "fx_rates",
 };
 
 interface UploadState {
@@ -30,6 +31,7 @@ export function useUpload() {
       watchlist: false,
       high_risk_countries: false,
       work_instructions: false,
+      fx_rates: false,
     },
     loading: false,
     error: null,
@@ -38,6 +40,7 @@ export function useUpload() {
       watchlist: null,
       high_risk_countries: null,
       work_instructions: null,
+      fx_rates: null,
     },
   });
 
@@ -100,6 +103,7 @@ export function useUpload() {
           watchlist: false,
           high_risk_countries: false,
           work_instructions: false,
+          fx_rates: false,
         },
         loading: false,
         error: null,
@@ -108,6 +112,7 @@ export function useUpload() {
           watchlist: null,
           high_risk_countries: null,
           work_instructions: null,
+          fx_rates: null,
         },
       });
     } catch (err) {
@@ -53,4 +53,11 @@ export const FILE_TYPES = {
       "Upload any existing work instructions associated with customers.",
     required: false,
   },
+  fx_rates: {
+    key: "fx-rates",
+    label: "FX Rates",
+    description:
+      "Upload daily FX rates (date, currency, units per EUR) to normalize non-EUR amounts.",
+    required: false,
+  },
 } as const;
@@ -16,7 +16,11 @@ export type AlertType =
   | "DORMANT_ACCOUNT"
   | "COUNTERPARTY_CONCENTRATION"
   | "PROFILE_DEVIATION"
-  | "FLOW_THROUGH";
+  | "FLOW_THROUGH"
+  | "LAYERING_CHAIN"
+  | "MATCHED_TRANSFER"
+  | "ROUND_TRIP"
+  | "SHARED_IBAN";
 
 /* ---- Transaction ---- */
 
@@ -32,6 +36,7 @@ export interface Transaction {
   description: string | null;
   transaction_type: string | null;
   flags: string[];
+  indicators?: string[];
 }
 
 /* ---- Alert ---- */
@@ -109,10 +114,21 @@ export interface CustomerOverview {
 
 /* ---- Upload ---- */
 
+export interface WatchlistDelta {
+  added_entries: string[];
+  removed_entries: string[];
+  unchanged_entry_count: number;
+  new_match_count: number;
+  retired_match_count: number;
+  bcns_gained: string[];
+  bcns_lost: string[];
+}
+
 export interface UploadResponse {
   status: string;
   record_count: number;
   warnings: string[];
+  watchlist_delta?: WatchlistDelta | null;
 }
 
 export interface UploadStatus {
@@ -120,6 +136,7 @@ export interface UploadStatus {
   watchlist: boolean;
   high_risk_countries: boolean;
   work_instructions: boolean;
+  fx_rates: boolean;
 }
 
 /* ---- Search ---- */